@@ -1,6 +1,12 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class ClientesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'clientes'
+
+    def ready(self):
+        # En SQLite la búsqueda usa una tabla FTS5 que se (re)instala tras cada migrate
+        from .busqueda import instalar_busqueda_sqlite
+        post_migrate.connect(instalar_busqueda_sqlite, sender=self)
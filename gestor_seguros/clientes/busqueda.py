@@ -0,0 +1,116 @@
+# clientes/busqueda.py
+"""
+Búsqueda de texto libre (subcadenas) con índices:
+
+- PostgreSQL: índices GIN de trigramas (pg_trgm) sobre UPPER(columna), que son
+  los que usa el icontains de Django. Se crean en las migraciones.
+- SQLite: tablas virtuales FTS5 con tokenizador 'trigram', mantenidas por
+  triggers. Se instalan después de cada migrate (ver instalar_busqueda_sqlite),
+  porque SQLite borra los triggers cuando una migración reconstruye la tabla.
+- Otros motores, o textos de menos de 3 caracteres: icontains sin índice.
+"""
+from django.db import connection, transaction
+from django.db.models import Q
+from django.db.models.expressions import RawSQL
+from django.db.utils import OperationalError
+
+# Los trigramas solo sirven a partir de 3 caracteres
+LONGITUD_MINIMA = 3
+
+TABLA_BUSQUEDA_CLIENTES = 'clientes_cliente_busqueda'
+
+SQL_BUSQUEDA_CLIENTES = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_BUSQUEDA_CLIENTES}
+        USING fts5(nombre_completo, numero_documento, tokenize='trigram')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA_CLIENTES}_ai AFTER INSERT ON clientes_cliente BEGIN
+        INSERT INTO {TABLA_BUSQUEDA_CLIENTES}(rowid, nombre_completo, numero_documento)
+        VALUES (new.id, new.nombre_completo, new.numero_documento);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA_CLIENTES}_au
+        AFTER UPDATE OF nombre_completo, numero_documento ON clientes_cliente BEGIN
+        DELETE FROM {TABLA_BUSQUEDA_CLIENTES} WHERE rowid = old.id;
+        INSERT INTO {TABLA_BUSQUEDA_CLIENTES}(rowid, nombre_completo, numero_documento)
+        VALUES (new.id, new.nombre_completo, new.numero_documento);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA_CLIENTES}_ad AFTER DELETE ON clientes_cliente BEGIN
+        DELETE FROM {TABLA_BUSQUEDA_CLIENTES} WHERE rowid = old.id;
+    END""",
+]
+
+SQL_CARGA_CLIENTES = f"""
+    INSERT INTO {TABLA_BUSQUEDA_CLIENTES}(rowid, nombre_completo, numero_documento)
+    SELECT id, nombre_completo, numero_documento FROM clientes_cliente
+"""
+
+
+# --- UTILIDADES COMPARTIDAS (también las usa polizas.busqueda) ---
+
+def _tablas_instaladas():
+    # Por conexión: la consulta a sqlite_master se hace una vez y no en cada búsqueda
+    return connection.__dict__.setdefault('_tablas_busqueda', {})
+
+
+def usa_busqueda_sqlite(tabla):
+    """True si la base es SQLite y la tabla FTS5 de búsqueda está instalada."""
+    if connection.vendor != 'sqlite':
+        return False
+    instaladas = _tablas_instaladas()
+    if tabla not in instaladas:
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = %s", [tabla])
+            instaladas[tabla] = cursor.fetchone() is not None
+    return instaladas[tabla]
+
+
+def filtrar_por_fts(queryset, tabla, texto):
+    """Filtra por los rowid (pk) que la tabla FTS5 encuentra para 'texto' como subcadena."""
+    frase = '"' + texto.replace('"', '""') + '"'
+    return queryset.filter(pk__in=RawSQL(f"SELECT rowid FROM {tabla} WHERE {tabla} MATCH %s", [frase]))
+
+
+def instalar_tabla_fts(tabla, sentencias, sql_carga):
+    """
+    Crea (si no existen) la tabla FTS5 y sus triggers en SQLite. Si faltaba algún
+    trigger, la tabla se vuelve a cargar desde cero. No hace nada en otros motores
+    ni si SQLite no trae FTS5 con el tokenizador trigram (se usa icontains).
+    """
+    if connection.vendor != 'sqlite':
+        return
+    triggers = [f"{tabla}_ai", f"{tabla}_au", f"{tabla}_ad"]
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT count(*) FROM sqlite_master WHERE type = 'trigger' AND name IN (%s, %s, %s)", triggers
+        )
+        completa = cursor.fetchone()[0] == len(triggers)
+        try:
+            with transaction.atomic():
+                for sentencia in sentencias:
+                    cursor.execute(sentencia)
+                if not completa:
+                    cursor.execute(f"DELETE FROM {tabla}")
+                    cursor.execute(sql_carga)
+            _tablas_instaladas()[tabla] = True
+        except OperationalError:
+            # SQLite sin FTS5 / trigram (anterior a 3.34): la búsqueda usa icontains
+            _tablas_instaladas()[tabla] = False
+
+
+# --- CLIENTES ---
+
+def instalar_busqueda_sqlite(**kwargs):
+    """Receptor de post_migrate: tabla de búsqueda de clientes para SQLite."""
+    instalar_tabla_fts(TABLA_BUSQUEDA_CLIENTES, SQL_BUSQUEDA_CLIENTES, SQL_CARGA_CLIENTES)
+
+
+def buscar_clientes(queryset, texto):
+    """Clientes cuyo nombre o número de documento contiene 'texto'."""
+    texto = (texto or '').strip()
+    if not texto:
+        return queryset
+    if len(texto) >= LONGITUD_MINIMA and usa_busqueda_sqlite(TABLA_BUSQUEDA_CLIENTES):
+        return filtrar_por_fts(queryset, TABLA_BUSQUEDA_CLIENTES, texto)
+    # En PostgreSQL ambos icontains usan su índice de trigramas (BitmapOr)
+    return queryset.filter(
+        Q(nombre_completo__icontains=texto) |
+        Q(numero_documento__icontains=texto)
+    )
@@ -1,8 +1,8 @@
 # polizas/filters.py
 import django_filters
 from .models import Cliente
+from .busqueda import buscar_clientes
 from django import forms
-from django.db import models
 
 
 class ClienteFilter(django_filters.FilterSet):
@@ -17,7 +17,4 @@ class ClienteFilter(django_filters.FilterSet):
         fields = [] # No necesitamos más filtros automáticos por ahora
 
     def filtro_nombre_o_doc(self, queryset, name, value):
-        return queryset.filter(
-            models.Q(nombre_completo__icontains=value) | 
-            models.Q(numero_documento__icontains=value)
-        )
+        return buscar_clientes(queryset, value)
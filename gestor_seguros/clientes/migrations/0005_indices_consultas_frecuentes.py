@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('clientes', '0004_historicalcliente'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['usuario', 'nombre_completo'], name='cliente_usuario_nombre_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='cliente',
+            index=models.Index(fields=['usuario', 'fecha_nacimiento'], name='cliente_usuario_nacim_idx'),
+        ),
+    ]
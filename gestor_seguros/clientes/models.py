@@ -43,4 +43,10 @@ class Cliente(models.Model):
         verbose_name = "Cliente"
         verbose_name_plural = "Clientes"
         ordering = ['nombre_completo']
-        unique_together = ('usuario', 'numero_documento')
\ No newline at end of file
+        unique_together = ('usuario', 'numero_documento')
+        indexes = [
+            # Listado de clientes del usuario ordenado por nombre
+            models.Index(fields=['usuario', 'nombre_completo'], name='cliente_usuario_nombre_idx'),
+            # Cumpleaños del mes (dashboard)
+            models.Index(fields=['usuario', 'fecha_nacimiento'], name='cliente_usuario_nacim_idx'),
+        ]
\ No newline at end of file
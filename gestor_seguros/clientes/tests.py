@@ -1,3 +1,77 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.test import TestCase, override_settings
+from django.urls import reverse
+
+from polizas.models import Aseguradora, Poliza
+from .busqueda import TABLA_BUSQUEDA_CLIENTES, usa_busqueda_sqlite
+from .filters import ClienteFilter
+from .models import Cliente
+
+
+# Sin el manifiesto de collectstatic: las plantillas usan {% static %}. La caché en
+# memoria deja fuera de la cuenta las consultas de la caché en base de datos.
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class DetalleClienteTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('corredor', 'corredor@example.com', 'clave')
+        cls.cliente = Cliente.objects.create(usuario=cls.usuario, nombre_completo="Ana Pérez", numero_documento='V-1')
+        cls.aseguradora = Aseguradora.objects.create(usuario=cls.usuario, nombre="Seguros Caracas")
+
+    def crear_polizas(self, cantidad):
+        inicio = Poliza.objects.count()
+        for i in range(cantidad):
+            Poliza.objects.create(
+                usuario=self.usuario, cliente=self.cliente, aseguradora=self.aseguradora,
+                numero_poliza=f'P-{inicio + i}', ramo_tipo_seguro='Automóvil',
+                fecha_inicio_vigencia=date(2026, 1, 1), fecha_fin_vigencia=date(2026, 12, 31) + timedelta(days=20 * i),
+                prima_total_anual=Decimal('1200'), frecuencia_pago='MENSUAL', estado_poliza='VIGENTE',
+            )
+
+    def test_consultas_fijas_sin_importar_las_polizas(self):
+        self.client.force_login(self.usuario)
+        url = reverse('clientes:detalle_cliente', args=[self.cliente.pk])
+        for cantidad in (1, 20):
+            self.crear_polizas(cantidad)
+            self.client.get(url)
+            with self.assertNumQueries(5):
+                respuesta = self.client.get(url)
+            self.assertEqual(respuesta.context['polizas_cliente'].total, Poliza.objects.filter(cliente=self.cliente).count())
+
+
+class BusquedaClientesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('corredor', 'corredor@example.com', 'clave')
+        otro = User.objects.create_user('otro', 'otro@example.com', 'clave')
+        for usuario, nombre, documento in [
+            (cls.usuario, "María Fernández", 'V-12345678'),
+            (cls.usuario, "José Ruiz", 'V-87654321'),
+            (otro, "María Fernández", 'V-12345670'),
+        ]:
+            Cliente.objects.create(usuario=usuario, nombre_completo=nombre, numero_documento=documento)
+
+    def buscar(self, texto):
+        queryset = Cliente.objects.filter(usuario=self.usuario)
+        return list(ClienteFilter({'nombre_o_doc': texto}, queryset=queryset).qs.values_list('numero_documento', flat=True))
+
+    def test_busqueda_por_nombre_y_documento_del_usuario(self):
+        casos = [
+            ('12345', ['V-12345678']), ('maría', ['V-12345678']), ('RUIZ', ['V-87654321']), ('sin coincidencias', []),
+            # Menos de 3 caracteres: icontains sin índice
+            ('87', ['V-87654321']), ('jo', ['V-87654321']), ('V-', ['V-87654321', 'V-12345678']),
+        ]
+        for con_fts in {usa_busqueda_sqlite(TABLA_BUSQUEDA_CLIENTES), False}:
+            with mock.patch('clientes.busqueda.usa_busqueda_sqlite', return_value=con_fts):
+                for texto, esperados in casos:
+                    with self.subTest(texto=texto, con_fts=con_fts):
+                        self.assertEqual(self.buscar(texto), esperados)
@@ -2,21 +2,25 @@
 from django.shortcuts import render
 from django.urls import reverse_lazy
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
-from django.contrib.contenttypes.models import ContentType
 from django.contrib.messages.views import SuccessMessageMixin
 from django.contrib.auth.mixins import LoginRequiredMixin # Para proteger vistas
 from .models import Cliente
 from .forms import ClienteForm
 from .filters import ClienteFilter
+from gestor_seguros.utils.paginacion import PaginacionKeysetMixin
+from polizas.tabla import cargar_tabla_polizas
+from documentos.adjuntos import DocumentosAdjuntosMixin
+from polizas.dashboard import invalidacion_agrupada
 
 # Para proteger todas las vistas de esta app, puedes usar @method_decorator(login_required)
 # o heredar de LoginRequiredMixin para cada CBV.
 
-class ClienteListView(LoginRequiredMixin, ListView):
+class ClienteListView(LoginRequiredMixin, PaginacionKeysetMixin, ListView):
     model = Cliente
     template_name = 'clientes/cliente_list.html' # clientes/lista_clientes.html
     context_object_name = 'clientes'
     paginate_by = 15 # Opcional: paginación
+    orden_keyset = ('nombre_completo', 'id')
 
     def get_queryset(self):
         queryset = super().get_queryset().filter(usuario=self.request.user)
@@ -28,16 +32,15 @@ class ClienteListView(LoginRequiredMixin, ListView):
         context['filterset'] = self.filterset
         return context
 
-class ClienteDetailView(LoginRequiredMixin, DetailView):
+class ClienteDetailView(LoginRequiredMixin, DocumentosAdjuntosMixin, DetailView):
     model = Cliente
     template_name = 'clientes/cliente_detail.html'
     context_object_name = 'cliente'
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        obj = self.get_object()
-        context['polizas_cliente'] = obj.polizas.all().order_by('-fecha_fin_vigencia')
-        context['content_type'] = ContentType.objects.get_for_model(self.get_object())
+        # Una consulta para las filas y el total (ver polizas/tabla.py)
+        context['polizas_cliente'] = cargar_tabla_polizas(self.object.polizas.all())
         return context
     
     def get_queryset(self):
@@ -117,7 +120,9 @@ def eliminar_clientes_masivo(request):
     cantidad = clientes_a_eliminar.count()
     
     if cantidad > 0:
-        clientes_a_eliminar.delete()
+        # Una sola invalidación del dashboard para todo el lote (y sus pólizas en cascada)
+        with invalidacion_agrupada(request.user.pk):
+            clientes_a_eliminar.delete()
         messages.success(request, f"Se eliminaron {cantidad} clientes exitosamente.")
     else:
         messages.warning(request, "No se encontraron clientes válidos para eliminar.")
@@ -0,0 +1,75 @@
+# documentos/adjuntos.py
+"""
+Documentos adjuntos a pólizas, siniestros, clientes y aseguradoras.
+
+- Los ContentType de los modelos que admiten documentos se resuelven desde un
+  mapa en memoria del proceso (se llena con la primera consulta), así que ni
+  las páginas de detalle ni la subida de archivos los vuelven a pedir.
+- adjuntar_documentos() carga con UNA consulta los documentos de una lista de
+  objetos del mismo modelo; la plantilla recorre la lista ya cargada.
+"""
+from django.apps import apps
+from django.contrib.contenttypes.models import ContentType
+from django.http import Http404
+
+from .models import Documento
+
+# Modelos a los que se pueden adjuntar documentos (todos tienen 'usuario')
+MODELOS_CON_DOCUMENTOS = ['polizas.Poliza', 'polizas.Siniestro', 'polizas.Aseguradora', 'clientes.Cliente']
+
+_tipos = {}
+
+
+def _mapa():
+    if not _tipos:
+        modelos = [apps.get_model(etiqueta) for etiqueta in MODELOS_CON_DOCUMENTOS]
+        for modelo, tipo in ContentType.objects.get_for_models(*modelos).items():
+            _tipos[modelo] = tipo
+            _tipos[tipo.pk] = tipo
+    return _tipos
+
+
+def tipo_de(modelo_u_objeto):
+    """ContentType del modelo (o de la instancia) desde el mapa en memoria."""
+    modelo = modelo_u_objeto if isinstance(modelo_u_objeto, type) else type(modelo_u_objeto)
+    return _mapa()[modelo._meta.concrete_model]
+
+
+def tipo_por_id(content_type_id):
+    """ContentType de un modelo que admite documentos; Http404 si no lo es."""
+    try:
+        return _mapa()[content_type_id]
+    except KeyError:
+        raise Http404("Este tipo de objeto no admite documentos.")
+
+
+def adjuntar_documentos(objetos):
+    """
+    Carga los documentos de 'objetos' (del mismo modelo) con una consulta y los
+    deja en objeto.documentos_adjuntos, ordenados como Documento.Meta.ordering.
+    """
+    objetos = list(objetos)
+    if not objetos:
+        return objetos
+    por_objeto = {objeto.pk: [] for objeto in objetos}
+    documentos = Documento.objects.filter(content_type=tipo_de(objetos[0]), object_id__in=list(por_objeto))
+    for documento in documentos:
+        por_objeto[documento.object_id].append(documento)
+    for objeto in objetos:
+        objeto.documentos_adjuntos = por_objeto[objeto.pk]
+    return objetos
+
+
+class DocumentosAdjuntosMixin:
+    """
+    Para DetailView: agrega al contexto 'content_type' y 'documentos' (la lista
+    ya cargada) para _documentos_seccion.html, usando el objeto que la vista ya
+    obtuvo (self.object) en vez de volver a consultarlo.
+    """
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        adjuntar_documentos([self.object])
+        context['content_type'] = tipo_de(self.object)
+        context['documentos'] = self.object.documentos_adjuntos
+        return context
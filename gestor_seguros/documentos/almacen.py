@@ -0,0 +1,282 @@
+# documentos/almacen.py
+"""
+Almacenamiento de los documentos adjuntos.
+
+- Contenido direccionado por hash: cada archivo se guarda una sola vez, como
+  ArchivoAlmacenado identificado por su SHA-256. Si el mismo PDF se adjunta a
+  varias pólizas, todos los Documento apuntan al mismo blob y 'referencias'
+  cuenta cuántos son; el archivo se borra al eliminar el último. El descuento
+  lo hace un receptor post_delete de Documento (documentos/signals.py), así que
+  también cuentan los borrados en cascada (póliza, siniestro, cliente o usuario).
+- Subidas por partes reanudables (SubidaEnCurso): el navegador envía trozos de
+  DOCUMENTOS_TAMANO_TROZO bytes con el desplazamiento en que empiezan; si la
+  conexión se corta, consulta cuántos bytes llegaron y sigue desde ahí. Los
+  trozos se guardan en la base (TrozoSubida), no en disco local, para que
+  cualquier proceso web reciba el siguiente; al completarse se leen en orden
+  (LectorSubida), se calcula el hash y el archivo pasa al almacén.
+- Si el navegador manda el hash al iniciar y el usuario ya subió ese contenido
+  (lo tiene en otro de sus documentos), el documento se crea al instante sin
+  transferir el archivo. El hash de un contenido ajeno no sirve: conocerlo no
+  prueba tener el archivo, así que esas subidas se transfieren y se verifican.
+"""
+import hashlib
+import io
+import logging
+import os
+
+from django.conf import settings
+from django.core.files import File
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import ArchivoAlmacenado, Documento, SubidaEnCurso, TrozoSubida
+
+logger = logging.getLogger(__name__)
+
+TAMANO_BLOQUE = 1024 * 1024
+
+
+class SubidaInvalida(Exception):
+    pass
+
+
+class DesfaseSubida(SubidaInvalida):
+    """El trozo no empieza donde terminó lo recibido; 'recibido' indica desde dónde seguir."""
+
+    def __init__(self, recibido):
+        super().__init__(f"Se esperaba el trozo que empieza en el byte {recibido}.")
+        self.recibido = recibido
+
+
+def sha256_de(archivo):
+    """Hash SHA-256 (hex) de un File de Django, leído por bloques."""
+    resumen = hashlib.sha256()
+    for bloque in archivo.chunks(TAMANO_BLOQUE):
+        resumen.update(bloque)
+    archivo.seek(0)
+    return resumen.hexdigest()
+
+
+# --- Blobs con conteo de referencias ---
+
+def _sumar_referencia(sha256):
+    """Suma una referencia al blob con ese hash si existe; lo devuelve (o None)."""
+    if ArchivoAlmacenado.objects.filter(sha256=sha256).update(referencias=F('referencias') + 1):
+        return ArchivoAlmacenado.objects.get(sha256=sha256)
+    return None
+
+
+def almacenar(archivo, sha256=None):
+    """
+    Blob con el contenido de 'archivo' (un File de Django), con una referencia
+    más. Si ese contenido ya estaba guardado no se vuelve a escribir.
+    Llamar dentro de la misma transacción que crea el Documento.
+    """
+    sha256 = sha256 or sha256_de(archivo)
+    blob = _sumar_referencia(sha256)
+    if blob is not None:
+        return blob
+
+    blob = ArchivoAlmacenado(sha256=sha256, tamano=archivo.size, referencias=1)
+    blob.archivo.save(os.path.basename(archivo.name), archivo, save=False)
+    try:
+        with transaction.atomic():
+            blob.save()
+    except IntegrityError:
+        # Otra petición guardó el mismo contenido al mismo tiempo: se usa el suyo
+        blob.archivo.delete(save=False)
+        blob = _sumar_referencia(sha256)
+    return blob
+
+
+def liberar(blob_id):
+    """Quita una referencia al blob; con la última, borra el registro y (al confirmar) el archivo."""
+    with transaction.atomic():
+        blob = ArchivoAlmacenado.objects.select_for_update().get(pk=blob_id)
+        if blob.referencias > 1:
+            ArchivoAlmacenado.objects.filter(pk=blob_id).update(referencias=F('referencias') - 1)
+            return
+        nombre, almacenamiento = blob.archivo.name, blob.archivo.storage
+        blob.delete()
+        transaction.on_commit(lambda: almacenamiento.delete(nombre))
+
+
+# --- Documentos ---
+
+def crear_documento(usuario, padre, titulo, archivo, sha256=None):
+    """Adjunta 'archivo' a 'padre' guardando el contenido en el almacén por hash."""
+    with transaction.atomic():
+        blob = almacenar(archivo, sha256)
+        return Documento.objects.create(
+            usuario=usuario, titulo=titulo, content_object=padre, blob=blob, archivo=blob.archivo.name,
+        )
+
+
+def documento_por_hash(usuario, padre, titulo, sha256):
+    """
+    Documento que reutiliza un contenido que el usuario ya subió, o None si
+    ninguno de sus documentos tiene ese hash.
+    """
+    with transaction.atomic():
+        if not Documento.objects.filter(usuario=usuario, blob__sha256=sha256).exists():
+            return None
+        blob = _sumar_referencia(sha256)
+        if blob is None:
+            return None
+        return Documento.objects.create(
+            usuario=usuario, titulo=titulo, content_object=padre, blob=blob, archivo=blob.archivo.name,
+        )
+
+
+def eliminar_documento(documento):
+    """
+    Borra el documento; el archivo solo se borra si ningún otro documento lo usa
+    (lo resuelve el receptor post_delete, ver documentos/signals.py).
+    """
+    with transaction.atomic():
+        documento.delete()
+
+
+def recontar_referencias():
+    """
+    Iguala 'referencias' a la cantidad real de documentos de cada blob y borra
+    los que ya no usa ninguno (desfases de borrados hechos por fuera del ORM o
+    anteriores al receptor post_delete). Devuelve (corregidos, borrados).
+    """
+    corregidos = borrados = 0
+    desfasados = (
+        ArchivoAlmacenado.objects.annotate(reales=Count('documentos'))
+        .exclude(referencias=F('reales')).values_list('pk', flat=True)
+    )
+    for blob_id in list(desfasados):
+        with transaction.atomic():
+            blob = ArchivoAlmacenado.objects.select_for_update().filter(pk=blob_id).first()
+            if blob is None:
+                continue
+            reales = blob.documentos.count()
+            if reales:
+                ArchivoAlmacenado.objects.filter(pk=blob_id).update(referencias=reales)
+                corregidos += 1
+            else:
+                nombre, almacenamiento = blob.archivo.name, blob.archivo.storage
+                blob.delete()
+                transaction.on_commit(lambda nombre=nombre: almacenamiento.delete(nombre))
+                borrados += 1
+    return corregidos, borrados
+
+
+# --- Subidas por partes ---
+
+class LectorSubida(io.RawIOBase):
+    """Lectura (con posición) de los trozos guardados de una subida, uno por consulta."""
+
+    def __init__(self, subida):
+        super().__init__()
+        self.subida_id = subida.pk
+        self.tamano = subida.recibido
+        self.posicion = 0
+        self._desde = 0
+        self._datos = b''
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.posicion
+
+    def seek(self, desplazamiento, desde=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.posicion, io.SEEK_END: self.tamano}[desde]
+        self.posicion = max(0, base + desplazamiento)
+        return self.posicion
+
+    def readinto(self, destino):
+        if self.posicion >= self.tamano:
+            return 0
+        if not self._desde <= self.posicion < self._desde + len(self._datos):
+            # Los trozos son contiguos (agregar_trozo lo exige): el que contiene la
+            # posición es el último que empieza antes de ella
+            self._desde, datos = (
+                TrozoSubida.objects.filter(subida_id=self.subida_id, desde__lte=self.posicion)
+                .order_by('-desde').values_list('desde', 'datos')[0]
+            )
+            self._datos = bytes(datos)
+        inicio = self.posicion - self._desde
+        parte = self._datos[inicio:inicio + len(destino)]
+        destino[:len(parte)] = parte
+        self.posicion += len(parte)
+        return len(parte)
+
+
+def iniciar_subida(usuario, padre, titulo, nombre_archivo, tamano, sha256=''):
+    """
+    Abre una subida por partes. Si 'sha256' corresponde a un contenido que el
+    usuario ya subió crea el documento de inmediato y devuelve (None, documento);
+    si no, devuelve (subida, None) y el hash se verifica al completar la subida.
+    """
+    if tamano <= 0 or tamano > settings.DOCUMENTOS_TAMANO_MAXIMO:
+        raise SubidaInvalida(f"El archivo debe pesar entre 1 byte y {settings.DOCUMENTOS_TAMANO_MAXIMO} bytes.")
+    sha256 = (sha256 or '').lower()
+    if sha256:
+        documento = documento_por_hash(usuario, padre, titulo, sha256)
+        if documento is not None:
+            return None, documento
+    subida = SubidaEnCurso.objects.create(
+        usuario=usuario, content_object=padre, titulo=titulo,
+        nombre_archivo=os.path.basename(nombre_archivo)[:200], tamano=tamano, sha256=sha256,
+    )
+    return subida, None
+
+
+def agregar_trozo(subida, desde, datos):
+    """
+    Agrega 'datos' (bytes) a la subida a partir del byte 'desde', que debe ser
+    lo ya recibido (DesfaseSubida si no). Devuelve la subida actualizada; la
+    fila queda bloqueada mientras se escribe y el trozo se guarda en la misma
+    transacción que 'recibido', así que nunca quedan bytes sin contar.
+    """
+    with transaction.atomic():
+        subida = SubidaEnCurso.objects.select_for_update().get(pk=subida.pk)
+        if desde != subida.recibido:
+            raise DesfaseSubida(subida.recibido)
+        if not datos or len(datos) > settings.DOCUMENTOS_TAMANO_TROZO or subida.recibido + len(datos) > subida.tamano:
+            raise SubidaInvalida("Trozo vacío o más grande de lo permitido.")
+        TrozoSubida.objects.create(subida=subida, desde=desde, datos=datos)
+        subida.recibido += len(datos)
+        subida.save(update_fields=['recibido', 'fecha_actualizacion'])
+    return subida
+
+
+def completar_subida(subida):
+    """
+    Pasa al almacén el archivo de una subida ya completa, verifica el hash
+    anunciado (si lo hubo) y crea el Documento. La subida desaparece.
+    """
+    try:
+        if subida.recibido != subida.tamano:
+            raise SubidaInvalida(f"Faltan bytes: se recibieron {subida.recibido} de {subida.tamano}.")
+        archivo = File(io.BufferedReader(LectorSubida(subida), buffer_size=TAMANO_BLOQUE), name=subida.nombre_archivo)
+        sha256 = sha256_de(archivo)
+        if subida.sha256 and subida.sha256 != sha256:
+            raise SubidaInvalida("El archivo recibido no coincide con el hash anunciado.")
+        documento = crear_documento(subida.usuario, subida.content_object, subida.titulo, archivo, sha256)
+    finally:
+        descartar_subida(subida)
+    return documento
+
+
+def descartar_subida(subida):
+    # Los trozos se borran en cascada con la subida
+    if subida.pk:
+        subida.delete()
+
+
+def limpiar_subidas(antes_de):
+    """Descarta las subidas sin actividad desde 'antes_de'. Devuelve cuántas."""
+    abandonadas = list(SubidaEnCurso.objects.filter(fecha_actualizacion__lt=antes_de))
+    for subida in abandonadas:
+        logger.info("Subida abandonada descartada: %s (%s de %s bytes)", subida.nombre_archivo, subida.recibido, subida.tamano)
+        descartar_subida(subida)
+    return len(abandonadas)
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class DocumentosConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'documentos'
+
+    def ready(self):
+        # Registra el receptor que descuenta las referencias de los archivos compartidos
+        from . import signals  # noqa: F401
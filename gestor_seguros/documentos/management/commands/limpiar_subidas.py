@@ -0,0 +1,21 @@
+# documentos/management/commands/limpiar_subidas.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from documentos.almacen import limpiar_subidas
+
+
+class Command(BaseCommand):
+    help = (
+        "Descarta las subidas por partes abandonadas (sin trozos nuevos en las últimas --horas) "
+        "y sus archivos parciales. Pensado para correr a diario."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--horas', type=int, default=24, help="Horas sin actividad para considerar abandonada una subida.")
+
+    def handle(self, *args, **options):
+        descartadas = limpiar_subidas(timezone.now() - timedelta(hours=options['horas']))
+        self.stdout.write(self.style.SUCCESS(f"Subidas abandonadas descartadas: {descartadas}."))
@@ -0,0 +1,15 @@
+# documentos/management/commands/recontar_referencias.py
+from django.core.management.base import BaseCommand
+
+from documentos.almacen import recontar_referencias
+
+
+class Command(BaseCommand):
+    help = (
+        "Recalcula cuántos documentos usan cada archivo almacenado y borra los archivos que ya "
+        "no usa ninguno (tras borrados hechos por fuera de la aplicación)."
+    )
+
+    def handle(self, *args, **options):
+        corregidos, borrados = recontar_referencias()
+        self.stdout.write(self.style.SUCCESS(f"Referencias corregidas: {corregidos}. Archivos sin documentos borrados: {borrados}."))
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:49
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('documentos', '0002_archivos_por_hash_y_subidas'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrozoSubida',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('desde', models.PositiveBigIntegerField()),
+                ('datos', models.BinaryField()),
+                ('subida', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trozos', to='documentos.subidaencurso')),
+            ],
+            options={
+                'verbose_name': 'Trozo de Subida',
+                'verbose_name_plural': 'Trozos de Subidas',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='trozosubida',
+            constraint=models.UniqueConstraint(fields=('subida', 'desde'), name='trozo_subida_unico'),
+        ),
+    ]
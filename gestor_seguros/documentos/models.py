@@ -1,3 +1,6 @@
+import os
+import uuid
+
 from django.db import models
 from django.conf import settings
 from django.contrib.contenttypes.fields import GenericForeignKey
@@ -7,12 +10,38 @@ def user_directory_path(instance, filename):
     # El archivo se subirá a MEDIA_ROOT/documentos/<user_id>/<filename>
     return f'documentos/{instance.usuario.id}/{filename}'
 
+def ruta_blob(instance, filename):
+    # Contenido direccionado por hash: MEDIA_ROOT/documentos/blobs/<2 primeros>/<sha256>.<ext>
+    return f'documentos/blobs/{instance.sha256[:2]}/{instance.sha256}{os.path.splitext(filename)[1].lower()}'
+
+class ArchivoAlmacenado(models.Model):
+    """
+    Contenido de un archivo subido, guardado una sola vez por hash SHA-256.
+    Varios Documento pueden compartirlo; 'referencias' cuenta cuántos, y el
+    archivo se borra cuando se elimina el último (ver documentos/almacen.py).
+    """
+    sha256 = models.CharField(max_length=64, unique=True)
+    archivo = models.FileField(upload_to=ruta_blob, max_length=200)
+    tamano = models.PositiveBigIntegerField(verbose_name="Tamaño (bytes)")
+    referencias = models.PositiveIntegerField(default=0)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.sha256
+
+    class Meta:
+        verbose_name = "Archivo Almacenado"
+        verbose_name_plural = "Archivos Almacenados"
+
 class Documento(models.Model):
     usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='documentos')
     titulo = models.CharField(max_length=200, verbose_name="Título o Descripción")
-    archivo = models.FileField(upload_to=user_directory_path, verbose_name="Archivo")
+    archivo = models.FileField(upload_to=user_directory_path, max_length=200, verbose_name="Archivo")
     fecha_subida = models.DateTimeField(auto_now_add=True)
 
+    # Contenido compartido (los documentos anteriores a los blobs no lo tienen y usan su propio archivo)
+    blob = models.ForeignKey(ArchivoAlmacenado, on_delete=models.PROTECT, null=True, blank=True, related_name='documentos')
+
     # Campos para la relación genérica
     content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
     object_id = models.PositiveIntegerField()
@@ -25,3 +54,48 @@ class Documento(models.Model):
         verbose_name = "Documento"
         verbose_name_plural = "Documentos"
         ordering = ['-fecha_subida']
+
+class SubidaEnCurso(models.Model):
+    """
+    Subida por partes que se puede reanudar: el cliente envía trozos en orden y,
+    si se corta, pregunta cuántos bytes llegaron ('recibido') y sigue desde ahí.
+    Los trozos se guardan en la base de datos (TrozoSubida), así que cualquier
+    proceso web puede recibir el siguiente o completar la subida.
+    """
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='subidas_en_curso')
+    content_type = models.ForeignKey(ContentType, on_delete=models.CASCADE)
+    object_id = models.PositiveIntegerField()
+    content_object = GenericForeignKey('content_type', 'object_id')
+    titulo = models.CharField(max_length=200)
+    nombre_archivo = models.CharField(max_length=200)
+    tamano = models.PositiveBigIntegerField()
+    recibido = models.PositiveBigIntegerField(default=0)
+    # Hash que el cliente calculó (opcional): se verifica al terminar
+    sha256 = models.CharField(max_length=64, blank=True)
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.nombre_archivo} ({self.recibido}/{self.tamano})"
+
+    class Meta:
+        verbose_name = "Subida en Curso"
+        verbose_name_plural = "Subidas en Curso"
+
+
+class TrozoSubida(models.Model):
+    """Un trozo recibido de una SubidaEnCurso, guardado a partir del byte 'desde'."""
+    subida = models.ForeignKey(SubidaEnCurso, on_delete=models.CASCADE, related_name='trozos')
+    desde = models.PositiveBigIntegerField()
+    datos = models.BinaryField()
+
+    def __str__(self):
+        return f"{self.subida_id} @{self.desde}"
+
+    class Meta:
+        verbose_name = "Trozo de Subida"
+        verbose_name_plural = "Trozos de Subidas"
+        constraints = [
+            models.UniqueConstraint(fields=['subida', 'desde'], name='trozo_subida_unico'),
+        ]
@@ -0,0 +1,19 @@
+# documentos/signals.py
+from django.db import transaction
+from django.db.models.signals import post_delete
+from django.dispatch import receiver
+
+from .almacen import liberar
+from .models import Documento
+
+
+@receiver(post_delete, sender=Documento)
+def liberar_archivo_del_documento(sender, instance, **kwargs):
+    # También llega en los borrados en cascada (GenericRelation de pólizas, siniestros,
+    # clientes y aseguradoras, o el usuario), que no pasan por eliminar_documento()
+    if instance.blob_id is not None:
+        liberar(instance.blob_id)
+    elif instance.archivo:
+        # Documento anterior al almacén por hash: el archivo es solo suyo
+        nombre, almacenamiento = instance.archivo.name, instance.archivo.storage
+        transaction.on_commit(lambda: almacenamiento.delete(nombre))
@@ -1,3 +1,146 @@
-from django.test import TestCase
+import hashlib
+import shutil
+import tempfile
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from django.utils import timezone
+
+from clientes.models import Cliente
+from polizas.models import Poliza
+from .adjuntos import tipo_de
+from .almacen import (
+    SubidaInvalida, agregar_trozo, completar_subida, crear_documento, eliminar_documento, iniciar_subida,
+    recontar_referencias,
+)
+from .models import ArchivoAlmacenado, Documento, SubidaEnCurso, TrozoSubida
+
+CONTENIDO = b'%PDF-1.4 contenido de prueba'
+
+
+class AlmacenDeDocumentosTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('corredor', 'corredor@example.com', 'clave')
+        cls.otro = User.objects.create_user('otro', 'otro@example.com', 'clave')
+        cls.cliente = Cliente.objects.create(usuario=cls.usuario, nombre_completo="Ana Pérez", numero_documento='V-1')
+        hoy = timezone.localdate()
+        cls.polizas = [
+            Poliza.objects.create(
+                usuario=cls.usuario, cliente=cls.cliente, numero_poliza=f'P-{numero}', ramo_tipo_seguro='Salud',
+                fecha_inicio_vigencia=hoy, fecha_fin_vigencia=hoy.replace(year=hoy.year + 1),
+                prima_total_anual=1200, frecuencia_pago='ANUAL', estado_poliza='VIGENTE',
+            )
+            for numero in range(2)
+        ]
+
+    def setUp(self):
+        media = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media, ignore_errors=True)
+        ajustes = override_settings(MEDIA_ROOT=media, DOCUMENTOS_TAMANO_TROZO=8)
+        ajustes.enable()
+        self.addCleanup(ajustes.disable)
+
+    def adjuntar(self, padre, usuario=None):
+        return crear_documento(usuario or self.usuario, padre, "Póliza firmada", ContentFile(CONTENIDO, name='poliza.pdf'))
+
+    def test_el_mismo_contenido_se_guarda_una_sola_vez(self):
+        primero = self.adjuntar(self.polizas[0])
+        segundo = self.adjuntar(self.polizas[1])
+        self.assertEqual(primero.blob_id, segundo.blob_id)
+        blob = ArchivoAlmacenado.objects.get()
+        self.assertEqual((blob.referencias, blob.sha256), (2, hashlib.sha256(CONTENIDO).hexdigest()))
+        with blob.archivo.open('rb') as archivo:
+            self.assertEqual(archivo.read(), CONTENIDO)
+
+    def test_el_hash_solo_evita_la_subida_si_el_usuario_ya_tiene_el_contenido(self):
+        self.adjuntar(self.polizas[0])
+        sha256 = hashlib.sha256(CONTENIDO).hexdigest()
+
+        subida, documento = iniciar_subida(self.usuario, self.polizas[1], "Copia", 'poliza.pdf', len(CONTENIDO), sha256)
+        self.assertIsNone(subida)
+        self.assertEqual(documento.blob.referencias, 2)
+
+        cliente_ajeno = Cliente.objects.create(usuario=self.otro, nombre_completo="Luis Gil", numero_documento='V-2')
+        subida, documento = iniciar_subida(self.otro, cliente_ajeno, "Ajeno", 'poliza.pdf', len(CONTENIDO), sha256)
+        self.assertIsNone(documento)
+        self.assertEqual(subida.recibido, 0)
+        self.assertFalse(Documento.objects.filter(usuario=self.otro).exists())
+        self.assertEqual(ArchivoAlmacenado.objects.get().referencias, 2)
+
+    def test_la_subida_sigue_desde_lo_recibido_tras_un_409(self):
+        self.client.force_login(self.usuario)
+        poliza = self.polizas[0]
+        respuesta = self.client.post(
+            reverse('documentos:iniciar_subida', args=[tipo_de(poliza).pk, poliza.pk]),
+            {'titulo': "Póliza", 'nombre': 'poliza.pdf', 'tamano': len(CONTENIDO)},
+        )
+        self.assertEqual(respuesta.status_code, 201)
+        url = respuesta.json()['url_subida']
+
+        def enviar(desde):
+            trozo = ContentFile(CONTENIDO[desde:desde + 8], name='poliza.pdf')
+            return self.client.post(url, {'desde': desde, 'trozo': trozo})
+
+        self.assertEqual(enviar(0).json()['recibido'], 8)
+        # El trozo 0 se reenvía (se perdió la respuesta): el servidor indica desde dónde seguir
+        desfase = enviar(0)
+        self.assertEqual((desfase.status_code, desfase.json()['recibido']), (409, 8))
+
+        recibido = desfase.json()['recibido']
+        while True:
+            datos = enviar(recibido).json()
+            if datos.get('completa'):
+                break
+            recibido = datos['recibido']
+        documento = Documento.objects.get(pk=datos['documento'])
+        with documento.blob.archivo.open('rb') as archivo:
+            self.assertEqual(archivo.read(), CONTENIDO)
+
+    def test_los_trozos_se_guardan_en_la_base_y_no_se_completa_una_subida_incompleta(self):
+        subida, _ = iniciar_subida(self.usuario, self.polizas[0], "Póliza", 'poliza.pdf', len(CONTENIDO))
+        subida = agregar_trozo(subida, 0, CONTENIDO[:8])
+        subida = agregar_trozo(subida, 8, CONTENIDO[8:16])
+        self.assertEqual(list(TrozoSubida.objects.order_by('desde').values_list('desde', flat=True)), [0, 8])
+
+        with self.assertRaises(SubidaInvalida):
+            completar_subida(subida)
+        self.assertFalse(Documento.objects.exists())
+        self.assertFalse(SubidaEnCurso.objects.exists())
+        self.assertFalse(TrozoSubida.objects.exists())
+
+    def test_los_borrados_en_cascada_descuentan_referencias(self):
+        self.adjuntar(self.polizas[0])
+        self.adjuntar(self.polizas[1])
+        de_cliente = self.adjuntar(self.cliente)
+        blob = ArchivoAlmacenado.objects.get()
+        nombre = blob.archivo.name
+
+        self.polizas[0].delete()
+        self.assertEqual(ArchivoAlmacenado.objects.get().referencias, 2)
+
+        eliminar_documento(de_cliente)
+        self.assertEqual(ArchivoAlmacenado.objects.get().referencias, 1)
+
+        # El cliente arrastra la póliza que queda y, con ella, su documento: era el último
+        with self.captureOnCommitCallbacks(execute=True):
+            self.cliente.delete()
+        self.assertFalse(ArchivoAlmacenado.objects.exists())
+        self.assertFalse(blob.archivo.storage.exists(nombre))
+
+    def test_recontar_corrige_los_desfases(self):
+        documento = self.adjuntar(self.polizas[0])
+        ArchivoAlmacenado.objects.update(referencias=5)
+        self.assertEqual(recontar_referencias(), (1, 0))
+        self.assertEqual(ArchivoAlmacenado.objects.get().referencias, 1)
+
+        # Borrado por fuera del ORM: no hay señal que descuente la referencia
+        with connection.cursor() as cursor:
+            cursor.execute('DELETE FROM documentos_documento WHERE id = %s', [documento.pk])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.assertEqual(recontar_referencias(), (0, 1))
+        self.assertFalse(ArchivoAlmacenado.objects.exists())
@@ -6,4 +6,7 @@ app_name = 'documentos'
 urlpatterns = [
     path('subir/<int:content_type_id>/<int:object_id>/', views.subir_documento, name='subir_documento'),
     path('<int:pk>/eliminar/', views.eliminar_documento, name='eliminar_documento'),
+    # Subida por partes reanudable (ver documentos/almacen.py)
+    path('subidas/<int:content_type_id>/<int:object_id>/', views.iniciar_subida, name='iniciar_subida'),
+    path('subidas/<uuid:pk>/', views.subida, name='subida'),
 ]
\ No newline at end of file
@@ -1,27 +1,29 @@
 from django.shortcuts import render, get_object_or_404, redirect
-from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.decorators import login_required
+from django.conf import settings
 from django.contrib import messages
-from .models import Documento
+from django.http import JsonResponse
+from django.urls import reverse
+from django.views.decorators.http import require_http_methods, require_POST
+from .models import Documento, SubidaEnCurso
+from .adjuntos import tipo_por_id
+from .almacen import (
+    SubidaInvalida, DesfaseSubida, crear_documento, eliminar_documento as borrar_documento,
+    iniciar_subida as abrir_subida, agregar_trozo, completar_subida,
+)
 from .forms import DocumentoForm
 
 @login_required
 def subir_documento(request, content_type_id, object_id):
-    content_type = get_object_or_404(ContentType, pk=content_type_id)
-    parent_object = get_object_or_404(content_type.model_class(), pk=object_id)
-
-    # Verificación de propiedad
-    if not hasattr(parent_object, 'usuario') or parent_object.usuario != request.user:
-        messages.error(request, "No tienes permiso para añadir documentos a este objeto.")
-        return redirect('dashboard') # O a donde prefieras
+    # El ContentType sale del mapa en memoria; el objeto, en una consulta que ya verifica la propiedad
+    content_type = tipo_por_id(content_type_id)
+    parent_object = get_object_or_404(content_type.model_class(), pk=object_id, usuario=request.user)
 
     if request.method == 'POST':
         form = DocumentoForm(request.POST, request.FILES)
         if form.is_valid():
-            documento = form.save(commit=False)
-            documento.usuario = request.user
-            documento.content_object = parent_object
-            documento.save()
+            # Se guarda por hash: si el mismo archivo ya estaba subido, se reutiliza
+            crear_documento(request.user, parent_object, form.cleaned_data['titulo'], form.cleaned_data['archivo'])
             messages.success(request, "Documento subido exitosamente.")
             return redirect(parent_object.get_absolute_url())
     
@@ -34,10 +36,79 @@ def eliminar_documento(request, pk):
     parent_object_url = documento.content_object.get_absolute_url()
     
     if request.method == 'POST':
-        documento.archivo.delete() # Borrar el archivo físico
-        documento.delete() # Borrar el registro de la BD
+        # Borra el registro; el archivo solo si ningún otro documento lo comparte
+        borrar_documento(documento)
         messages.success(request, "Documento eliminado exitosamente.")
         return redirect(parent_object_url)
         
     # Para mostrar una confirmación (opcional, pero recomendado)
-    return render(request, 'documentos/documento_confirm_delete.html', {'documento': documento})
\ No newline at end of file
+    return render(request, 'documentos/documento_confirm_delete.html', {'documento': documento})
+
+
+# --- Subida por partes (reanudable) ---
+
+def _estado_subida(subida):
+    return {
+        'id': str(subida.pk), 'url_subida': reverse('documentos:subida', args=[subida.pk]),
+        'recibido': subida.recibido, 'tamano': subida.tamano, 'tamano_trozo': settings.DOCUMENTOS_TAMANO_TROZO,
+        'completa': False,
+    }
+
+
+def _documento_creado(documento, parent_object):
+    return {'completa': True, 'documento': documento.pk, 'url': parent_object.get_absolute_url()}
+
+
+@login_required
+@require_POST
+def iniciar_subida(request, content_type_id, object_id):
+    """
+    Abre una subida por partes. Recibe titulo, nombre, tamano y, opcionalmente,
+    sha256; si ese contenido ya está guardado, el documento se crea sin subir nada.
+    """
+    content_type = tipo_por_id(content_type_id)
+    parent_object = get_object_or_404(content_type.model_class(), pk=object_id, usuario=request.user)
+    titulo = request.POST.get('titulo', '').strip()[:200]
+    try:
+        tamano = int(request.POST.get('tamano', ''))
+    except ValueError:
+        return JsonResponse({'error': "Tamaño de archivo inválido."}, status=400)
+    if not titulo:
+        return JsonResponse({'error': "El título es obligatorio."}, status=400)
+    try:
+        subida, documento = abrir_subida(
+            request.user, parent_object, titulo, request.POST.get('nombre', 'archivo'), tamano, request.POST.get('sha256', ''),
+        )
+    except SubidaInvalida as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    if documento is not None:
+        messages.success(request, "Documento subido exitosamente.")
+        return JsonResponse(_documento_creado(documento, parent_object))
+    return JsonResponse(_estado_subida(subida), status=201)
+
+
+@login_required
+@require_http_methods(['GET', 'POST'])
+def subida(request, pk):
+    """
+    GET: cuántos bytes llegaron (para reanudar). POST: un trozo ('trozo', archivo)
+    que empieza en el byte 'desde'; con el último se crea el documento.
+    Un trozo fuera de lugar responde 409 con el byte desde el que hay que seguir.
+    """
+    subida = get_object_or_404(SubidaEnCurso, pk=pk, usuario=request.user)
+    if request.method == 'GET':
+        return JsonResponse(_estado_subida(subida))
+
+    trozo = request.FILES.get('trozo')
+    try:
+        desde = int(request.POST.get('desde', ''))
+        subida = agregar_trozo(subida, desde, trozo.read() if trozo else b'')
+        if subida.recibido < subida.tamano:
+            return JsonResponse(_estado_subida(subida))
+        documento = completar_subida(subida)
+    except DesfaseSubida as e:
+        return JsonResponse({'error': str(e), 'recibido': e.recibido}, status=409)
+    except (SubidaInvalida, ValueError) as e:
+        return JsonResponse({'error': str(e)}, status=400)
+    messages.success(request, "Documento subido exitosamente.")
+    return JsonResponse(_documento_creado(documento, documento.content_object))
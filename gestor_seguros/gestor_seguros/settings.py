@@ -54,9 +54,11 @@ INSTALLED_APPS = [
     'documentos',
     'reportes',
     'simple_history',
+    'tareas',
 ]
 
 MIDDLEWARE = [
+    'gestor_seguros.utils.instrumentacion.InstrumentacionMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'whitenoise.middleware.WhiteNoiseMiddleware',
     'simple_history.middleware.HistoryRequestMiddleware',
@@ -152,6 +154,132 @@ STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# --- DOCUMENTOS ADJUNTOS ---
+# Subidas por partes reanudables (documentos/almacen.py): tamaño máximo de cada
+# trozo que envía el navegador y del archivo completo.
+DOCUMENTOS_TAMANO_TROZO = 1024 * 1024
+DOCUMENTOS_TAMANO_MAXIMO = int(os.getenv('DOCUMENTOS_TAMANO_MAXIMO', str(100 * 1024 * 1024)))
+
+# --- CACHÉ ---
+# La caché vive en la base de datos para que la compartan todos los procesos y
+# dynos (web y worker): la invalidación del dashboard y la tasa BCV se ven en
+# cualquiera de ellos. La tabla se crea con 'manage.py createcachetable' (el
+# Procfile lo corre al desplegar). Para desarrollo en una sola máquina se puede
+# usar un directorio local con CACHE_DIR.
+if os.getenv('CACHE_DIR'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': os.getenv('CACHE_DIR'),
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.db.DatabaseCache',
+            'LOCATION': 'cache_compartida',
+        }
+    }
+
+# --- TAREAS EN SEGUNDO PLANO ---
+# Las importaciones y exportaciones grandes las procesa 'manage.py procesar_tareas'.
+# Para desarrollo local sin worker se puede poner TAREAS_EN_SEGUNDO_PLANO=False.
+TAREAS_EN_SEGUNDO_PLANO = os.getenv('TAREAS_EN_SEGUNDO_PLANO', 'True') == 'True'
+# Los archivos de entrada y los resultados se guardan en la base de datos, que la web y
+# el worker comparten aunque corran en máquinas distintas (tareas/almacen.py).
+TAREAS_ALMACENAMIENTO = os.getenv('TAREAS_ALMACENAMIENTO', 'tareas.almacen.AlmacenamientoEnBaseDeDatos')
+# Una tarea EN_PROCESO sin latido durante estos segundos se da por abandonada (el
+# worker se cayó) y se vuelve a encolar; tras TAREAS_MAX_INTENTOS queda FALLIDA.
+TAREAS_SIN_LATIDO = int(os.getenv('TAREAS_SIN_LATIDO', str(10 * 60)))
+TAREAS_MAX_INTENTOS = int(os.getenv('TAREAS_MAX_INTENTOS', '3'))
+
+# --- NOTIFICACIONES ---
+# Avisos de renovación y cobro ('manage.py enviar_notificaciones'). En desarrollo el
+# correo sale por consola; en producción se define EMAIL_BACKEND y los datos SMTP.
+EMAIL_BACKEND = os.getenv('EMAIL_BACKEND', 'django.core.mail.backends.console.EmailBackend')
+EMAIL_HOST = os.getenv('EMAIL_HOST', 'localhost')
+EMAIL_PORT = int(os.getenv('EMAIL_PORT', '25'))
+EMAIL_HOST_USER = os.getenv('EMAIL_HOST_USER', '')
+EMAIL_HOST_PASSWORD = os.getenv('EMAIL_HOST_PASSWORD', '')
+EMAIL_USE_TLS = os.getenv('EMAIL_USE_TLS', 'False') == 'True'
+DEFAULT_FROM_EMAIL = os.getenv('DEFAULT_FROM_EMAIL', 'avisos@gestorseguros.local')
+
+# Clase de cada canal. WhatsApp usa un sustituto local (archivo JSONL o consola)
+# hasta integrar un proveedor: basta con otra subclase de CanalWhatsApp.
+NOTIFICACIONES_CANALES = {
+    'EMAIL': 'gestor_seguros.utils.notificaciones.CanalEmail',
+    'WHATSAPP': 'gestor_seguros.utils.notificaciones.CanalWhatsAppArchivo',
+}
+NOTIFICACIONES_WHATSAPP_ARCHIVO = os.getenv('NOTIFICACIONES_WHATSAPP_ARCHIVO') or None
+# Ventanas en días respecto de hoy (desde, hasta): fin de vigencia y próxima cuota
+NOTIFICACIONES_VENTANAS = {
+    'RENOVACION': (0, 30),
+    'COBRO': (-15, 5),
+}
+# Hilos que envían en paralelo (acotado para no saturar el SMTP ni el proveedor)
+NOTIFICACIONES_HILOS = int(os.getenv('NOTIFICACIONES_HILOS', '4'))
+# Minutos tras los que una reserva 'ENVIANDO' se da por abandonada (corrida caída a
+# mitad del envío) y el aviso vuelve a quedar disponible
+NOTIFICACIONES_RESERVA_MINUTOS = int(os.getenv('NOTIFICACIONES_RESERVA_MINUTOS', '30'))
+
+# --- TASA BCV ---
+# La tasa se refresca con 'manage.py actualizar_tasa_bcv' (cron o --bucle). Pasada la
+# frescura se sigue sirviendo la guardada mientras se revalida en segundo plano.
+TASA_BCV_FRESCURA = int(os.getenv('TASA_BCV_FRESCURA', str(60 * 60)))
+# Segundos máximos de espera por proveedor (se consultan en paralelo)
+TASA_BCV_TIMEOUT = float(os.getenv('TASA_BCV_TIMEOUT', '5'))
+
+# --- PAGINACIÓN DE LISTADOS ---
+# Los listados se paginan por clave (gestor_seguros/utils/paginacion.py). El total de
+# resultados se cuenta una vez por filtro y se guarda estos segundos; con 0 no se muestra.
+PAGINACION_CONTEO_CACHE = int(os.getenv('PAGINACION_CONTEO_CACHE', '300'))
+
+# --- INSTRUMENTACIÓN DE CONSULTAS ---
+# Con INSTRUMENTACION_CONSULTAS=True cada petición registra en el log sus consultas,
+# tiempo de SQL y de plantillas y las consultas repetidas (N+1).
+INSTRUMENTACION_CONSULTAS = os.getenv('INSTRUMENTACION_CONSULTAS', 'False') == 'True'
+
+# Máximo de consultas por vista (nombre de URL). 'manage.py bench' falla si se supera.
+# Incluyen la caché en base de datos: leer una clave es 1 consulta y guardarla hasta 5
+# (conteo para depurar, BEGIN, SELECT, INSERT/UPDATE y COMMIT).
+# La búsqueda en SQLite comprueba una vez por conexión que exista su tabla FTS5.
+# La importación borra los planes anteriores con delete() (lectura de las cuotas,
+# anulación de proxima_cuota y DELETE por lote) para respetar las señales, y guarda
+# y lee el archivo en trozos (savepoint, archivo y trozo; archivo y trozo). Sus lotes
+# crecen con las filas: el presupuesto es para las 200 filas por defecto del bench.
+PRESUPUESTO_CONSULTAS = {
+    'dashboard': 13,
+    'polizas:lista_polizas': 13,
+    'reportes:dashboard_reportes': 7,
+    'reportes:exportar_polizas_csv': 4,
+    'polizas:importar_polizas_csv': 53,
+}
+
+# --- REGISTRO (LOGGING) ---
+# Cada módulo usa logging.getLogger(__name__). En producción se corre en INFO
+# (sin registros por fila ni por cuota); NIVEL_LOG=DEBUG muestra los lotes de
+# importación y los planes de pago con su duración.
+NIVEL_LOG = os.getenv('NIVEL_LOG', 'INFO')
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'formatters': {
+        'simple': {'format': '%(asctime)s %(levelname)s %(name)s: %(message)s'},
+    },
+    'handlers': {
+        'consola': {'class': 'logging.StreamHandler', 'formatter': 'simple'},
+    },
+    'root': {'handlers': ['consola'], 'level': 'WARNING'},
+    'loggers': {
+        name: {'handlers': ['consola'], 'level': NIVEL_LOG, 'propagate': False}
+        for name in ['gestor_seguros', 'polizas', 'clientes', 'reportes', 'documentos', 'tareas', 'cuentas']
+    } | {
+        # Solo escribe cuando INSTRUMENTACION_CONSULTAS está activo
+        'gestor_seguros.instrumentacion': {'handlers': ['consola'], 'level': 'INFO', 'propagate': False},
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
@@ -39,6 +39,9 @@ urlpatterns = [
         # App de Documentos
     path('documentos/', include('documentos.urls', namespace='documentos')),
 
+    # Tareas en segundo plano (progreso y descargas)
+    path('tareas/', include('tareas.urls', namespace='tareas')),
+
 
 ]
 
@@ -0,0 +1,158 @@
+# gestor_seguros/utils/instrumentacion.py
+"""
+Instrumentación de consultas por petición.
+
+Con INSTRUMENTACION_CONSULTAS=True el middleware registra, para cada petición:
+cantidad de consultas, tiempo total de SQL, tiempo de renderizado de plantillas
+(y cuántas consultas se dispararon desde la plantilla, el síntoma típico de un
+N+1 en un bucle {% for %}), y las consultas repetidas agrupadas por "huella"
+(el SQL con los literales reemplazados por '?').
+
+Cada petición se escribe en el logger 'gestor_seguros.instrumentacion'; si la
+vista supera su presupuesto (settings.PRESUPUESTO_CONSULTAS, por nombre de URL)
+se registra como advertencia. El informe también queda en response.instrumentacion
+para que 'manage.py bench' lo pueda leer.
+"""
+import logging
+import re
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack
+
+from django.conf import settings
+from django.core.exceptions import MiddlewareNotUsed
+from django.db import connections
+from django.template import base as template_base
+
+logger = logging.getLogger('gestor_seguros.instrumentacion')
+
+_estado = threading.local()
+
+_LITERAL_TEXTO = re.compile(r"'(?:[^']|'')*'")
+_LITERAL_NUMERO = re.compile(r"\b\d+(?:\.\d+)?\b")
+_LISTA_IN = re.compile(r"\(\s*\?(?:\s*,\s*\?)*\s*\)")
+_FIN = object()
+
+
+def huella_sql(sql):
+    """SQL normalizado: mismas consultas con distintos valores dan la misma huella."""
+    sql = _LITERAL_TEXTO.sub('?', sql)
+    sql = _LITERAL_NUMERO.sub('?', sql)
+    sql = _LISTA_IN.sub('(...)', sql)
+    return ' '.join(sql.split())
+
+
+def presupuesto_para(nombre_vista):
+    """Máximo de consultas declarado para la vista (nombre de URL con namespace), o None."""
+    return getattr(settings, 'PRESUPUESTO_CONSULTAS', {}).get(nombre_vista)
+
+
+class MedicionPeticion:
+    """Acumula las consultas de una petición; se instala con connection.execute_wrapper()."""
+
+    def __init__(self):
+        self.consultas = []  # (sql, params, segundos, desde_plantilla)
+        self.inicio = time.perf_counter()
+        self.render = 0.0
+
+    def __call__(self, execute, sql, params, many, context):
+        inicio = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            desde_plantilla = getattr(_estado, 'profundidad', 0) > 0
+            self.consultas.append((sql, params, time.perf_counter() - inicio, desde_plantilla))
+
+    def informe(self, nombre_vista):
+        huellas = Counter(huella_sql(sql) for sql, _params, _seg, _pl in self.consultas)
+        exactas = Counter((sql, repr(params)) for sql, params, _seg, _pl in self.consultas)
+        presupuesto = presupuesto_para(nombre_vista)
+        return {
+            'vista': nombre_vista,
+            'consultas': len(self.consultas),
+            'sql_ms': round(sum(seg for _sql, _p, seg, _pl in self.consultas) * 1000, 2),
+            'render_ms': round(self.render * 1000, 2),
+            'total_ms': round((time.perf_counter() - self.inicio) * 1000, 2),
+            'consultas_en_plantilla': sum(1 for *_resto, pl in self.consultas if pl),
+            'duplicadas': sum(n - 1 for n in exactas.values() if n > 1),
+            'repetidas': [(huella, n) for huella, n in huellas.most_common() if n > 1],
+            'presupuesto': presupuesto,
+            'excedida': presupuesto is not None and len(self.consultas) > presupuesto,
+        }
+
+
+# --- TIEMPO DE PLANTILLAS ---
+
+_render_original = template_base.Template._render
+
+
+def _render_medido(self, context):
+    # Solo se cronometra la plantilla más externa ({% include %} y {% extends %} anidan)
+    medicion = getattr(_estado, 'medicion', None)
+    profundidad = getattr(_estado, 'profundidad', 0)
+    _estado.profundidad = profundidad + 1
+    inicio = time.perf_counter()
+    try:
+        return _render_original(self, context)
+    finally:
+        _estado.profundidad = profundidad
+        if medicion is not None and profundidad == 0:
+            medicion.render += time.perf_counter() - inicio
+
+
+def _registrar(informe, metodo, ruta):
+    repetidas = '; '.join(f"{n}x {huella[:120]}" for huella, n in informe['repetidas'][:3])
+    mensaje = (
+        f"{metodo} {ruta} [{informe['vista']}] {informe['consultas']} consultas"
+        f" ({informe['consultas_en_plantilla']} desde plantilla, {informe['duplicadas']} duplicadas),"
+        f" SQL {informe['sql_ms']} ms, plantillas {informe['render_ms']} ms, total {informe['total_ms']} ms"
+    )
+    if repetidas:
+        mensaje += f" | repetidas: {repetidas}"
+    if informe['excedida']:
+        logger.warning("PRESUPUESTO EXCEDIDO (%s): %s", informe['presupuesto'], mensaje)
+    else:
+        logger.info(mensaje)
+
+
+class InstrumentacionMiddleware:
+    def __init__(self, get_response):
+        if not getattr(settings, 'INSTRUMENTACION_CONSULTAS', False):
+            raise MiddlewareNotUsed
+        template_base.Template._render = _render_medido
+        self.get_response = get_response
+
+    def __call__(self, request):
+        medicion = MedicionPeticion()
+        response = self._medir(medicion, lambda: self.get_response(request))
+
+        nombre_vista = request.resolver_match.view_name if request.resolver_match else None
+        if response.streaming:
+            # Las consultas de una descarga en streaming ocurren al consumir el contenido
+            contenido = iter(response.streaming_content)
+            response.streaming_content = self._medir_streaming(medicion, contenido, response, request, nombre_vista)
+        else:
+            response.instrumentacion = medicion.informe(nombre_vista)
+            _registrar(response.instrumentacion, request.method, request.path)
+        return response
+
+    def _medir(self, medicion, funcion):
+        anterior = getattr(_estado, 'medicion', None)
+        _estado.medicion = medicion
+        try:
+            with ExitStack() as pila:
+                for conexion in connections.all():
+                    pila.enter_context(conexion.execute_wrapper(medicion))
+                return funcion()
+        finally:
+            _estado.medicion = anterior
+
+    def _medir_streaming(self, medicion, contenido, response, request, nombre_vista):
+        while True:
+            trozo = self._medir(medicion, lambda: next(contenido, _FIN))
+            if trozo is _FIN:
+                break
+            yield trozo
+        response.instrumentacion = medicion.informe(nombre_vista)
+        _registrar(response.instrumentacion, request.method, request.path)
@@ -1,17 +1,133 @@
 # gestor_seguros/utils/notificaciones.py
+"""
+Canales de notificación y despacho en paralelo. Cada canal recibe lotes de
+mensajes y devuelve, por mensaje, None si se envió o el texto del error. Los
+canales se configuran en settings.NOTIFICACIONES_CANALES (ruta de la clase por
+canal), así que se puede cambiar el proveedor de WhatsApp sin tocar el resto.
+Los hilos solo hablan con los canales: no tocan la base de datos.
+"""
+import json
 import logging
+import sys
+import threading
+import time
+from collections import Counter, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.mail import EmailMessage, get_connection
+from django.utils.module_loading import import_string
 
 logger = logging.getLogger(__name__)
 
-def enviar_notificacion_base(cliente, mensaje, canal='EMAIL'):
+Mensaje = namedtuple('Mensaje', 'canal destinatario asunto cuerpo')
+
+# Mensajes por llamada a un canal (una conexión SMTP por lote)
+TAMANO_LOTE_ENVIO = 50
+
+
+class CanalNotificacion:
+    """Interfaz de un canal. Las subclases implementan enviar_lote()."""
+
+    def enviar_lote(self, mensajes):
+        """Envía los mensajes y devuelve una lista paralela con None o el error de cada uno."""
+        raise NotImplementedError
+
+
+class CanalEmail(CanalNotificacion):
+    """Correo con el backend de email de Django (EMAIL_BACKEND), una conexión por lote."""
+
+    def enviar_lote(self, mensajes):
+        errores = []
+        with get_connection() as conexion:
+            for mensaje in mensajes:
+                correo = EmailMessage(
+                    mensaje.asunto, mensaje.cuerpo, settings.DEFAULT_FROM_EMAIL,
+                    [mensaje.destinatario], connection=conexion,
+                )
+                try:
+                    correo.send()
+                    errores.append(None)
+                except Exception as e:
+                    errores.append(str(e) or e.__class__.__name__)
+        return errores
+
+
+class CanalWhatsApp(CanalNotificacion):
+    """Interfaz para el proveedor de WhatsApp (Twilio, API de Meta, ...)."""
+
+
+class CanalWhatsAppArchivo(CanalWhatsApp):
+    """
+    Sustituto local de WhatsApp: escribe cada mensaje como una línea JSON en
+    settings.NOTIFICACIONES_WHATSAPP_ARCHIVO, o en la consola si no está definido.
+    """
+    _candado = threading.Lock()
+
+    def enviar_lote(self, mensajes):
+        lineas = ''.join(
+            json.dumps({'para': m.destinatario, 'mensaje': m.cuerpo}, ensure_ascii=False) + '\n'
+            for m in mensajes
+        )
+        ruta = getattr(settings, 'NOTIFICACIONES_WHATSAPP_ARCHIVO', None)
+        with self._candado:
+            if ruta:
+                with open(ruta, 'a', encoding='utf-8') as archivo:
+                    archivo.write(lineas)
+            else:
+                sys.stdout.write(lineas)
+        return [None] * len(mensajes)
+
+
+def obtener_canales():
+    """Instancia de cada canal configurado: {'EMAIL': CanalEmail(), ...}."""
+    return {canal: import_string(ruta)() for canal, ruta in settings.NOTIFICACIONES_CANALES.items()}
+
+
+def despachar(mensajes, canales=None, hilos=None, tamano_lote=TAMANO_LOTE_ENVIO):
     """
-    Función base para envío de notificaciones.
-    Canales soportados futuro: 'EMAIL', 'WHATSAPP'
+    Envía los mensajes en lotes por canal con un pool de hilos acotado
+    (settings.NOTIFICACIONES_HILOS). Devuelve (errores, metricas): 'errores' es
+    paralela a 'mensajes' (None = enviado) y 'metricas' trae enviados, fallidos,
+    cuenta por canal, segundos y mensajes por segundo.
     """
-    logger.info(f"PRE-ENVÍO: Notificación para {cliente.nombre_completo} vía {canal}: {mensaje}")
-    # Aquí se integrará en el futuro el envío real vía SendGrid o Twilio
-    return True
+    canales = canales if canales is not None else obtener_canales()
+    hilos = hilos or settings.NOTIFICACIONES_HILOS
+    errores = [None] * len(mensajes)
+
+    # Lotes de índices por canal; un lote = una llamada al canal en un hilo
+    por_canal = {}
+    for indice, mensaje in enumerate(mensajes):
+        por_canal.setdefault(mensaje.canal, []).append(indice)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=hilos) as pool:
+        futuros = []
+        for canal, indices in por_canal.items():
+            for desde in range(0, len(indices), tamano_lote):
+                lote = indices[desde:desde + tamano_lote]
+                if canal not in canales:
+                    for i in lote:
+                        errores[i] = f"Canal '{canal}' no configurado."
+                    continue
+                futuros.append((lote, pool.submit(canales[canal].enviar_lote, [mensajes[i] for i in lote])))
+        for lote, futuro in futuros:
+            try:
+                resultado = futuro.result()
+            except Exception as e:
+                # Un fallo del canal (p. ej. SMTP caído) marca todo el lote
+                logger.exception("Falló un lote de %s mensajes", len(lote))
+                resultado = [str(e) or e.__class__.__name__] * len(lote)
+            for i, error in zip(lote, resultado):
+                errores[i] = error
+    segundos = time.perf_counter() - inicio
 
-def notificar_renovacion_proxima(poliza):
-    mensaje = f"Hola {poliza.cliente.nombre_completo}, su póliza {poliza.numero_poliza} vence el {poliza.fecha_fin_vigencia}. ¿Desea renovarla?"
-    return enviar_notificacion_base(poliza.cliente, mensaje)
+    fallidos = sum(1 for error in errores if error)
+    metricas = {
+        'enviados': len(mensajes) - fallidos,
+        'fallidos': fallidos,
+        'por_canal': dict(Counter(m.canal for m, error in zip(mensajes, errores) if not error)),
+        'segundos': round(segundos, 3),
+        'mensajes_por_segundo': round(len(mensajes) / segundos, 1) if segundos and mensajes else 0,
+    }
+    return errores, metricas
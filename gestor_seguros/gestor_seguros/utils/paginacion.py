@@ -0,0 +1,216 @@
+# gestor_seguros/utils/paginacion.py
+"""
+Paginación por clave ("keyset" o "seek") para los listados.
+
+La paginación de Django (paginate_by) hace un COUNT(*) de la consulta filtrada
+en cada página y salta las filas anteriores con OFFSET, que es más lento cuanto
+más profunda la página. Aquí cada página se pide a partir de la última fila de
+la anterior: WHERE (orden) > (valores de esa fila) ORDER BY orden LIMIT n, que
+con un índice sobre el orden cuesta lo mismo en la página 1 que en la 500.
+
+- El orden debe terminar en un campo único ('id') para que no haya empates.
+- El cursor es opaco para el usuario: base64 del JSON con los valores de la
+  fila y la dirección. Un cursor inválido lleva a la primera página.
+- El total es opcional y aproximado: se cuenta una vez y se guarda en la caché
+  por firma del filtro (la consulta SQL) durante PAGINACION_CONTEO_CACHE segundos.
+"""
+import base64
+import hashlib
+import json
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.serializers.json import DjangoJSONEncoder
+from django.core.exceptions import FieldDoesNotExist, ValidationError
+from django.db.models import Q
+
+PARAMETRO_CURSOR = 'cursor'
+SIGUIENTE = 'sig'
+ANTERIOR = 'ant'
+
+
+# --- Cursores ---
+
+def codificar_cursor(valores, direccion=SIGUIENTE):
+    datos = json.dumps({'v': valores, 'd': direccion}, cls=DjangoJSONEncoder, separators=(',', ':'))
+    return base64.urlsafe_b64encode(datos.encode()).decode().rstrip('=')
+
+
+def decodificar_cursor(token, modelo, campos):
+    """
+    (valores, dirección) del cursor, con los valores convertidos al tipo de cada
+    campo; None si el cursor no es válido para este orden.
+    """
+    try:
+        datos = json.loads(base64.urlsafe_b64decode(token + '=' * (-len(token) % 4)))
+        valores, direccion = datos.get('v'), datos['d']
+        if direccion not in (SIGUIENTE, ANTERIOR):
+            return None
+        if valores is None:
+            # Sin valores: desde un extremo (la última página si la dirección es ANTERIOR)
+            return None, direccion
+        if len(valores) != len(campos):
+            return None
+        return [_valor_de_campo(modelo, campo, valor) for campo, valor in zip(campos, valores)], direccion
+    except (ValueError, TypeError, KeyError, AttributeError, ValidationError):
+        return None
+
+
+def _valor_de_campo(modelo, campo, valor):
+    try:
+        return modelo._meta.get_field(campo).to_python(valor)
+    except FieldDoesNotExist:
+        # Anotación (p. ej. prioridad_renovacion): el JSON ya trae el tipo
+        return valor
+
+
+def _campo_y_sentido(orden):
+    return (orden[1:], True) if orden.startswith('-') else (orden, False)
+
+
+def _invertir(orden):
+    return orden[1:] if orden.startswith('-') else f'-{orden}'
+
+
+def filtro_desde(orden, valores, direccion):
+    """
+    Q de las filas que van después (SIGUIENTE) o antes (ANTERIOR) de 'valores'
+    en el orden dado: (a > x) OR (a = x AND b > y) OR ..., con < en los
+    campos descendentes o al ir hacia atrás.
+    """
+    filtro = Q()
+    iguales = {}
+    for campo_orden, valor in zip(orden, valores):
+        campo, descendente = _campo_y_sentido(campo_orden)
+        mayor = descendente == (direccion == ANTERIOR)
+        filtro |= Q(**iguales, **{f'{campo}__{"gt" if mayor else "lt"}': valor})
+        iguales[campo] = valor
+    return filtro
+
+
+# --- Página ---
+
+class PaginaKeyset:
+    """Página de un listado por clave; se usa en las plantillas como page_obj."""
+
+    es_keyset = True
+
+    def __init__(self, object_list, cursor_anterior, cursor_siguiente, total=None):
+        self.object_list = object_list
+        self.cursor_anterior = cursor_anterior
+        self.cursor_siguiente = cursor_siguiente
+        self.total = total
+        self.url_primera = self.url_anterior = self.url_siguiente = self.url_ultima = ''
+
+    def has_previous(self):
+        return self.cursor_anterior is not None
+
+    def has_next(self):
+        return self.cursor_siguiente is not None
+
+    def has_other_pages(self):
+        return self.has_previous() or self.has_next()
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+
+def paginar_keyset(queryset, orden, token=None, por_pagina=15):
+    """
+    Página de 'queryset' ordenado por 'orden' (lista de campos, con '-' para
+    descendente, terminada en uno único) a partir del cursor 'token'.
+    Una sola consulta: se pide una fila de más para saber si hay otra página.
+    """
+    campos = [_campo_y_sentido(o)[0] for o in orden]
+    cursor = decodificar_cursor(token, queryset.model, campos) if token else None
+    valores, direccion = cursor or (None, SIGUIENTE)
+
+    if direccion == ANTERIOR:
+        pedido = queryset.order_by(*[_invertir(o) for o in orden])
+    else:
+        pedido = queryset.order_by(*orden)
+    if valores is not None:
+        pedido = pedido.filter(filtro_desde(orden, valores, direccion))
+
+    filas = list(pedido[:por_pagina + 1])
+    hay_mas = len(filas) > por_pagina
+    filas = filas[:por_pagina]
+    if direccion == ANTERIOR:
+        filas.reverse()
+    if not filas:
+        # El cursor apunta más allá del final (p. ej. se borraron filas): primera página
+        return paginar_keyset(queryset, orden, None, por_pagina) if valores is not None else PaginaKeyset([], None, None)
+
+    def cursor_de(fila, hacia):
+        return codificar_cursor([getattr(fila, campo) for campo in campos], hacia)
+
+    # Hacia adelante, "hay más" es la página siguiente y la anterior existe si se llegó con cursor;
+    # hacia atrás, al revés.
+    hay_anterior = hay_mas if direccion == ANTERIOR else valores is not None
+    hay_siguiente = hay_mas if direccion == SIGUIENTE else valores is not None
+    return PaginaKeyset(
+        filas,
+        cursor_de(filas[0], ANTERIOR) if hay_anterior else None,
+        cursor_de(filas[-1], SIGUIENTE) if hay_siguiente else None,
+    )
+
+
+def contar_en_cache(queryset):
+    """
+    COUNT(*) del queryset guardado en la caché por firma de la consulta (el SQL
+    con sus parámetros: usuario y filtros). Puede estar desfasado hasta
+    PAGINACION_CONTEO_CACHE segundos; con 0 no se cuenta y devuelve None.
+    """
+    duracion = settings.PAGINACION_CONTEO_CACHE
+    if not duracion:
+        return None
+    consulta = queryset.order_by()
+    clave = 'conteo:' + hashlib.md5(str(consulta.query).encode()).hexdigest()
+    total = cache.get(clave)
+    if total is None:
+        total = consulta.count()
+        cache.set(clave, total, duracion)
+    return total
+
+
+# --- Vistas ---
+
+class PaginacionKeysetMixin:
+    """
+    Para ListView: reemplaza paginate_by por la paginación por clave.
+    'orden_keyset' (o get_orden_keyset()) define el orden del listado, terminado
+    en 'id'; puede incluir anotaciones del queryset.
+    En el contexto, page_obj es una PaginaKeyset con las URL de navegación
+    (conservan los filtros de la petición) e is_paginated indica si hay más de una página.
+    """
+    orden_keyset = ('id',)
+    paginate_by = 15
+
+    def get_orden_keyset(self):
+        return self.orden_keyset
+
+    def paginate_queryset(self, queryset, page_size):
+        pagina = paginar_keyset(queryset, self.get_orden_keyset(), self.request.GET.get(PARAMETRO_CURSOR), page_size)
+        pagina.total = contar_en_cache(queryset)
+
+        parametros = self.request.GET.copy()
+        parametros.pop(PARAMETRO_CURSOR, None)
+        parametros.pop('page', None)
+
+        def url(cursor):
+            if cursor:
+                parametros[PARAMETRO_CURSOR] = cursor
+            else:
+                parametros.pop(PARAMETRO_CURSOR, None)
+            return '?' + parametros.urlencode()
+
+        pagina.url_primera = url(None)
+        pagina.url_ultima = url(codificar_cursor(None, ANTERIOR))
+        if pagina.has_previous():
+            pagina.url_anterior = url(pagina.cursor_anterior)
+        if pagina.has_next():
+            pagina.url_siguiente = url(pagina.cursor_siguiente)
+        return None, pagina, pagina.object_list, pagina.has_other_pages()
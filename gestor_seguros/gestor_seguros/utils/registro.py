@@ -0,0 +1,29 @@
+# gestor_seguros/utils/registro.py
+import logging
+import time
+from contextlib import contextmanager
+
+
+def _formatear_campos(campos):
+    return ' '.join(f"{clave}={valor}" for clave, valor in campos.items())
+
+
+@contextmanager
+def medir(logger, evento, nivel=logging.DEBUG, **campos):
+    """
+    Span de tiempo: al salir del bloque registra 'evento' con sus campos
+    (clave=valor) y la duración en ms. El bloque puede agregar campos al dict
+    que recibe. Si el nivel no está activo no mide ni formatea nada.
+
+        with medir(logger, "plan_de_pagos", poliza=poliza.pk) as span:
+            span['cuotas'] = len(cuotas)
+    """
+    if not logger.isEnabledFor(nivel):
+        yield campos
+        return
+    inicio = time.perf_counter()
+    try:
+        yield campos
+    finally:
+        campos['ms'] = round((time.perf_counter() - inicio) * 1000, 1)
+        logger.log(nivel, "%s %s", evento, _formatear_campos(campos), extra={'evento': evento, 'campos': campos})
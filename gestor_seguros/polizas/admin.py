@@ -1,6 +1,6 @@
 # polizas/admin.py
 from django.contrib import admin
-from .models import Poliza, Aseguradora,PagoCuota
+from .models import Poliza, Aseguradora,PagoCuota, NotificacionEnviada
 
 
 # --- REGISTRA EL NUEVO MODELO DE PAGOS ---
@@ -11,6 +11,7 @@ class PagoCuotaAdmin(admin.ModelAdmin):
     list_filter = ('estado', 'fecha_vencimiento_cuota', 'poliza__aseguradora')
     search_fields = ('poliza__numero_poliza', 'poliza__cliente__nombre_completo')
     list_editable = ('estado', 'fecha_de_pago_realizado') # Permite editar estos campos desde la lista
+    list_select_related = ('poliza__cliente',)  # __str__ de la póliza usa el cliente
     autocomplete_fields = ['poliza']
 
 # --- OPCIONAL: MOSTRAR PAGOS EN LA VISTA DE LA PÓLIZA ---
@@ -82,3 +83,11 @@ class PolizaAdmin(admin.ModelAdmin):
         # Optimizar consulta para evitar N+1
         return super().get_queryset(request).select_related('cliente', 'aseguradora')
 
+
+@admin.register(NotificacionEnviada)
+class NotificacionEnviadaAdmin(admin.ModelAdmin):
+    list_display = ('poliza', 'tipo', 'canal', 'fecha_referencia', 'destinatario', 'estado', 'fecha_envio')
+    list_filter = ('tipo', 'canal', 'estado')
+    search_fields = ('poliza__numero_poliza', 'destinatario')
+    list_select_related = ('poliza__cliente',)
+    raw_id_fields = ('poliza', 'usuario')
@@ -1,6 +1,15 @@
 from django.apps import AppConfig
+from django.db.models.signals import post_migrate
 
 
 class PolizasConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'polizas'
+
+    def ready(self):
+        # Registra los receptores que invalidan la caché del dashboard
+        from . import signals  # noqa: F401
+
+        # En SQLite la búsqueda usa una tabla FTS5 que se (re)instala tras cada migrate
+        from .busqueda import instalar_busqueda_sqlite
+        post_migrate.connect(instalar_busqueda_sqlite, sender=self)
@@ -0,0 +1,82 @@
+# polizas/busqueda.py
+"""
+Búsqueda de texto libre de pólizas (ver clientes/busqueda.py para el esquema
+general: trigramas en PostgreSQL, FTS5 en SQLite, icontains en el resto).
+"""
+from django.db.models import Q
+
+from clientes.busqueda import (
+    LONGITUD_MINIMA, usa_busqueda_sqlite, filtrar_por_fts, instalar_tabla_fts,
+)
+
+TABLA_BUSQUEDA_POLIZAS = 'polizas_poliza_busqueda'
+
+# Campos de la búsqueda general; en PostgreSQL cada uno tiene su índice de trigramas
+CAMPOS_BUSQUEDA_POLIZAS = [
+    'numero_poliza', 'cliente__nombre_completo', 'aseguradora__nombre', 'descripcion_bien_asegurado',
+]
+
+_VALORES_POLIZA = """new.id, new.numero_poliza, new.descripcion_bien_asegurado,
+        (SELECT nombre_completo FROM clientes_cliente WHERE id = new.cliente_id),
+        (SELECT nombre FROM polizas_aseguradora WHERE id = new.aseguradora_id)"""
+
+_COLUMNAS = "rowid, numero_poliza, descripcion_bien_asegurado, cliente_nombre, aseguradora_nombre"
+
+SQL_BUSQUEDA_POLIZAS = [
+    f"""CREATE VIRTUAL TABLE IF NOT EXISTS {TABLA_BUSQUEDA_POLIZAS}
+        USING fts5(numero_poliza, descripcion_bien_asegurado, cliente_nombre, aseguradora_nombre, tokenize='trigram')""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA_POLIZAS}_ai AFTER INSERT ON polizas_poliza BEGIN
+        INSERT INTO {TABLA_BUSQUEDA_POLIZAS}({_COLUMNAS}) VALUES ({_VALORES_POLIZA});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA_POLIZAS}_au
+        AFTER UPDATE OF numero_poliza, descripcion_bien_asegurado, cliente_id, aseguradora_id ON polizas_poliza BEGIN
+        DELETE FROM {TABLA_BUSQUEDA_POLIZAS} WHERE rowid = old.id;
+        INSERT INTO {TABLA_BUSQUEDA_POLIZAS}({_COLUMNAS}) VALUES ({_VALORES_POLIZA});
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA_POLIZAS}_ad AFTER DELETE ON polizas_poliza BEGIN
+        DELETE FROM {TABLA_BUSQUEDA_POLIZAS} WHERE rowid = old.id;
+    END""",
+    # Los nombres de cliente y aseguradora están copiados en la tabla de búsqueda
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA_POLIZAS}_cliente_au
+        AFTER UPDATE OF nombre_completo ON clientes_cliente BEGIN
+        UPDATE {TABLA_BUSQUEDA_POLIZAS} SET cliente_nombre = new.nombre_completo
+        WHERE rowid IN (SELECT id FROM polizas_poliza WHERE cliente_id = new.id);
+    END""",
+    f"""CREATE TRIGGER IF NOT EXISTS {TABLA_BUSQUEDA_POLIZAS}_aseguradora_au
+        AFTER UPDATE OF nombre ON polizas_aseguradora BEGIN
+        UPDATE {TABLA_BUSQUEDA_POLIZAS} SET aseguradora_nombre = new.nombre
+        WHERE rowid IN (SELECT id FROM polizas_poliza WHERE aseguradora_id = new.id);
+    END""",
+]
+
+SQL_CARGA_POLIZAS = f"""
+    INSERT INTO {TABLA_BUSQUEDA_POLIZAS}({_COLUMNAS})
+    SELECT p.id, p.numero_poliza, p.descripcion_bien_asegurado, c.nombre_completo, a.nombre
+    FROM polizas_poliza p
+    LEFT JOIN clientes_cliente c ON c.id = p.cliente_id
+    LEFT JOIN polizas_aseguradora a ON a.id = p.aseguradora_id
+"""
+
+
+def instalar_busqueda_sqlite(**kwargs):
+    """Receptor de post_migrate: tabla de búsqueda de pólizas para SQLite."""
+    instalar_tabla_fts(TABLA_BUSQUEDA_POLIZAS, SQL_BUSQUEDA_POLIZAS, SQL_CARGA_POLIZAS)
+
+
+def buscar_polizas(queryset, texto):
+    """
+    Pólizas cuyo número, cliente, aseguradora o bien asegurado contiene 'texto'.
+
+    Fuera de SQLite la búsqueda se arma como la UNIÓN de una subconsulta por
+    campo en lugar de un OR con joins: así cada rama puede usar su propio índice
+    de trigramas en vez de recorrer toda la cartera.
+    """
+    texto = (texto or '').strip()
+    if not texto:
+        return queryset
+    if len(texto) >= LONGITUD_MINIMA and usa_busqueda_sqlite(TABLA_BUSQUEDA_POLIZAS):
+        return filtrar_por_fts(queryset, TABLA_BUSQUEDA_POLIZAS, texto)
+
+    base = queryset.order_by()
+    ramas = [base.filter(Q(**{f'{campo}__icontains': texto})).values('pk') for campo in CAMPOS_BUSQUEDA_POLIZAS]
+    return queryset.filter(pk__in=ramas[0].union(*ramas[1:]))
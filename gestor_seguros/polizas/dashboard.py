@@ -0,0 +1,253 @@
+# polizas/dashboard.py
+import json
+import threading
+from contextlib import contextmanager
+from datetime import timedelta
+
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from clientes.models import Cliente
+from .models import Poliza
+
+# Estados que se consideran "activos" para los recordatorios de vencimiento
+ESTADOS_VIGENCIA = ['VIGENTE', 'PENDIENTE_PAGO']
+# Estados que cuentan para el KPI de pólizas vigentes
+ESTADOS_KPI_VIGENTES = ['VIGENTE', 'PENDIENTE_PAGO', 'EN_TRAMITE']
+# Frecuencias sin cuotas periódicas (no aparecen en los widgets de cobro)
+FRECUENCIAS_PAGO_UNICO = ['UNICO', 'ANUAL']
+
+# La foto del dashboard vive como máximo un día; la clave ya incluye la fecha
+SNAPSHOT_TIMEOUT = 60 * 60 * 24
+
+# Permite agrupar la invalidación durante operaciones masivas (ver invalidacion_agrupada)
+_estado_invalidacion = threading.local()
+
+
+def cartera_activa(usuario):
+    """
+    Queryset de la cartera activa del usuario (todo menos canceladas y renovadas),
+    con cliente y aseguradora. La próxima cuota pendiente viene en las columnas
+    desnormalizadas de la póliza, así que no se cargan las cuotas.
+    """
+    return Poliza.objects.filter(
+        usuario=usuario
+    ).exclude(
+        estado_poliza__in=['CANCELADA', 'RENOVADA']
+    ).select_related('cliente', 'aseguradora')
+
+
+def clasificar_cartera(polizas, hoy):
+    """
+    Recorre la cartera UNA sola vez y reparte cada póliza en sus cubetas de
+    renovación y de cobranza. Devuelve listas ya ordenadas y los contadores.
+    """
+    en_7_dias = hoy + timedelta(days=7)
+    en_30_dias = hoy + timedelta(days=30)
+    en_31_dias = hoy + timedelta(days=31)
+    en_60_dias = hoy + timedelta(days=60)
+
+    en_tramite = []
+    por_gestionar = []
+    vencidas = []
+    a_vencer_30 = []
+    a_vencer_60 = []
+    vencen_semana = []
+    cobros_vencidos = []
+    cobros_pendientes_30_dias = []
+    total_vigentes = 0
+
+    for poliza in polizas:
+        estado = poliza.estado_poliza
+        fin = poliza.fecha_fin_vigencia
+
+        # A. Gestión de renovaciones
+        if estado == 'EN_TRAMITE':
+            en_tramite.append(poliza)
+        if estado in ('EN_TRAMITE', 'PENDIENTE_PAGO'):
+            por_gestionar.append(poliza)
+        # Estado guardado por 'manage.py actualizar_estados'; la fecha cubre las que
+        # vencieron desde la última corrida
+        if estado == 'VENCIDA' or (fin < hoy and estado in ESTADOS_VIGENCIA):
+            vencidas.append(poliza)
+        if hoy <= fin <= en_30_dias:
+            a_vencer_30.append(poliza)
+        if en_31_dias <= fin <= en_60_dias:
+            a_vencer_60.append(poliza)
+        if hoy <= fin <= en_7_dias:
+            vencen_semana.append(poliza)
+        if fin >= hoy and estado in ESTADOS_KPI_VIGENTES:
+            total_vigentes += 1
+
+        # B. Cobranza: se clasifica la PÓLIZA según su primera cuota pendiente
+        if poliza.frecuencia_pago in FRECUENCIAS_PAGO_UNICO:
+            continue
+        if poliza.proxima_cuota_fecha is None:
+            continue
+        dias = (poliza.proxima_cuota_fecha - hoy).days
+        if dias < 0:
+            cobros_vencidos.append(poliza)
+        elif dias <= 30:
+            cobros_pendientes_30_dias.append(poliza)
+
+    por_inicio = lambda p: p.fecha_inicio_vigencia
+    por_fin = lambda p: p.fecha_fin_vigencia
+    por_cuota = lambda p: p.proxima_cuota_fecha
+
+    en_tramite.sort(key=por_inicio)
+    por_gestionar.sort(key=por_inicio)
+    vencidas.sort(key=por_fin)
+    a_vencer_30.sort(key=por_fin)
+    a_vencer_60.sort(key=por_fin)
+    cobros_vencidos.sort(key=por_cuota)
+    cobros_pendientes_30_dias.sort(key=por_cuota)
+
+    return {
+        'polizas_en_tramite': en_tramite,
+        'polizas_por_gestionar': por_gestionar,
+        'polizas_vencidas': vencidas,
+        'polizas_a_vencer_30': a_vencer_30,
+        'polizas_a_vencer_60': a_vencer_60,
+        'polizas_vencen_semana': vencen_semana,
+        'cobros_vencidos': cobros_vencidos,
+        'cobros_pendientes_30_dias': cobros_pendientes_30_dias,
+        'total_polizas_vigentes': total_vigentes,
+    }
+
+
+def construir_dashboard(usuario, hoy):
+    """
+    Arma todo el contexto del dashboard con un número fijo de consultas,
+    sin importar el tamaño de la cartera ni la cantidad de widgets.
+    """
+    cubetas = clasificar_cartera(cartera_activa(usuario), hoy)
+
+    # C. Comisiones
+    comisiones_pendientes = list(
+        Poliza.objects.filter(usuario=usuario, comision_cobrada=False, comision_monto__gt=0)
+        .select_related('cliente').order_by('fecha_fin_vigencia')
+    )
+
+    # D. Cumpleaños (el filtro del día se hace en memoria sobre la lista del mes)
+    cumpleaneros_mes = list(
+        Cliente.objects.filter(usuario=usuario, fecha_nacimiento__isnull=False, fecha_nacimiento__month=hoy.month)
+        .order_by('fecha_nacimiento__day')
+    )
+    cumpleaneros_hoy = [c for c in cumpleaneros_mes if c.fecha_nacimiento.day == hoy.day]
+
+    total_clientes = Cliente.objects.filter(usuario=usuario).count()
+
+    # --- DATOS PARA GRÁFICOS ---
+    datos_ramos = Poliza.objects.filter(usuario=usuario).values('ramo_tipo_seguro').annotate(
+        total=Count('id'),
+        monto=Sum('prima_total_anual')
+    ).order_by('-total')
+
+    chart_ramos_labels = []
+    chart_ramos_series = []
+    for d in datos_ramos:
+        label = d['ramo_tipo_seguro'] if d['ramo_tipo_seguro'] else 'Sin Ramo'
+        chart_ramos_labels.append(str(label))
+        chart_ramos_series.append(float(d['total']))
+
+    vencen_semana = cubetas.pop('polizas_vencen_semana')
+
+    return {
+        **cubetas,
+        'comisiones_pendientes': comisiones_pendientes,
+        'cumpleaneros_mes': cumpleaneros_mes,
+        'total_clientes': total_clientes,
+        'cumpleaneros_hoy_json': json.dumps([{'nombre': c.nombre_completo} for c in cumpleaneros_hoy]),
+        'polizas_vencen_semana_json': json.dumps([{'numero': p.numero_poliza} for p in vencen_semana]),
+        'chart_ramos_json': json.dumps({'labels': chart_ramos_labels, 'series': chart_ramos_series}),
+    }
+
+
+# --- SNAPSHOT POR USUARIO (CACHÉ) ---
+# En la caché se guardan solo valores simples: los ids de cada lista (en su
+# orden), los contadores y los JSON de los gráficos. Al leerla se cargan las
+# pólizas y clientes de todas las listas con una consulta por modelo.
+
+LISTAS_DE_POLIZAS = (
+    'polizas_en_tramite', 'polizas_por_gestionar', 'polizas_vencidas', 'polizas_a_vencer_30',
+    'polizas_a_vencer_60', 'cobros_vencidos', 'cobros_pendientes_30_dias', 'comisiones_pendientes',
+)
+LISTAS_DE_CLIENTES = ('cumpleaneros_mes',)
+
+
+def clave_snapshot_dashboard(usuario_id, hoy):
+    return f'dashboard_snapshot_{usuario_id}_{hoy.isoformat()}'
+
+
+def a_snapshot(contexto):
+    """Versión del contexto para la caché: cada lista de objetos pasa a lista de ids."""
+    snapshot = dict(contexto)
+    for clave in LISTAS_DE_POLIZAS + LISTAS_DE_CLIENTES:
+        snapshot[clave] = [objeto.pk for objeto in contexto[clave]]
+    return snapshot
+
+
+def desde_snapshot(snapshot, usuario):
+    """Contexto del dashboard a partir de la foto guardada (dos consultas)."""
+    ids_polizas = {pk for clave in LISTAS_DE_POLIZAS for pk in snapshot[clave]}
+    ids_clientes = {pk for clave in LISTAS_DE_CLIENTES for pk in snapshot[clave]}
+    polizas = Poliza.objects.filter(usuario=usuario).select_related('cliente', 'aseguradora').in_bulk(ids_polizas)
+    clientes = Cliente.objects.filter(usuario=usuario).in_bulk(ids_clientes)
+
+    contexto = dict(snapshot)
+    for claves, objetos in ((LISTAS_DE_POLIZAS, polizas), (LISTAS_DE_CLIENTES, clientes)):
+        for clave in claves:
+            contexto[clave] = [objetos[pk] for pk in snapshot[clave] if pk in objetos]
+    return contexto
+
+
+def obtener_snapshot_dashboard(usuario, hoy):
+    """
+    Devuelve el contexto del dashboard desde la caché. Si no existe (primera visita
+    del día o hubo cambios en la cartera) se reconstruye y se guarda.
+    """
+    clave = clave_snapshot_dashboard(usuario.pk, hoy)
+    snapshot = cache.get(clave)
+    if snapshot is not None:
+        return desde_snapshot(snapshot, usuario)
+    contexto = construir_dashboard(usuario, hoy)
+    cache.set(clave, a_snapshot(contexto), timeout=SNAPSHOT_TIMEOUT)
+    return contexto
+
+
+def invalidar_snapshot_dashboard(usuario_id):
+    """Descarta la foto del día; se reconstruye en la siguiente visita."""
+    if usuario_id:
+        cache.delete(clave_snapshot_dashboard(usuario_id, timezone.localdate()))
+
+
+def invalidacion_suspendida():
+    return getattr(_estado_invalidacion, 'nivel', 0) > 0
+
+
+@contextmanager
+def invalidacion_en_pausa():
+    """
+    Dentro del bloque las señales no invalidan nada; quien lo abre se encarga
+    de invalidar las fotos afectadas al terminar.
+    """
+    _estado_invalidacion.nivel = getattr(_estado_invalidacion, 'nivel', 0) + 1
+    try:
+        yield
+    finally:
+        _estado_invalidacion.nivel -= 1
+
+
+@contextmanager
+def invalidacion_agrupada(usuario_id):
+    """
+    Dentro del bloque las señales no invalidan fila por fila; al salir se
+    invalida una sola vez la foto del usuario. Pensado para importaciones y
+    operaciones en lote.
+    """
+    try:
+        with invalidacion_en_pausa():
+            yield
+    finally:
+        invalidar_snapshot_dashboard(usuario_id)
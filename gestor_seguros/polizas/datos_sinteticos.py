@@ -0,0 +1,188 @@
+# polizas/datos_sinteticos.py
+import random
+from datetime import timedelta
+from decimal import Decimal
+
+from django.core.files.base import ContentFile
+from django.contrib.contenttypes.models import ContentType
+from django.db.models import F
+from django.utils import timezone
+from simple_history.utils import bulk_create_with_history
+
+from clientes.models import Cliente
+from documentos.almacen import almacenar, liberar
+from documentos.models import ArchivoAlmacenado, Documento
+from reportes.resumen import reconstruir_resumen
+from .models import (
+    Poliza, Aseguradora, PagoCuota, Asegurado, Siniestro, generar_planes_de_pagos, actualizar_resumen_cuotas,
+)
+
+RAMOS = ['Automóvil', 'Salud', 'Vida', 'Hogar', 'Accidentes Personales', 'Funerario', 'Responsabilidad Civil']
+FRECUENCIAS = [codigo for codigo, _etiqueta in Poliza.FRECUENCIA_PAGO_CHOICES]
+# Ramos con varias personas aseguradas por póliza
+RAMOS_CON_ASEGURADOS = ['Salud', 'Vida', 'Accidentes Personales', 'Funerario']
+NOMBRES = ['María', 'José', 'Luis', 'Ana', 'Carlos', 'Rosa', 'Pedro', 'Carmen', 'Jesús', 'Daniela', 'Miguel', 'Andrea']
+APELLIDOS = ['González', 'Rodríguez', 'Pérez', 'Hernández', 'García', 'Martínez', 'López', 'Díaz', 'Sánchez', 'Romero']
+ESTADOS_SINIESTRO = [codigo for codigo, _etiqueta in Siniestro.ESTADO_CHOICES]
+PARENTESCOS = ['CONYUGE', 'HIJO_A', 'HIJO_A', 'PADRE_MADRE', 'OTRO']
+
+# Contenido compartido por todos los documentos sintéticos (se guarda una sola vez)
+CONTENIDO_DOCUMENTO = b'%PDF-1.4\n% documento sintetico\n%%EOF\n'
+
+# Estados con un peso aproximado al de una cartera real
+ESTADOS_PONDERADOS = [('VIGENTE', 60), ('PENDIENTE_PAGO', 10), ('EN_TRAMITE', 8), ('VENCIDA', 10), ('RENOVADA', 7), ('CANCELADA', 5)]
+
+TAMANO_LOTE = 1000
+
+
+def _crear(modelo, objetos, con_historial):
+    if con_historial:
+        return bulk_create_with_history(objetos, modelo, batch_size=TAMANO_LOTE)
+    return modelo.objects.bulk_create(objetos, batch_size=TAMANO_LOTE)
+
+
+def sembrar_cartera(usuario, cantidad_polizas, semilla=0, prefijo='SINT', con_historial=False):
+    """
+    Crea una cartera sintética para 'usuario': aseguradoras, clientes (uno cada dos
+    pólizas), pólizas con fechas repartidas en ±2 años, todas las frecuencias de pago
+    y su plan de pagos, con las cuotas de más de 60 días atrás marcadas como pagadas.
+    Usa inserciones en bloque (sin señales); con_historial=True también crea los
+    registros de simple_history. Devuelve las cantidades creadas.
+    """
+    rnd = random.Random(semilla)
+    hoy = timezone.now().date()
+    estados, pesos = zip(*ESTADOS_PONDERADOS)
+    marca = f"{prefijo}-{usuario.pk}"
+
+    aseguradoras = _crear(Aseguradora, [
+        Aseguradora(usuario=usuario, nombre=f"Aseguradora {marca}-{i}") for i in range(8)
+    ], con_historial)
+
+    cantidad_clientes = max(cantidad_polizas // 2, 1)
+    clientes = _crear(Cliente, [
+        Cliente(
+            usuario=usuario,
+            nombre_completo=f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)} {rnd.choice(APELLIDOS)} {marca}-{i:06d}",
+            numero_documento=f"{marca}-{i}",
+            fecha_nacimiento=hoy - timedelta(days=rnd.randint(18 * 365, 80 * 365)),
+            telefono_principal=f"0414{rnd.randint(1000000, 9999999)}",
+        )
+        for i in range(cantidad_clientes)
+    ], con_historial)
+
+    total_cuotas = 0
+    for inicio_lote in range(0, cantidad_polizas, TAMANO_LOTE):
+        polizas = []
+        for i in range(inicio_lote, min(inicio_lote + TAMANO_LOTE, cantidad_polizas)):
+            inicio = hoy - timedelta(days=rnd.randint(-60, 700))
+            prima = Decimal(rnd.randint(100, 5000))
+            polizas.append(Poliza(
+                usuario=usuario,
+                cliente=rnd.choice(clientes),
+                aseguradora=rnd.choice(aseguradoras),
+                numero_poliza=f"{marca}-{i:07d}",
+                ramo_tipo_seguro=rnd.choice(RAMOS),
+                fecha_emision=inicio - timedelta(days=rnd.randint(0, 15)),
+                fecha_inicio_vigencia=inicio,
+                fecha_fin_vigencia=inicio + timedelta(days=364),
+                prima_total_anual=prima,
+                frecuencia_pago=rnd.choice(FRECUENCIAS),
+                comision_monto=(prima * Decimal('0.12')).quantize(Decimal('0.01')),
+                comision_cobrada=rnd.random() < 0.6,
+                estado_poliza=rnd.choices(estados, weights=pesos)[0],
+            ))
+        polizas = _crear(Poliza, polizas, con_historial)
+        total_cuotas += generar_planes_de_pagos(polizas)
+
+    # Las cuotas viejas ya se cobraron
+    pagadas = PagoCuota.objects.filter(
+        poliza__usuario=usuario, fecha_vencimiento_cuota__lt=hoy - timedelta(days=60)
+    ).update(estado='PAGADO', fecha_de_pago_realizado=F('fecha_vencimiento_cuota'))
+    actualizar_resumen_cuotas(Poliza.objects.filter(usuario=usuario).values('pk'))
+    # Las pólizas se insertaron en bloque (sin señales): resumen mensual de una vez
+    reconstruir_resumen([usuario.pk])
+
+    return {
+        'aseguradoras': len(aseguradoras),
+        'clientes': len(clientes),
+        'polizas': cantidad_polizas,
+        'cuotas': total_cuotas,
+        'cuotas_pagadas': pagadas,
+    }
+
+
+def sembrar_detalle(usuario, semilla=0, tasa_siniestros=0.05, tasa_documentos=0.3):
+    """
+    Completa la cartera de 'usuario' con asegurados (ramos de personas), siniestros
+    y documentos adjuntos a pólizas y clientes. Devuelve las cantidades creadas.
+    """
+    rnd = random.Random(semilla)
+    hoy = timezone.now().date()
+    # Todos los documentos sintéticos comparten un mismo contenido en el almacén por hash
+    blob = almacenar(ContentFile(CONTENIDO_DOCUMENTO, name='ejemplo.pdf'))
+
+    tipo_poliza = ContentType.objects.get_for_model(Poliza)
+    tipo_cliente = ContentType.objects.get_for_model(Cliente)
+    totales = {'asegurados': 0, 'siniestros': 0, 'documentos': 0}
+
+    polizas = Poliza.objects.filter(usuario=usuario).values_list(
+        'id', 'cliente_id', 'ramo_tipo_seguro', 'fecha_inicio_vigencia', 'prima_total_anual'
+    ).order_by('pk')
+    asegurados, siniestros, documentos = [], [], []
+    clientes_con_documento = set()
+
+    def _guardar_pendientes():
+        totales['asegurados'] += len(Asegurado.objects.bulk_create(asegurados, batch_size=TAMANO_LOTE))
+        totales['siniestros'] += len(Siniestro.objects.bulk_create(siniestros, batch_size=TAMANO_LOTE))
+        totales['documentos'] += len(Documento.objects.bulk_create(documentos, batch_size=TAMANO_LOTE))
+        asegurados.clear()
+        siniestros.clear()
+        documentos.clear()
+
+    for poliza_id, cliente_id, ramo, inicio, prima in polizas.iterator(chunk_size=TAMANO_LOTE):
+        if ramo in RAMOS_CON_ASEGURADOS:
+            asegurados.append(Asegurado(poliza_id=poliza_id, nombre_completo=f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)}",
+                                        parentesco='TITULAR', sexo=rnd.choice('MF')))
+            for _ in range(rnd.randint(0, 3)):
+                asegurados.append(Asegurado(
+                    poliza_id=poliza_id,
+                    nombre_completo=f"{rnd.choice(NOMBRES)} {rnd.choice(APELLIDOS)}",
+                    cedula=str(rnd.randint(5000000, 35000000)),
+                    fecha_nacimiento=hoy - timedelta(days=rnd.randint(365, 80 * 365)),
+                    parentesco=rnd.choice(PARENTESCOS),
+                    sexo=rnd.choice('MF'),
+                ))
+
+        if rnd.random() < tasa_siniestros:
+            ocurrencia = min(inicio + timedelta(days=rnd.randint(0, 360)), hoy)
+            reclamado = (prima * Decimal(rnd.uniform(0.1, 2))).quantize(Decimal('0.01'))
+            estado = rnd.choice(ESTADOS_SINIESTRO)
+            siniestros.append(Siniestro(
+                poliza_id=poliza_id,
+                usuario=usuario,
+                fecha_ocurrencia=ocurrencia,
+                fecha_reporte=min(ocurrencia + timedelta(days=rnd.randint(0, 10)), hoy),
+                estado_siniestro=estado,
+                descripcion=f"Siniestro sintético de {ramo.lower()}",
+                monto_reclamado=reclamado,
+                monto_indemnizado=reclamado if estado in ('PAGADO', 'CERRADO') else Decimal('0.00'),
+            ))
+
+        if rnd.random() < tasa_documentos:
+            documentos.append(Documento(usuario=usuario, titulo=f"Póliza {poliza_id} (PDF)", blob=blob, archivo=blob.archivo.name,
+                                        content_type=tipo_poliza, object_id=poliza_id))
+        if cliente_id not in clientes_con_documento and rnd.random() < tasa_documentos / 3:
+            clientes_con_documento.add(cliente_id)
+            documentos.append(Documento(usuario=usuario, titulo="Cédula de identidad", blob=blob, archivo=blob.archivo.name,
+                                        content_type=tipo_cliente, object_id=cliente_id))
+
+        if len(asegurados) >= TAMANO_LOTE:
+            _guardar_pendientes()
+
+    _guardar_pendientes()
+    # almacenar() sumó una referencia; las verdaderas son los documentos creados
+    if totales['documentos']:
+        ArchivoAlmacenado.objects.filter(pk=blob.pk).update(referencias=F('referencias') - 1 + totales['documentos'])
+    else:
+        liberar(blob.pk)
+    return totales
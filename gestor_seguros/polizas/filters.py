@@ -1,8 +1,8 @@
 # polizas/filters.py
 import django_filters
-from .models import Poliza
+from .models import Poliza, ESTADOS_RENOVACION
+from .busqueda import buscar_polizas
 from django import forms
-from django.db import models
 
 class PolizaFilter(django_filters.FilterSet):
     # Campo de búsqueda de texto libre que busca en varios campos
@@ -12,6 +12,20 @@ class PolizaFilter(django_filters.FilterSet):
         widget=forms.TextInput(attrs={'placeholder': 'Nro. Póliza, Cliente, Placa'})
     )
 
+    # Estado de renovación y orden, calculados en la base de datos (ver PolizaQuerySet)
+    renovacion = django_filters.ChoiceFilter(
+        method='filtro_renovacion',
+        label="Renovación",
+        choices=ESTADOS_RENOVACION,
+        empty_label="Renovación (todas)",
+    )
+    orden = django_filters.ChoiceFilter(
+        method='filtro_orden',
+        label="Ordenar por",
+        choices=[('renovacion', 'Urgencia de renovación')],
+        empty_label="Fin de vigencia",
+    )
+
     class Meta:
         model = Poliza
         # Campos por los que se puede filtrar con desplegables
@@ -23,9 +37,12 @@ class PolizaFilter(django_filters.FilterSet):
 
     def filtro_general(self, queryset, name, value):
         # Esta función define cómo funciona la búsqueda de texto libre 'q'
-        return queryset.filter(
-            models.Q(numero_poliza__icontains=value) |
-            models.Q(cliente__nombre_completo__icontains=value) |
-            models.Q(aseguradora__nombre__icontains=value) |
-            models.Q(descripcion_bien_asegurado__icontains=value)
-        )
\ No newline at end of file
+        # (Nro. Póliza, cliente, aseguradora o placa; con índices, ver polizas/busqueda.py)
+        return buscar_polizas(queryset, value)
+
+    def filtro_renovacion(self, queryset, name, value):
+        return queryset.por_estado_renovacion(value)
+
+    def filtro_orden(self, queryset, name, value):
+        # El orden lo aplica la vista (PolizaListView.get_orden_keyset), que pagina por él
+        return queryset
@@ -0,0 +1,446 @@
+# polizas/importacion.py
+import codecs
+import csv
+import io
+import logging
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from itertools import chain, islice
+
+import openpyxl
+from dateutil.relativedelta import relativedelta
+from django.db import transaction, IntegrityError
+from django.utils import timezone
+from simple_history.utils import bulk_create_with_history, bulk_update_with_history
+
+from clientes.models import Cliente
+from gestor_seguros.utils.registro import medir
+from .models import Poliza, Aseguradora, generar_planes_de_pagos
+from reportes.resumen import marcar_meses, resumen_agrupado
+from .dashboard import invalidacion_agrupada
+
+logger = logging.getLogger(__name__)
+
+# Cantidad de filas que se resuelven en memoria y se guardan juntas
+TAMANO_LOTE = 500
+# Errores de fila que se copian al log al terminar (el reporte de la tarea los guarda todos)
+MAX_ERRORES_EN_LOG = 5
+
+CAMPOS_FECHA = ['Fecha Emision', 'Fecha Inicio Vigencia', 'Fecha Fin Vigencia']
+
+ENCODINGS_CSV = ['utf-8-sig', 'utf-8', 'latin-1', 'iso-8859-1', 'cp1252']
+# Bytes que se leen de una vez al validar el encoding de un CSV
+TAMANO_BLOQUE_LECTURA = 64 * 1024
+
+# Campos que una fila del archivo puede modificar en una póliza existente
+CAMPOS_ACTUALIZABLES = [
+    'numero_poliza', 'cliente', 'aseguradora', 'descripcion_bien_asegurado', 'ramo_tipo_seguro',
+    'prima_total_anual', 'comision_monto', 'comision_cobrada', 'estado_poliza', 'frecuencia_pago',
+    'fecha_emision', 'fecha_inicio_vigencia', 'fecha_fin_vigencia', 'fecha_actualizacion',
+]
+
+
+def _texto(row, columna, defecto=''):
+    return (row.get(columna, defecto) or '').strip()
+
+
+def safe_decimal(value):
+    # Helper seguro para parsear decimales vacíos
+    val = (value or '').strip().replace(',', '.')
+    return Decimal(val) if val else Decimal('0.00')
+
+
+def _valor_celda(val):
+    # Convertir todo a string para mantener consistencia con CSV
+    if val is None:
+        return ""
+    if isinstance(val, datetime):
+        return val.strftime('%d/%m/%Y')
+    return str(val).strip()
+
+
+class FilasArchivo:
+    """
+    Fuente de filas en streaming para un archivo .csv o .xlsx abierto en binario.
+    Se recorre como un iterable de dicts con las cabeceras de la primera línea,
+    leyendo una fila a la vez: el archivo nunca se carga completo en memoria.
+
+    Al crearla se valida el archivo (libro Excel o encoding del CSV) y se calcula
+    'total_estimado', que sirve para mostrar el progreso. Lanza ValueError si
+    no se puede decodificar el CSV o si la extensión no es soportada.
+    """
+
+    def __init__(self, archivo, nombre_archivo):
+        self.archivo = archivo
+        nombre_archivo = nombre_archivo.lower()
+        self.total_estimado = None
+
+        if nombre_archivo.endswith('.xlsx'):
+            self.formato = 'xlsx'
+            # En modo read_only openpyxl solo lee la estructura; las filas se leen del zip al recorrer la hoja
+            self.libro = openpyxl.load_workbook(archivo, read_only=True, data_only=True)
+            max_row = self.libro.active.max_row
+            if max_row:
+                self.total_estimado = max(max_row - 1, 0)
+        elif nombre_archivo.endswith('.csv'):
+            self.formato = 'csv'
+            self.encoding, saltos = self._detectar_encoding()
+            # Una fila por salto de línea, menos la cabecera (aproximado si hay campos multilínea)
+            self.total_estimado = max(saltos - 1, 0)
+            logger.debug("CSV decodificado con %s (~%s filas).", self.encoding, self.total_estimado)
+        else:
+            raise ValueError("Formato de archivo no soportado. Usa .csv o .xlsx")
+
+    def __iter__(self):
+        if self.formato == 'xlsx':
+            return self._filas_xlsx()
+        return self._filas_csv()
+
+    # --- EXCEL ---
+
+    def _filas_xlsx(self):
+        try:
+            filas = self.libro.active.iter_rows(values_only=True)
+            headers = next(filas, None)
+            if headers is None:
+                return
+            for row in filas:
+                if any(row):  # Ignorar filas completamente vacías
+                    yield {key: _valor_celda(val) for key, val in zip(headers, row)}
+        finally:
+            self.libro.close()
+
+    # --- CSV (Decodificación robusta y auto-detección de separador) ---
+
+    def _detectar_encoding(self):
+        """
+        Prueba los encodings en orden decodificando el archivo por bloques (memoria
+        acotada). Devuelve el primero que sirve y la cantidad de saltos de línea.
+        """
+        for encoding in ENCODINGS_CSV:
+            self.archivo.seek(0)
+            decodificador = codecs.getincrementaldecoder(encoding)()
+            saltos = 0
+            ultimo = b''
+            try:
+                while True:
+                    bloque = self.archivo.read(TAMANO_BLOQUE_LECTURA)
+                    if not bloque:
+                        break
+                    decodificador.decode(bloque)
+                    saltos += bloque.count(b'\n')
+                    ultimo = bloque
+                decodificador.decode(b'', final=True)
+            except UnicodeDecodeError:
+                continue
+            finally:
+                self.archivo.seek(0)
+            if ultimo and not ultimo.endswith(b'\n'):
+                saltos += 1  # Última línea sin salto final
+            return encoding, saltos
+        raise ValueError("No se pudo decodificar el archivo CSV. Asegúrate de que esté en formato UTF-8.")
+
+    def _filas_csv(self):
+        self.archivo.seek(0)
+        texto = io.TextIOWrapper(self.archivo, encoding=self.encoding, newline='')
+        try:
+            # Detectar si el archivo usa comas o punto y coma mirando la primera línea
+            primera_linea = texto.readline()
+            delimitador = ';' if primera_linea.count(';') > primera_linea.count(',') else ','
+            logger.debug("Delimitador CSV detectado: '%s'", delimitador)
+
+            yield from csv.DictReader(chain([primera_linea], texto), delimiter=delimitador)
+        finally:
+            # Suelta el archivo sin cerrarlo: lo cierra quien lo abrió
+            texto.detach()
+
+
+def _lotes(iterable, tamano):
+    iterador = iter(iterable)
+    while True:
+        lote = list(islice(iterador, tamano))
+        if not lote:
+            return
+        yield lote
+
+
+class ImportadorPolizas:
+    """
+    Motor de importación por lotes. Precarga en diccionarios los clientes,
+    aseguradoras y claves (numero_poliza, fecha_inicio_vigencia) del usuario,
+    resuelve cada lote en memoria y lo guarda con bulk_create / bulk_update,
+    generando todas las cuotas del lote con una sola inserción.
+    """
+
+    def __init__(self, usuario, tamano_lote=TAMANO_LOTE):
+        self.usuario = usuario
+        self.tamano_lote = tamano_lote
+        self.hoy = timezone.now().date()
+        self.reporte = {'creadas': 0, 'actualizadas': 0, 'errores': []}
+
+        # Nombres en minúscula -> id (equivalente al iexact de la versión fila a fila)
+        self.clientes = {}
+        for pk, nombre in Cliente.objects.filter(usuario=usuario).values_list('id', 'nombre_completo'):
+            self.clientes.setdefault(nombre.lower(), pk)
+        self.aseguradoras = {}
+        for pk, nombre in Aseguradora.objects.filter(usuario=usuario).values_list('id', 'nombre'):
+            self.aseguradoras.setdefault(nombre.lower(), pk)
+
+        # (numero_poliza, fecha_inicio_vigencia) -> id de la póliza existente, o la
+        # instancia nueva creada durante esta importación.
+        self.claves = {}
+        self.clave_por_id = {}
+        for pk, numero, fecha_ini in Poliza.objects.filter(usuario=usuario).values_list(
+            'id', 'numero_poliza', 'fecha_inicio_vigencia'
+        ):
+            self.claves[(numero, fecha_ini)] = pk
+            self.clave_por_id[pk] = (numero, fecha_ini)
+
+    def procesar(self, filas, al_avanzar=None):
+        """
+        Procesa un iterable de filas (dicts con las cabeceras del CSV exportado).
+        Si se pasa 'al_avanzar', se llama tras cada lote con la cantidad de filas leídas.
+        """
+        leidas = 0
+        # Un solo registro INFO por importación; los lotes y errores de fila van a DEBUG
+        with medir(logger, "importacion", logging.INFO, usuario=self.usuario.pk) as resumen:
+            with invalidacion_agrupada(self.usuario.pk), resumen_agrupado():
+                filas_numeradas = enumerate(filas)
+                for lote in _lotes(filas_numeradas, self.tamano_lote):
+                    with medir(logger, "importacion_lote", usuario=self.usuario.pk, filas=len(lote)):
+                        self._procesar_lote(lote)
+                    leidas += len(lote)
+                    if al_avanzar:
+                        al_avanzar(leidas)
+            resumen.update(filas=leidas, creadas=self.reporte['creadas'],
+                           actualizadas=self.reporte['actualizadas'], errores=len(self.reporte['errores']))
+        if self.reporte['errores']:
+            logger.warning(
+                "Importación del usuario %s con %s errores. Primeros: %s", self.usuario.pk,
+                len(self.reporte['errores']), ' || '.join(self.reporte['errores'][:MAX_ERRORES_EN_LOG]),
+            )
+        return self.reporte
+
+    def _registrar_error(self, error_msg):
+        self.reporte['errores'].append(error_msg)
+        logger.debug("Error de importación: %s", error_msg)
+
+    # --- 1. Lectura y limpieza de cada fila ---
+
+    def _leer_fila(self, i, row):
+        poliza_id = _texto(row, 'ID Poliza')
+        numero_poliza = _texto(row, 'Nro. Poliza')
+        cliente_nombre = _texto(row, 'Cliente')
+        aseguradora_nombre = _texto(row, 'Aseguradora')
+
+        if not cliente_nombre or not aseguradora_nombre:
+            raise ValueError("Faltan datos esenciales (Cliente o Aseguradora)")
+
+        if not numero_poliza or numero_poliza.upper() == 'N/A':
+            numero_poliza = f"GEN-{timezone.now().strftime('%Y%m%d%H%M%S')}-{i}"
+
+        poliza_defaults = {
+            'numero_poliza': numero_poliza,
+            'descripcion_bien_asegurado': _texto(row, 'Bien Asegurado (Placa)'),
+            'ramo_tipo_seguro': _texto(row, 'Ramo'),
+            'prima_total_anual': safe_decimal(row.get('Prima Total Anual', '0')),
+            'comision_monto': safe_decimal(row.get('Monto Comision', '0')),
+            'comision_cobrada': _texto(row, 'Comision Cobrada').lower() == 'si',
+            'estado_poliza': _texto(row, 'Estado de la Poliza', 'VIGENTE').upper().replace(' ', '_'),
+            'frecuencia_pago': _texto(row, 'Frecuencia de Pago', 'ANUAL').upper(),
+        }
+
+        # Conversión de fechas segura
+        for campo_fecha in CAMPOS_FECHA:
+            fecha_str = _texto(row, campo_fecha)
+            if fecha_str:
+                poliza_defaults[campo_fecha.lower().replace(' ', '_')] = datetime.strptime(fecha_str, '%d/%m/%Y').date()
+
+        return {
+            'poliza_id': int(poliza_id) if poliza_id.isdigit() else None,
+            'cliente': cliente_nombre,
+            'aseguradora': aseguradora_nombre,
+            'defaults': poliza_defaults,
+        }
+
+    # --- 2. Clientes y aseguradoras que faltan (un INSERT por lote) ---
+
+    def _crear_relacionados(self, filas):
+        marca = timezone.now().timestamp()
+        nuevos_clientes = {}
+        nuevas_aseguradoras = {}
+        for fila in filas:
+            nombre = fila['cliente']
+            if nombre.lower() not in self.clientes and nombre.lower() not in nuevos_clientes:
+                nuevos_clientes[nombre.lower()] = Cliente(
+                    usuario=self.usuario,
+                    nombre_completo=nombre,
+                    numero_documento=f"Generado-{nombre[:10]}-{marca}-{len(nuevos_clientes)}",
+                )
+            nombre = fila['aseguradora']
+            if nombre.lower() not in self.aseguradoras and nombre.lower() not in nuevas_aseguradoras:
+                nuevas_aseguradoras[nombre.lower()] = Aseguradora(usuario=self.usuario, nombre=nombre)
+
+        if nuevos_clientes:
+            creados = bulk_create_with_history(list(nuevos_clientes.values()), Cliente, default_user=self.usuario)
+            self.clientes.update({c.nombre_completo.lower(): c.pk for c in creados})
+        if nuevas_aseguradoras:
+            creadas = bulk_create_with_history(list(nuevas_aseguradoras.values()), Aseguradora, default_user=self.usuario)
+            self.aseguradoras.update({a.nombre.lower(): a.pk for a in creadas})
+
+    # --- 3. Resolución en memoria de cada póliza del lote ---
+
+    def _procesar_lote(self, lote):
+        filas = []
+        for i, row in lote:
+            linea = i + 2
+            try:
+                filas.append((linea, self._leer_fila(i, row)))
+            except (ValueError, InvalidOperation, KeyError) as e:
+                self._registrar_error(f"Error en línea {linea}: {e} | Datos: {row}")
+
+        if not filas:
+            return
+
+        self._crear_relacionados([fila for _, fila in filas])
+
+        # Una sola consulta para todas las pólizas existentes que el lote puede tocar
+        ids_candidatos = set()
+        for _, fila in filas:
+            if fila['poliza_id'] in self.clave_por_id:
+                ids_candidatos.add(fila['poliza_id'])
+            clave = self._clave(fila['defaults'])
+            if isinstance(self.claves.get(clave), int):
+                ids_candidatos.add(self.claves[clave])
+        existentes = Poliza.objects.in_bulk(ids_candidatos) if ids_candidatos else {}
+
+        nuevas = []
+        actualizadas = {}
+        for _, fila in filas:
+            defaults = dict(fila['defaults'])
+            defaults['cliente_id'] = self.clientes[fila['cliente'].lower()]
+            defaults['aseguradora_id'] = self.aseguradoras[fila['aseguradora'].lower()]
+
+            poliza = None
+            if fila['poliza_id'] in self.clave_por_id:
+                poliza = self._instancia(fila['poliza_id'], existentes)
+            # Si no se encontró por ID, intentamos por número y fecha para no chocar con unique_together
+            if poliza is None:
+                encontrada = self.claves.get(self._clave(defaults))
+                poliza = self._instancia(encontrada, existentes) if isinstance(encontrada, int) else encontrada
+
+            if poliza is not None:
+                if self._aplicar_actualizacion(poliza, defaults):
+                    if poliza.pk:
+                        actualizadas[poliza.pk] = poliza
+                    self.reporte['actualizadas'] += 1
+            else:
+                nuevas.append(self._nueva_poliza(defaults))
+                self.reporte['creadas'] += 1
+
+        self._guardar_lote(nuevas, list(actualizadas.values()))
+
+    def _clave(self, defaults):
+        return (defaults['numero_poliza'], defaults.get('fecha_inicio_vigencia', self.hoy))
+
+    def _instancia(self, pk, existentes):
+        if pk not in existentes:
+            existentes[pk] = Poliza.objects.get(pk=pk)
+        return existentes[pk]
+
+    def _aplicar_actualizacion(self, poliza, defaults):
+        clave_anterior = (poliza.numero_poliza, poliza.fecha_inicio_vigencia)
+        clave_nueva = (defaults['numero_poliza'], defaults.get('fecha_inicio_vigencia', poliza.fecha_inicio_vigencia))
+        ocupante = self.claves.get(clave_nueva)
+        if ocupante is not None and ocupante not in (poliza, poliza.pk):
+            referencia = f"Póliza ID {poliza.pk}" if poliza.pk else f"Póliza '{poliza.numero_poliza}'"
+            self._registrar_error(
+                f"Error de integridad al actualizar {referencia}: ya existe otra póliza "
+                f"con el número '{clave_nueva[0]}' y fecha de inicio {clave_nueva[1]}."
+            )
+            return False
+
+        if poliza.pk:
+            # El mes de emisión anterior también cambia en el resumen mensual
+            marcar_meses(self.usuario.pk, [poliza.fecha_emision])
+        for attr, value in defaults.items():
+            setattr(poliza, attr, value)
+
+        if clave_nueva != clave_anterior:
+            self.claves.pop(clave_anterior, None)
+            self.claves[clave_nueva] = poliza.pk or poliza
+            if poliza.pk:
+                self.clave_por_id[poliza.pk] = clave_nueva
+        return True
+
+    def _nueva_poliza(self, defaults):
+        # Crear póliza nueva (Detección de duplicados activos)
+        fecha_ini = defaults.get('fecha_inicio_vigencia', self.hoy)
+        base_numero = numero_poliza = defaults['numero_poliza']
+        contador = 1
+
+        # Respetamos el unique_together('usuario', 'numero_poliza', 'fecha_inicio_vigencia')
+        while (numero_poliza, fecha_ini) in self.claves:
+            numero_poliza = f"{base_numero}-{contador}"
+            contador += 1
+
+        defaults['numero_poliza'] = numero_poliza
+        defaults.setdefault('fecha_inicio_vigencia', self.hoy)
+        defaults.setdefault('fecha_fin_vigencia', self.hoy + relativedelta(years=1))
+        poliza = Poliza(usuario=self.usuario, **defaults)
+        self.claves[(numero_poliza, fecha_ini)] = poliza
+        return poliza
+
+    # --- 4. Escritura del lote ---
+
+    def _guardar_lote(self, nuevas, actualizadas):
+        ahora = timezone.now()
+        for poliza in actualizadas:
+            poliza.fecha_actualizacion = ahora
+
+        try:
+            with transaction.atomic():
+                if nuevas:
+                    bulk_create_with_history(nuevas, Poliza, batch_size=self.tamano_lote, default_user=self.usuario)
+                if actualizadas:
+                    bulk_update_with_history(actualizadas, Poliza, CAMPOS_ACTUALIZABLES, batch_size=self.tamano_lote, default_user=self.usuario)
+                generar_planes_de_pagos(nuevas + actualizadas)
+        except IntegrityError:
+            # Algo chocó en la base de datos: repetimos el lote fila a fila
+            # para reportar exactamente qué pólizas fallaron.
+            self._guardar_fila_a_fila(nuevas, actualizadas)
+            return
+
+        for poliza in nuevas:
+            self.clave_por_id[poliza.pk] = (poliza.numero_poliza, poliza.fecha_inicio_vigencia)
+            self.claves[self.clave_por_id[poliza.pk]] = poliza.pk
+        marcar_meses(self.usuario.pk, [p.fecha_emision for p in nuevas + actualizadas])
+
+    def _guardar_fila_a_fila(self, nuevas, actualizadas):
+        for poliza in actualizadas:
+            try:
+                with transaction.atomic():
+                    poliza.save()
+                    poliza.generar_plan_de_pagos()
+            except IntegrityError as e:
+                self.reporte['actualizadas'] -= 1
+                self._registrar_error(f"Error de integridad al actualizar Póliza ID {poliza.id}: {e}")
+
+        for poliza in nuevas:
+            # Si el INSERT masivo alcanzó a asignar ids antes de fallar, los descartamos
+            poliza.pk = None
+            poliza._state.adding = True
+            try:
+                with transaction.atomic():
+                    poliza.save()
+                    poliza.generar_plan_de_pagos()
+                self.claves[(poliza.numero_poliza, poliza.fecha_inicio_vigencia)] = poliza.pk
+                self.clave_por_id[poliza.pk] = (poliza.numero_poliza, poliza.fecha_inicio_vigencia)
+            except IntegrityError as e:
+                self.reporte['creadas'] -= 1
+                self._registrar_error(f"Error de integridad al crear Póliza '{poliza.numero_poliza}': {e}")
+
+
+def importar_filas(usuario, filas, tamano_lote=TAMANO_LOTE, al_avanzar=None):
+    """Importa pólizas desde un iterable de filas y devuelve el reporte (creadas, actualizadas, errores)."""
+    return ImportadorPolizas(usuario, tamano_lote).procesar(filas, al_avanzar=al_avanzar)
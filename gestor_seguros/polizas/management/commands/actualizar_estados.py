@@ -0,0 +1,48 @@
+# polizas/management/commands/actualizar_estados.py
+import time
+from datetime import date
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from polizas.transiciones import actualizar_estados
+
+
+class Command(BaseCommand):
+    help = (
+        "Pasa a 'VENCIDA' las pólizas cuya vigencia terminó y a 'VENCIDO' las cuotas sin pagar con la "
+        "fecha pasada. Pensado para un cron nocturno o, con --bucle, como worker."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--fecha', help="Fecha de referencia AAAA-MM-DD (por defecto, hoy).")
+        parser.add_argument('--bucle', action='store_true', help="No termina: repite cada --intervalo segundos.")
+        parser.add_argument('--intervalo', type=float, default=3600.0, help="Segundos entre corridas con --bucle.")
+        parser.add_argument('--simular', action='store_true', help="Muestra cuántos cambios habría sin guardarlos.")
+
+    def handle(self, *args, **options):
+        hoy = None
+        if options['fecha']:
+            try:
+                hoy = date.fromisoformat(options['fecha'])
+            except ValueError:
+                raise CommandError(f"Fecha inválida '{options['fecha']}'. Usa el formato AAAA-MM-DD.")
+        if options['bucle'] and (hoy or options['simular']):
+            raise CommandError("--bucle no se combina con --fecha ni con --simular.")
+
+        while True:
+            if options['simular']:
+                with transaction.atomic():
+                    resultado = actualizar_estados(hoy)
+                    transaction.set_rollback(True)
+            else:
+                # Sin transacción externa: cada lote de pólizas confirma por su cuenta
+                resultado = actualizar_estados(hoy)
+
+            accion = "Pasarían" if options['simular'] else "Pasaron"
+            self.stdout.write(self.style.SUCCESS(
+                f"{accion} a vencida {resultado['polizas']} pólizas y a vencido {resultado['cuotas']} cuotas."
+            ))
+            if not options['bucle']:
+                break
+            time.sleep(options['intervalo'])
@@ -0,0 +1,210 @@
+# polizas/management/commands/bench.py
+import io
+import json
+import math
+import platform
+import time
+from datetime import datetime
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import resolve, reverse
+
+from gestor_seguros.utils.instrumentacion import presupuesto_para
+from polizas.dashboard import invalidar_snapshot_dashboard
+from reportes.exportacion import polizas_para_exportar, escribir_csv_polizas
+from tareas.models import Tarea
+
+MARGEN_MINIMO_MS = 10
+
+
+def percentil(valores, p):
+    """Percentil por rango más cercano (valores ya ordenados)."""
+    if not valores:
+        return 0.0
+    rango = max(math.ceil(p / 100 * len(valores)), 1)
+    return valores[rango - 1]
+
+
+class Command(BaseCommand):
+    help = (
+        "Mide latencia (p50/p90/p95/máx) y cantidad de consultas de las vistas principales con el "
+        "cliente de pruebas de Django, con la instrumentación de consultas activa. Falla si una vista "
+        "supera su PRESUPUESTO_CONSULTAS. Puede guardar una línea base en JSON y compararse contra ella."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help="Corredor a usar (por defecto el primero creado con seed_portfolio).")
+        parser.add_argument('--repeticiones', type=int, default=10, help="Peticiones por escenario.")
+        parser.add_argument('--filas-importacion', type=int, default=200, help="Filas del CSV que se importa.")
+        parser.add_argument('--guardar', metavar='RUTA', help="Guarda los resultados como línea base JSON.")
+        parser.add_argument('--comparar', metavar='RUTA', help="Compara contra una línea base JSON.")
+        parser.add_argument('--tolerancia', type=float, default=0.25,
+                            help="Aumento de latencia p50 tolerado frente a la línea base (0.25 = 25%%).")
+
+    def handle(self, *args, **options):
+        usuario = self._usuario(options['usuario'])
+        self.cliente = Client(HTTP_HOST=self._host())
+        self.cliente.force_login(usuario)
+        self.usuario = usuario
+
+        resultados, excedidas = {}, []
+        # El middleware se arma con la primera petición del cliente, ya con el ajuste activo
+        with override_settings(INSTRUMENTACION_CONSULTAS=True):
+            for nombre, url, ejecutar in self._escenarios(options):
+                tiempos, informes = [], []
+                for _ in range(options['repeticiones']):
+                    ms, informe = ejecutar()
+                    tiempos.append(ms)
+                    informes.append(informe)
+                tiempos.sort()
+                presupuesto = presupuesto_para(resolve(url.split('?')[0]).view_name)
+                resultados[nombre] = {
+                    'p50_ms': round(percentil(tiempos, 50), 2),
+                    'p90_ms': round(percentil(tiempos, 90), 2),
+                    'p95_ms': round(percentil(tiempos, 95), 2),
+                    'max_ms': round(tiempos[-1], 2),
+                    'consultas': max(informe['consultas'] for informe in informes),
+                    'sql_ms': round(percentil(sorted(informe['sql_ms'] for informe in informes), 50), 2),
+                    'render_ms': round(percentil(sorted(informe['render_ms'] for informe in informes), 50), 2),
+                    'consultas_en_plantilla': max(informe['consultas_en_plantilla'] for informe in informes),
+                    'presupuesto': presupuesto,
+                }
+                self.stdout.write(self._fila(nombre, resultados[nombre]))
+                if presupuesto is not None and resultados[nombre]['consultas'] > presupuesto:
+                    excedidas.append(f"{nombre} ({resultados[nombre]['consultas']} > {presupuesto})")
+
+        informe = {
+            'fecha': datetime.now().isoformat(timespec='seconds'),
+            'motor': connection.vendor,
+            'python': platform.python_version(),
+            'usuario': usuario.username,
+            'polizas': usuario.polizas.count(),
+            'repeticiones': options['repeticiones'],
+            'escenarios': resultados,
+        }
+        if options['guardar']:
+            with open(options['guardar'], 'w', encoding='utf-8') as archivo:
+                json.dump(informe, archivo, indent=2, ensure_ascii=False)
+            self.stdout.write(self.style.SUCCESS(f"Línea base guardada en {options['guardar']}."))
+        if excedidas:
+            raise CommandError(f"Presupuesto de consultas excedido en: {', '.join(excedidas)}.")
+        if options['comparar']:
+            self._comparar(informe, options['comparar'], options['tolerancia'])
+
+    # --- ESCENARIOS ---
+
+    def _escenarios(self, options):
+        csv_importacion = self._csv_importacion(options['filas_importacion'])
+        dashboard = reverse('dashboard')
+        lista = reverse('polizas:lista_polizas')
+        busqueda = lista + '?q=Gonz'
+        reportes = reverse('reportes:dashboard_reportes')
+        exportar = reverse('reportes:exportar_polizas_csv')
+        importar = reverse('polizas:importar_polizas_csv')
+        return [
+            ('dashboard (sin caché)', dashboard, lambda: self._get(dashboard, limpiar_cache=True)),
+            ('dashboard (con caché)', dashboard, lambda: self._get(dashboard)),
+            ('lista de pólizas', lista, lambda: self._get(lista)),
+            ('búsqueda de pólizas', busqueda, lambda: self._get(busqueda)),
+            ('reportes', reportes, lambda: self._get(reportes)),
+            ('exportar CSV', exportar, lambda: self._get(exportar)),
+            ('importar CSV', importar, lambda: self._importar(importar, csv_importacion)),
+        ]
+
+    def _get(self, url, limpiar_cache=False):
+        if limpiar_cache:
+            invalidar_snapshot_dashboard(self.usuario.pk)
+        inicio = time.perf_counter()
+        respuesta = self.cliente.get(url)
+        if respuesta.streaming:
+            b''.join(respuesta.streaming_content)
+        ms = (time.perf_counter() - inicio) * 1000
+        self._verificar(url, respuesta)
+        return ms, respuesta.instrumentacion
+
+    def _importar(self, url, contenido):
+        archivo = SimpleUploadedFile('bench.csv', contenido, content_type='text/csv')
+        # La importación se ejecuta en línea y se revierte para no alterar la cartera entre corridas
+        with override_settings(TAREAS_EN_SEGUNDO_PLANO=False), transaction.atomic():
+            inicio = time.perf_counter()
+            respuesta = self.cliente.post(url, {'archivo': archivo})
+            ms = (time.perf_counter() - inicio) * 1000
+            for tarea in Tarea.objects.filter(usuario=self.usuario):
+                tarea.archivo.delete(save=False)
+            transaction.set_rollback(True)
+        self._verificar(url, respuesta)
+        return ms, respuesta.instrumentacion
+
+    def _csv_importacion(self, filas):
+        salida = io.StringIO()
+        polizas = polizas_para_exportar(self.usuario)
+        escribir_csv_polizas(salida, polizas.filter(pk__in=polizas.order_by('pk').values('pk')[:filas]))
+        return salida.getvalue().encode('utf-8-sig')
+
+    def _verificar(self, url, respuesta):
+        if respuesta.status_code >= 400:
+            raise CommandError(f"{url} respondió {respuesta.status_code}.")
+
+    # --- UTILIDADES ---
+
+    def _usuario(self, username):
+        User = get_user_model()
+        if username:
+            try:
+                return User.objects.get(username=username)
+            except User.DoesNotExist:
+                raise CommandError(f"No existe el usuario '{username}'.")
+        usuario = User.objects.filter(username__startswith='corredor_').order_by('pk').first()
+        if usuario is None:
+            raise CommandError("No hay corredores sintéticos. Ejecuta primero 'manage.py seed_portfolio'.")
+        return usuario
+
+    def _host(self):
+        # El cliente de pruebas usa 'testserver', que puede no estar en ALLOWED_HOSTS
+        hosts = settings.ALLOWED_HOSTS
+        if not hosts or '*' in hosts or 'testserver' in hosts:
+            return 'testserver'
+        return hosts[0].lstrip('.')
+
+    def _fila(self, nombre, datos):
+        presupuesto = f"/{datos['presupuesto']}" if datos['presupuesto'] is not None else ''
+        return (f"{nombre:<24} p50 {datos['p50_ms']:>8.1f} ms  p90 {datos['p90_ms']:>8.1f} ms  "
+                f"p95 {datos['p95_ms']:>8.1f} ms  máx {datos['max_ms']:>8.1f} ms  "
+                f"SQL {datos['sql_ms']:>7.1f} ms  plantillas {datos['render_ms']:>7.1f} ms  "
+                f"{datos['consultas']:>3}{presupuesto} consultas ({datos['consultas_en_plantilla']} en plantilla)")
+
+    def _comparar(self, informe, ruta, tolerancia):
+        try:
+            with open(ruta, encoding='utf-8') as archivo:
+                base = json.load(archivo)
+        except FileNotFoundError:
+            raise CommandError(f"No existe la línea base {ruta}. Créala con --guardar.")
+
+        regresiones = []
+        self.stdout.write("")
+        self.stdout.write(f"Comparación con {ruta} ({base.get('fecha')}, {base.get('polizas')} pólizas):")
+        for nombre, actual in informe['escenarios'].items():
+            anterior = base.get('escenarios', {}).get(nombre)
+            if anterior is None:
+                self.stdout.write(f"  {nombre:<24} (nuevo escenario)")
+                continue
+            variacion = (actual['p50_ms'] - anterior['p50_ms']) / anterior['p50_ms'] if anterior['p50_ms'] else 0
+            linea = (f"  {nombre:<24} p50 {anterior['p50_ms']:.1f} -> {actual['p50_ms']:.1f} ms ({variacion:+.0%}), "
+                     f"consultas {anterior['consultas']} -> {actual['consultas']}")
+            # Por debajo de MARGEN_MINIMO_MS la diferencia es ruido de medición
+            mas_lento = variacion > tolerancia and actual['p50_ms'] - anterior['p50_ms'] > MARGEN_MINIMO_MS
+            if actual['consultas'] > anterior['consultas'] or mas_lento:
+                regresiones.append(nombre)
+                self.stdout.write(self.style.ERROR(linea))
+            else:
+                self.stdout.write(linea)
+
+        if regresiones:
+            raise CommandError(f"Regresiones en: {', '.join(regresiones)}.")
+        self.stdout.write(self.style.SUCCESS("Sin regresiones."))
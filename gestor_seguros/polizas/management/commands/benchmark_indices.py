@@ -0,0 +1,136 @@
+# polizas/management/commands/benchmark_indices.py
+import statistics
+import time
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from django.db.models import Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from clientes.models import Cliente
+from polizas.datos_sinteticos import sembrar_cartera
+from polizas.models import Poliza, PagoCuota, Siniestro, ESTADOS_ACTIVOS, ESTADOS_CUOTA_POR_COBRAR
+
+# Modelos cuyos Meta.indexes se comparan (con y sin ellos)
+MODELOS_CON_INDICES = [Poliza, PagoCuota, Cliente, Siniestro]
+
+
+def consultas_frecuentes(usuario, hoy):
+    """Las mismas consultas que hacen los listados, el dashboard y los reportes."""
+    return [
+        ('Listado de pólizas', Poliza.objects.filter(usuario=usuario)
+            .select_related('cliente', 'aseguradora').order_by('-fecha_fin_vigencia')[:25]),
+        ('Pólizas por estado', Poliza.objects.filter(usuario=usuario, estado_poliza='VIGENTE')
+            .order_by('-fecha_fin_vigencia')[:25]),
+        ('Vencen en 30 días', Poliza.objects.filter(
+            usuario=usuario, estado_poliza__in=['VIGENTE', 'PENDIENTE_PAGO'],
+            fecha_fin_vigencia__gte=hoy, fecha_fin_vigencia__lte=hoy + timedelta(days=30))
+            .order_by('fecha_fin_vigencia')),
+        ('Cartera activa', Poliza.objects.filter(usuario=usuario, estado_poliza__in=ESTADOS_ACTIVOS)
+            .order_by('fecha_fin_vigencia')),
+        ('Comisiones pendientes', Poliza.objects.filter(usuario=usuario, comision_cobrada=False, comision_monto__gt=0)
+            .order_by('fecha_fin_vigencia')),
+        ('Producción por mes', Poliza.objects.filter(
+            usuario=usuario, fecha_emision__gte=hoy - timedelta(days=180), fecha_emision__lte=hoy)
+            .annotate(mes=TruncMonth('fecha_emision')).values('mes')
+            .annotate(total=Sum('prima_total_anual')).order_by('mes')),
+        ('Cobros próximos 30 días', Poliza.objects.filter(
+            usuario=usuario, proxima_cuota_fecha__lte=hoy + timedelta(days=30))
+            .order_by('proxima_cuota_fecha')),
+        ('Cuotas pendientes del mes', PagoCuota.objects.filter(
+            poliza__usuario=usuario, estado__in=ESTADOS_CUOTA_POR_COBRAR,
+            fecha_vencimiento_cuota__gte=hoy, fecha_vencimiento_cuota__lte=hoy + timedelta(days=30))
+            .order_by('fecha_vencimiento_cuota')),
+        ('Listado de clientes', Cliente.objects.filter(usuario=usuario).order_by('nombre_completo')[:25]),
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        "Siembra una cartera sintética y compara planes (EXPLAIN) y tiempos de las consultas "
+        "frecuentes sin y con los índices de los modelos. Todo se revierte al terminar. "
+        "En PostgreSQL bloquea las tablas mientras corre: usar en una copia, no en producción."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--polizas', type=int, default=5000, help="Pólizas sintéticas por usuario.")
+        parser.add_argument('--usuarios', type=int, default=4, help="Usuarios sintéticos (las consultas usan el primero).")
+        parser.add_argument('--repeticiones', type=int, default=5, help="Ejecuciones por consulta (se informa la mediana).")
+        parser.add_argument('--sin-explain', action='store_true', help="Solo muestra los tiempos.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        hoy = timezone.now().date()
+
+        with transaction.atomic():
+            usuarios = []
+            for i in range(options['usuarios']):
+                usuario = User.objects.create_user(username=f"benchmark_indices_{i}_{int(time.time())}")
+                totales = sembrar_cartera(usuario, options['polizas'], semilla=i, prefijo='BENCH')
+                self.stdout.write(f"Usuario {usuario.username}: {totales}")
+                usuarios.append(usuario)
+            self._analizar()
+
+            consultas = consultas_frecuentes(usuarios[0], hoy)
+
+            # 1. Sin índices: se eliminan dentro de un savepoint y se restauran al revertirlo
+            savepoint = transaction.savepoint()
+            editor = connection.SchemaEditorClass(connection)
+            with connection.cursor() as cursor:
+                for modelo in MODELOS_CON_INDICES:
+                    for indice in modelo._meta.indexes:
+                        cursor.execute(str(indice.remove_sql(modelo, editor)))
+            self._analizar()
+            antes = self._medir(consultas, options)
+            transaction.savepoint_rollback(savepoint)
+
+            # 2. Con índices
+            self._analizar()
+            despues = self._medir(consultas, options)
+
+            self._informar(consultas, antes, despues, options)
+
+            # No se deja nada en la base de datos
+            transaction.set_rollback(True)
+
+    def _analizar(self):
+        # Actualiza las estadísticas del planificador para que los planes sean realistas
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+
+    def _medir(self, consultas, options):
+        resultados = {}
+        for nombre, queryset in consultas:
+            tiempos = []
+            for _ in range(options['repeticiones']):
+                inicio = time.perf_counter()
+                filas = len(list(queryset.all()))
+                tiempos.append((time.perf_counter() - inicio) * 1000)
+            plan = '' if options['sin_explain'] else queryset.explain()
+            resultados[nombre] = (statistics.median(tiempos), filas, plan)
+        return resultados
+
+    def _informar(self, consultas, antes, despues, options):
+        self.stdout.write("")
+        self.stdout.write(f"{'Consulta':<28} {'Filas':>7} {'Sin índices':>13} {'Con índices':>13} {'Mejora':>8}")
+        for nombre, _queryset in consultas:
+            ms_antes, filas, _plan = antes[nombre]
+            ms_despues, _filas, _plan = despues[nombre]
+            mejora = ms_antes / ms_despues if ms_despues else 0
+            self.stdout.write(f"{nombre:<28} {filas:>7} {ms_antes:>10.2f} ms {ms_despues:>10.2f} ms {mejora:>7.1f}x")
+
+        if options['sin_explain']:
+            return
+        for nombre, _queryset in consultas:
+            self.stdout.write("")
+            self.stdout.write(self.style.MIGRATE_HEADING(nombre))
+            self.stdout.write("  Sin índices:")
+            self.stdout.write(self._sangrar(antes[nombre][2]))
+            self.stdout.write("  Con índices:")
+            self.stdout.write(self._sangrar(despues[nombre][2]))
+
+    def _sangrar(self, plan):
+        return '\n'.join(f"    {linea}" for linea in plan.splitlines())
@@ -0,0 +1,61 @@
+# polizas/management/commands/enviar_notificaciones.py
+from datetime import date
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from gestor_seguros.utils.notificaciones import obtener_canales
+from polizas.notificaciones import enviar_notificaciones
+
+
+class Command(BaseCommand):
+    help = (
+        "Envía a los clientes los avisos de renovación y de cobro que caen en las ventanas "
+        "configuradas (NOTIFICACIONES_VENTANAS). No repite avisos ya enviados: se puede correr a diario."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help="Solo la cartera de este corredor (nombre de usuario).")
+        parser.add_argument('--fecha', help="Fecha de referencia AAAA-MM-DD (por defecto, hoy).")
+        parser.add_argument('--canales', nargs='+', help="Limita los canales (EMAIL, WHATSAPP).")
+        parser.add_argument('--simular', action='store_true', help="Cuenta los avisos sin enviar ni registrar nada.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        if options['usuario']:
+            usuarios = User.objects.filter(username=options['usuario'])
+            if not usuarios.exists():
+                raise CommandError(f"No existe el usuario '{options['usuario']}'.")
+        else:
+            usuarios = User.objects.filter(is_active=True, polizas__isnull=False).distinct()
+
+        hoy = None
+        if options['fecha']:
+            try:
+                hoy = date.fromisoformat(options['fecha'])
+            except ValueError:
+                raise CommandError(f"Fecha inválida '{options['fecha']}'. Usa el formato AAAA-MM-DD.")
+
+        canales = obtener_canales()
+        if options['canales']:
+            desconocidos = set(options['canales']) - set(canales)
+            if desconocidos:
+                raise CommandError(f"Canales no configurados: {', '.join(sorted(desconocidos))}.")
+            canales = {nombre: canales[nombre] for nombre in options['canales']}
+
+        metricas = enviar_notificaciones(usuarios.order_by('pk'), hoy=hoy, simular=options['simular'], canales=canales)
+
+        self.stdout.write(
+            f"Corredores: {metricas['corredores']}. Avisos: {metricas['avisos']} "
+            f"(ya enviados: {metricas['ya_enviados']}, sin contacto: {metricas['sin_contacto']})."
+        )
+        if options['simular']:
+            self.stdout.write(self.style.SUCCESS(f"Se enviarían {metricas['enviados']} mensajes."))
+            return
+        por_canal = ', '.join(f"{canal}: {cantidad}" for canal, cantidad in sorted(metricas['por_canal'].items()))
+        self.stdout.write(self.style.SUCCESS(
+            f"Enviados {metricas['enviados']} ({por_canal or 'ninguno'}) en {metricas['segundos_envio']} s "
+            f"({metricas['mensajes_por_segundo']} mensajes/s)."
+        ))
+        if metricas['fallidos']:
+            self.stdout.write(self.style.WARNING(f"Fallidos: {metricas['fallidos']} (se reintentarán en la próxima corrida)."))
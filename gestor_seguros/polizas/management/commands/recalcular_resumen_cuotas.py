@@ -0,0 +1,30 @@
+# polizas/management/commands/recalcular_resumen_cuotas.py
+from itertools import islice
+
+from django.core.management.base import BaseCommand
+
+from polizas.models import Poliza, actualizar_resumen_cuotas
+
+
+class Command(BaseCommand):
+    help = "Reconstruye las columnas de próxima cuota y cuotas pendientes de todas las pólizas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', type=int, help="Solo las pólizas de este usuario (id).")
+        parser.add_argument('--lote', type=int, default=1000, help="Pólizas actualizadas por cada UPDATE.")
+
+    def handle(self, *args, **options):
+        polizas = Poliza.objects.order_by('pk')
+        if options['usuario']:
+            polizas = polizas.filter(usuario_id=options['usuario'])
+
+        # Un UPDATE por lote para no bloquear toda la tabla en carteras grandes
+        actualizadas = 0
+        ids = polizas.values_list('pk', flat=True).iterator(chunk_size=options['lote'])
+        while True:
+            lote = list(islice(ids, options['lote']))
+            if not lote:
+                break
+            actualizadas += actualizar_resumen_cuotas(lote)
+
+        self.stdout.write(self.style.SUCCESS(f"Resumen de cuotas recalculado para {actualizadas} pólizas."))
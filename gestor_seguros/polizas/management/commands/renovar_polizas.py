@@ -0,0 +1,58 @@
+# polizas/management/commands/renovar_polizas.py
+from datetime import timedelta
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.utils import timezone
+
+from polizas.models import Poliza
+from polizas.renovaciones import renovar_polizas
+
+# Solo se renuevan automáticamente las pólizas en curso
+ESTADOS_RENOVABLES = ['VIGENTE', 'PENDIENTE_PAGO']
+
+
+class Command(BaseCommand):
+    help = (
+        "Renueva en bloque (una transacción) las pólizas de un usuario: las indicadas con --ids "
+        "o las vigentes que vencen en los próximos --dias días y aún no tienen renovación."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', required=True, help="Nombre de usuario del corredor.")
+        parser.add_argument('--ids', type=int, nargs='+', help="IDs de las pólizas a renovar.")
+        parser.add_argument('--dias', type=int, default=30, help="Sin --ids: pólizas que vencen en este plazo.")
+        parser.add_argument('--simular', action='store_true', help="Muestra el resultado sin guardar nada.")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        try:
+            usuario = User.objects.get(username=options['usuario'])
+        except User.DoesNotExist:
+            raise CommandError(f"No existe el usuario '{options['usuario']}'.")
+
+        if options['ids']:
+            poliza_ids = options['ids']
+        else:
+            hoy = timezone.now().date()
+            poliza_ids = list(
+                Poliza.objects.filter(
+                    usuario=usuario, estado_poliza__in=ESTADOS_RENOVABLES,
+                    fecha_fin_vigencia__range=(hoy, hoy + timedelta(days=options['dias'])),
+                    renovaciones__isnull=True,
+                ).values_list('pk', flat=True)
+            )
+        if not poliza_ids:
+            self.stdout.write("No hay pólizas para renovar.")
+            return
+
+        with transaction.atomic():
+            reporte = renovar_polizas(usuario, poliza_ids)
+            if options['simular']:
+                transaction.set_rollback(True)
+
+        for mensaje in reporte['conflictos'] + reporte['omitidas']:
+            self.stdout.write(self.style.WARNING(mensaje))
+        accion = "Se renovarían" if options['simular'] else "Se renovaron"
+        self.stdout.write(self.style.SUCCESS(f"{accion} {len(reporte['renovadas'])} de {len(poliza_ids)} pólizas."))
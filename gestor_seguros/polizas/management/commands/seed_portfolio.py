@@ -0,0 +1,53 @@
+# polizas/management/commands/seed_portfolio.py
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+
+from polizas.dashboard import invalidar_snapshot_dashboard
+from polizas.datos_sinteticos import sembrar_cartera, sembrar_detalle
+
+
+class Command(BaseCommand):
+    help = (
+        "Genera corredores con carteras sintéticas (clientes, aseguradoras, pólizas con todas las "
+        "frecuencias, cuotas, asegurados, siniestros y documentos) para pruebas de carga."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--corredores', type=int, default=1, help="Cantidad de usuarios (corredores) a crear.")
+        parser.add_argument('--polizas', type=int, default=10000, help="Pólizas por corredor.")
+        parser.add_argument('--prefijo', default='corredor', help="Prefijo del nombre de usuario (corredor_1, ...).")
+        parser.add_argument('--password', default='bench1234', help="Contraseña de los corredores creados.")
+        parser.add_argument('--semilla', type=int, default=0, help="Semilla aleatoria (mismos datos en cada corrida).")
+        parser.add_argument('--tasa-siniestros', type=float, default=0.05, help="Fracción de pólizas con siniestro.")
+        parser.add_argument('--tasa-documentos', type=float, default=0.3, help="Fracción de pólizas con documento.")
+        parser.add_argument('--sin-historial', action='store_true', help="No crea registros de historial (más rápido).")
+
+    def handle(self, *args, **options):
+        User = get_user_model()
+        usernames = [f"{options['prefijo']}_{i}" for i in range(1, options['corredores'] + 1)]
+        existentes = list(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+        if existentes:
+            raise CommandError(f"Ya existen los usuarios {', '.join(existentes)}. Usa otro --prefijo.")
+
+        for i, username in enumerate(usernames):
+            inicio = time.perf_counter()
+            semilla = options['semilla'] + i
+            # Cada corredor en su propia transacción: si algo falla no quedan carteras a medias
+            with transaction.atomic():
+                usuario = User.objects.create_user(username=username, password=options['password'])
+                totales = sembrar_cartera(
+                    usuario, options['polizas'], semilla=semilla,
+                    prefijo=username.upper(), con_historial=not options['sin_historial'],
+                )
+                totales.update(sembrar_detalle(
+                    usuario, semilla=semilla,
+                    tasa_siniestros=options['tasa_siniestros'], tasa_documentos=options['tasa_documentos'],
+                ))
+            invalidar_snapshot_dashboard(usuario.pk)
+
+            resumen = ', '.join(f"{clave}: {valor}" for clave, valor in totales.items())
+            segundos = time.perf_counter() - inicio
+            self.stdout.write(self.style.SUCCESS(f"{username} creado en {segundos:.1f} s ({resumen})."))
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:16
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+import django.db.models.deletion
+
+
+def calcular_resumen_cuotas(apps, schema_editor):
+    # Misma consulta que polizas.models.actualizar_resumen_cuotas, con los modelos históricos
+    Poliza = apps.get_model('polizas', 'Poliza')
+    PagoCuota = apps.get_model('polizas', 'PagoCuota')
+    pendientes = PagoCuota.objects.filter(
+        poliza=OuterRef('pk'), estado='PENDIENTE'
+    ).order_by('fecha_vencimiento_cuota', 'pk')
+    conteo = PagoCuota.objects.filter(
+        poliza=OuterRef('pk'), estado='PENDIENTE'
+    ).order_by().values('poliza').annotate(total=Count('pk')).values('total')
+    Poliza.objects.update(
+        proxima_cuota=Subquery(pendientes.values('pk')[:1]),
+        proxima_cuota_fecha=Subquery(pendientes.values('fecha_vencimiento_cuota')[:1]),
+        proxima_cuota_monto=Subquery(pendientes.values('monto_cuota')[:1]),
+        cuotas_pendientes_count=Coalesce(Subquery(conteo), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polizas', '0003_historicalpoliza_historicalaseguradora'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='poliza',
+            name='cuotas_pendientes_count',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='Cuotas Pendientes'),
+        ),
+        migrations.AddField(
+            model_name='poliza',
+            name='proxima_cuota',
+            field=models.ForeignKey(blank=True, editable=False, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='polizas.pagocuota', verbose_name='Próxima Cuota Pendiente'),
+        ),
+        migrations.AddField(
+            model_name='poliza',
+            name='proxima_cuota_fecha',
+            field=models.DateField(blank=True, editable=False, null=True, verbose_name='Vencimiento Próxima Cuota'),
+        ),
+        migrations.AddField(
+            model_name='poliza',
+            name='proxima_cuota_monto',
+            field=models.DecimalField(blank=True, decimal_places=2, editable=False, max_digits=12, null=True, verbose_name='Monto Próxima Cuota'),
+        ),
+        migrations.AddIndex(
+            model_name='poliza',
+            index=models.Index(fields=['usuario', 'proxima_cuota_fecha'], name='poliza_usuario_prox_cuota_idx'),
+        ),
+        migrations.RunPython(calcular_resumen_cuotas, migrations.RunPython.noop),
+    ]
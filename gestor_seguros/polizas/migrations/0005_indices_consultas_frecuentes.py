@@ -0,0 +1,53 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:18
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polizas', '0004_resumen_cuotas'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='pagocuota',
+            index=models.Index(fields=['poliza', 'estado', 'fecha_vencimiento_cuota'], name='cuota_poliza_estado_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='pagocuota',
+            index=models.Index(condition=models.Q(('estado', 'PENDIENTE')), fields=['fecha_vencimiento_cuota', 'poliza'], name='cuota_pendiente_venc_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poliza',
+            index=models.Index(fields=['usuario', 'fecha_fin_vigencia'], name='poliza_usuario_fin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poliza',
+            index=models.Index(fields=['usuario', 'estado_poliza', 'fecha_fin_vigencia'], name='poliza_usuario_estado_fin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poliza',
+            index=models.Index(fields=['usuario', 'fecha_emision'], name='poliza_usuario_emision_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poliza',
+            index=models.Index(fields=['cliente', 'fecha_fin_vigencia'], name='poliza_cliente_fin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poliza',
+            index=models.Index(condition=models.Q(('estado_poliza__in', ['VIGENTE', 'PENDIENTE_PAGO', 'EN_TRAMITE'])), fields=['usuario', 'fecha_fin_vigencia'], name='poliza_activas_fin_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='poliza',
+            index=models.Index(condition=models.Q(('comision_cobrada', False)), fields=['usuario', 'fecha_fin_vigencia'], name='poliza_comision_pend_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='siniestro',
+            index=models.Index(fields=['poliza', 'fecha_ocurrencia'], name='siniestro_poliza_fecha_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='siniestro',
+            index=models.Index(fields=['usuario', 'estado_siniestro', 'fecha_ocurrencia'], name='siniestro_usuario_estado_idx'),
+        ),
+    ]
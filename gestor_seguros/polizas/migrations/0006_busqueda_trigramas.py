@@ -0,0 +1,41 @@
+# Índices de trigramas (pg_trgm) para la búsqueda de pólizas (número, placa y
+# aseguradora; el nombre del cliente usa el de clientes). Solo PostgreSQL;
+# en SQLite la búsqueda usa una tabla FTS5 (ver polizas/busqueda.py).
+
+from django.db import migrations
+
+INDICES = [
+    ('poliza_numero_trgm_idx', 'polizas_poliza', 'numero_poliza'),
+    ('poliza_bien_trgm_idx', 'polizas_poliza', 'descripcion_bien_asegurado'),
+    ('aseguradora_nombre_trgm_idx', 'polizas_aseguradora', 'nombre'),
+]
+
+
+def crear_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for nombre, tabla, columna in INDICES:
+        # UPPER(columna::text) es la expresión que genera el icontains de Django
+        schema_editor.execute(
+            f'CREATE INDEX IF NOT EXISTS {nombre} ON {tabla} USING gin (UPPER({columna}::text) gin_trgm_ops)'
+        )
+
+
+def eliminar_indices(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    for nombre, _tabla, _columna in INDICES:
+        schema_editor.execute(f'DROP INDEX IF EXISTS {nombre}')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polizas', '0005_indices_consultas_frecuentes'),
+        ('clientes', '0006_busqueda_trigramas'),
+    ]
+
+    operations = [
+        migrations.RunPython(crear_indices, eliminar_indices),
+    ]
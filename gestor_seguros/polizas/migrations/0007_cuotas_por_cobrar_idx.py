@@ -0,0 +1,21 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:44
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polizas', '0006_busqueda_trigramas'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='pagocuota',
+            name='cuota_pendiente_venc_idx',
+        ),
+        migrations.AddIndex(
+            model_name='pagocuota',
+            index=models.Index(condition=models.Q(('estado__in', ['PENDIENTE', 'VENCIDO'])), fields=['fecha_vencimiento_cuota', 'poliza'], name='cuota_pendiente_venc_idx'),
+        ),
+    ]
@@ -0,0 +1,41 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:47
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('polizas', '0007_cuotas_por_cobrar_idx'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificacionEnviada',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('RENOVACION', 'Renovación próxima'), ('COBRO', 'Cobro de cuota')], max_length=15)),
+                ('canal', models.CharField(choices=[('EMAIL', 'Email'), ('WHATSAPP', 'WhatsApp')], max_length=10)),
+                ('fecha_referencia', models.DateField(verbose_name='Fecha de Referencia')),
+                ('destinatario', models.CharField(max_length=254)),
+                ('estado', models.CharField(choices=[('ENVIANDO', 'Enviando'), ('ENVIADA', 'Enviada')], default='ENVIANDO', max_length=10)),
+                ('lote', models.CharField(max_length=32, verbose_name='Lote de Envío')),
+                ('fecha_envio', models.DateTimeField(auto_now_add=True)),
+                ('poliza', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones_enviadas', to='polizas.poliza')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='notificaciones_enviadas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Notificación Enviada',
+                'verbose_name_plural': 'Notificaciones Enviadas',
+                'ordering': ['-fecha_envio'],
+                'indexes': [models.Index(fields=['lote'], name='notificacion_lote_idx')],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='notificacionenviada',
+            constraint=models.UniqueConstraint(fields=('poliza', 'tipo', 'canal', 'fecha_referencia'), name='notificacion_unica'),
+        ),
+    ]
@@ -1,5 +1,12 @@
 # polizas/models.py
-from django.db import models
+import calendar
+import logging
+from datetime import date, timedelta
+from functools import lru_cache
+
+from django.db import models, transaction
+from django.db.models import Case, Count, DurationField, ExpressionWrapper, F, IntegerField, OuterRef, Q, Subquery, Value, When
+from django.db.models.functions import Coalesce
 from django.urls import reverse
 from django.utils import timezone
 from decimal import Decimal
@@ -9,6 +16,9 @@ from dateutil.relativedelta import relativedelta
 from django.contrib.contenttypes.fields import GenericRelation
 from documentos.models import Documento
 from simple_history.models import HistoricalRecords
+from gestor_seguros.utils.registro import medir
+
+logger = logging.getLogger(__name__)
 
 class Aseguradora(models.Model):
 
@@ -73,6 +83,112 @@ class Asegurado(models.Model):
         verbose_name_plural = "Asegurados en Póliza"
         ordering = ['parentesco', 'nombre_completo']
 
+# Estados de una póliza en curso (los que siguen en la gestión de renovaciones y cobros)
+ESTADOS_ACTIVOS = ['VIGENTE', 'PENDIENTE_PAGO', 'EN_TRAMITE']
+# Estados de una póliza en curso que pasan a 'VENCIDA' al terminar su vigencia (ver polizas/transiciones.py)
+ESTADOS_VENCIBLES = ['VIGENTE', 'PENDIENTE_PAGO']
+# Estados de una cuota que aún no se ha pagado ('VENCIDO' = pendiente con la fecha ya pasada)
+ESTADOS_CUOTA_POR_COBRAR = ['PENDIENTE', 'VENCIDO']
+
+# Estados de renovación (ver Poliza.estado_renovacion), en orden de urgencia: (clave para filtros, etiqueta)
+ESTADOS_RENOVACION = [
+    ('VENCIDA', "Vencida"),
+    ('CRITICO', "Crítico (0-30 días)"),
+    ('PROXIMO', "Próximo (31-90 días)"),
+    ('PENDIENTE_PAGO', "Pendiente de Pago"),
+    ('EN_TRAMITE', "En Trámite"),
+    ('VIGENTE', "Vigente"),
+    ('RENOVADA', "Renovada"),
+    ('CANCELADA', "Cancelada"),
+]
+
+
+def condiciones_renovacion(hoy):
+    """
+    Q de cada estado de renovación para la fecha 'hoy', con la misma jerarquía
+    que Poliza.estado_renovacion. Son excluyentes entre sí y, como comparan
+    fecha_fin_vigencia con fechas fijas, usan los índices por fin de vigencia.
+    """
+    vigente = Q(estado_poliza='VIGENTE')
+    en_30_dias = hoy + timedelta(days=30)
+    en_90_dias = hoy + timedelta(days=90)
+    return {
+        'VENCIDA': Q(estado_poliza='VENCIDA') | (vigente & Q(fecha_fin_vigencia__lt=hoy)),
+        'CRITICO': vigente & Q(fecha_fin_vigencia__gte=hoy, fecha_fin_vigencia__lte=en_30_dias),
+        'PROXIMO': vigente & Q(fecha_fin_vigencia__gt=en_30_dias, fecha_fin_vigencia__lte=en_90_dias),
+        'PENDIENTE_PAGO': Q(estado_poliza='PENDIENTE_PAGO'),
+        'EN_TRAMITE': Q(estado_poliza='EN_TRAMITE'),
+        'VIGENTE': vigente & Q(fecha_fin_vigencia__gt=en_90_dias),
+        'RENOVADA': Q(estado_poliza='RENOVADA'),
+        'CANCELADA': Q(estado_poliza='CANCELADA'),
+    }
+
+
+class PolizaQuerySet(models.QuerySet):
+
+    def con_estado_renovacion(self, hoy=None):
+        """
+        Anota dias_para_renovar, estado_renovacion y prioridad_renovacion (el
+        índice en ESTADOS_RENOVACION, para ordenar por urgencia) calculados en
+        SQL contra un único 'hoy'. Las propiedades del modelo devuelven estos
+        valores en vez de recalcularlos fila por fila.
+        """
+        hoy = hoy or timezone.now().date()
+        condiciones = condiciones_renovacion(hoy)
+        return self.annotate(
+            dias_para_renovar=Case(
+                When(estado_poliza='VIGENTE', then=ExpressionWrapper(
+                    F('fecha_fin_vigencia') - Value(hoy), output_field=DurationField(),
+                )),
+                default=None,
+                output_field=DurationField(),
+            ),
+            estado_renovacion=Case(
+                *[When(condiciones[clave], then=Value(etiqueta)) for clave, etiqueta in ESTADOS_RENOVACION],
+                default=Value("Indeterminado"),
+                output_field=models.CharField(),
+            ),
+            prioridad_renovacion=Case(
+                *[When(condiciones[clave], then=Value(i)) for i, (clave, _) in enumerate(ESTADOS_RENOVACION)],
+                default=Value(len(ESTADOS_RENOVACION)),
+                output_field=IntegerField(),
+            ),
+        )
+
+    def por_estado_renovacion(self, clave, hoy=None):
+        """Pólizas en el estado de renovación 'clave' (ver ESTADOS_RENOVACION)."""
+        return self.filter(condiciones_renovacion(hoy or timezone.now().date())[clave])
+
+# Columnas de Poliza calculadas a partir de sus cuotas (no se guardan en el historial)
+CAMPOS_RESUMEN_CUOTAS = ['proxima_cuota', 'proxima_cuota_fecha', 'proxima_cuota_monto', 'cuotas_pendientes_count']
+
+# Meses entre cuotas y cantidad de cuotas por frecuencia de pago
+PERIODOS_PAGO = {
+    'MENSUAL': (1, 12), 'TRIMESTRAL': (3, 4), 'CUATRIMESTRAL': (4, 3),
+    'SEMESTRAL': (6, 2), 'ANUAL': (12, 1), 'UNICO': (12, 1),
+}
+
+
+@lru_cache(maxsize=8192)
+def fechas_de_cuotas(inicio, meses_periodo, num_cuotas, fin=None):
+    """
+    Vencimientos de un plan de pagos: la cuota k vence k * meses_periodo meses
+    después del inicio, con el día ajustado al último del mes cuando no existe
+    (31/01 -> 28/02 -> 31/03), y sin pasar de 'fin'. Se calcula sobre el índice
+    año * 12 + mes en lugar de sumar relativedelta cuota a cuota; el caché
+    aprovecha que las pólizas de un lote suelen compartir fechas de vigencia.
+    """
+    base = inicio.year * 12 + inicio.month - 1
+    fechas = []
+    for k in range(num_cuotas):
+        anio, mes = divmod(base + k * meses_periodo, 12)
+        mes += 1
+        fecha = date(anio, mes, min(inicio.day, calendar.monthrange(anio, mes)[1]))
+        if fin and fecha > fin:
+            break
+        fechas.append(fecha)
+    return tuple(fechas)
+
 class Poliza(models.Model):
 
     usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='polizas')
@@ -133,15 +249,42 @@ class Poliza(models.Model):
     # Campo para el archivo de la póliza (opcional)
     archivo_poliza = models.FileField(upload_to='polizas_archivos/', blank=True, null=True, verbose_name="Archivo de la Póliza (PDF)")
 
+    # --- RESUMEN DE CUOTAS (desnormalizado) ---
+    # Se mantiene con actualizar_resumen_cuotas() cada vez que se crean, pagan o revierten
+    # cuotas, para no consultar las cuotas de cada póliza al listar cobros.
+    proxima_cuota = models.ForeignKey(
+        'PagoCuota', on_delete=models.SET_NULL, null=True, blank=True, editable=False,
+        related_name='+', verbose_name="Próxima Cuota Pendiente"
+    )
+    proxima_cuota_fecha = models.DateField(null=True, blank=True, editable=False, verbose_name="Vencimiento Próxima Cuota")
+    proxima_cuota_monto = models.DecimalField(max_digits=12, decimal_places=2, null=True, blank=True, editable=False, verbose_name="Monto Próxima Cuota")
+    cuotas_pendientes_count = models.PositiveIntegerField(default=0, editable=False, verbose_name="Cuotas Pendientes")
+
     fecha_creacion = models.DateTimeField(auto_now_add=True)
     fecha_actualizacion = models.DateTimeField(auto_now=True)
     documentos = GenericRelation(Documento)
-    history = HistoricalRecords()
+    history = HistoricalRecords(excluded_fields=CAMPOS_RESUMEN_CUOTAS)
+
+    objects = PolizaQuerySet.as_manager()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instancia = super().from_db(db, field_names, values)
+        # Usuario y fecha de emisión tal como se leyeron: al guardar, el resumen mensual
+        # (reportes/signals.py) recalcula también el mes anterior sin volver a consultarlo
+        instancia._emision_cargada = (
+            (instancia.usuario_id, instancia.fecha_emision)
+            if 'usuario_id' in field_names and 'fecha_emision' in field_names else None
+        )
+        return instancia
     
     # --- PROPIEDADES PARA RENOVACIÓN ---
 
     @property
     def dias_para_renovar(self):
+        # Calculado en SQL por PolizaQuerySet.con_estado_renovacion()
+        if hasattr(self, '_dias_para_renovar'):
+            return self._dias_para_renovar
         hoy = timezone.now().date()
         if self.fecha_fin_vigencia:
             # Si el estado no implica una vigencia activa, no calculamos días.
@@ -153,6 +296,11 @@ class Poliza(models.Model):
             return delta.days
         return None
 
+    @dias_para_renovar.setter
+    def dias_para_renovar(self, valor):
+        # La anotación llega como duración (resta de fechas en SQL)
+        self._dias_para_renovar = valor.days if isinstance(valor, timedelta) else valor
+
     @property
     def estado_renovacion(self):
         """
@@ -160,12 +308,18 @@ class Poliza(models.Model):
         1. Estados administrativos finales (Renovada, Cancelada).
         2. Estados que requieren acción (En Trámite, Pendiente de Pago).
         3. Estados basados en la fecha de vencimiento (Vencida, Crítico, Próximo, Vigente).
+        Para listas, PolizaQuerySet.con_estado_renovacion() lo calcula en SQL.
         """
+        if hasattr(self, '_estado_renovacion'):
+            return self._estado_renovacion
+
         # Prioridad 1: Estados finales que no requieren más seguimiento de renovación.
         if self.estado_poliza == 'RENOVADA':
             return "Renovada"
         if self.estado_poliza == 'CANCELADA':
             return "Cancelada"
+        if self.estado_poliza == 'VENCIDA':
+            return "Vencida"
 
         # Prioridad 2: Estados que requieren una acción para activarse.
         if self.estado_poliza == 'EN_TRAMITE':
@@ -194,6 +348,10 @@ class Poliza(models.Model):
         else: # Más de 90 días
             return "Vigente"
 
+    @estado_renovacion.setter
+    def estado_renovacion(self, valor):
+        self._estado_renovacion = valor
+
     @property
     def proxima_fecha_renovacion_calculada(self):
         # Esta es una lógica simple, asume que se renueva al día siguiente del fin de vigencia
@@ -220,40 +378,26 @@ class Poliza(models.Model):
 
     @property
     def proxima_cuota_pendiente(self):
-        return self.cuotas.filter(estado='PENDIENTE').order_by('fecha_vencimiento_cuota').first()
+        return self.proxima_cuota
 
     @property
     def dias_para_proximo_cobro(self):
-        proxima_cuota = self.proxima_cuota_pendiente
-        if proxima_cuota:
-            return (proxima_cuota.fecha_vencimiento_cuota - timezone.now().date()).days
+        # Usa la columna desnormalizada: no consulta las cuotas
+        if self.proxima_cuota_fecha:
+            return (self.proxima_cuota_fecha - timezone.now().date()).days
         return None
     
-    def generar_plan_de_pagos(self):
-        # PROTECCIÓN CRÍTICA: No regenerar si ya hay cuotas con pagos realizados para evitar pérdida de historial.
-        if self.cuotas.filter(estado='PAGADO').exists():
-            print(f"DEBUG: No se puede regenerar plan para Póliza {self.pk}. Ya existen cuotas pagadas.")
-            return
-
-        # Primero, borramos cualquier plan de pagos anterior para esta póliza
-        self.cuotas.all().delete()
-
-        if not self.fecha_inicio_vigencia or not self.frecuencia_pago:
-            print(f"DEBUG: No se genera plan para Póliza {self.pk}. Faltan fechas o frecuencia.")
-            return
-
-        periodos = {
-            'MENSUAL': (relativedelta(months=1), 12), 'TRIMESTRAL': (relativedelta(months=3), 4),
-            'CUATRIMESTRAL': (relativedelta(months=4), 3), 'SEMESTRAL': (relativedelta(months=6), 2),
-            'ANUAL': (relativedelta(years=1), 1), 'UNICO': (relativedelta(years=1), 1),
-        }
+    def _cuotas_plan_de_pagos(self):
+        """
+        Calcula (sin guardar) las cuotas del plan de pagos según la vigencia,
+        la frecuencia y los montos de la póliza. Devuelve una lista vacía si
+        faltan datos o el monto resultante no es positivo.
+        """
+        if not self.fecha_inicio_vigencia or self.frecuencia_pago not in PERIODOS_PAGO:
+            return []
 
-        if self.frecuencia_pago not in periodos:
-            print(f"DEBUG: Frecuencia de pago '{self.frecuencia_pago}' no válida para Póliza {self.pk}.")
-            return
+        meses_periodo, num_cuotas = PERIODOS_PAGO[self.frecuencia_pago]
 
-        periodo, num_cuotas = periodos[self.frecuencia_pago]
-        
         # --- Lógica de Cálculo de Monto Mejorada ---
         # Si el usuario especificó un valor de cuota, lo usamos.
         # Si no, lo calculamos dividiendo la prima total.
@@ -263,34 +407,24 @@ class Poliza(models.Model):
             monto_por_cuota = self.valor_cuota
         elif self.prima_total_anual and num_cuotas > 0:
             monto_por_cuota = self.prima_total_anual / Decimal(num_cuotas)
-        
-        if monto_por_cuota <= 0:
-            print(f"DEBUG: No se genera plan para Póliza {self.pk}. Monto de cuota es cero o negativo.")
-            return
 
-        fecha_actual_cuota = self.fecha_inicio_vigencia
+        if monto_por_cuota <= 0:
+            return []
 
-        print(f"DEBUG: Generando {num_cuotas} cuotas para Póliza {self.pk}...")
-        
-        # --- Optimización: Crear todas las cuotas en memoria y luego insertarlas en bloque ---
-        cuotas_a_crear = []
-        for i in range(num_cuotas):
-            if self.fecha_fin_vigencia and fecha_actual_cuota > self.fecha_fin_vigencia:
-                break
-            
-            cuota = PagoCuota(
-                poliza=self,
-                fecha_vencimiento_cuota=fecha_actual_cuota,
-                monto_cuota=monto_por_cuota.quantize(Decimal('0.01')) # Redondeo a 2 decimales
-            )
-            cuotas_a_crear.append(cuota)
-            print(f"  -> Preparada cuota {i+1} para fecha {fecha_actual_cuota}")
-            fecha_actual_cuota += periodo
+        monto_por_cuota = monto_por_cuota.quantize(Decimal('0.01')) # Redondeo a 2 decimales
+        fechas = fechas_de_cuotas(self.fecha_inicio_vigencia, meses_periodo, num_cuotas, self.fecha_fin_vigencia)
+        # Se asigna poliza_id (no la instancia): es bastante más rápido al crear miles de cuotas
+        return [
+            PagoCuota(poliza_id=self.pk, fecha_vencimiento_cuota=fecha, monto_cuota=monto_por_cuota)
+            for fecha in fechas
+        ]
 
-        # Ejecutamos un solo INSERT a la base de datos con todas las cuotas (Mejora de rendimiento)
-        if cuotas_a_crear:
-            PagoCuota.objects.bulk_create(cuotas_a_crear)
-            print(f"DEBUG: {len(cuotas_a_crear)} cuotas insertadas en lote exitosamente.")
+    def generar_plan_de_pagos(self):
+        # PROTECCIÓN CRÍTICA: No regenerar si ya hay cuotas con pagos realizados para evitar pérdida de historial.
+        # Es la versión en lote con una sola póliza (ver generar_planes_de_pagos).
+        generar_planes_de_pagos([self])
+        # La instancia en memoria queda con el resumen recién calculado
+        self.refresh_from_db(fields=CAMPOS_RESUMEN_CUOTAS)
 
     def __str__(self):
         return f"Póliza {self.numero_poliza} - {self.cliente.nombre_completo} ({self.ramo_tipo_seguro})"
@@ -302,6 +436,29 @@ class Poliza(models.Model):
         verbose_name = "Póliza"
         verbose_name_plural = "Pólizas"
         ordering = ['-fecha_fin_vigencia', 'cliente']
+        # Índices para las consultas frecuentes, que siempre filtran primero por usuario
+        # (ver el comando benchmark_indices para medirlos con EXPLAIN)
+        indexes = [
+            # Listados y vencimientos ordenados por fin de vigencia
+            models.Index(fields=['usuario', 'fecha_fin_vigencia'], name='poliza_usuario_fin_idx'),
+            # Filtro por estado del listado
+            models.Index(fields=['usuario', 'estado_poliza', 'fecha_fin_vigencia'], name='poliza_usuario_estado_fin_idx'),
+            # Reportes y exportaciones filtrados por fecha de emisión
+            models.Index(fields=['usuario', 'fecha_emision'], name='poliza_usuario_emision_idx'),
+            # Pólizas de un cliente (detalle del cliente)
+            models.Index(fields=['cliente', 'fecha_fin_vigencia'], name='poliza_cliente_fin_idx'),
+            # Widgets de cobranza: rango por fecha de la próxima cuota dentro de la cartera del usuario
+            models.Index(fields=['usuario', 'proxima_cuota_fecha'], name='poliza_usuario_prox_cuota_idx'),
+            # Parciales: solo la cartera activa (renovaciones) y las comisiones por cobrar
+            models.Index(
+                fields=['usuario', 'fecha_fin_vigencia'], name='poliza_activas_fin_idx',
+                condition=models.Q(estado_poliza__in=ESTADOS_ACTIVOS),
+            ),
+            models.Index(
+                fields=['usuario', 'fecha_fin_vigencia'], name='poliza_comision_pend_idx',
+                condition=models.Q(comision_cobrada=False),
+            ),
+        ]
         # --- RESTRICCIÓN DE UNICIDAD ---
         # Una póliza es única por la combinación de su número, usuario Y fecha de inicio.
         # Esto permite tener "123" para 2025 y "123" para 2026.
@@ -311,7 +468,7 @@ class PagoCuota(models.Model):
     ESTADO_PAGO_CHOICES = [
         ('PENDIENTE', 'Pendiente'),
         ('PAGADO', 'Pagado'),
-        ('VENCIDO', 'Vencido'), # Opcional, para lógica futura
+        ('VENCIDO', 'Vencido'), # Pendiente con la fecha ya pasada (lo asigna 'manage.py actualizar_estados')
     ]
 
     poliza = models.ForeignKey(Poliza, on_delete=models.CASCADE, related_name='cuotas')
@@ -327,6 +484,26 @@ class PagoCuota(models.Model):
     def __str__(self):
         return f"Cuota de {self.poliza.numero_poliza} con vencimiento {self.fecha_vencimiento_cuota}"
 
+    def save(self, *args, **kwargs):
+        # Cada cambio en una cuota (alta, pago, reversión) actualiza el resumen de su póliza
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            actualizar_resumen_cuotas([self.poliza_id])
+
+    def delete(self, *args, **kwargs):
+        poliza_id = self.poliza_id
+        with transaction.atomic():
+            resultado = super().delete(*args, **kwargs)
+            actualizar_resumen_cuotas([poliza_id])
+        return resultado
+
+    @property
+    def estado_sin_pagar(self):
+        """Estado que corresponde a la cuota si no está pagada (al revertir un pago)."""
+        if self.fecha_vencimiento_cuota < timezone.now().date():
+            return 'VENCIDO'
+        return 'PENDIENTE'
+
     @property
     def dias_vencimiento(self):
         """
@@ -354,6 +531,86 @@ class PagoCuota(models.Model):
         verbose_name = "Cuota de Póliza"
         verbose_name_plural = "Cuotas de Póliza"
         ordering = ['fecha_vencimiento_cuota']
+        indexes = [
+            # Cuotas de una póliza por estado (resumen de cuotas, protección de cuotas pagadas)
+            models.Index(fields=['poliza', 'estado', 'fecha_vencimiento_cuota'], name='cuota_poliza_estado_venc_idx'),
+            # Parcial: solo las cuotas por cobrar, por fecha de vencimiento (cobranza y vencimiento nocturno)
+            models.Index(
+                fields=['fecha_vencimiento_cuota', 'poliza'], name='cuota_pendiente_venc_idx',
+                condition=models.Q(estado__in=ESTADOS_CUOTA_POR_COBRAR),
+            ),
+        ]
+
+# Pólizas por grupo de sentencias al regenerar planes (acota los IN (...) en SQLite)
+TAMANO_LOTE_PLANES = 900
+
+
+def generar_planes_de_pagos(polizas):
+    """
+    Regenera el plan de pagos de varias pólizas a la vez (importaciones,
+    renovaciones y operaciones masivas). Por cada grupo de hasta
+    TAMANO_LOTE_PLANES pólizas: una consulta para detectar cuotas pagadas, el
+    borrado de los planes anteriores, un bulk_create con todas las cuotas y un
+    UPDATE del resumen de cuotas, todo en una transacción.
+    Las pólizas con cuotas ya pagadas se dejan intactas.
+    Devuelve la cantidad de cuotas creadas.
+    """
+    from .dashboard import invalidar_snapshot_dashboard, invalidacion_en_pausa, invalidacion_suspendida
+
+    polizas = [p for p in polizas if p.pk]
+    total_cuotas = 0
+    usuarios = set()
+    with medir(logger, "planes_de_pagos", polizas=len(polizas)) as span, transaction.atomic():
+        for inicio in range(0, len(polizas), TAMANO_LOTE_PLANES):
+            lote = polizas[inicio:inicio + TAMANO_LOTE_PLANES]
+            con_pagos = set(
+                PagoCuota.objects.filter(poliza_id__in=[p.pk for p in lote], estado='PAGADO')
+                .values_list('poliza_id', flat=True)
+            )
+            a_regenerar = [p for p in lote if p.pk not in con_pagos]
+            if not a_regenerar:
+                continue
+            ids = [p.pk for p in a_regenerar]
+
+            # Borrado normal (señales y anulación de proxima_cuota incluidas), pero sin
+            # invalidar el dashboard cuota por cuota: se invalida una vez por usuario al final
+            with invalidacion_en_pausa():
+                PagoCuota.objects.filter(poliza_id__in=ids).delete()
+
+            cuotas_a_crear = [cuota for poliza in a_regenerar for cuota in poliza._cuotas_plan_de_pagos()]
+            PagoCuota.objects.bulk_create(cuotas_a_crear, batch_size=1000)
+            actualizar_resumen_cuotas(ids)
+
+            total_cuotas += len(cuotas_a_crear)
+            usuarios.update(p.usuario_id for p in a_regenerar)
+        span['cuotas'] = total_cuotas
+
+    if not invalidacion_suspendida():
+        for usuario_id in usuarios:
+            invalidar_snapshot_dashboard(usuario_id)
+    return total_cuotas
+
+
+def actualizar_resumen_cuotas(poliza_ids):
+    """
+    Recalcula las columnas desnormalizadas (próxima cuota pendiente, su fecha, su
+    monto y la cantidad de cuotas pendientes) de las pólizas indicadas con un
+    solo UPDATE con subconsultas correlacionadas.
+    No dispara señales ni toca fecha_actualizacion ni el historial.
+    """
+    pendientes = PagoCuota.objects.filter(
+        poliza=OuterRef('pk'), estado__in=ESTADOS_CUOTA_POR_COBRAR
+    ).order_by('fecha_vencimiento_cuota', 'pk')
+    conteo = PagoCuota.objects.filter(
+        poliza=OuterRef('pk'), estado__in=ESTADOS_CUOTA_POR_COBRAR
+    ).order_by().values('poliza').annotate(total=Count('pk')).values('total')
+
+    return Poliza.objects.filter(pk__in=poliza_ids).update(
+        proxima_cuota=Subquery(pendientes.values('pk')[:1]),
+        proxima_cuota_fecha=Subquery(pendientes.values('fecha_vencimiento_cuota')[:1]),
+        proxima_cuota_monto=Subquery(pendientes.values('monto_cuota')[:1]),
+        cuotas_pendientes_count=Coalesce(Subquery(conteo), 0),
+    )
 
 class Siniestro(models.Model):
     ESTADO_CHOICES = [
@@ -392,5 +649,55 @@ class Siniestro(models.Model):
         verbose_name = "Siniestro"
         verbose_name_plural = "Siniestros"
         ordering = ['-fecha_ocurrencia']
+        indexes = [
+            models.Index(fields=['poliza', 'fecha_ocurrencia'], name='siniestro_poliza_fecha_idx'),
+            models.Index(fields=['usuario', 'estado_siniestro', 'fecha_ocurrencia'], name='siniestro_usuario_estado_idx'),
+        ]
+
+class NotificacionEnviada(models.Model):
+    """
+    Bitácora de avisos a clientes (ver polizas/notificaciones.py). La clave
+    única evita enviar dos veces el mismo aviso aunque el envío se repita. Se
+    usa la fecha de referencia (fin de vigencia o vencimiento de la cuota) y no
+    la cuota en sí porque las cuotas se borran y recrean al regenerar el plan.
+    """
+    TIPO_CHOICES = [
+        ('RENOVACION', 'Renovación próxima'),
+        ('COBRO', 'Cobro de cuota'),
+    ]
+    CANAL_CHOICES = [
+        ('EMAIL', 'Email'),
+        ('WHATSAPP', 'WhatsApp'),
+    ]
+    ESTADO_CHOICES = [
+        ('ENVIANDO', 'Enviando'),  # Reservada por un envío en curso (o interrumpido)
+        ('ENVIADA', 'Enviada'),
+    ]
+
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='notificaciones_enviadas')
+    poliza = models.ForeignKey(Poliza, on_delete=models.CASCADE, related_name='notificaciones_enviadas')
+    tipo = models.CharField(max_length=15, choices=TIPO_CHOICES)
+    canal = models.CharField(max_length=10, choices=CANAL_CHOICES)
+    fecha_referencia = models.DateField(verbose_name="Fecha de Referencia")
+    destinatario = models.CharField(max_length=254)
+    estado = models.CharField(max_length=10, choices=ESTADO_CHOICES, default='ENVIANDO')
+    lote = models.CharField(max_length=32, verbose_name="Lote de Envío")
+    fecha_envio = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} de {self.poliza_id} por {self.canal} ({self.fecha_referencia})"
+
+    class Meta:
+        verbose_name = "Notificación Enviada"
+        verbose_name_plural = "Notificaciones Enviadas"
+        ordering = ['-fecha_envio']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['poliza', 'tipo', 'canal', 'fecha_referencia'], name='notificacion_unica',
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['lote'], name='notificacion_lote_idx'),
+        ]
 
 # ---  FIN DE MODELOS PARA PÓLIZAS DE SEGUROS  ---
\ No newline at end of file
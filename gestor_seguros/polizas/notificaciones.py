@@ -0,0 +1,225 @@
+# polizas/notificaciones.py
+"""
+Avisos de renovación y de cobro a los clientes ('manage.py enviar_notificaciones').
+Por corredor: una consulta trae las pólizas que vencen o tienen la próxima cuota
+dentro de las ventanas de settings.NOTIFICACIONES_VENTANAS, los mensajes se
+arman con las plantillas de templates/notificaciones/ y salen por los canales
+configurados (gestor_seguros/utils/notificaciones.py).
+
+NotificacionEnviada evita los duplicados: cada aviso se reserva en la bitácora
+antes de enviarse, así que repetir la corrida (o correr dos a la vez) no lo
+manda otra vez. Si el envío falla la reserva se borra y se reintenta en la
+siguiente corrida; si la corrida se cae a mitad del envío, la reserva queda en
+'ENVIANDO' y se libera pasados settings.NOTIFICACIONES_RESERVA_MINUTOS.
+"""
+import logging
+import uuid
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import Q
+from django.template.loader import get_template
+from django.utils import timezone
+
+from gestor_seguros.utils.notificaciones import Mensaje, despachar, obtener_canales
+from gestor_seguros.utils.registro import medir
+from .dashboard import cartera_activa
+from .models import NotificacionEnviada, ESTADOS_VENCIBLES
+
+logger = logging.getLogger(__name__)
+
+# Acota los IN (...) en SQLite
+TAMANO_LOTE = 900
+
+PLANTILLAS = {
+    'RENOVACION': 'notificaciones/renovacion.txt',
+    'COBRO': 'notificaciones/cobro.txt',
+}
+ASUNTOS = {
+    'RENOVACION': "Su póliza {numero} vence el {fecha:%d/%m/%Y}",
+    'COBRO': "Recordatorio de pago de su póliza {numero}",
+}
+# Dato de contacto del cliente que usa cada canal
+CONTACTO_POR_CANAL = {
+    'EMAIL': 'email',
+    'WHATSAPP': 'telefono_principal',
+}
+
+
+def _rango(hoy, ventana):
+    desde, hasta = ventana
+    return (hoy + timedelta(days=desde), hoy + timedelta(days=hasta))
+
+
+def avisos_del_corredor(usuario, hoy, ventanas):
+    """
+    Avisos que corresponden hoy al corredor, con UNA consulta sobre su cartera
+    activa: [(tipo, poliza, fecha_referencia), ...]. La cuota se toma de las
+    columnas desnormalizadas de la póliza (próxima cuota por cobrar).
+    """
+    condicion = Q()
+    if 'RENOVACION' in ventanas:
+        condicion |= Q(estado_poliza__in=ESTADOS_VENCIBLES, fecha_fin_vigencia__range=_rango(hoy, ventanas['RENOVACION']))
+    if 'COBRO' in ventanas:
+        condicion |= Q(proxima_cuota_fecha__range=_rango(hoy, ventanas['COBRO']))
+    if not condicion:
+        return []
+
+    avisos = []
+    for poliza in cartera_activa(usuario).filter(condicion).order_by('pk'):
+        if 'RENOVACION' in ventanas and poliza.estado_poliza in ESTADOS_VENCIBLES:
+            desde, hasta = _rango(hoy, ventanas['RENOVACION'])
+            if desde <= poliza.fecha_fin_vigencia <= hasta:
+                avisos.append(('RENOVACION', poliza, poliza.fecha_fin_vigencia))
+        if 'COBRO' in ventanas and poliza.proxima_cuota_fecha:
+            desde, hasta = _rango(hoy, ventanas['COBRO'])
+            if desde <= poliza.proxima_cuota_fecha <= hasta:
+                avisos.append(('COBRO', poliza, poliza.proxima_cuota_fecha))
+    return avisos
+
+
+def liberar_reservas_abandonadas(usuario, ahora=None):
+    """
+    Borra las reservas 'ENVIANDO' del corredor más viejas que
+    NOTIFICACIONES_RESERVA_MINUTOS: su corrida se interrumpió antes de marcarlas
+    enviadas o borrarlas. Devuelve cuántas se liberaron.
+    """
+    ahora = ahora or timezone.now()
+    limite = ahora - timedelta(minutes=settings.NOTIFICACIONES_RESERVA_MINUTOS)
+    borradas, _ = NotificacionEnviada.objects.filter(
+        usuario=usuario, estado='ENVIANDO', fecha_envio__lt=limite,
+    ).delete()
+    if borradas:
+        logger.warning("Se liberaron %s reservas de avisos abandonadas del usuario %s", borradas, usuario.pk)
+    return borradas
+
+
+def _claves_registradas(poliza_ids):
+    claves = set()
+    for inicio in range(0, len(poliza_ids), TAMANO_LOTE):
+        claves.update(
+            NotificacionEnviada.objects.filter(poliza_id__in=poliza_ids[inicio:inicio + TAMANO_LOTE])
+            .values_list('poliza_id', 'tipo', 'canal', 'fecha_referencia')
+        )
+    return claves
+
+
+def _renderizar(tipo, poliza, fecha, hoy, corredor):
+    cuerpo = get_template(PLANTILLAS[tipo]).render({
+        'cliente': poliza.cliente,
+        'poliza': poliza,
+        'fecha': fecha,
+        'vencida': fecha < hoy,
+        'monto': poliza.proxima_cuota_monto,
+        'corredor': corredor,
+    })
+    return ASUNTOS[tipo].format(numero=poliza.numero_poliza, fecha=fecha), cuerpo.strip()
+
+
+def _metricas_vacias():
+    return {
+        'corredores': 0, 'avisos': 0, 'ya_enviados': 0, 'sin_contacto': 0,
+        'enviados': 0, 'fallidos': 0, 'por_canal': {}, 'segundos_envio': 0.0,
+    }
+
+
+def notificar_corredor(usuario, hoy, canales, ventanas, simular=False):
+    """
+    Selecciona, deduplica, reserva, envía y registra los avisos de un corredor.
+    Devuelve sus métricas (ver _metricas_vacias). Con 'simular' solo cuenta.
+    """
+    metricas = _metricas_vacias()
+    metricas['corredores'] = 1
+    if not simular:
+        liberar_reservas_abandonadas(usuario)
+    avisos = avisos_del_corredor(usuario, hoy, ventanas)
+    registradas = _claves_registradas(sorted({poliza.pk for _, poliza, _ in avisos}))
+    corredor = usuario.get_full_name() or usuario.username
+
+    lote = uuid.uuid4().hex
+    reservas = []
+    contenidos = {}
+    for tipo, poliza, fecha in avisos:
+        for canal in canales:
+            metricas['avisos'] += 1
+            destinatario = getattr(poliza.cliente, CONTACTO_POR_CANAL.get(canal, ''), None)
+            if not destinatario:
+                metricas['sin_contacto'] += 1
+                continue
+            if (poliza.pk, tipo, canal, fecha) in registradas:
+                metricas['ya_enviados'] += 1
+                continue
+            if (poliza.pk, tipo) not in contenidos:
+                contenidos[(poliza.pk, tipo)] = _renderizar(tipo, poliza, fecha, hoy, corredor)
+            reservas.append(NotificacionEnviada(
+                usuario=usuario, poliza=poliza, tipo=tipo, canal=canal,
+                fecha_referencia=fecha, destinatario=destinatario, lote=lote,
+            ))
+
+    if simular:
+        metricas['enviados'] = len(reservas)
+        return metricas
+    if not reservas:
+        return metricas
+
+    # Reserva: si otra corrida ya registró el aviso, la fila no entra y no se envía
+    NotificacionEnviada.objects.bulk_create(reservas, batch_size=500, ignore_conflicts=True)
+    propias = {
+        (poliza_id, tipo, canal, fecha): pk
+        for pk, poliza_id, tipo, canal, fecha in NotificacionEnviada.objects.filter(lote=lote)
+        .values_list('pk', 'poliza_id', 'tipo', 'canal', 'fecha_referencia')
+    }
+    metricas['ya_enviados'] += len(reservas) - len(propias)
+
+    enviar = [r for r in reservas if (r.poliza_id, r.tipo, r.canal, r.fecha_referencia) in propias]
+    mensajes = [
+        Mensaje(r.canal, r.destinatario, *contenidos[(r.poliza_id, r.tipo)])
+        for r in enviar
+    ]
+    errores, envio = despachar(mensajes, canales)
+
+    enviadas, fallidas = [], []
+    for reserva, error in zip(enviar, errores):
+        pk = propias[(reserva.poliza_id, reserva.tipo, reserva.canal, reserva.fecha_referencia)]
+        (fallidas if error else enviadas).append(pk)
+    for inicio in range(0, len(enviadas), TAMANO_LOTE):
+        NotificacionEnviada.objects.filter(pk__in=enviadas[inicio:inicio + TAMANO_LOTE]).update(estado='ENVIADA')
+    for inicio in range(0, len(fallidas), TAMANO_LOTE):
+        NotificacionEnviada.objects.filter(pk__in=fallidas[inicio:inicio + TAMANO_LOTE]).delete()
+    if fallidas:
+        primeros = [error for error in errores if error][:5]
+        logger.warning("Avisos fallidos del usuario %s: %s (primeros errores: %s)", usuario.pk, len(fallidas), primeros)
+
+    metricas.update(
+        enviados=envio['enviados'], fallidos=envio['fallidos'],
+        por_canal=envio['por_canal'], segundos_envio=envio['segundos'],
+    )
+    return metricas
+
+
+def enviar_notificaciones(usuarios, hoy=None, simular=False, canales=None, ventanas=None):
+    """
+    Corre notificar_corredor para cada usuario y suma las métricas. Agrega el
+    rendimiento global: segundos totales y mensajes enviados por segundo.
+    """
+    hoy = hoy or timezone.now().date()
+    canales = canales if canales is not None else obtener_canales()
+    ventanas = ventanas if ventanas is not None else settings.NOTIFICACIONES_VENTANAS
+
+    total = _metricas_vacias()
+    with medir(logger, "notificaciones", nivel=logging.INFO, fecha=hoy, simular=simular) as span:
+        for usuario in usuarios:
+            metricas = notificar_corredor(usuario, hoy, canales, ventanas, simular=simular)
+            for clave, valor in metricas.items():
+                if clave == 'por_canal':
+                    for canal, cantidad in valor.items():
+                        total['por_canal'][canal] = total['por_canal'].get(canal, 0) + cantidad
+                else:
+                    total[clave] += valor
+        span.update(corredores=total['corredores'], enviados=total['enviados'], fallidos=total['fallidos'])
+
+    total['segundos_envio'] = round(total['segundos_envio'], 3)
+    total['mensajes_por_segundo'] = (
+        round(total['enviados'] / total['segundos_envio'], 1) if total['segundos_envio'] else 0
+    )
+    return total
@@ -0,0 +1,131 @@
+# polizas/renovaciones.py
+"""
+Renovación de pólizas. La renovación individual (vista renovar_poliza), la
+masiva (acción sobre la lista de pólizas) y 'manage.py renovar_polizas' usan
+el mismo motor: todo el lote en una transacción, con inserciones en bloque de
+las pólizas nuevas, sus asegurados y sus cuotas.
+"""
+from dateutil.relativedelta import relativedelta
+from django.db import transaction, IntegrityError
+from django.utils import timezone
+from simple_history.utils import bulk_create_with_history
+
+from reportes.resumen import marcar_meses, resumen_agrupado
+from .dashboard import invalidacion_agrupada
+from .models import Poliza, Asegurado, generar_planes_de_pagos
+
+TAMANO_LOTE = 500
+
+
+def construir_renovacion(poliza_original, hoy):
+    """Póliza nueva (sin guardar) que continúa 'poliza_original' por un año más."""
+    return Poliza(
+        usuario_id=poliza_original.usuario_id,
+        cliente_id=poliza_original.cliente_id,
+        aseguradora_id=poliza_original.aseguradora_id,
+        ramo_tipo_seguro=poliza_original.ramo_tipo_seguro,
+        descripcion_bien_asegurado=poliza_original.descripcion_bien_asegurado,
+        prima_total_anual=poliza_original.prima_total_anual,
+        frecuencia_pago=poliza_original.frecuencia_pago,
+        valor_cuota=poliza_original.valor_cuota,
+        comision_monto=poliza_original.comision_monto,
+
+        # Valores específicos de la renovación
+        numero_poliza=f"{poliza_original.numero_poliza}-{poliza_original.fecha_fin_vigencia.year}",
+        renovacion_de=poliza_original,
+        fecha_inicio_vigencia=poliza_original.fecha_fin_vigencia,
+        fecha_fin_vigencia=poliza_original.fecha_fin_vigencia + relativedelta(years=1),
+        fecha_emision=hoy,
+        estado_poliza='EN_TRAMITE',
+        comision_cobrada=False,
+    )
+
+
+def _copias_asegurados(nueva_por_original):
+    """Copias (sin guardar) de los asegurados de las pólizas originales, con una sola consulta."""
+    copias = []
+    for asegurado in Asegurado.objects.filter(poliza_id__in=nueva_por_original).order_by('pk'):
+        asegurado.pk = None
+        asegurado.poliza_id = nueva_por_original[asegurado.poliza_id]
+        copias.append(asegurado)
+    return copias
+
+
+def renovar_polizas(usuario, poliza_ids, hoy=None):
+    """
+    Renueva las pólizas indicadas del usuario en una sola transacción.
+
+    Antes de escribir detecta con una consulta los choques con la clave única
+    (usuario, numero_poliza, fecha_inicio_vigencia), dentro del lote y contra
+    la base, y omite las pólizas que ya tienen una renovación o no tienen fecha
+    de fin. Devuelve {'renovadas': [(original, nueva), ...], 'conflictos': [...],
+    'omitidas': [...]} con mensajes legibles en las dos últimas listas.
+    """
+    hoy = hoy or timezone.now().date()
+    reporte = {'renovadas': [], 'conflictos': [], 'omitidas': []}
+
+    originales = list(Poliza.objects.filter(usuario=usuario, pk__in=poliza_ids).order_by('pk'))
+    ya_renovadas = set(
+        Poliza.objects.filter(renovacion_de__in=[p.pk for p in originales]).values_list('renovacion_de_id', flat=True)
+    )
+
+    candidatas = []
+    for original in originales:
+        if original.pk in ya_renovadas:
+            reporte['omitidas'].append(f"La póliza '{original.numero_poliza}' ya tiene una renovación.")
+        elif not original.fecha_fin_vigencia:
+            reporte['omitidas'].append(f"La póliza '{original.numero_poliza}' no tiene fecha de fin de vigencia.")
+        else:
+            candidatas.append((original, construir_renovacion(original, hoy)))
+
+    # Una consulta para todas las claves del lote (se filtra por número y se compara el par en memoria)
+    ocupadas = set(
+        Poliza.objects.filter(usuario=usuario, numero_poliza__in={nueva.numero_poliza for _, nueva in candidatas})
+        .values_list('numero_poliza', 'fecha_inicio_vigencia')
+    )
+    pares = []
+    for original, nueva in candidatas:
+        clave = (nueva.numero_poliza, nueva.fecha_inicio_vigencia)
+        if clave in ocupadas:
+            reporte['conflictos'].append(
+                f"Ya existe la póliza '{nueva.numero_poliza}' con inicio {nueva.fecha_inicio_vigencia:%d/%m/%Y}; "
+                f"no se renovó '{original.numero_poliza}'."
+            )
+            continue
+        ocupadas.add(clave)
+        pares.append((original, nueva))
+
+    if not pares:
+        return reporte
+
+    ahora = timezone.now()
+    try:
+        with transaction.atomic(), invalidacion_agrupada(usuario.pk), resumen_agrupado():
+            nuevas = [nueva for _, nueva in pares]
+            bulk_create_with_history(nuevas, Poliza, batch_size=TAMANO_LOTE, default_user=usuario)
+
+            # Todas las originales reciben los mismos valores: UPDATE por lote en vez de
+            # bulk_update (CASE por fila), más su registro de historial
+            renovadas = [original for original, _ in pares]
+            for inicio in range(0, len(renovadas), TAMANO_LOTE):
+                lote = renovadas[inicio:inicio + TAMANO_LOTE]
+                for original in lote:
+                    original.estado_poliza = 'RENOVADA'
+                    original.fecha_actualizacion = ahora
+                Poliza.objects.filter(pk__in=[p.pk for p in lote]).update(estado_poliza='RENOVADA', fecha_actualizacion=ahora)
+            Poliza.history.bulk_history_create(renovadas, batch_size=TAMANO_LOTE, update=True, default_user=usuario)
+            marcar_meses(usuario.pk, [p.fecha_emision for p in nuevas + renovadas])
+
+            nueva_por_original = {original.pk: nueva.pk for original, nueva in pares}
+            Asegurado.objects.bulk_create(_copias_asegurados(nueva_por_original), batch_size=TAMANO_LOTE)
+            generar_planes_de_pagos(nuevas)
+    except IntegrityError:
+        # Otra operación ocupó alguna de las claves después de la verificación
+        reporte['conflictos'].append(
+            "Otra operación creó pólizas con los mismos números mientras se renovaba el lote. "
+            "No se renovó ninguna; vuelve a intentarlo."
+        )
+        return reporte
+
+    reporte['renovadas'] = pares
+    return reporte
@@ -0,0 +1,45 @@
+# polizas/signals.py
+from django.db.models import QuerySet
+from django.db.models.signals import post_save, post_delete
+from django.dispatch import receiver
+
+from clientes.models import Cliente
+from .models import Poliza, PagoCuota, Aseguradora
+from .dashboard import invalidar_snapshot_dashboard, invalidacion_suspendida
+
+
+def _borrado_en_cascada(sender, kwargs):
+    """
+    True si la fila se borra en cascada desde otro modelo (el cliente, la póliza
+    o el usuario dueño). Django indica en 'origin' la instancia o el queryset
+    con que empezó el borrado; el post_delete de ese origen ya invalida la foto,
+    así que no hace falta (ni conviene: sería una llamada por fila) repetirlo.
+    """
+    origen = kwargs.get('origin')
+    if origen is None:
+        return False
+    modelo_origen = origen.model if isinstance(origen, QuerySet) else type(origen)
+    return not issubclass(modelo_origen, sender)
+
+
+def _usuario_de_cuota(cuota):
+    # Si la póliza ya viene cargada (p. ej. desde poliza.cuotas.all()) evitamos la consulta
+    if PagoCuota.poliza.is_cached(cuota):
+        return cuota.poliza.usuario_id
+    return Poliza.objects.filter(pk=cuota.poliza_id).values_list('usuario_id', flat=True).first()
+
+
+@receiver([post_save, post_delete], sender=Poliza)
+@receiver([post_save, post_delete], sender=Cliente)
+@receiver([post_save, post_delete], sender=Aseguradora)
+def invalidar_dashboard_por_usuario(sender, instance, **kwargs):
+    if invalidacion_suspendida() or _borrado_en_cascada(sender, kwargs):
+        return
+    invalidar_snapshot_dashboard(instance.usuario_id)
+
+
+@receiver([post_save, post_delete], sender=PagoCuota)
+def invalidar_dashboard_por_cuota(sender, instance, **kwargs):
+    if invalidacion_suspendida() or _borrado_en_cascada(sender, kwargs):
+        return
+    invalidar_snapshot_dashboard(_usuario_de_cuota(instance))
@@ -0,0 +1,43 @@
+# polizas/tabla.py
+"""
+Filas de las tablas de pólizas (listado, detalle de cliente y de aseguradora).
+
+Todas las tablas muestran el cliente, la aseguradora y el estado de
+renovación de cada póliza. Cargarlas por aquí garantiza que esos datos vienen
+en la misma consulta (select_related + anotaciones de PolizaQuerySet) y que la
+plantilla no dispara consultas por fila, sea una póliza o cientos.
+"""
+from collections import Counter
+
+ORDEN_TABLA = ('-fecha_fin_vigencia', '-id')
+
+
+def filas_de_polizas(queryset, hoy=None):
+    """Queryset de pólizas con cliente y aseguradora unidos y el estado de renovación anotado."""
+    return queryset.select_related('cliente', 'aseguradora').con_estado_renovacion(hoy)
+
+
+class TablaPolizas:
+    """
+    Filas ya evaluadas y sus conteos (total y por estado de renovación),
+    calculados sobre las mismas filas: no hace falta un COUNT aparte.
+    """
+
+    def __init__(self, filas):
+        self.filas = filas
+        self.total = len(filas)
+        self.por_renovacion = Counter(poliza.estado_renovacion for poliza in filas)
+
+    def __iter__(self):
+        return iter(self.filas)
+
+    def __len__(self):
+        return self.total
+
+    def __bool__(self):
+        return self.total > 0
+
+
+def cargar_tabla_polizas(queryset, hoy=None, orden=ORDEN_TABLA):
+    """Evalúa la tabla con una sola consulta. Devuelve una TablaPolizas."""
+    return TablaPolizas(list(filas_de_polizas(queryset, hoy).order_by(*orden)))
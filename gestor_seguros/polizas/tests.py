@@ -1,3 +1,764 @@
-from django.test import TestCase
+import io
+from datetime import date, datetime, timedelta
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.db.models.signals import post_delete
+from django.template import base as template_base
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from clientes.busqueda import usa_busqueda_sqlite
+from clientes.models import Cliente
+from gestor_seguros.utils import instrumentacion
+from gestor_seguros.utils.paginacion import ANTERIOR, SIGUIENTE, codificar_cursor, paginar_keyset
+from reportes.exportacion import generar_csv_polizas, polizas_para_exportar
+from reportes.models import ResumenMensual
+from .busqueda import TABLA_BUSQUEDA_POLIZAS
+from .dashboard import clave_snapshot_dashboard, obtener_snapshot_dashboard
+from .filters import PolizaFilter
+from .importacion import FilasArchivo, ImportadorPolizas, importar_filas
+from .models import Asegurado, Aseguradora, NotificacionEnviada, PagoCuota, Poliza
+from .notificaciones import liberar_reservas_abandonadas
+from .renovaciones import renovar_polizas
+from .transiciones import MOTIVO_VENCIMIENTO, actualizar_estados
+
+
+# Sin el manifiesto de collectstatic: las plantillas usan {% static %}. La caché en
+# memoria deja fuera de la cuenta las consultas de la caché en base de datos.
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+)
+class ConsultasPorPaginaTests(TestCase):
+    """
+    Las páginas con tablas de pólizas hacen siempre la misma cantidad de
+    consultas, sin importar cuántas pólizas muestren (ver polizas/tabla.py).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('corredor', 'corredor@example.com', 'clave')
+        cls.cliente = Cliente.objects.create(usuario=cls.usuario, nombre_completo="Ana Pérez", numero_documento='V-1')
+        cls.aseguradora = Aseguradora.objects.create(usuario=cls.usuario, nombre="Seguros Caracas")
+        cls.poliza = cls.crear_polizas(1)[0]
+
+    @classmethod
+    def crear_polizas(cls, cantidad):
+        inicio = Poliza.objects.count()
+        return [
+            Poliza.objects.create(
+                usuario=cls.usuario, cliente=cls.cliente, aseguradora=cls.aseguradora,
+                numero_poliza=f'P-{inicio + i}', ramo_tipo_seguro='Automóvil',
+                fecha_inicio_vigencia=date(2026, 1, 1), fecha_fin_vigencia=date(2026, 12, 31) + timedelta(days=20 * i),
+                prima_total_anual=Decimal('1200'), frecuencia_pago='MENSUAL', estado_poliza='VIGENTE',
+            )
+            for i in range(cantidad)
+        ]
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+
+    def assertConsultasFijas(self, url, consultas):
+        # La primera visita llena cachés (ContentType, conteo del listado)
+        self.client.get(url)
+        with self.assertNumQueries(consultas):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.crear_polizas(20)
+        self.client.get(url)
+        with self.assertNumQueries(consultas):
+            self.assertEqual(self.client.get(url).status_code, 200)
+
+    def test_detalle_aseguradora(self):
+        self.assertConsultasFijas(reverse('polizas:detalle_aseguradora', args=[self.aseguradora.pk]), 5)
+
+    def test_detalle_poliza(self):
+        self.assertConsultasFijas(reverse('polizas:detalle_poliza', args=[self.poliza.pk]), 9)
+
+    def test_lista_polizas(self):
+        self.assertConsultasFijas(reverse('polizas:lista_polizas'), 5)
+
+    def test_total_de_la_tabla_sin_count(self):
+        self.crear_polizas(3)
+        respuesta = self.client.get(reverse('polizas:detalle_aseguradora', args=[self.aseguradora.pk]))
+        tabla = respuesta.context['polizas_asociadas']
+        self.assertEqual(tabla.total, 4)
+        self.assertEqual(sum(tabla.por_renovacion.values()), 4)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class SnapshotDashboardTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('corredor', 'corredor@example.com', 'clave')
+        cls.cliente = Cliente.objects.create(usuario=cls.usuario, nombre_completo="Ana Pérez", numero_documento='V-1')
+        hoy = timezone.localdate()
+        cls.poliza = Poliza.objects.create(
+            usuario=cls.usuario, cliente=cls.cliente, numero_poliza='P-1', ramo_tipo_seguro='Automóvil',
+            fecha_inicio_vigencia=hoy - timedelta(days=345), fecha_fin_vigencia=hoy + timedelta(days=20),
+            prima_total_anual=Decimal('1200'), frecuencia_pago='MENSUAL', estado_poliza='VIGENTE',
+        )
+        cls.poliza.generar_plan_de_pagos()
+
+    def setUp(self):
+        cache.clear()
+        self.hoy = timezone.localdate()
+        self.clave = clave_snapshot_dashboard(self.usuario.pk, self.hoy)
+
+    def test_la_cache_guarda_ids_y_no_instancias(self):
+        contexto = obtener_snapshot_dashboard(self.usuario, self.hoy)
+        self.assertEqual(cache.get(self.clave)['polizas_a_vencer_30'], [self.poliza.pk])
+        # Solo las pólizas: sin cumpleañeros este mes no hace falta consultar clientes
+        with self.assertNumQueries(1):
+            desde_cache = obtener_snapshot_dashboard(self.usuario, self.hoy)
+        self.assertEqual(desde_cache['polizas_a_vencer_30'], contexto['polizas_a_vencer_30'])
+        self.assertEqual(desde_cache['polizas_a_vencer_30'][0].cliente.nombre_completo, "Ana Pérez")
+
+    def test_borrado_en_cascada_no_consulta_el_usuario_de_cada_cuota(self):
+        obtener_snapshot_dashboard(self.usuario, self.hoy)
+        with mock.patch('polizas.signals._usuario_de_cuota') as usuario_de_cuota:
+            self.cliente.delete()
+        usuario_de_cuota.assert_not_called()
+        self.assertIsNone(cache.get(self.clave))
+
+    def test_regenerar_el_plan_borra_las_cuotas_con_senales_e_invalida_una_vez(self):
+        obtener_snapshot_dashboard(self.usuario, self.hoy)
+        cuotas = set(self.poliza.cuotas.values_list('pk', flat=True))
+        borradas = []
+
+        def al_borrar(sender, instance, **kwargs):
+            borradas.append(instance.pk)
+
+        post_delete.connect(al_borrar, sender=PagoCuota)
+        self.addCleanup(post_delete.disconnect, al_borrar, sender=PagoCuota)
+        with mock.patch('polizas.signals._usuario_de_cuota') as usuario_de_cuota:
+            self.poliza.generar_plan_de_pagos()
+
+        self.assertEqual(set(borradas), cuotas)
+        usuario_de_cuota.assert_not_called()
+        self.assertIsNone(cache.get(self.clave))
+        self.assertEqual(self.poliza.cuotas_pendientes_count, len(cuotas))
+
+    def test_guardar_una_instancia_vieja_no_pisa_el_resumen_si_se_indican_los_campos(self):
+        vieja = Poliza.objects.get(pk=self.poliza.pk)
+        cuota = PagoCuota.objects.get(pk=vieja.proxima_cuota_id)
+        cuota.estado = 'PAGADO'
+        cuota.save()
+
+        vieja.estado_poliza = 'EN_TRAMITE'
+        vieja.save(update_fields=['estado_poliza', 'fecha_actualizacion'])
+        self.poliza.refresh_from_db()
+        self.assertNotEqual(self.poliza.proxima_cuota_id, cuota.pk)
+        self.assertEqual(self.poliza.cuotas_pendientes_count, vieja.cuotas_pendientes_count - 1)
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    NOTIFICACIONES_RESERVA_MINUTOS=30,
+)
+class NotificacionesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_superuser('corredor', 'corredor@example.com', 'clave')
+        cliente = Cliente.objects.create(usuario=cls.usuario, nombre_completo="Ana Pérez", numero_documento='V-1')
+        hoy = timezone.localdate()
+        cls.polizas = [
+            Poliza.objects.create(
+                usuario=cls.usuario, cliente=cliente, numero_poliza=f'P-{numero}', ramo_tipo_seguro='Salud',
+                fecha_inicio_vigencia=hoy, fecha_fin_vigencia=hoy + timedelta(days=365),
+                prima_total_anual=Decimal('1200'), frecuencia_pago='ANUAL', estado_poliza='VIGENTE',
+            )
+            for numero in range(3)
+        ]
+
+    def reservar(self, poliza, hace_minutos):
+        reserva = NotificacionEnviada.objects.create(
+            usuario=self.usuario, poliza=poliza, tipo='RENOVACION', canal='EMAIL',
+            fecha_referencia=poliza.fecha_fin_vigencia, destinatario='ana@example.com', lote='x',
+        )
+        NotificacionEnviada.objects.filter(pk=reserva.pk).update(
+            fecha_envio=timezone.now() - timedelta(minutes=hace_minutos)
+        )
+        return reserva
+
+    def test_se_liberan_solo_las_reservas_abandonadas(self):
+        abandonada = self.reservar(self.polizas[0], hace_minutos=90)
+        en_curso = self.reservar(self.polizas[1], hace_minutos=5)
+        enviada = self.reservar(self.polizas[2], hace_minutos=90)
+        NotificacionEnviada.objects.filter(pk=enviada.pk).update(estado='ENVIADA')
+
+        self.assertEqual(liberar_reservas_abandonadas(self.usuario), 1)
+        self.assertEqual(
+            set(NotificacionEnviada.objects.values_list('pk', flat=True)), {en_curso.pk, enviada.pk}
+        )
+        self.assertFalse(NotificacionEnviada.objects.filter(pk=abandonada.pk).exists())
+
+    def test_el_admin_no_consulta_la_poliza_por_fila(self):
+        self.client.force_login(self.usuario)
+        url = reverse('admin:polizas_notificacionenviada_changelist')
+        self.reservar(self.polizas[0], hace_minutos=0)
+        with CaptureQueriesContext(connection) as una:
+            self.client.get(url)
+        for poliza in self.polizas[1:]:
+            self.reservar(poliza, hace_minutos=0)
+        with CaptureQueriesContext(connection) as tres:
+            self.assertEqual(self.client.get(url).status_code, 200)
+        self.assertEqual(len(tres), len(una))
+
+
+class PaginacionKeysetTests(TestCase):
+    ORDEN_LISTA = ('-fecha_fin_vigencia', '-id')
+    ORDEN_RENOVACION = ('prioridad_renovacion', 'fecha_fin_vigencia', 'id')
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('corredor', 'corredor@example.com', 'clave')
+        cliente = Cliente.objects.create(usuario=cls.usuario, nombre_completo="Ana Pérez", numero_documento='V-1')
+        hoy = timezone.localdate()
+        # Fechas repetidas y estados distintos: los empates se deshacen por id
+        vencimientos = [-10, 5, 5, 5, 40, 40, 90, 200, -3, 15, 15]
+        estados = ['VIGENTE', 'VIGENTE', 'EN_TRAMITE', 'CANCELADA']
+        for numero, dias in enumerate(vencimientos):
+            Poliza.objects.create(
+                usuario=cls.usuario, cliente=cliente, numero_poliza=f'P-{numero}', ramo_tipo_seguro='Salud',
+                fecha_inicio_vigencia=hoy - timedelta(days=365 - dias), fecha_fin_vigencia=hoy + timedelta(days=dias),
+                prima_total_anual=Decimal('1200'), frecuencia_pago='ANUAL', estado_poliza=estados[numero % len(estados)],
+            )
+
+    def polizas(self):
+        return Poliza.objects.con_estado_renovacion().filter(usuario=self.usuario)
+
+    def recorrer(self, orden, token=None, hacia='siguiente'):
+        paginas = []
+        while True:
+            pagina = paginar_keyset(self.polizas(), orden, token, por_pagina=3)
+            paginas.append([poliza.pk for poliza in pagina])
+            token = pagina.cursor_siguiente if hacia == 'siguiente' else pagina.cursor_anterior
+            if token is None:
+                return paginas
+
+    def assertIdaYVuelta(self, orden):
+        esperado = list(self.polizas().order_by(*orden).values_list('pk', flat=True))
+        hacia_adelante = self.recorrer(orden)
+        self.assertEqual([pk for pagina in hacia_adelante for pk in pagina], esperado)
+        self.assertEqual([len(pagina) for pagina in hacia_adelante], [3, 3, 3, 2])
+
+        # Desde la última página (cursor sin valores) hacia atrás se ven las mismas filas
+        hacia_atras = self.recorrer(orden, codificar_cursor(None, ANTERIOR), hacia='anterior')
+        self.assertEqual([pk for pagina in reversed(hacia_atras) for pk in pagina], esperado)
+        self.assertEqual(hacia_atras[0], esperado[-3:])
+
+    def test_ida_y_vuelta_por_fin_de_vigencia(self):
+        self.assertIdaYVuelta(self.ORDEN_LISTA)
+
+    def test_ida_y_vuelta_por_prioridad_de_renovacion(self):
+        self.assertIdaYVuelta(self.ORDEN_RENOVACION)
+
+    def test_volver_desde_la_segunda_pagina_da_la_primera(self):
+        primera = paginar_keyset(self.polizas(), self.ORDEN_RENOVACION, por_pagina=3)
+        segunda = paginar_keyset(self.polizas(), self.ORDEN_RENOVACION, primera.cursor_siguiente, por_pagina=3)
+        de_vuelta = paginar_keyset(self.polizas(), self.ORDEN_RENOVACION, segunda.cursor_anterior, por_pagina=3)
+        self.assertEqual(list(de_vuelta), list(primera))
+        self.assertFalse(de_vuelta.has_previous())
+        self.assertTrue(de_vuelta.has_next())
+
+    def test_cursor_invalido_lleva_a_la_primera_pagina(self):
+        primera = [p.pk for p in paginar_keyset(self.polizas(), self.ORDEN_LISTA, por_pagina=3)]
+        invalidos = [
+            'basura',
+            codificar_cursor(['2026-01-01'], SIGUIENTE),  # Menos valores que campos
+            codificar_cursor(['no es fecha', 1], SIGUIENTE),
+            codificar_cursor(['2026-01-01', 1], 'otra'),
+        ]
+        for token in invalidos:
+            with self.subTest(token=token):
+                pagina = paginar_keyset(self.polizas(), self.ORDEN_LISTA, token, por_pagina=3)
+                self.assertEqual([p.pk for p in pagina], primera)
+                self.assertFalse(pagina.has_previous())
+
+    def test_cursor_desfasado_lleva_a_la_primera_pagina(self):
+        primera = paginar_keyset(self.polizas(), self.ORDEN_LISTA, por_pagina=3)
+        # Se borra todo lo que venía después de la primera página
+        Poliza.objects.exclude(pk__in=[p.pk for p in primera]).delete()
+        pagina = paginar_keyset(self.polizas(), self.ORDEN_LISTA, primera.cursor_siguiente, por_pagina=3)
+        self.assertEqual(list(pagina), list(primera))
+        self.assertFalse(pagina.has_previous())
+        self.assertFalse(pagina.has_next())
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class ImportacionPolizasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('corredor', 'corredor@example.com', 'clave')
+        cls.cliente = Cliente.objects.create(usuario=cls.usuario, nombre_completo="Ana Pérez", numero_documento='V-1')
+        cls.aseguradora = Aseguradora.objects.create(usuario=cls.usuario, nombre="Mapfre")
+
+    def fila(self, numero, inicio='01/02/2026', **columnas):
+        fila = {
+            'Nro. Poliza': numero, 'Cliente': "Ana Pérez", 'Aseguradora': "Mapfre", 'Ramo': "Salud",
+            'Prima Total Anual': '1200', 'Frecuencia de Pago': 'TRIMESTRAL', 'Estado de la Poliza': 'VIGENTE',
+            'Fecha Emision': inicio, 'Fecha Inicio Vigencia': inicio, 'Fecha Fin Vigencia': '01/02/2027',
+        }
+        fila.update(columnas)
+        return fila
+
+    def crear_poliza(self, numero, inicio=date(2026, 2, 1)):
+        return Poliza.objects.create(
+            usuario=self.usuario, cliente=self.cliente, aseguradora=self.aseguradora, numero_poliza=numero,
+            ramo_tipo_seguro='Salud', fecha_inicio_vigencia=inicio, fecha_fin_vigencia=date(2027, 2, 1),
+            prima_total_anual=Decimal('1200'), frecuencia_pago='TRIMESTRAL', estado_poliza='VIGENTE',
+        )
+
+    def importar(self, filas, **kwargs):
+        with self.captureOnCommitCallbacks(execute=True):
+            return importar_filas(self.usuario, filas, **kwargs)
+
+    def test_crea_o_actualiza_segun_numero_y_fecha_de_inicio(self):
+        existente = self.crear_poliza('P-1')
+        reporte = self.importar([
+            self.fila('P-1', **{'Prima Total Anual': '2400'}),
+            self.fila('P-1', inicio='01/03/2026'),
+            self.fila('P-2', Cliente="Luis Gil", Aseguradora="Seguros Caracas"),
+        ])
+
+        self.assertEqual((reporte['creadas'], reporte['actualizadas'], reporte['errores']), (2, 1, []))
+        existente.refresh_from_db()
+        self.assertEqual(existente.prima_total_anual, Decimal('2400'))
+        self.assertEqual(
+            list(Poliza.objects.filter(numero_poliza='P-1').order_by('fecha_inicio_vigencia').values_list('fecha_inicio_vigencia', flat=True)),
+            [date(2026, 2, 1), date(2026, 3, 1)],
+        )
+        nueva = Poliza.objects.get(numero_poliza='P-2')
+        self.assertEqual((nueva.cliente.nombre_completo, nueva.aseguradora.nombre), ("Luis Gil", "Seguros Caracas"))
+
+    def test_un_numero_repetido_en_el_lote_actualiza_la_poliza_de_la_primera_fila(self):
+        for tamano_lote in (500, 1):
+            with self.subTest(tamano_lote=tamano_lote):
+                Poliza.objects.all().delete()
+                reporte = self.importar(
+                    [self.fila('P-5'), self.fila('P-5', **{'Prima Total Anual': '600'})], tamano_lote=tamano_lote,
+                )
+                self.assertEqual((reporte['creadas'], reporte['actualizadas']), (1, 1))
+                self.assertEqual(list(Poliza.objects.values_list('numero_poliza', 'prima_total_anual')), [('P-5', Decimal('600'))])
+
+    def test_si_el_lote_choca_en_la_base_se_guarda_fila_a_fila(self):
+        importador = ImportadorPolizas(self.usuario)
+        # Otra petición crea la misma póliza después de que el importador leyó las claves
+        self.crear_poliza('P-9')
+        with self.captureOnCommitCallbacks(execute=True):
+            reporte = importador.procesar([self.fila('P-8'), self.fila('P-9')])
+
+        self.assertEqual((reporte['creadas'], reporte['actualizadas']), (1, 0))
+        self.assertEqual(len(reporte['errores']), 1)
+        self.assertIn("'P-9'", reporte['errores'][0])
+        self.assertEqual(Poliza.objects.filter(numero_poliza='P-9').count(), 1)
+        self.assertEqual(Poliza.objects.get(numero_poliza='P-8').cuotas.count(), 4)
+
+    def test_las_polizas_importadas_tienen_plan_de_pagos_y_resumen(self):
+        self.importar([self.fila('P-1'), self.fila('P-2')])
+
+        for poliza in Poliza.objects.all():
+            self.assertEqual(
+                list(poliza.cuotas.order_by('fecha_vencimiento_cuota').values_list('fecha_vencimiento_cuota', 'monto_cuota')),
+                [(date(2026, mes, 1), Decimal('300.00')) for mes in (2, 5, 8, 11)],
+            )
+            self.assertEqual((poliza.cuotas_pendientes_count, poliza.proxima_cuota_monto), (4, Decimal('300.00')))
+        self.assertEqual(
+            list(ResumenMensual.objects.values_list('mes', 'aseguradora', 'cantidad', 'prima_total')),
+            [(date(2026, 2, 1), self.aseguradora.pk, 2, Decimal('2400.00'))],
+        )
+
+
+class FilasArchivoTests(TestCase):
+
+    def filas(self, contenido, nombre):
+        lector = FilasArchivo(io.BytesIO(contenido), nombre)
+        return lector, list(lector)
+
+    def test_csv_utf8_con_bom_y_punto_y_coma(self):
+        lector, filas = self.filas('\ufeffNro. Poliza;Cliente\r\nP-1;José Peña\r\nP-2;Ana, Pérez\r\n'.encode('utf-8'), 'polizas.CSV')
+        self.assertEqual(lector.encoding, 'utf-8-sig')
+        self.assertEqual(lector.total_estimado, 2)
+        self.assertEqual(filas, [
+            {'Nro. Poliza': 'P-1', 'Cliente': 'José Peña'},
+            {'Nro. Poliza': 'P-2', 'Cliente': 'Ana, Pérez'},
+        ])
+
+    def test_csv_latin1_con_comas_y_sin_salto_final(self):
+        lector, filas = self.filas('Nro. Poliza,Cliente,Ramo\nP-1,José Peña,Salud\nP-2,Ana,Vehículo'.encode('latin-1'), 'polizas.csv')
+        self.assertEqual(lector.encoding, 'latin-1')
+        self.assertEqual(lector.total_estimado, 2)
+        self.assertEqual([(fila['Cliente'], fila['Ramo']) for fila in filas], [('José Peña', 'Salud'), ('Ana', 'Vehículo')])
+
+    def test_xlsx_ignora_filas_vacias_y_convierte_las_celdas_a_texto(self):
+        libro = openpyxl.Workbook()
+        hoja = libro.active
+        hoja.append(['Nro. Poliza', 'Fecha Emision', 'Prima Total Anual'])
+        hoja.append(['P-1', datetime(2026, 2, 1), 1200])
+        hoja.append([None, None, None])
+        hoja.append([' P-2 ', None, Decimal('99.50')])
+        contenido = io.BytesIO()
+        libro.save(contenido)
+
+        lector, filas = self.filas(contenido.getvalue(), 'polizas.xlsx')
+        # El total se estima con las filas de la hoja, vacías incluidas
+        self.assertEqual(lector.total_estimado, 3)
+        self.assertEqual(filas, [
+            {'Nro. Poliza': 'P-1', 'Fecha Emision': '01/02/2026', 'Prima Total Anual': '1200'},
+            {'Nro. Poliza': 'P-2', 'Fecha Emision': '', 'Prima Total Anual': '99.5'},
+        ])
+
+    def test_formato_no_soportado(self):
+        with self.assertRaises(ValueError):
+            FilasArchivo(io.BytesIO(b'Nro. Poliza\n'), 'polizas.txt')
+
+    def test_el_csv_exportado_se_vuelve_a_importar_igual(self):
+        origen = User.objects.create_user('origen', 'origen@example.com', 'clave')
+        destino = User.objects.create_user('destino', 'destino@example.com', 'clave')
+        cliente = Cliente.objects.create(usuario=origen, nombre_completo="José Peña", numero_documento='V-1')
+        aseguradora = Aseguradora.objects.create(usuario=origen, nombre="Seguros Caracas")
+        for i, (estado, frecuencia) in enumerate([('VIGENTE', 'MENSUAL'), ('VENCIDA', 'ANUAL'), ('CANCELADA', 'SEMESTRAL')]):
+            Poliza.objects.create(
+                usuario=origen, cliente=cliente, aseguradora=aseguradora if i else None, numero_poliza=f'P-{i}',
+                ramo_tipo_seguro='Vehículo', descripcion_bien_asegurado=f'AB{i}CD',
+                fecha_emision=date(2026, 1, 10 + i), fecha_inicio_vigencia=date(2026, 1, 10 + i),
+                fecha_fin_vigencia=date(2027, 1, 10 + i), prima_total_anual=Decimal('1200.50'),
+                comision_monto=Decimal('120.05'), comision_cobrada=bool(i % 2), estado_poliza=estado, frecuencia_pago=frecuencia,
+            )
+
+        contenido = b''.join(generar_csv_polizas(polizas_para_exportar(origen), filas_por_bloque=2))
+        reporte = importar_filas(destino, FilasArchivo(io.BytesIO(contenido), 'polizas.csv'))
+
+        self.assertEqual((reporte['creadas'], reporte['actualizadas'], reporte['errores']), (3, 0, []))
+        campos = [
+            'numero_poliza', 'cliente__nombre_completo', 'aseguradora__nombre', 'ramo_tipo_seguro',
+            'descripcion_bien_asegurado', 'fecha_emision', 'fecha_inicio_vigencia', 'fecha_fin_vigencia',
+            'prima_total_anual', 'comision_monto', 'comision_cobrada', 'estado_poliza', 'frecuencia_pago',
+        ]
+        importadas = list(Poliza.objects.filter(usuario=destino).order_by('numero_poliza').values_list(*campos))
+        originales = list(Poliza.objects.filter(usuario=origen).order_by('numero_poliza').values_list(*campos))
+        # La póliza sin aseguradora se exporta como 'N/A' y se importa con una aseguradora con ese nombre
+        self.assertEqual(importadas[0][2], 'N/A')
+        self.assertEqual([fila[:2] + fila[3:] for fila in importadas], [fila[:2] + fila[3:] for fila in originales])
+        self.assertEqual([fila[2] for fila in importadas[1:]], ["Seguros Caracas"] * 2)
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class RenovacionesTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('corredor', 'corredor@example.com', 'clave')
+        cls.cliente = Cliente.objects.create(usuario=cls.usuario, nombre_completo="Ana Pérez", numero_documento='V-1')
+        cls.aseguradora = Aseguradora.objects.create(usuario=cls.usuario, nombre="Mapfre")
+
+    def crear_poliza(self, numero, inicio=date(2025, 6, 30), fin=date(2026, 6, 30)):
+        return Poliza.objects.create(
+            usuario=self.usuario, cliente=self.cliente, aseguradora=self.aseguradora, numero_poliza=numero,
+            ramo_tipo_seguro='Salud', fecha_emision=inicio, fecha_inicio_vigencia=inicio, fecha_fin_vigencia=fin,
+            prima_total_anual=Decimal('1200'), frecuencia_pago='TRIMESTRAL', estado_poliza='VIGENTE',
+        )
+
+    def renovar(self, *polizas):
+        with self.captureOnCommitCallbacks(execute=True):
+            return renovar_polizas(self.usuario, [poliza.pk for poliza in polizas], hoy=date(2026, 6, 1))
+
+    def test_la_renovacion_copia_asegurados_y_genera_historial_y_plan_de_pagos(self):
+        original = self.crear_poliza('P-1')
+        for nombre in ("Luis Pérez", "Eva Pérez"):
+            Asegurado.objects.create(poliza=original, nombre_completo=nombre)
+
+        reporte = self.renovar(original)
+
+        self.assertEqual((reporte['conflictos'], reporte['omitidas']), ([], []))
+        [(_, nueva)] = reporte['renovadas']
+        nueva = Poliza.objects.get(pk=nueva.pk)
+        self.assertEqual(
+            (nueva.numero_poliza, nueva.renovacion_de_id, nueva.estado_poliza, nueva.fecha_emision),
+            ('P-1-2026', original.pk, 'EN_TRAMITE', date(2026, 6, 1)),
+        )
+        self.assertEqual((nueva.fecha_inicio_vigencia, nueva.fecha_fin_vigencia), (date(2026, 6, 30), date(2027, 6, 30)))
+        self.assertEqual(list(nueva.asegurados.order_by('pk').values_list('nombre_completo', flat=True)), ["Luis Pérez", "Eva Pérez"])
+        self.assertEqual(original.asegurados.count(), 2)
+
+        historial = original.history.order_by('-history_id').first()
+        self.assertEqual((historial.history_type, historial.estado_poliza), ('~', 'RENOVADA'))
+        self.assertEqual(Poliza.objects.get(pk=original.pk).estado_poliza, 'RENOVADA')
+        self.assertEqual(nueva.history.get().history_type, '+')
+
+        self.assertEqual(
+            list(nueva.cuotas.order_by('fecha_vencimiento_cuota').values_list('fecha_vencimiento_cuota', flat=True)),
+            [date(2026, 6, 30), date(2026, 9, 30), date(2026, 12, 30), date(2027, 3, 30)],
+        )
+        self.assertEqual(
+            (nueva.cuotas_pendientes_count, nueva.proxima_cuota_fecha, nueva.proxima_cuota_monto),
+            (4, date(2026, 6, 30), Decimal('300.00')),
+        )
+
+    def test_se_omiten_las_ya_renovadas_y_las_que_no_tienen_fecha_de_fin(self):
+        renovada = self.crear_poliza('P-1')
+        self.renovar(renovada)
+        sin_fin = self.crear_poliza('P-2')
+        from_db = Poliza.from_db.__func__
+
+        def cargar(cls, db, field_names, values):
+            # La columna es NOT NULL: se simula un registro heredado sin fecha de fin
+            instancia = from_db(cls, db, field_names, values)
+            if instancia.pk == sin_fin.pk:
+                instancia.fecha_fin_vigencia = None
+            return instancia
+
+        with mock.patch.object(Poliza, 'from_db', classmethod(cargar)):
+            reporte = self.renovar(renovada, sin_fin)
+
+        self.assertEqual(reporte['renovadas'], [])
+        self.assertEqual(reporte['omitidas'], [
+            "La póliza 'P-1' ya tiene una renovación.",
+            "La póliza 'P-2' no tiene fecha de fin de vigencia.",
+        ])
+        self.assertEqual(Poliza.objects.filter(renovacion_de__isnull=False).count(), 1)
+
+    def test_los_choques_de_clave_en_el_lote_y_en_la_base_se_reportan(self):
+        contra_la_base = self.crear_poliza('P-2')
+        self.crear_poliza('P-2-2026', inicio=date(2026, 6, 30), fin=date(2027, 6, 30))
+        # Mismo número con otro inicio y el mismo fin: las dos renovaciones tendrían la misma clave
+        primera = self.crear_poliza('P-3')
+        repetida = self.crear_poliza('P-3', inicio=date(2025, 7, 1))
+
+        reporte = self.renovar(contra_la_base, primera, repetida)
+
+        self.assertEqual([original.pk for original, _ in reporte['renovadas']], [primera.pk])
+        self.assertEqual(len(reporte['conflictos']), 2)
+        self.assertIn("'P-2-2026'", reporte['conflictos'][0])
+        self.assertIn("'P-3-2026'", reporte['conflictos'][1])
+        self.assertEqual(
+            set(Poliza.objects.filter(estado_poliza='RENOVADA').values_list('pk', flat=True)), {primera.pk},
+        )
+
+
+@override_settings(CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}})
+class TransicionesTests(TestCase):
+    hoy = date(2026, 7, 1)
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('corredor', 'corredor@example.com', 'clave')
+        cls.cliente = Cliente.objects.create(usuario=cls.usuario, nombre_completo="Ana Pérez", numero_documento='V-1')
+        cls.aseguradora = Aseguradora.objects.create(usuario=cls.usuario, nombre="Mapfre")
+
+    def setUp(self):
+        cache.clear()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.polizas = {
+                numero: Poliza.objects.create(
+                    usuario=self.usuario, cliente=self.cliente, aseguradora=self.aseguradora, numero_poliza=numero,
+                    ramo_tipo_seguro='Salud', fecha_emision=date(2025, 6, 15), fecha_inicio_vigencia=date(2025, 6, 15),
+                    fecha_fin_vigencia=fin, prima_total_anual=Decimal('1200'), frecuencia_pago='ANUAL', estado_poliza=estado,
+                )
+                for numero, estado, fin in [
+                    ('VENCE', 'VIGENTE', date(2026, 6, 30)),
+                    ('VENCE-SIN-PAGO', 'PENDIENTE_PAGO', date(2026, 6, 15)),
+                    ('TERMINA-HOY', 'VIGENTE', self.hoy),
+                    ('CANCELADA', 'CANCELADA', date(2026, 1, 1)),
+                ]
+            }
+        poliza = self.polizas['TERMINA-HOY']
+        self.cuotas = {
+            nombre: PagoCuota.objects.create(poliza=poliza, fecha_vencimiento_cuota=fecha, monto_cuota=Decimal('100'), estado=estado)
+            for nombre, fecha, estado in [
+                ('atrasada', date(2026, 6, 30), 'PENDIENTE'),
+                ('de_hoy', self.hoy, 'PENDIENTE'),
+                ('pagada', date(2026, 5, 1), 'PAGADO'),
+            ]
+        }
+
+    def actualizar(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            return actualizar_estados(self.hoy)
+
+    def estados(self):
+        return (
+            dict(Poliza.objects.values_list('numero_poliza', 'estado_poliza')),
+            {nombre: PagoCuota.objects.get(pk=cuota.pk).estado for nombre, cuota in self.cuotas.items()},
+        )
+
+    def resumen_por_estado(self):
+        return dict(ResumenMensual.objects.values_list('estado', 'cantidad'))
+
+    def test_vence_solo_lo_atrasado_y_es_idempotente(self):
+        self.assertEqual(self.actualizar(), {'polizas': 2, 'cuotas': 1})
+        esperados = (
+            {'VENCE': 'VENCIDA', 'VENCE-SIN-PAGO': 'VENCIDA', 'TERMINA-HOY': 'VIGENTE', 'CANCELADA': 'CANCELADA'},
+            {'atrasada': 'VENCIDO', 'de_hoy': 'PENDIENTE', 'pagada': 'PAGADO'},
+        )
+        self.assertEqual(self.estados(), esperados)
+
+        self.assertEqual(self.actualizar(), {'polizas': 0, 'cuotas': 0})
+        self.assertEqual(self.estados(), esperados)
+
+    def test_el_vencimiento_queda_en_el_historial_una_vez(self):
+        self.actualizar()
+        self.actualizar()
+        for numero in ('VENCE', 'VENCE-SIN-PAGO'):
+            registros = self.polizas[numero].history.filter(estado_poliza='VENCIDA')
+            self.assertEqual(
+                list(registros.values_list('history_type', 'history_change_reason')), [('~', MOTIVO_VENCIMIENTO)],
+            )
+        self.assertFalse(self.polizas['TERMINA-HOY'].history.filter(estado_poliza='VENCIDA').exists())
+
+    def test_se_recalcula_el_resumen_y_se_invalida_el_dashboard(self):
+        clave = clave_snapshot_dashboard(self.usuario.pk, timezone.localdate())
+        cache.set(clave, {'foto': 'vieja'})
+        self.assertEqual(self.resumen_por_estado(), {'VIGENTE': 2, 'PENDIENTE_PAGO': 1, 'CANCELADA': 1})
+
+        self.actualizar()
+
+        self.assertIsNone(cache.get(clave))
+        self.assertEqual(self.resumen_por_estado(), {'VENCIDA': 2, 'VIGENTE': 1, 'CANCELADA': 1})
+
+
+class BusquedaPolizasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('corredor', 'corredor@example.com', 'clave')
+        otro = User.objects.create_user('otro', 'otro@example.com', 'clave')
+        cls.polizas = {}
+        for usuario, numero, cliente, documento, aseguradora, placa in [
+            (cls.usuario, 'AUTO-7781', "María Fernández", 'V-12345678', "Mapfre", 'AB123CD'),
+            (cls.usuario, 'SAL-0042', "José Ruiz", 'V-87654321', "Seguros Caracas", ''),
+            (otro, 'AUTO-7781', "María Fernández", 'V-12345670', "Mapfre", 'AB123CD'),
+        ]:
+            cls.polizas[usuario.pk, numero] = Poliza.objects.create(
+                usuario=usuario, numero_poliza=numero, descripcion_bien_asegurado=placa,
+                cliente=Cliente.objects.create(usuario=usuario, nombre_completo=cliente, numero_documento=documento),
+                aseguradora=Aseguradora.objects.create(usuario=usuario, nombre=aseguradora),
+                fecha_inicio_vigencia=date(2026, 1, 1), fecha_fin_vigencia=date(2027, 1, 1), prima_total_anual=Decimal('100'),
+            )
+
+    def buscar(self, texto):
+        queryset = Poliza.objects.filter(usuario=self.usuario)
+        return sorted(PolizaFilter({'q': texto}, queryset=queryset).qs.values_list('numero_poliza', flat=True))
+
+    def test_busqueda_por_numero_cliente_aseguradora_y_placa(self):
+        casos = [
+            ('AUTO-77', ['AUTO-7781']), ('maría', ['AUTO-7781']), ('caracas', ['SAL-0042']),
+            ('ab123', ['AUTO-7781']), ('sin coincidencias', []),
+            # Menos de 3 caracteres: la unión de icontains por campo
+            ('42', ['SAL-0042']), ('ab', ['AUTO-7781']), ('Jo', ['SAL-0042']), ('M', ['AUTO-7781']),
+            ('  ', ['AUTO-7781', 'SAL-0042']),
+        ]
+        # Con FTS5 los textos largos se prueban en la tabla de búsqueda y también en la unión (la de PostgreSQL)
+        for con_fts in {usa_busqueda_sqlite(TABLA_BUSQUEDA_POLIZAS), False}:
+            with mock.patch('polizas.busqueda.usa_busqueda_sqlite', return_value=con_fts):
+                for texto, esperadas in casos:
+                    with self.subTest(texto=texto, con_fts=con_fts):
+                        self.assertEqual(self.buscar(texto), esperadas)
+
+    def test_la_tabla_de_busqueda_sigue_los_cambios_de_nombre(self):
+        if not usa_busqueda_sqlite(TABLA_BUSQUEDA_POLIZAS):
+            self.skipTest("Solo SQLite con FTS5 mantiene una tabla de búsqueda")
+        Cliente.objects.filter(pk=self.polizas[self.usuario.pk, 'SAL-0042'].cliente_id).update(nombre_completo="Josefina Ruiz")
+        Aseguradora.objects.filter(usuario=self.usuario, nombre="Mapfre").update(nombre="La Previsora")
+        self.assertEqual(self.buscar('josefina'), ['SAL-0042'])
+        self.assertEqual(self.buscar('previsora'), ['AUTO-7781'])
+        self.assertEqual(self.buscar('mapfre'), [])
+
+
+@override_settings(
+    STATICFILES_STORAGE='django.contrib.staticfiles.storage.StaticFilesStorage',
+    INSTRUMENTACION_CONSULTAS=True,
+)
+class PresupuestoConsultasTests(TestCase):
+    """
+    Las vistas de settings.PRESUPUESTO_CONSULTAS, medidas por el middleware de
+    instrumentación como en 'manage.py bench' (con la caché en base de datos
+    de settings, que los presupuestos incluyen).
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('corredor', 'corredor@example.com', 'clave')
+        hoy = timezone.localdate()
+        aseguradoras = [Aseguradora.objects.create(usuario=cls.usuario, nombre=nombre) for nombre in ("Mapfre", "Seguros Caracas")]
+        for i in range(12):
+            cliente = Cliente.objects.create(
+                usuario=cls.usuario, nombre_completo=f"Cliente {i}", numero_documento=f'V-{i}',
+                fecha_nacimiento=date(1980, hoy.month, 1 + i),
+            )
+            poliza = Poliza.objects.create(
+                usuario=cls.usuario, cliente=cliente, aseguradora=aseguradoras[i % 2], numero_poliza=f'P-{i}',
+                ramo_tipo_seguro=['Salud', 'Automóvil'][i % 2], fecha_emision=hoy - timedelta(days=30 * i),
+                fecha_inicio_vigencia=hoy - timedelta(days=300 - 10 * i), fecha_fin_vigencia=hoy + timedelta(days=5 * i - 20),
+                prima_total_anual=Decimal('1200'), frecuencia_pago=['MENSUAL', 'TRIMESTRAL', 'ANUAL'][i % 3],
+                estado_poliza=['VIGENTE', 'PENDIENTE_PAGO', 'EN_TRAMITE'][i % 3], comision_monto=Decimal('100'),
+            )
+            poliza.generar_plan_de_pagos()
+
+    def setUp(self):
+        self.client.force_login(self.usuario)
+        # El middleware reemplaza Template._render al crearse (con la primera petición): se restaura al terminar
+        self.addCleanup(setattr, template_base.Template, '_render', template_base.Template._render)
+        # Como en una conexión nueva (CONN_MAX_AGE=0): la búsqueda vuelve a comprobar su tabla FTS5
+        connection.__dict__.pop('_tablas_busqueda', None)
+
+    def informe(self, respuesta):
+        self.assertLess(respuesta.status_code, 400)
+        if respuesta.streaming:
+            b''.join(respuesta.streaming_content)
+        return respuesta.instrumentacion
+
+    def peticiones(self):
+        lista = reverse('polizas:lista_polizas')
+        contenido = b''.join(generar_csv_polizas(polizas_para_exportar(self.usuario)))
+        yield 'dashboard', lambda: self.client.get(reverse('dashboard'))
+        # Con la foto del dashboard ya en la caché
+        yield 'dashboard', lambda: self.client.get(reverse('dashboard'))
+        yield 'polizas:lista_polizas', lambda: self.client.get(lista)
+        yield 'polizas:lista_polizas', lambda: self.client.get(lista, {'q': 'Client'})
+        yield 'reportes:dashboard_reportes', lambda: self.client.get(reverse('reportes:dashboard_reportes'))
+        yield 'reportes:exportar_polizas_csv', lambda: self.client.get(reverse('reportes:exportar_polizas_csv'))
+        yield 'polizas:importar_polizas_csv', lambda: self.client.post(
+            reverse('polizas:importar_polizas_csv'), {'archivo': SimpleUploadedFile('polizas.csv', contenido)},
+        )
+
+    @override_settings(TAREAS_EN_SEGUNDO_PLANO=False)
+    def test_las_vistas_no_superan_su_presupuesto(self):
+        vistas = set()
+        for vista, pedir in self.peticiones():
+            with self.subTest(vista=vista):
+                informe = self.informe(pedir())
+                self.assertEqual(informe['vista'], vista)
+                self.assertEqual(informe['presupuesto'], settings.PRESUPUESTO_CONSULTAS[vista])
+                self.assertFalse(informe['excedida'], f"{informe['consultas']} consultas > {informe['presupuesto']}")
+            vistas.add(vista)
+        # Cada vista con presupuesto tiene su escenario
+        self.assertEqual(vistas, set(settings.PRESUPUESTO_CONSULTAS))
+
+    def test_un_presupuesto_excedido_se_registra_como_advertencia(self):
+        with override_settings(PRESUPUESTO_CONSULTAS={'polizas:lista_polizas': 1}):
+            with self.assertLogs('gestor_seguros.instrumentacion', 'WARNING') as registros:
+                informe = self.informe(self.client.get(reverse('polizas:lista_polizas')))
+        self.assertTrue(informe['excedida'])
+        self.assertIn('PRESUPUESTO EXCEDIDO (1)', registros.output[0])
+
+    def test_el_middleware_mide_el_renderizado_de_las_plantillas(self):
+        self.assertIs(template_base.Template._render, instrumentacion._render_original)
+        informe = self.informe(self.client.get(reverse('polizas:lista_polizas')))
+        # Queda reemplazado hasta la limpieza de setUp
+        self.assertIs(template_base.Template._render, instrumentacion._render_medido)
+        self.assertGreater(informe['render_ms'], 0)
@@ -0,0 +1,87 @@
+# polizas/transiciones.py
+"""
+Transiciones de estado por fecha. En vez de deducir en cada lectura si una
+póliza o una cuota ya venció, 'manage.py actualizar_estados' (cron nocturno o
+bucle de worker) guarda el estado: las pólizas en curso cuya vigencia terminó
+pasan a 'VENCIDA' y las cuotas sin pagar con la fecha pasada a 'VENCIDO'. Así
+las listas y los reportes pueden filtrar por el estado, que está indexado.
+"""
+import logging
+
+from django.db import transaction
+from django.utils import timezone
+
+from gestor_seguros.utils.registro import medir
+from reportes.resumen import marcar_meses, resumen_agrupado
+from .dashboard import invalidar_snapshot_dashboard
+from .models import Poliza, PagoCuota, ESTADOS_VENCIBLES
+
+logger = logging.getLogger(__name__)
+
+TAMANO_LOTE = 500
+MOTIVO_VENCIMIENTO = "Vencimiento automático de la vigencia"
+
+
+def polizas_por_vencer(hoy):
+    return Poliza.objects.filter(estado_poliza__in=ESTADOS_VENCIBLES, fecha_fin_vigencia__lt=hoy)
+
+
+def cuotas_por_vencer(hoy):
+    return PagoCuota.objects.filter(estado='PENDIENTE', fecha_vencimiento_cuota__lt=hoy)
+
+
+def vencer_polizas(hoy):
+    """
+    Pasa a 'VENCIDA' las pólizas en curso cuya vigencia terminó antes de 'hoy'.
+    Por lote (en su propia transacción): bloquea las filas que siguen
+    cumpliendo la condición, las actualiza con un solo UPDATE y registra su
+    historial con bulk_history_create, igual que un cambio hecho con save().
+    Devuelve (cantidad de pólizas, ids de los usuarios afectados).
+    """
+    total = 0
+    usuarios = set()
+    ahora = timezone.now()
+    while True:
+        with transaction.atomic():
+            lote = list(polizas_por_vencer(hoy).select_for_update().order_by('pk')[:TAMANO_LOTE])
+            if not lote:
+                break
+            for poliza in lote:
+                poliza.estado_poliza = 'VENCIDA'
+                poliza.fecha_actualizacion = ahora
+            Poliza.objects.filter(pk__in=[p.pk for p in lote]).update(estado_poliza='VENCIDA', fecha_actualizacion=ahora)
+            Poliza.history.bulk_history_create(
+                lote, update=True, default_change_reason=MOTIVO_VENCIMIENTO, default_date=ahora,
+            )
+            for usuario_id in {p.usuario_id for p in lote}:
+                marcar_meses(usuario_id, [p.fecha_emision for p in lote if p.usuario_id == usuario_id])
+        total += len(lote)
+        usuarios.update(p.usuario_id for p in lote)
+    return total, usuarios
+
+
+def vencer_cuotas(hoy):
+    """
+    Pasa a 'VENCIDO' las cuotas pendientes con fecha anterior a 'hoy' con un
+    solo UPDATE. Las cuotas no llevan historial y el resumen de cuotas de la
+    póliza no cambia: 'VENCIDO' sigue contando como cuota por cobrar.
+    """
+    return cuotas_por_vencer(hoy).update(estado='VENCIDO')
+
+
+def actualizar_estados(hoy=None):
+    """
+    Aplica todas las transiciones por fecha. Es idempotente: correrla varias
+    veces el mismo día no cambia nada después de la primera.
+    Devuelve {'polizas': n, 'cuotas': m}.
+    """
+    hoy = hoy or timezone.now().date()
+    with medir(logger, "transiciones_estado", nivel=logging.INFO, fecha=hoy) as span:
+        with resumen_agrupado():
+            polizas, usuarios = vencer_polizas(hoy)
+        cuotas = vencer_cuotas(hoy)
+        span.update(polizas=polizas, cuotas=cuotas)
+
+    for usuario_id in usuarios:
+        invalidar_snapshot_dashboard(usuario_id)
+    return {'polizas': polizas, 'cuotas': cuotas}
@@ -5,28 +5,31 @@ from django.utils.dateparse import parse_date
 from django.views.generic import ListView, DetailView, CreateView, UpdateView, DeleteView
 from django.contrib.messages.views import SuccessMessageMixin
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.contrib.contenttypes.models import ContentType
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from dateutil.relativedelta import relativedelta
 from django.utils import timezone
-from datetime import timedelta,datetime
-from django.db import transaction, IntegrityError
-from .models import Poliza, Aseguradora,PagoCuota,Siniestro,Asegurado 
+from datetime import timedelta
+from django.db import transaction
+from .models import Poliza, Aseguradora,PagoCuota,Siniestro,Asegurado, ESTADOS_CUOTA_POR_COBRAR 
 from .forms import PolizaForm, AseguradoraForm,SiniestroForm,AseguradoForm,AseguradoFormSet
-from clientes.models import Cliente # Para el selector de clientes
-from django.db.models import F,Prefetch
+from django.db.models import F
 from django.forms import inlineformset_factory
-import copy,json,requests,csv,io
+import copy,logging
 from django.http import JsonResponse, HttpResponseRedirect
 from bs4 import BeautifulSoup
-from django.core.cache import cache
-from decimal import Decimal,InvalidOperation
 from .mixins import OwnerRequiredMixin
+from gestor_seguros.utils.paginacion import PaginacionKeysetMixin
 from django.utils.decorators import method_decorator
 from .filters import PolizaFilter
 from .forms import DocumentoImportForm
-import openpyxl
+from .dashboard import obtener_snapshot_dashboard
+from .renovaciones import renovar_polizas
+from .tabla import cargar_tabla_polizas, filas_de_polizas
+from documentos.adjuntos import DocumentosAdjuntosMixin
+from tareas.cola import encolar_tarea, tareas_recientes
+from reportes.tasas import tasa_actual
+
+logger = logging.getLogger(__name__)
 
 # Constantes para estados de póliza activos
 ESTADOS_POLIZA_ACTIVOS = ['VIGENTE', 'PENDIENTE_PAGO']
@@ -35,25 +38,25 @@ ESTADOS_POLIZA_ACTIVOS = ['VIGENTE', 'PENDIENTE_PAGO']
 # VISTAS PARA EL CRUD DE ASEGURADORAS (CÓDIGO FINAL)
 # ==========================================================
 
-class AseguradoraListView(LoginRequiredMixin, ListView):
+class AseguradoraListView(LoginRequiredMixin, PaginacionKeysetMixin, ListView):
     model = Aseguradora
     template_name = 'polizas/aseguradora_list.html'
     context_object_name = 'aseguradoras'
     paginate_by = 15
+    orden_keyset = ('nombre', 'id')
 
     def get_queryset(self):
         return Aseguradora.objects.filter(usuario=self.request.user).order_by('nombre')
 
-class AseguradoraDetailView(LoginRequiredMixin, OwnerRequiredMixin, DetailView):
+class AseguradoraDetailView(LoginRequiredMixin, OwnerRequiredMixin, DocumentosAdjuntosMixin, DetailView):
     model = Aseguradora
     template_name = 'polizas/aseguradora_detail.html'
     context_object_name = 'aseguradora'
     
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
-        obj = self.get_object()
-        context['polizas_asociadas'] = obj.polizas.filter(usuario=self.request.user).select_related('cliente').order_by('-fecha_fin_vigencia')
-        context['content_type'] = ContentType.objects.get_for_model(obj)
+        # Una consulta para las filas y el total (ver polizas/tabla.py)
+        context['polizas_asociadas'] = cargar_tabla_polizas(self.object.polizas.filter(usuario=self.request.user))
         return context
 
 class AseguradoraCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView):
@@ -99,11 +102,15 @@ class AseguradoraDeleteView(LoginRequiredMixin, OwnerRequiredMixin, DeleteView):
 # VISTAS PARA EL CRUD DE PÓLIZAS
 # ==========================================================
 
-class PolizaListView(LoginRequiredMixin, ListView):
+class PolizaListView(LoginRequiredMixin, PaginacionKeysetMixin, ListView):
     model = Poliza
     template_name = 'polizas/poliza_list.html'
     context_object_name = 'polizas'
     paginate_by = 15
+    # Paginación por clave: la página 500 cuesta lo mismo que la 1 (índice usuario + fin de vigencia)
+    orden_keyset = ('-fecha_fin_vigencia', '-id')
+    # Orden por urgencia de renovación (filtro 'orden' de PolizaFilter)
+    orden_renovacion = ('prioridad_renovacion', 'fecha_fin_vigencia', 'id')
 
     def get_queryset(self):
         queryset = Poliza.objects.select_related('cliente', 'aseguradora')
@@ -137,21 +144,28 @@ class PolizaListView(LoginRequiredMixin, ListView):
 
     def get_queryset(self):
         # El queryset base ahora es más simple
-        queryset = super().get_queryset().filter(usuario=self.request.user).select_related('cliente', 'aseguradora')
+        # Cliente, aseguradora y estado de renovación en la misma consulta (ver polizas/tabla.py)
+        queryset = filas_de_polizas(super().get_queryset().filter(usuario=self.request.user))
         
         # Aplicamos el filtro
         self.filterset = PolizaFilter(self.request.GET, queryset=queryset)
         
         # Devolvemos el queryset filtrado
-        return self.filterset.qs.order_by('-fecha_fin_vigencia')
+        return self.filterset.qs.order_by(*self.get_orden_keyset())
+
+    def get_orden_keyset(self):
+        if self.request.GET.get('orden') == 'renovacion':
+            return self.orden_renovacion
+        return self.orden_keyset
 
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         # Pasamos el formulario de filtros a la plantilla
         context['filterset'] = self.filterset
+        context['tareas_recientes'] = tareas_recientes(self.request.user)
         return context
 
-class PolizaDetailView(LoginRequiredMixin, OwnerRequiredMixin, DetailView):
+class PolizaDetailView(LoginRequiredMixin, OwnerRequiredMixin, DocumentosAdjuntosMixin, DetailView):
     model = Poliza
     template_name = 'polizas/poliza_detail.html'
     context_object_name = 'poliza'
@@ -160,18 +174,9 @@ class PolizaDetailView(LoginRequiredMixin, OwnerRequiredMixin, DetailView):
         return super().get_queryset().select_related(
             'cliente', 'aseguradora'
         ).prefetch_related(
-            'asegurados', 'cuotas', 'siniestros', 'documentos'
+            'asegurados', 'cuotas', 'siniestros'
         )
 
-    def get_context_data(self, **kwargs):
-        """
-        Prepara el contexto. Ya no necesita pasar el formset de cuotas.
-        """
-        context = super().get_context_data(**kwargs)
-        poliza = self.get_object()
-        context['content_type'] = ContentType.objects.get_for_model(poliza)
-        return context
-
     def post(self, request, *args, **kwargs):
         """
         Maneja solo las acciones de 'Pagar' y 'Cancelar Pago'.
@@ -182,7 +187,7 @@ class PolizaDetailView(LoginRequiredMixin, OwnerRequiredMixin, DetailView):
         if 'marcar_pagada' in request.POST:
             cuota_pk = request.POST.get('marcar_pagada')
             cuota = get_object_or_404(PagoCuota, pk=cuota_pk, poliza=poliza, poliza__usuario=request.user)
-            if cuota.estado == 'PENDIENTE':
+            if cuota.estado in ESTADOS_CUOTA_POR_COBRAR:
                 cuota.estado = 'PAGADO'
                 cuota.fecha_de_pago_realizado = timezone.now().date()
                 cuota.save()
@@ -194,7 +199,7 @@ class PolizaDetailView(LoginRequiredMixin, OwnerRequiredMixin, DetailView):
             cuota_pk = request.POST.get('cancelar_pago')
             cuota = get_object_or_404(PagoCuota, pk=cuota_pk, poliza=poliza, poliza__usuario=request.user)
             if cuota.estado == 'PAGADO':
-                cuota.estado = 'PENDIENTE'
+                cuota.estado = cuota.estado_sin_pagar
                 cuota.fecha_de_pago_realizado = None
                 cuota.save()
                 messages.success(request, 'El pago de la cuota ha sido revertido.')
@@ -284,10 +289,8 @@ class PolizaUpdateView(LoginRequiredMixin, OwnerRequiredMixin, UpdateView):
                 # --- LÓGICA CORREGIDA ---
                 # Solo regeneramos el plan si uno de los campos clave cambió
                 if regenerar_plan:
-                    print("DEBUG: Detectado cambio en campos clave. Regenerando plan de pagos.")
+                    logger.debug("Póliza %s: cambiaron campos de pago, se regenera el plan.", self.object.pk)
                     self.object.generar_plan_de_pagos()
-                else:
-                    print("DEBUG: No hubo cambios en campos clave. El plan de pagos se mantiene.")
 
             messages.success(self.request, "Póliza actualizada exitosamente.")
             return redirect(self.get_success_url())
@@ -317,56 +320,37 @@ class PolizaDeleteView(LoginRequiredMixin, OwnerRequiredMixin, DeleteView):
 def renovar_poliza(request, pk):
     poliza_original = get_object_or_404(Poliza, pk=pk, usuario=request.user)
 
-    # 1. Marcamos la póliza original como RENOVADA y la guardamos primero.
-    poliza_original.estado_poliza = 'RENOVADA'
-    poliza_original.save()
-
-    # --- LÓGICA DE RENOVACIÓN CORREGIDA ---
-    
-    # 2. Calculamos los nuevos valores.
-    nuevo_ano_vigencia = poliza_original.fecha_fin_vigencia.year
-    nuevo_numero_poliza = f"{poliza_original.numero_poliza}-{nuevo_ano_vigencia}"
-
-    # 3. Creamos la nueva instancia de póliza pasando todos los argumentos.
-    poliza_nueva = Poliza(
-        usuario=poliza_original.usuario,
-        cliente=poliza_original.cliente,
-        aseguradora=poliza_original.aseguradora,
-        ramo_tipo_seguro=poliza_original.ramo_tipo_seguro,
-        descripcion_bien_asegurado=poliza_original.descripcion_bien_asegurado,
-        prima_total_anual=poliza_original.prima_total_anual,
-        frecuencia_pago=poliza_original.frecuencia_pago,
-        valor_cuota=poliza_original.valor_cuota,
-        comision_monto=poliza_original.comision_monto,
-        
-        # Valores específicos de la renovación
-        numero_poliza=nuevo_numero_poliza, # <-- Usamos la variable correcta
-        renovacion_de=poliza_original,
-        fecha_inicio_vigencia=poliza_original.fecha_fin_vigencia,
-        fecha_fin_vigencia=poliza_original.fecha_fin_vigencia + relativedelta(years=1),
-        fecha_emision=timezone.now().date(),
-        estado_poliza='EN_TRAMITE',
-        comision_cobrada=False,
-    )
-    
-    # 4. Guardamos la nueva póliza.
-    poliza_nueva.save()
-
-    # 5. Copiamos los asegurados de la póliza original a la nueva.
-    for asegurado in poliza_original.asegurados.all():
-        asegurado.pk = None # Anula el ID para crear una nueva instancia
-        asegurado.id = None
-        asegurado.poliza = poliza_nueva
-        asegurado.save()
-
-    # 6. Generamos el nuevo plan de pagos para la póliza renovada.
-    poliza_nueva.generar_plan_de_pagos()
+    # Misma lógica que la renovación masiva (ver polizas/renovaciones.py)
+    reporte = renovar_polizas(request.user, [poliza_original.pk])
+    if not reporte['renovadas']:
+        for mensaje in reporte['conflictos'] + reporte['omitidas']:
+            messages.error(request, mensaje)
+        return redirect(poliza_original.get_absolute_url())
 
+    _, poliza_nueva = reporte['renovadas'][0]
     messages.success(request, f"Póliza '{poliza_original.numero_poliza}' renovada como '{poliza_nueva.numero_poliza}'.")
-    
+
     # Redirigimos al formulario de EDICIÓN de la nueva póliza.
     return redirect('polizas:editar_poliza', pk=poliza_nueva.pk)
 
+@login_required
+def renovar_polizas_lote(request):
+    """Renueva en bloque las pólizas marcadas en la lista."""
+    if request.method != 'POST':
+        return redirect('polizas:lista_polizas')
+
+    poliza_ids = [pk for pk in request.POST.getlist('polizas') if pk.isdigit()]
+    if not poliza_ids:
+        messages.warning(request, "No se seleccionó ninguna póliza para renovar.")
+        return redirect('polizas:lista_polizas')
+
+    reporte = renovar_polizas(request.user, poliza_ids)
+    if reporte['renovadas']:
+        messages.success(request, f"Se renovaron {len(reporte['renovadas'])} pólizas (quedan En Trámite).")
+    for mensaje in reporte['conflictos'] + reporte['omitidas']:
+        messages.warning(request, mensaje)
+    return redirect('polizas:lista_polizas')
+
 @login_required
 def cancelar_renovacion(request, pk):
     """
@@ -385,14 +369,14 @@ def cancelar_renovacion(request, pk):
             
             # Revertimos el estado de la póliza original a 'VIGENTE'
             poliza_original.estado_poliza = 'VIGENTE'
-            poliza_original.save()
+            poliza_original.save(update_fields=['estado_poliza', 'fecha_actualizacion'])
             
             messages.success(request, f"La renovación de la póliza '{poliza_original.numero_poliza}' ha sido cancelada.")
         else:
             messages.warning(request, "No se encontró una póliza de renovación para cancelar, pero se ha revertido el estado de la póliza original.")
             # Aunque no haya renovación que borrar, igual revertimos el estado
             poliza_original.estado_poliza = 'VIGENTE'
-            poliza_original.save()
+            poliza_original.save(update_fields=['estado_poliza', 'fecha_actualizacion'])
             
         return redirect(poliza_original.get_absolute_url())
 
@@ -406,110 +390,15 @@ def cancelar_renovacion(request, pk):
 @login_required
 def dashboard_view(request):
     hoy = timezone.localtime(timezone.now()).date()
-    
-        # --- QUERIES BASE ---
-    # Usamos prefetch_related para cargar eficientemente solo la primera cuota pendiente de cada póliza
-    primera_cuota_pendiente_qs = PagoCuota.objects.filter(estado='PENDIENTE').order_by('fecha_vencimiento_cuota')
-    
-    polizas_activas_y_pendientes = Poliza.objects.filter(
-        usuario=request.user
-    ).exclude(
-        estado_poliza__in=['CANCELADA', 'RENOVADA']
-    ).select_related('cliente', 'aseguradora').prefetch_related(
-        Prefetch('cuotas', queryset=primera_cuota_pendiente_qs, to_attr='cuotas_pendientes_list')
-    )
-
-    # --- CÁLCULOS PARA EL DASHBOARD ---
-
-    # A. Gestión de Renovaciones
-    polizas_en_tramite = polizas_activas_y_pendientes.filter(estado_poliza='EN_TRAMITE').order_by('fecha_inicio_vigencia')
-    polizas_vencidas = polizas_activas_y_pendientes.filter(fecha_fin_vigencia__lt=hoy, estado_poliza__in=['VIGENTE', 'PENDIENTE_PAGO']).order_by('fecha_fin_vigencia')
-    polizas_a_vencer_30 = polizas_activas_y_pendientes.filter(fecha_fin_vigencia__range=(hoy, hoy + timedelta(days=30))).order_by('fecha_fin_vigencia')
-    polizas_a_vencer_60 = polizas_activas_y_pendientes.filter(fecha_fin_vigencia__range=(hoy + timedelta(days=31), hoy + timedelta(days=60))).order_by('fecha_fin_vigencia')
-    polizas_por_gestionar = polizas_activas_y_pendientes.filter(estado_poliza__in=['EN_TRAMITE', 'PENDIENTE_PAGO']).order_by('fecha_inicio_vigencia')
-
-
-    cobros_pendientes_30_dias = []
-    cobros_vencidos = []
-    
-    # Iteramos sobre las pólizas que tienen cuotas periódicas
-    for poliza in polizas_activas_y_pendientes.exclude(frecuencia_pago__in=['UNICO', 'ANUAL']):
-        # Gracias al prefetch, 'cuotas_pendientes_list' contiene solo las cuotas pendientes
-        if hasattr(poliza, 'cuotas_pendientes_list') and poliza.cuotas_pendientes_list:
-            # La primera en la lista es la más antigua pendiente
-            primera_cuota_pendiente = poliza.cuotas_pendientes_list[0]
-            
-            dias = (primera_cuota_pendiente.fecha_vencimiento_cuota - hoy).days
-            
-            # Clasificamos la PÓLIZA según su primera cuota pendiente
-            if dias < 0:
-                cobros_vencidos.append(poliza)
-            elif 0 <= dias <= 30:
-                cobros_pendientes_30_dias.append(poliza)
-
-    # Ordenamos las listas de pólizas
-    cobros_pendientes_30_dias.sort(key=lambda p: p.cuotas_pendientes_list[0].fecha_vencimiento_cuota)
-    cobros_vencidos.sort(key=lambda p: p.cuotas_pendientes_list[0].fecha_vencimiento_cuota)
-
-    # C. Comisiones
-    comisiones_pendientes = Poliza.objects.filter(usuario=request.user, comision_cobrada=False, comision_monto__gt=0).select_related('cliente').order_by('fecha_fin_vigencia')
-
-    # D. Cumpleaños
-    cumpleaneros_mes = Cliente.objects.filter(usuario=request.user, fecha_nacimiento__isnull=False, fecha_nacimiento__month=hoy.month).order_by('fecha_nacimiento__day')
-    
-    # --- KPIs Y DATOS JS ---
-    total_clientes = Cliente.objects.filter(usuario=request.user).count()
-    
-    # KPI de Vigentes: Definimos como vigentes aquellas con estado VIGENTE o PENDIENTE_PAGO que no han vencido
-    total_polizas_vigentes = polizas_activas_y_pendientes.filter(
-        estado_poliza__in=['VIGENTE', 'PENDIENTE_PAGO', 'EN_TRAMITE'],
-        fecha_fin_vigencia__gte=hoy
-    ).count()
-    
-    cumpleaneros_hoy = cumpleaneros_mes.filter(fecha_nacimiento__day=hoy.day)
-    cumpleaneros_hoy_json = json.dumps([{'nombre': c.nombre_completo} for c in cumpleaneros_hoy])
-    
-    polizas_vencen_semana = polizas_activas_y_pendientes.filter(fecha_fin_vigencia__range=(hoy, hoy + timedelta(days=7)))
-    polizas_vencen_semana_json = json.dumps([{'numero': p.numero_poliza} for p in polizas_vencen_semana])
-
-    # --- DATOS PARA GRÁFICOS (MEJORADO) ---
-    from django.db.models import Sum, Count
-    # Usamos all_polizas para el gráfico para que siempre muestre algo si hay datos
-    datos_ramos = Poliza.objects.filter(usuario=request.user).values('ramo_tipo_seguro').annotate(
-        total=Count('id'),
-        monto=Sum('prima_total_anual')
-    ).order_by('-total')
-    
-    chart_ramos_labels = []
-    chart_ramos_series = []
-    
-    for d in datos_ramos:
-        label = d['ramo_tipo_seguro'] if d['ramo_tipo_seguro'] else 'Sin Ramo'
-        chart_ramos_labels.append(str(label))
-        chart_ramos_series.append(float(d['total']))
-    
-    chart_ramos_json = json.dumps({'labels': chart_ramos_labels, 'series': chart_ramos_series})
 
-    # --- CONTEXTO FINAL ---
-    context = {
+    # Toda la cartera se carga una sola vez y se clasifica en memoria (ver polizas/dashboard.py).
+    # El resultado se guarda en caché por usuario y día hasta que cambie algún dato.
+    context = dict(obtener_snapshot_dashboard(request.user, hoy))
+    context.update({
         'hoy': hoy,
-        'polizas_en_tramite': polizas_en_tramite,
-        'polizas_vencidas': polizas_vencidas,
-        'polizas_a_vencer_30': polizas_a_vencer_30,
-        'polizas_a_vencer_60': polizas_a_vencer_60,
-        'cobros_vencidos': cobros_vencidos,
-        'cobros_pendientes_30_dias': cobros_pendientes_30_dias,
-        'comisiones_pendientes': comisiones_pendientes,
-        'cumpleaneros_mes': cumpleaneros_mes,
-        'total_clientes': total_clientes,
-        'total_polizas_vigentes': total_polizas_vigentes,
-        'cumpleaneros_hoy_json': cumpleaneros_hoy_json,
-        'polizas_vencen_semana_json': polizas_vencen_semana_json,
-        'chart_ramos_json': chart_ramos_json,
-        'polizas_por_gestionar': polizas_por_gestionar,
         'titulo_pagina': "Dashboard de Pólizas",
-    }
-    
+    })
+
     return render(request, 'polizas/dashboard.html', context)
 
 # ---  VISTA DE ACCIÓN RÁPIDA PARA REGISTRAR PAGO ---
@@ -562,29 +451,15 @@ class SiniestroCreateView(LoginRequiredMixin, SuccessMessageMixin, CreateView):
         # Redirige al detalle del siniestro recién creado
         return reverse_lazy('polizas:detalle_siniestro', kwargs={'pk': self.object.pk})
 
-class SiniestroDetailView(LoginRequiredMixin, OwnerRequiredMixin, DetailView):
+class SiniestroDetailView(LoginRequiredMixin, OwnerRequiredMixin, DocumentosAdjuntosMixin, DetailView):
     model = Siniestro
     template_name = 'polizas/siniestro_detail.html'
     context_object_name = 'siniestro' # Es buena práctica definir el nombre del objeto
+    # 'content_type' y 'documentos' para la sección de documentos los agrega DocumentosAdjuntosMixin
     
     def get_queryset(self):
         return super().get_queryset().select_related('poliza', 'poliza__cliente')
 
-    # --- MÉTODO AÑADIDO ---
-    def get_context_data(self, **kwargs):
-        """
-        Añade el 'content_type' al contexto para la sección de documentos.
-        """
-        context = super().get_context_data(**kwargs)
-        
-        # Obtenemos el objeto actual (el siniestro)
-        obj = self.get_object()
-        
-        # Pasamos su ContentType a la plantilla
-        context['content_type'] = ContentType.objects.get_for_model(obj)
-        
-        return context
-
 class SiniestroUpdateView(LoginRequiredMixin, OwnerRequiredMixin, SuccessMessageMixin, UpdateView):
     model = Siniestro
     form_class = SiniestroForm
@@ -611,14 +486,14 @@ class SiniestroDeleteView(LoginRequiredMixin, OwnerRequiredMixin, DeleteView):
 @login_required
 def cancelar_pago_cuota(request, pk_cuota):
     """
-    Revierte una cuota del estado 'PAGADO' al estado 'PENDIENTE'.
+    Revierte una cuota del estado 'PAGADO' al estado 'PENDIENTE' (o 'VENCIDO' si su fecha ya pasó).
     """
     # Buscamos la cuota, asegurándonos de que pertenece al usuario.
     cuota = get_object_or_404(PagoCuota, pk=pk_cuota, poliza__usuario=request.user)
 
     if request.method == 'POST':
         if cuota.estado == 'PAGADO':
-            cuota.estado = 'PENDIENTE'
+            cuota.estado = cuota.estado_sin_pagar # 'VENCIDO' si la fecha ya pasó
             cuota.fecha_de_pago_realizado = None # Limpiamos la fecha del pago
             cuota.notas_pago = f"Pago revertido por el usuario el {timezone.now().strftime('%d/%m/%Y')}. {cuota.notas_pago or ''}" # Opcional: añade una nota
             cuota.save()
@@ -652,47 +527,12 @@ def cancelar_pago_cuota(request, pk_cuota):
 #<--------- END CANCELAR PAGO CUOTA POR ERROR --------->
 @login_required
 def obtener_tasa_bcv_api(request):
-    CACHE_KEY = 'tasa_bcv_usd'
-    tasa_str = cache.get(CACHE_KEY)
-    
-    if not tasa_str:
-        # Lista de APIs para intentar obtener la tasa (Multi-provider fallback)
-        APIS = [
-            {
-                'url': 'https://ve.dolarapi.com/v1/dolares/oficial',
-                'parser': lambda d: d.get('promedio')
-            },
-            {
-                'url': 'https://pydolarve.org/api/v1/dollar?page=bcv',
-                'parser': lambda d: d.get('monitors', {}).get('usd', {}).get('price')
-            }
-        ]
-        
-        errors = []
-        for api in APIS:
-            try:
-                headers = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}
-                response = requests.get(api['url'], headers=headers, timeout=10)
-                response.raise_for_status()
-                data = response.json()
-                
-                tasa_raw = api['parser'](data)
-                if tasa_raw:
-                    tasa_decimal = Decimal(str(tasa_raw))
-                    tasa_str = str(tasa_decimal)
-                    cache.set(CACHE_KEY, tasa_str, timeout=43200) # 12 horas
-                    print(f"DEBUG: Tasa BCV obtenida exitosamente de {api['url']}: {tasa_str}")
-                    break
-            except Exception as e:
-                errors.append(f"{api['url']}: {str(e)}")
-                continue
-        
-        if not tasa_str:
-            error_msg = f"No se pudo obtener la tasa de ninguna fuente comercial. Errores: {'; '.join(errors)}"
-            print(f"CRÍTICO: {error_msg}")
-            return JsonResponse({'error': error_msg}, status=503)
-            
-    return JsonResponse({'tasa_usd': tasa_str})
+    # No consulta a los proveedores: sirve la tasa guardada y, si está vieja,
+    # la revalida en segundo plano (ver reportes/tasas.py)
+    dato = tasa_actual()
+    if dato is None:
+        return JsonResponse({'error': "La tasa BCV no está disponible en este momento. Intenta de nuevo en unos segundos."}, status=503)
+    return JsonResponse({'tasa_usd': dato['tasa'], 'fecha': dato['fecha'], 'desactualizada': dato['desactualizada']})
 
 @login_required
 def importar_polizas_csv(request):
@@ -711,183 +551,17 @@ def importar_polizas_csv(request):
         messages.error(request, 'Formato de archivo incorrecto. Sube un archivo .csv o .xlsx')
         return redirect('polizas:lista_polizas')
 
-    filas_datos = []
-    
-    print(f"--- INICIANDO PROCESO DE IMPORTACIÓN FORMATO: {nombre_archivo} ---")
-
-    try:
-        if nombre_archivo.endswith('.xlsx'):
-            # LÓGICA DE EXCEL
-            wb = openpyxl.load_workbook(archivo, data_only=True)
-            sheet = wb.active
-            headers = [cell.value for cell in sheet[1]]
-            
-            for row in sheet.iter_rows(min_row=2, values_only=True):
-                if any(row):  # Ignorar filas completamente vacías
-                    row_dict = dict(zip(headers, row))
-                    # Convertir todo a string para mantener consistencia con CSV
-                    for key, val in row_dict.items():
-                        if val is None:
-                            row_dict[key] = ""
-                        elif isinstance(val, datetime):
-                            row_dict[key] = val.strftime('%d/%m/%Y')
-                        else:
-                            row_dict[key] = str(val).strip()
-                    filas_datos.append(row_dict)
-                    
-        elif nombre_archivo.endswith('.csv'):
-            # LÓGICA DE CSV (Decodificación robusta y auto-detección de separador)
-            decoded_file = None
-            encodings_to_try = ['utf-8-sig', 'utf-8', 'latin-1', 'iso-8859-1', 'cp1252']
-            
-            file_content = archivo.read()
-            for encoding in encodings_to_try:
-                try:
-                    decoded_file = file_content.decode(encoding)
-                    print(f"DEBUG: Archivo decodificado exitosamente con {encoding}")
-                    break
-                except UnicodeDecodeError:
-                    continue
-
-            if not decoded_file:
-                messages.error(request, "No se pudo decodificar el archivo CSV. Asegúrate de que esté en formato UTF-8.")
-                return redirect('polizas:lista_polizas')
-
-            # Detectar si el archivo usa comas o punto y coma
-            # Miramos la primera línea de datos
-            primer_salto = decoded_file.find('\n')
-            primera_linea = decoded_file[:primer_salto] if primer_salto != -1 else decoded_file
-            delimitador = ';' if primera_linea.count(';') > primera_linea.count(',') else ','
-            
-            print(f"DEBUG: Delimitador CSV detectado: '{delimitador}'")
-
-            io_string = io.StringIO(decoded_file)
-            reader = csv.DictReader(io_string, delimiter=delimitador)
-            filas_datos = list(reader)
-            
-    except Exception as e:
-        messages.error(request, f"Error al leer el archivo: {str(e)}")
-        return redirect('polizas:lista_polizas')
-    
-    reporte = {'creadas': 0, 'actualizadas': 0, 'errores': []}
-    
-    for i, row in enumerate(filas_datos):
-        linea = i + 2
-        try:
-            # --- 1. Leer y limpiar datos del CSV ---
-            poliza_id = row.get('ID Poliza', '').strip()
-            numero_poliza = row.get('Nro. Poliza', '').strip()
-            cliente_nombre = row.get('Cliente', '').strip()
-            aseguradora_nombre = row.get('Aseguradora', '').strip()
-            bien_asegurado = row.get('Bien Asegurado (Placa)', '').strip()
-
-            if not cliente_nombre or not aseguradora_nombre:
-                raise ValueError("Faltan datos esenciales (Cliente o Aseguradora)")
-                
-            if not numero_poliza or numero_poliza.upper() == 'N/A':
-                numero_poliza = f"GEN-{timezone.now().strftime('%Y%m%d%H%M%S')}-{i}"
-
-            # --- 2. Buscar o crear objetos relacionados ---
-            # Manejo seguro para Cliente
-            cliente = Cliente.objects.filter(usuario=request.user, nombre_completo__iexact=cliente_nombre).first()
-            if not cliente:
-                cliente = Cliente.objects.create(usuario=request.user, nombre_completo=cliente_nombre, numero_documento=f"Generado-{cliente_nombre[:10]}-{timezone.now().timestamp()}")
-            
-            # Manejo seguro para Aseguradora
-            aseguradora = Aseguradora.objects.filter(usuario=request.user, nombre__iexact=aseguradora_nombre).first()
-            if not aseguradora:
-                aseguradora = Aseguradora.objects.create(usuario=request.user, nombre=aseguradora_nombre)
-            
-            # --- 3. Preparar el diccionario de datos para la póliza ---
-            
-            # Helper seguro para parsear decimales vacíos
-            def safe_decimal(value):
-                val = value.strip().replace(',', '.')
-                return Decimal(val) if val else Decimal('0.00')
-
-            poliza_defaults = {
-                'numero_poliza': numero_poliza,
-                'cliente': cliente,
-                'aseguradora': aseguradora,
-                'descripcion_bien_asegurado': bien_asegurado,
-                'ramo_tipo_seguro': row.get('Ramo', '').strip(),
-                'prima_total_anual': safe_decimal(row.get('Prima Total Anual', '0')),
-                'comision_monto': safe_decimal(row.get('Monto Comision', '0')),
-                'comision_cobrada': row.get('Comision Cobrada', '').strip().lower() == 'si',
-                'estado_poliza': row.get('Estado de la Poliza', 'VIGENTE').strip().upper().replace(' ', '_'),
-                'frecuencia_pago': row.get('Frecuencia de Pago', 'ANUAL').strip().upper(),
-            }
-            
-            # Conversión de fechas segura
-            for campo_fecha in ['Fecha Emision', 'Fecha Inicio Vigencia', 'Fecha Fin Vigencia']:
-                fecha_str = row.get(campo_fecha, '').strip()
-                if fecha_str:
-                    poliza_defaults[campo_fecha.lower().replace(' ', '_')] = datetime.strptime(fecha_str, '%d/%m/%Y').date()
-
-            # --- 4. Lógica de Actualizar o Crear ---
-            poliza = None
-            if poliza_id and poliza_id.isdigit():
-                poliza = Poliza.objects.filter(id=int(poliza_id), usuario=request.user).first()
-            
-            # Si no se encontró por ID, intentamos por número y fecha para no chocar con unique_together
-            if not poliza:
-                fecha_ini = poliza_defaults.get('fecha_inicio_vigencia', timezone.now().date())
-                poliza = Poliza.objects.filter(
-                    usuario=request.user, 
-                    numero_poliza=numero_poliza,
-                    fecha_inicio_vigencia=fecha_ini
-                ).first()
-
-            if poliza:
-                # Actualizar póliza existente
-                try:
-                    with transaction.atomic():
-                        for attr, value in poliza_defaults.items():
-                            setattr(poliza, attr, value)
-                        poliza.save()
-                        poliza.generar_plan_de_pagos()
-                    reporte['actualizadas'] += 1
-                    print(f"Línea {linea}: Póliza ID {poliza.id} ACTUALIZADA.")
-                except IntegrityError as e:
-                    error_msg = f"Error de integridad al actualizar Póliza ID {poliza.id}: {e}"
-                    reporte['errores'].append(error_msg)
-                    print(f"ERROR: {error_msg}")
-            else:
-                # Crear póliza nueva (Detección de duplicados activos)
-                base_numero = numero_poliza
-                fecha_ini = poliza_defaults.get('fecha_inicio_vigencia', timezone.now().date())
-                contador = 1
-                
-                # Respetamos el unique_together('usuario', 'numero_poliza', 'fecha_inicio_vigencia')
-                while Poliza.objects.filter(usuario=request.user, numero_poliza=numero_poliza, fecha_inicio_vigencia=fecha_ini).exists():
-                    numero_poliza = f"{base_numero}-{contador}"
-                    contador += 1
-                
-                poliza_defaults['numero_poliza'] = numero_poliza
-                poliza_defaults['usuario'] = request.user
-                poliza_defaults.setdefault('fecha_inicio_vigencia', timezone.now().date())
-                poliza_defaults.setdefault('fecha_fin_vigencia', timezone.now().date() + relativedelta(years=1))
-                
-                try:
-                    with transaction.atomic():
-                        poliza = Poliza.objects.create(**poliza_defaults)
-                        poliza.generar_plan_de_pagos()
-                    reporte['creadas'] += 1
-                    print(f"Línea {linea}: Póliza nueva '{numero_poliza}' CREADA.")
-                except IntegrityError as e:
-                    error_msg = f"Error de integridad al crear Póliza '{numero_poliza}': {e}"
-                    reporte['errores'].append(error_msg)
-                    print(f"ERROR: {error_msg}")
-
-        except (ValueError, InvalidOperation, KeyError) as e:
-            error_msg = f"Error en línea {linea}: {e} | Datos: {row}"
-            reporte['errores'].append(error_msg)
-            print(f"ERROR: {error_msg}")
-
-    # --- 5. Reporte final al usuario ---
-    messages.success(request, f"Importación finalizada. Pólizas creadas: {reporte['creadas']}. Pólizas actualizadas: {reporte['actualizadas']}.")
-    if reporte['errores']:
-        messages.warning(request, f"Se encontraron {len(reporte['errores'])} errores. Revisa los logs del servidor para más detalles.")
-    
-    print("--- FIN DEL PROCESO DE IMPORTACIÓN CSV ---")
+    # El archivo se procesa fuera de la petición (ver tareas/ y 'manage.py procesar_tareas').
+    # La lista de pólizas consulta el progreso de la tarea.
+    tarea = encolar_tarea(request.user, 'IMPORTAR_POLIZAS', archivo=archivo, parametros={'nombre_archivo': archivo.name})
+
+    if tarea.estado == 'COMPLETADA':
+        reporte = tarea.reporte
+        messages.success(request, f"Importación finalizada. Pólizas creadas: {reporte['creadas']}. Pólizas actualizadas: {reporte['actualizadas']}.")
+        if reporte['errores']:
+            messages.warning(request, f"Se encontraron {len(reporte['errores'])} errores. Revisa los logs del servidor para más detalles.")
+    elif tarea.estado == 'FALLIDA':
+        messages.error(request, tarea.mensaje_error)
+    else:
+        messages.info(request, "El archivo se está importando en segundo plano. Puedes seguir el progreso en esta página.")
     return redirect('polizas:lista_polizas')
\ No newline at end of file
@@ -1,3 +1,17 @@
 from django.contrib import admin
 
-# Register your models here.
+from .models import ResumenMensual, TasaCambio
+
+
+@admin.register(TasaCambio)
+class TasaCambioAdmin(admin.ModelAdmin):
+    list_display = ('fecha', 'moneda', 'tasa', 'fuente', 'fecha_actualizacion')
+    list_filter = ('moneda', 'fuente')
+    date_hierarchy = 'fecha'
+
+
+@admin.register(ResumenMensual)
+class ResumenMensualAdmin(admin.ModelAdmin):
+    list_display = ('usuario', 'mes', 'ramo', 'aseguradora', 'estado', 'cantidad', 'prima_total')
+    list_filter = ('usuario', 'estado', 'ramo')
+    date_hierarchy = 'mes'
@@ -4,3 +4,7 @@ from django.apps import AppConfig
 class ReportesConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'reportes'
+
+    def ready(self):
+        # Mantiene el resumen mensual de producción al guardar o borrar pólizas y tasas
+        from . import signals  # noqa: F401
@@ -0,0 +1,242 @@
+# reportes/exportacion.py
+import csv
+import io
+
+import openpyxl
+
+from clientes.models import Cliente
+from polizas.models import Poliza, PagoCuota, Siniestro, Asegurado
+
+# Cabeceras del CSV (más claras y en español). El importador lee este mismo formato.
+CABECERAS_POLIZAS = [
+    'ID Poliza',
+    'Nro. Poliza',
+    'Cliente',
+    'Documento Cliente',
+    'Email Cliente',
+    'Telefono Cliente',
+    'Aseguradora',
+    'Ramo',
+    'Bien Asegurado (Placa)',
+    'Fecha Emision',
+    'Fecha Inicio Vigencia',
+    'Fecha Fin Vigencia',
+    'Prima Total Anual',
+    'Monto Comision',
+    'Comision Cobrada',
+    'Estado de la Poliza',
+    'Frecuencia de Pago',
+]
+
+
+def polizas_para_exportar(usuario, fecha_inicio=None, fecha_fin=None):
+    """Queryset de pólizas del usuario filtrado por fecha de emisión, igual que en los reportes."""
+    polizas_query = Poliza.objects.filter(usuario=usuario).order_by('cliente__nombre_completo', 'fecha_fin_vigencia')
+
+    if fecha_inicio:
+        polizas_query = polizas_query.filter(fecha_emision__gte=fecha_inicio)
+    if fecha_fin:
+        polizas_query = polizas_query.filter(fecha_emision__lte=fecha_fin)
+    return polizas_query
+
+
+# Columnas que se leen de la base de datos (en el orden de CABECERAS_POLIZAS)
+CAMPOS_POLIZAS = [
+    'id', 'numero_poliza', 'cliente__nombre_completo', 'cliente__tipo_documento', 'cliente__numero_documento',
+    'cliente__email', 'cliente__telefono_principal', 'aseguradora__nombre', 'ramo_tipo_seguro',
+    'descripcion_bien_asegurado', 'fecha_emision', 'fecha_inicio_vigencia', 'fecha_fin_vigencia',
+    'prima_total_anual', 'comision_monto', 'comision_cobrada', 'estado_poliza', 'frecuencia_pago',
+]
+
+# Etiquetas de los choices calculadas una sola vez (equivalen a get_*_display)
+ETIQUETAS_TIPO_DOCUMENTO = dict(Cliente.TIPO_DOCUMENTO_CHOICES)
+ETIQUETAS_ESTADO_POLIZA = dict(Poliza.ESTADO_POLIZA_CHOICES)
+ETIQUETAS_FRECUENCIA_PAGO = dict(Poliza.FRECUENCIA_PAGO_CHOICES)
+
+TAMANO_BLOQUE = 2000
+
+
+def _fecha_texto(fecha):
+    return fecha.strftime('%d/%m/%Y')
+
+
+def _fecha_nativa(fecha):
+    return fecha
+
+
+def filas_polizas(polizas, chunk_size=TAMANO_BLOQUE, fechas_como_texto=True):
+    """
+    Genera las filas del CSV leyendo tuplas con values_list() en bloques, sin
+    crear instancias del modelo ni guardar el resultado completo en memoria.
+    Con fechas_como_texto=False las fechas se entregan como date (para Excel).
+    """
+    formatear_fecha = _fecha_texto if fechas_como_texto else _fecha_nativa
+    for (pk, numero, cliente, tipo_doc, numero_doc, email, telefono, aseguradora, ramo, bien,
+         emision, inicio, fin, prima, comision, cobrada, estado, frecuencia) in polizas.values_list(
+            *CAMPOS_POLIZAS).iterator(chunk_size=chunk_size):
+        yield [
+            pk,
+            numero,
+            cliente,
+            f"{ETIQUETAS_TIPO_DOCUMENTO.get(tipo_doc, tipo_doc)}-{numero_doc}",
+            email,
+            telefono,
+            aseguradora if aseguradora is not None else 'N/A',
+            ramo,
+            bien,
+            formatear_fecha(emision),
+            formatear_fecha(inicio),
+            formatear_fecha(fin),
+            prima,
+            comision,
+            'Si' if cobrada else 'No',
+            ETIQUETAS_ESTADO_POLIZA.get(estado, estado),
+            ETIQUETAS_FRECUENCIA_PAGO.get(frecuencia, frecuencia),
+        ]
+
+
+def escribir_csv_polizas(salida, polizas, al_avanzar=None, cada=500):
+    """
+    Escribe las cabeceras y una fila por póliza en 'salida' (cualquier objeto con write).
+    Si se pasa 'al_avanzar', se llama con la cantidad de filas escritas cada 'cada' filas.
+    """
+    writer = csv.writer(salida, delimiter=';')
+    writer.writerow(CABECERAS_POLIZAS)
+    escritas = 0
+    for fila in filas_polizas(polizas):
+        writer.writerow(fila)
+        escritas += 1
+        if al_avanzar and escritas % cada == 0:
+            al_avanzar(escritas)
+    if al_avanzar:
+        al_avanzar(escritas)
+    return escritas
+
+
+def generar_csv_polizas(polizas, filas_por_bloque=500):
+    """
+    Generador para StreamingHttpResponse: entrega el BOM, las cabeceras y luego
+    bloques de filas ya formateadas, de modo que la descarga empieza de inmediato.
+    """
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, delimiter=';')
+
+    # BOM (Byte Order Mark) le dice a Excel que el archivo es UTF-8
+    buffer.write('\ufeff')
+    writer.writerow(CABECERAS_POLIZAS)
+    yield buffer.getvalue().encode('utf-8')
+    buffer.seek(0)
+    buffer.truncate()
+
+    pendientes = 0
+    for fila in filas_polizas(polizas):
+        writer.writerow(fila)
+        pendientes += 1
+        if pendientes == filas_por_bloque:
+            yield buffer.getvalue().encode('utf-8')
+            buffer.seek(0)
+            buffer.truncate()
+            pendientes = 0
+    yield buffer.getvalue().encode('utf-8')
+
+
+# --- EXPORTACIÓN A EXCEL (VARIAS HOJAS) ---
+
+CABECERAS_CUOTAS = [
+    'ID Cuota', 'ID Poliza', 'Nro. Poliza', 'Cliente', 'Fecha Vencimiento', 'Monto Cuota',
+    'Estado', 'Fecha de Pago', 'Notas del Pago',
+]
+CAMPOS_CUOTAS = [
+    'id', 'poliza_id', 'poliza__numero_poliza', 'poliza__cliente__nombre_completo', 'fecha_vencimiento_cuota',
+    'monto_cuota', 'estado', 'fecha_de_pago_realizado', 'notas_pago',
+]
+
+CABECERAS_SINIESTROS = [
+    'ID Siniestro', 'ID Poliza', 'Nro. Poliza', 'Cliente', 'Fecha Ocurrencia', 'Fecha Reporte',
+    'Estado', 'Descripcion', 'Monto Reclamado', 'Monto Indemnizado',
+]
+CAMPOS_SINIESTROS = [
+    'id', 'poliza_id', 'poliza__numero_poliza', 'poliza__cliente__nombre_completo', 'fecha_ocurrencia',
+    'fecha_reporte', 'estado_siniestro', 'descripcion', 'monto_reclamado', 'monto_indemnizado',
+]
+
+CABECERAS_ASEGURADOS = [
+    'ID Asegurado', 'ID Poliza', 'Nro. Poliza', 'Nombre Completo', 'Cedula', 'Fecha Nacimiento',
+    'Parentesco', 'Sexo', 'Email', 'Telefono',
+]
+CAMPOS_ASEGURADOS = [
+    'id', 'poliza_id', 'poliza__numero_poliza', 'nombre_completo', 'cedula', 'fecha_nacimiento',
+    'parentesco', 'sexo', 'email', 'telefono',
+]
+
+ETIQUETAS_ESTADO_CUOTA = dict(PagoCuota.ESTADO_PAGO_CHOICES)
+ETIQUETAS_ESTADO_SINIESTRO = dict(Siniestro.ESTADO_CHOICES)
+ETIQUETAS_PARENTESCO = dict(Asegurado.PARENTESCO_CHOICES)
+ETIQUETAS_SEXO = dict(Asegurado.SEXO_CHOICES)
+
+
+def _filas_relacionadas(queryset, campos, etiquetas, chunk_size=TAMANO_BLOQUE):
+    """
+    Filas de un modelo hijo de Poliza leídas con values_list() en bloques.
+    'etiquetas' indica qué columnas (por posición) se traducen con su dict de choices.
+    """
+    for fila in queryset.values_list(*campos).iterator(chunk_size=chunk_size):
+        fila = list(fila)
+        for posicion, etiquetas_columna in etiquetas.items():
+            if fila[posicion] is not None:
+                fila[posicion] = etiquetas_columna.get(fila[posicion], fila[posicion])
+        yield fila
+
+
+def hojas_reporte(polizas):
+    """
+    Lista de (título, cabeceras, total, generador de filas) del reporte Excel.
+    Las cuotas, siniestros y asegurados son los de las pólizas filtradas.
+    """
+    ids_polizas = polizas.values('pk')
+    cuotas = PagoCuota.objects.filter(poliza__in=ids_polizas).order_by('poliza_id', 'fecha_vencimiento_cuota')
+    siniestros = Siniestro.objects.filter(poliza__in=ids_polizas).order_by('poliza_id', 'fecha_ocurrencia')
+    asegurados = Asegurado.objects.filter(poliza__in=ids_polizas).order_by('poliza_id', 'id')
+
+    return [
+        ('Polizas', CABECERAS_POLIZAS, polizas,
+         lambda: filas_polizas(polizas, fechas_como_texto=False)),
+        ('Cuotas', CABECERAS_CUOTAS, cuotas,
+         lambda: _filas_relacionadas(cuotas, CAMPOS_CUOTAS, {6: ETIQUETAS_ESTADO_CUOTA})),
+        ('Siniestros', CABECERAS_SINIESTROS, siniestros,
+         lambda: _filas_relacionadas(siniestros, CAMPOS_SINIESTROS, {6: ETIQUETAS_ESTADO_SINIESTRO})),
+        ('Asegurados', CABECERAS_ASEGURADOS, asegurados,
+         lambda: _filas_relacionadas(asegurados, CAMPOS_ASEGURADOS, {6: ETIQUETAS_PARENTESCO, 7: ETIQUETAS_SEXO})),
+    ]
+
+
+def contar_filas_reporte(polizas):
+    return sum(queryset.count() for _titulo, _cabeceras, queryset, _filas in hojas_reporte(polizas))
+
+
+def escribir_xlsx_reporte(salida, polizas, al_avanzar=None, cada=500):
+    """
+    Escribe el libro Excel (una hoja por modelo) en 'salida' (ruta o archivo binario).
+    Usa un libro write_only: cada hoja se vuelca a disco a medida que se agregan
+    filas, así que la memoria no crece con el tamaño de la cartera.
+    Devuelve la cantidad de filas escritas por hoja.
+    """
+    wb = openpyxl.Workbook(write_only=True)
+    escritas_por_hoja = {}
+    escritas = 0
+
+    for titulo, cabeceras, _queryset, filas in hojas_reporte(polizas):
+        ws = wb.create_sheet(title=titulo)
+        ws.append(cabeceras)
+        escritas_por_hoja[titulo] = 0
+        for fila in filas():
+            ws.append(fila)
+            escritas_por_hoja[titulo] += 1
+            escritas += 1
+            if al_avanzar and escritas % cada == 0:
+                al_avanzar(escritas)
+
+    wb.save(salida)
+    if al_avanzar:
+        al_avanzar(escritas)
+    return escritas_por_hoja
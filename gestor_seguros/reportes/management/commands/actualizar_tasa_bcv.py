@@ -0,0 +1,53 @@
+# reportes/management/commands/actualizar_tasa_bcv.py
+import time
+from datetime import date
+from decimal import Decimal, InvalidOperation
+
+from django.core.management.base import BaseCommand, CommandError
+
+from reportes.tasas import TasaNoDisponible, guardar_tasa, refrescar_tasa
+
+
+class Command(BaseCommand):
+    help = (
+        "Consulta la tasa BCV y la guarda en la caché y en el historial (TasaCambio). "
+        "Pensado para un cron o, con --bucle, como worker. Con --tasa registra una tasa "
+        "a mano (p. ej. para cargar el historial de fechas pasadas)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--bucle', action='store_true', help="No termina: repite cada --intervalo segundos.")
+        parser.add_argument('--intervalo', type=float, default=3600.0, help="Segundos entre consultas con --bucle.")
+        parser.add_argument('--tasa', help="Registra esta tasa sin consultar a los proveedores.")
+        parser.add_argument('--fecha', help="Con --tasa: fecha AAAA-MM-DD de la tasa (por defecto, hoy).")
+        parser.add_argument('--moneda', default='USD', help="Con --tasa: moneda de la tasa.")
+
+    def handle(self, *args, **options):
+        if options['tasa']:
+            self._registrar_manual(options)
+            return
+        if options['fecha']:
+            raise CommandError("--fecha solo se usa junto con --tasa.")
+
+        while True:
+            try:
+                tasa, fuente = refrescar_tasa()
+                self.stdout.write(self.style.SUCCESS(f"Tasa BCV: {tasa} ({fuente})."))
+            except TasaNoDisponible as e:
+                if not options['bucle']:
+                    raise CommandError(f"No se pudo obtener la tasa BCV: {e}")
+                self.stdout.write(self.style.WARNING(f"No se pudo obtener la tasa BCV: {e}"))
+            if not options['bucle']:
+                break
+            time.sleep(options['intervalo'])
+
+    def _registrar_manual(self, options):
+        try:
+            tasa = Decimal(options['tasa'])
+            fecha = date.fromisoformat(options['fecha']) if options['fecha'] else None
+        except (InvalidOperation, ValueError):
+            raise CommandError("Usa una tasa numérica y una fecha con el formato AAAA-MM-DD.")
+        if tasa <= 0:
+            raise CommandError("La tasa debe ser mayor que cero.")
+        guardar_tasa(tasa, fecha=fecha, fuente='manual', moneda=options['moneda'].upper())
+        self.stdout.write(self.style.SUCCESS(f"Tasa {options['moneda'].upper()} registrada: {tasa}."))
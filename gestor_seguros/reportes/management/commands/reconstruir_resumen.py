@@ -0,0 +1,29 @@
+# reportes/management/commands/reconstruir_resumen.py
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+
+from reportes.resumen import reconstruir_resumen
+
+
+class Command(BaseCommand):
+    help = (
+        "Rehace desde las pólizas el resumen mensual de producción que usa el dashboard de reportes "
+        "(tras cargas masivas hechas por fuera de la aplicación o si se sospecha que está desfasado)."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--usuario', help="Solo el resumen de este usuario (por defecto, todos).")
+
+    def handle(self, *args, **options):
+        usuario_ids = None
+        if options['usuario']:
+            User = get_user_model()
+            usuario_ids = list(User.objects.filter(username=options['usuario']).values_list('pk', flat=True))
+            if not usuario_ids:
+                raise CommandError(f"No existe el usuario '{options['usuario']}'.")
+
+        inicio = time.perf_counter()
+        filas = reconstruir_resumen(usuario_ids)
+        self.stdout.write(self.style.SUCCESS(f"Resumen mensual reconstruido: {filas} filas en {time.perf_counter() - inicio:.1f} s."))
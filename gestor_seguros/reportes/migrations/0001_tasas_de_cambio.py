@@ -0,0 +1,34 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TasaCambio',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('moneda', models.CharField(default='USD', max_length=3)),
+                ('fecha', models.DateField(verbose_name='Fecha')),
+                ('tasa', models.DecimalField(decimal_places=6, max_digits=18, verbose_name='Tasa (Bs. por unidad)')),
+                ('fuente', models.CharField(blank=True, max_length=30, verbose_name='Fuente')),
+                ('fecha_actualizacion', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name': 'Tasa de Cambio',
+                'verbose_name_plural': 'Tasas de Cambio',
+                'ordering': ['-fecha'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='tasacambio',
+            constraint=models.UniqueConstraint(fields=('moneda', 'fecha'), name='tasa_moneda_fecha_unica'),
+        ),
+    ]
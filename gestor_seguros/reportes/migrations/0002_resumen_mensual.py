@@ -0,0 +1,45 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:54
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polizas', '0008_notificaciones_enviadas'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('reportes', '0001_tasas_de_cambio'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ResumenMensual',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('mes', models.DateField(verbose_name='Mes')),
+                ('ramo', models.CharField(max_length=100)),
+                ('estado', models.CharField(max_length=20)),
+                ('cantidad', models.PositiveIntegerField(default=0)),
+                ('prima_total', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('comisiones_cobradas', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('comisiones_pendientes', models.DecimalField(decimal_places=2, default=0, max_digits=16)),
+                ('prima_total_ves', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+                ('comisiones_cobradas_ves', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+                ('comisiones_pendientes_ves', models.DecimalField(decimal_places=2, default=0, max_digits=24)),
+                ('polizas_sin_tasa', models.PositiveIntegerField(default=0)),
+                ('aseguradora', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='polizas.aseguradora')),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='resumen_mensual', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Resumen Mensual de Producción',
+                'verbose_name_plural': 'Resúmenes Mensuales de Producción',
+                'ordering': ['usuario', 'mes'],
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='resumenmensual',
+            constraint=models.UniqueConstraint(fields=('usuario', 'mes', 'ramo', 'aseguradora', 'estado'), name='resumen_mensual_unico'),
+        ),
+    ]
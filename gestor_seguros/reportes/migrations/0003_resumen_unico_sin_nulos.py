@@ -0,0 +1,40 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:30
+
+from django.db import migrations, models
+import django.db.models.functions.comparison
+
+
+def quitar_repetidas_sin_aseguradora(apps, schema_editor):
+    # La clave anterior dejaba repetir filas con aseguradora NULL (recálculos
+    # concurrentes); se conserva la más reciente de cada grupo
+    ResumenMensual = apps.get_model('reportes', 'ResumenMensual')
+    repetidas = (
+        ResumenMensual.objects.filter(aseguradora__isnull=True)
+        .values('usuario', 'mes', 'ramo', 'estado')
+        .annotate(ultima=models.Max('pk'), filas=models.Count('pk'))
+        .filter(filas__gt=1)
+    )
+    for grupo in repetidas:
+        ResumenMensual.objects.filter(
+            aseguradora__isnull=True, usuario=grupo['usuario'], mes=grupo['mes'],
+            ramo=grupo['ramo'], estado=grupo['estado'], pk__lt=grupo['ultima'],
+        ).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reportes', '0002_resumen_mensual'),
+    ]
+
+    operations = [
+        migrations.RunPython(quitar_repetidas_sin_aseguradora, migrations.RunPython.noop),
+        migrations.RemoveConstraint(
+            model_name='resumenmensual',
+            name='resumen_mensual_unico',
+        ),
+        migrations.AddConstraint(
+            model_name='resumenmensual',
+            constraint=models.UniqueConstraint(models.F('usuario'), models.F('mes'), models.F('ramo'), django.db.models.functions.comparison.Coalesce(models.F('aseguradora'), models.Value(0)), models.F('estado'), name='resumen_mensual_unico'),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:42
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('polizas', '0008_notificaciones_enviadas'),
+        ('reportes', '0003_resumen_unico_sin_nulos'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='resumenmensual',
+            name='aseguradora',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='+', to='polizas.aseguradora'),
+        ),
+    ]
@@ -1,3 +1,73 @@
+# reportes/models.py
+from django.conf import settings
 from django.db import models
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
 
-# Create your models here.
+
+class TasaCambio(models.Model):
+    """
+    Historial de la tasa oficial (bolívares por unidad de 'moneda'), una por
+    día. La llena 'manage.py actualizar_tasa_bcv' (ver reportes/tasas.py) y los
+    reportes la usan para convertir montos a la tasa de su fecha sin consultar
+    a los proveedores.
+    """
+    moneda = models.CharField(max_length=3, default='USD')
+    fecha = models.DateField(verbose_name="Fecha")
+    tasa = models.DecimalField(max_digits=18, decimal_places=6, verbose_name="Tasa (Bs. por unidad)")
+    fuente = models.CharField(max_length=30, blank=True, verbose_name="Fuente")
+    fecha_actualizacion = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.moneda} {self.fecha}: {self.tasa}"
+
+    class Meta:
+        verbose_name = "Tasa de Cambio"
+        verbose_name_plural = "Tasas de Cambio"
+        ordering = ['-fecha']
+        constraints = [
+            models.UniqueConstraint(fields=['moneda', 'fecha'], name='tasa_moneda_fecha_unica'),
+        ]
+
+
+class ResumenMensual(models.Model):
+    """
+    Producción precalculada por (usuario, mes de emisión, ramo, aseguradora,
+    estado): cantidad de pólizas, primas y comisiones, en dólares y en bolívares
+    a la tasa de la fecha de emisión. La mantienen las señales de Poliza y las
+    operaciones en lote (ver reportes/resumen.py); se reconstruye con
+    'manage.py reconstruir_resumen'.
+    """
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='resumen_mensual')
+    mes = models.DateField(verbose_name="Mes")  # Primer día del mes de emisión
+    ramo = models.CharField(max_length=100)
+    # Al borrar una aseguradora sus filas se borran y los meses se recalculan (sus pólizas
+    # pasan a 'sin aseguradora', ver reportes/signals.py); anularlas chocaría con la clave única
+    aseguradora = models.ForeignKey('polizas.Aseguradora', on_delete=models.CASCADE, null=True, blank=True, related_name='+')
+    estado = models.CharField(max_length=20)
+
+    cantidad = models.PositiveIntegerField(default=0)
+    prima_total = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    comisiones_cobradas = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    comisiones_pendientes = models.DecimalField(max_digits=16, decimal_places=2, default=0)
+    prima_total_ves = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+    comisiones_cobradas_ves = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+    comisiones_pendientes_ves = models.DecimalField(max_digits=24, decimal_places=2, default=0)
+    polizas_sin_tasa = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.usuario_id} {self.mes:%Y-%m} {self.ramo} ({self.cantidad})"
+
+    class Meta:
+        verbose_name = "Resumen Mensual de Producción"
+        verbose_name_plural = "Resúmenes Mensuales de Producción"
+        ordering = ['usuario', 'mes']
+        constraints = [
+            # También sirve de índice para las lecturas por (usuario, mes). La aseguradora
+            # va con Coalesce: con NULL una clave única normal admite filas repetidas
+            models.UniqueConstraint(
+                F('usuario'), F('mes'), F('ramo'),
+                Coalesce(F('aseguradora'), Value(0)), F('estado'),
+                name='resumen_mensual_unico',
+            ),
+        ]
@@ -0,0 +1,247 @@
+# reportes/resumen.py
+"""
+Resumen mensual de producción (ResumenMensual). El dashboard de reportes lee
+de aquí en vez de agregar todas las pólizas del usuario en cada visita, así
+que su costo depende de la cantidad de meses y no de pólizas.
+
+Mantenimiento: cada cambio recalcula por completo los meses afectados del
+usuario (DELETE + un agregado + bulk_create), en vez de sumar y restar
+diferencias, así que el resumen siempre coincide con las pólizas. El recálculo
+bloquea la fila del usuario (select_for_update): dos recálculos del mismo
+usuario no se pisan.
+- Las señales de Poliza (reportes/signals.py) marcan el mes anterior y el nuevo.
+  Los meses marcados dentro de una transacción se recalculan una sola vez al
+  confirmarla (un borrado en cascada de un cliente recalcula una vez, no una
+  por póliza).
+- Las operaciones en lote (importación, renovaciones, vencimientos) usan
+  resumen_agrupado() y marcar_meses(): se recalcula una vez al final.
+- Un cambio en TasaCambio recalcula los meses que usan esa tasa.
+- 'manage.py reconstruir_resumen' lo rehace desde cero.
+"""
+import threading
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+
+from dateutil.relativedelta import relativedelta
+from django.contrib.auth import get_user_model
+from django.db import connection, transaction
+from django.db.models import Count, Q, Sum
+from django.db.models.functions import TruncMonth
+from django.utils import timezone
+
+from polizas.models import Poliza
+from .models import ResumenMensual, TasaCambio
+from .tasas import tasa_en_fecha, en_bolivares
+
+# Campos numéricos del resumen (se suman al combinar filas)
+CAMPOS_SUMABLES = [
+    'cantidad', 'prima_total', 'comisiones_cobradas', 'comisiones_pendientes',
+    'prima_total_ves', 'comisiones_cobradas_ves', 'comisiones_pendientes_ves', 'polizas_sin_tasa',
+]
+
+_estado = threading.local()
+
+
+def mes_de(fecha):
+    # Una póliza nueva trae fecha_emision=timezone.now() (datetime) hasta que se recarga
+    if isinstance(fecha, datetime):
+        fecha = timezone.localdate(fecha) if timezone.is_aware(fecha) else fecha.date()
+    return fecha.replace(day=1)
+
+
+def filas_resumen(polizas):
+    """
+    Agrega un queryset de pólizas con la forma de ResumenMensual: una fila (dict)
+    por usuario, mes, ramo, aseguradora y estado. Una sola consulta.
+    """
+    cobrada = Q(comision_cobrada=True)
+    pendiente = Q(comision_cobrada=False)
+    filas = polizas.annotate(
+        mes=TruncMonth('fecha_emision'),
+        tasa=tasa_en_fecha('fecha_emision'),
+    ).values(
+        'usuario_id', 'mes', 'ramo_tipo_seguro', 'aseguradora_id', 'estado_poliza',
+    ).annotate(
+        cantidad=Count('pk'),
+        prima_total=Sum('prima_total_anual', default=0),
+        comisiones_cobradas=Sum('comision_monto', filter=cobrada, default=0),
+        comisiones_pendientes=Sum('comision_monto', filter=pendiente, default=0),
+        prima_total_ves=Sum(en_bolivares('prima_total_anual'), default=0),
+        comisiones_cobradas_ves=Sum(en_bolivares('comision_monto'), filter=cobrada, default=0),
+        comisiones_pendientes_ves=Sum(en_bolivares('comision_monto'), filter=pendiente, default=0),
+        polizas_sin_tasa=Count('pk', filter=Q(tasa__isnull=True)),
+    ).order_by()
+    for fila in filas:
+        fila['ramo'] = fila.pop('ramo_tipo_seguro')
+        fila['estado'] = fila.pop('estado_poliza')
+        yield fila
+
+
+def _bloquear_usuario(usuario_id):
+    # Serializa los recálculos del mismo usuario hasta el fin de la transacción. En
+    # SQLite no hace falta (ni existe): la escritura ya es exclusiva de una conexión
+    if connection.features.has_select_for_update:
+        list(get_user_model().objects.select_for_update().filter(pk=usuario_id).values_list('pk', flat=True))
+
+
+def recalcular_meses(usuario_id, meses):
+    """Rehace a partir de sus pólizas el resumen del usuario en esos meses (y solo en esos)."""
+    meses = sorted({mes_de(m) for m in meses if m})
+    if not meses:
+        return
+    emitidas = Q()
+    for mes in meses:
+        emitidas |= Q(fecha_emision__gte=mes, fecha_emision__lt=mes + relativedelta(months=1))
+    with transaction.atomic():
+        _bloquear_usuario(usuario_id)
+        ResumenMensual.objects.filter(usuario_id=usuario_id, mes__in=meses).delete()
+        polizas = Poliza.objects.filter(emitidas, usuario_id=usuario_id)
+        ResumenMensual.objects.bulk_create([ResumenMensual(**fila) for fila in filas_resumen(polizas)], batch_size=500)
+
+
+def reconstruir_resumen(usuario_ids=None):
+    """Rehace el resumen de los usuarios indicados (todos si es None). Devuelve las filas creadas."""
+    if usuario_ids is None:
+        usuario_ids = Poliza.objects.order_by().values_list('usuario_id', flat=True).distinct()
+        ResumenMensual.objects.all().delete()
+    total = 0
+    for usuario_id in list(usuario_ids):
+        with transaction.atomic():
+            _bloquear_usuario(usuario_id)
+            ResumenMensual.objects.filter(usuario_id=usuario_id).delete()
+            filas = [ResumenMensual(**fila) for fila in filas_resumen(Poliza.objects.filter(usuario_id=usuario_id))]
+            ResumenMensual.objects.bulk_create(filas, batch_size=500)
+        total += len(filas)
+    return total
+
+
+# --- Lectura (dashboard de reportes) ---
+
+def filas_del_periodo(usuario, inicio=None, fin=None):
+    """
+    Filas con 'mes' y CAMPOS_SUMABLES de la producción emitida entre 'inicio' y
+    'fin' (incluidos; None = sin límite). Los meses completos salen del resumen;
+    los días de un mes cortado por el filtro (como mucho dos meses) se agregan
+    directamente de las pólizas, con la misma forma.
+    """
+    primer_mes = ultimo_mes = None
+    if inicio:
+        primer_mes = inicio if inicio.day == 1 else mes_de(inicio) + relativedelta(months=1)
+    if fin:
+        ultimo_mes = mes_de(fin) if (fin + timedelta(days=1)).day == 1 else mes_de(fin) - relativedelta(months=1)
+
+    filas = []
+    if primer_mes is None or ultimo_mes is None or primer_mes <= ultimo_mes:
+        resumen = ResumenMensual.objects.filter(usuario=usuario)
+        if primer_mes:
+            resumen = resumen.filter(mes__gte=primer_mes)
+        if ultimo_mes:
+            resumen = resumen.filter(mes__lte=ultimo_mes)
+        # Una fila por mes: lo que se trae no crece con ramos, aseguradoras ni estados
+        filas.extend(resumen.values('mes').annotate(**{campo: Sum(campo) for campo in CAMPOS_SUMABLES}).order_by())
+
+    dias_sueltos = Q()
+    if inicio and inicio.day != 1:
+        fin_del_mes = mes_de(inicio) + relativedelta(months=1) - timedelta(days=1)
+        dias_sueltos |= Q(fecha_emision__range=(inicio, min(fin, fin_del_mes) if fin else fin_del_mes))
+    if fin and (fin + timedelta(days=1)).day != 1:
+        dias_sueltos |= Q(fecha_emision__range=(max(inicio, mes_de(fin)) if inicio else mes_de(fin), fin))
+    if dias_sueltos:
+        filas.extend(filas_resumen(Poliza.objects.filter(usuario=usuario).filter(dias_sueltos)))
+    return filas
+
+
+def cartera_por_ramo_y_aseguradora(usuario):
+    """
+    Cantidad de pólizas (de todo el historial) por ramo y por nombre de
+    aseguradora, con una consulta sobre el resumen. Listas ordenadas de mayor a menor.
+    """
+    por_ramo = Counter()
+    por_aseguradora = Counter()
+    filas = (
+        ResumenMensual.objects.filter(usuario=usuario)
+        .values('ramo', 'aseguradora__nombre').annotate(total=Sum('cantidad')).order_by()
+    )
+    for fila in filas:
+        por_ramo[fila['ramo']] += fila['total']
+        por_aseguradora[fila['aseguradora__nombre']] += fila['total']
+    return (
+        [{'ramo_tipo_seguro': ramo, 'cantidad': cantidad} for ramo, cantidad in por_ramo.most_common()],
+        [{'nombre_aseguradora': nombre, 'cantidad': cantidad} for nombre, cantidad in por_aseguradora.most_common()],
+    )
+
+
+# --- Mantenimiento incremental ---
+
+def marcar_meses(usuario_id, fechas):
+    """
+    Indica que cambiaron pólizas del usuario emitidas en esas fechas. Dentro de
+    resumen_agrupado() se acumula hasta el final del bloque; fuera, hasta que se
+    confirma la transacción en curso (en autocommit, en el momento).
+    """
+    meses = {mes_de(f) for f in fechas if f}
+    if not usuario_id or not meses:
+        return
+    pendientes = getattr(_estado, 'pendientes', None)
+    if pendientes is not None:
+        pendientes.setdefault(usuario_id, set()).update(meses)
+        return
+    if not hasattr(_estado, 'al_confirmar'):
+        _estado.al_confirmar = {}
+    _estado.al_confirmar.setdefault(usuario_id, set()).update(meses)
+    # Cada marca registra el vaciado, pero solo el primero que corre encuentra trabajo.
+    # Si la transacción se revierte, lo marcado se recalcula con la siguiente (sin daño:
+    # el recálculo parte de las pólizas)
+    transaction.on_commit(_recalcular_al_confirmar)
+
+
+def _recalcular_al_confirmar():
+    pendientes, _estado.al_confirmar = getattr(_estado, 'al_confirmar', {}), {}
+    _recalcular(pendientes)
+
+
+@contextmanager
+def resumen_agrupado():
+    """Acumula los meses marcados en el bloque y los recalcula una vez al salir."""
+    if getattr(_estado, 'pendientes', None) is not None:
+        # Anidado: el bloque exterior recalcula
+        yield
+        return
+    _estado.pendientes = {}
+    try:
+        yield
+    except BaseException:
+        pendientes, _estado.pendientes = _estado.pendientes, None
+        # Dentro de una transacción fallida no se puede consultar (y se revertirá);
+        # fuera de ella, lo que alcanzó a confirmarse sí hay que recalcularlo
+        if not transaction.get_connection().in_atomic_block:
+            _recalcular(pendientes)
+        raise
+    pendientes, _estado.pendientes = _estado.pendientes, None
+    _recalcular(pendientes)
+
+
+def _recalcular(pendientes):
+    for usuario_id, meses in pendientes.items():
+        recalcular_meses(usuario_id, meses)
+
+
+def recalcular_por_tasa(fecha, moneda='USD'):
+    """
+    Una tasa nueva o corregida cambia los bolívares de las pólizas emitidas
+    desde 'fecha' hasta la siguiente tasa registrada: recalcula esos meses.
+    """
+    if moneda != 'USD':
+        return
+    siguiente = (
+        TasaCambio.objects.filter(moneda=moneda, fecha__gt=fecha)
+        .order_by('fecha').values_list('fecha', flat=True).first()
+    )
+    afectadas = Poliza.objects.filter(fecha_emision__gte=fecha)
+    if siguiente:
+        afectadas = afectadas.filter(fecha_emision__lt=siguiente)
+    meses_por_usuario = {}
+    for usuario_id, mes in afectadas.annotate(mes=TruncMonth('fecha_emision')).values_list('usuario_id', 'mes').distinct().order_by():
+        meses_por_usuario.setdefault(usuario_id, set()).add(mes)
+    _recalcular(meses_por_usuario)
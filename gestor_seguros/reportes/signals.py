@@ -0,0 +1,65 @@
+# reportes/signals.py
+from django.db.models.signals import pre_save, post_save, pre_delete, post_delete
+from django.dispatch import receiver
+
+from polizas.models import Aseguradora, Poliza
+from .models import ResumenMensual, TasaCambio
+from .resumen import marcar_meses, recalcular_por_tasa
+
+# Campos de Poliza que cambian el resumen mensual
+CAMPOS_DEL_RESUMEN = {
+    'usuario', 'fecha_emision', 'ramo_tipo_seguro', 'aseguradora', 'estado_poliza',
+    'prima_total_anual', 'comision_monto', 'comision_cobrada',
+}
+
+
+def _afecta_resumen(update_fields):
+    return update_fields is None or bool(CAMPOS_DEL_RESUMEN.intersection(update_fields))
+
+
+@receiver(pre_save, sender=Poliza)
+def recordar_mes_anterior(sender, instance, raw=False, update_fields=None, **kwargs):
+    # El mes (y el usuario) de antes del cambio también hay que recalcularlo. Se
+    # toma de lo que se leyó de la base (Poliza.from_db); solo se consulta si la
+    # instancia no viene de una lectura completa
+    instance._resumen_anterior = None
+    if instance.pk and not raw and _afecta_resumen(update_fields):
+        instance._resumen_anterior = getattr(instance, '_emision_cargada', None) or (
+            Poliza.objects.filter(pk=instance.pk).values_list('usuario_id', 'fecha_emision').first()
+        )
+
+
+@receiver(post_save, sender=Poliza)
+def actualizar_resumen_por_poliza(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw or not _afecta_resumen(update_fields):
+        return
+    anterior = getattr(instance, '_resumen_anterior', None)
+    # Lo guardado pasa a ser el punto de partida del siguiente save() de esta instancia
+    instance._emision_cargada = (instance.usuario_id, instance.fecha_emision)
+    if anterior and anterior[0] != instance.usuario_id:
+        marcar_meses(anterior[0], [anterior[1]])
+        anterior = None
+    marcar_meses(instance.usuario_id, [instance.fecha_emision, anterior and anterior[1]])
+
+
+@receiver(post_delete, sender=Poliza)
+def actualizar_resumen_por_borrado(sender, instance, **kwargs):
+    marcar_meses(instance.usuario_id, [instance.fecha_emision])
+
+
+@receiver(pre_delete, sender=Aseguradora)
+def actualizar_resumen_por_aseguradora(sender, instance, **kwargs):
+    # Sus filas se borran en cascada y sus pólizas quedan sin aseguradora (sin señales
+    # de Poliza): se recalculan los meses en que tenía producción
+    meses_por_usuario = {}
+    filas = ResumenMensual.objects.filter(aseguradora=instance).values_list('usuario_id', 'mes').distinct().order_by()
+    for usuario_id, mes in filas:
+        meses_por_usuario.setdefault(usuario_id, []).append(mes)
+    for usuario_id, meses in meses_por_usuario.items():
+        marcar_meses(usuario_id, meses)
+
+
+@receiver([post_save, post_delete], sender=TasaCambio)
+def actualizar_resumen_por_tasa(sender, instance, raw=False, **kwargs):
+    if not raw:
+        recalcular_por_tasa(instance.fecha, instance.moneda)
@@ -0,0 +1,245 @@
+# reportes/tasas.py
+"""
+Tasa oficial BCV (bolívares por dólar). Las peticiones no esperan a los
+proveedores:
+
+- 'manage.py actualizar_tasa_bcv' (cron o --bucle) la refresca y la guarda en
+  la caché y en TasaCambio, el historial que usan los reportes.
+- tasa_actual() sirve la tasa de la caché (o la última del historial) aunque
+  esté vieja y, si lo está o no hay ninguna, lanza UNA revalidación en segundo
+  plano. Ninguna petición espera a los proveedores.
+- Un candado en la caché coalesce las revalidaciones: aunque lleguen muchas
+  peticiones a la vez, solo una consulta a los proveedores.
+- Los proveedores se consultan en paralelo y gana la primera respuesta válida.
+  Cada uno tiene un cortacircuitos: tras UMBRAL_FALLOS fallos seguidos se deja
+  de consultar durante ENFRIAMIENTO segundos.
+
+Las funciones reciben 'proveedores' (cualquier objeto con 'nombre' y
+obtener(timeout)) para poder usar sustitutos sin red en las pruebas.
+"""
+import logging
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed, TimeoutError as TiempoAgotado
+from decimal import Decimal
+
+import requests
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection, models
+from django.db.models import ExpressionWrapper, F, OuterRef, Subquery
+from django.utils import timezone
+
+from .models import TasaCambio
+
+logger = logging.getLogger(__name__)
+
+CLAVE_CACHE = 'tasa_bcv'
+CLAVE_CANDADO = 'tasa_bcv:refrescando'
+# La caché dura mucho más que la frescura: se sirve la tasa vieja mientras se revalida
+DURACION_CACHE = 60 * 60 * 24 * 7
+UMBRAL_FALLOS = 3
+ENFRIAMIENTO = 300
+DECIMALES = Decimal('0.000001')
+CABECERAS = {'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'}
+
+
+class TasaNoDisponible(Exception):
+    pass
+
+
+class ProveedorTasa:
+    """Fuente HTTP de la tasa; 'parser' extrae el valor del JSON de respuesta."""
+
+    def __init__(self, nombre, url, parser):
+        self.nombre = nombre
+        self.url = url
+        self.parser = parser
+
+    def obtener(self, timeout):
+        respuesta = requests.get(self.url, headers=CABECERAS, timeout=timeout)
+        respuesta.raise_for_status()
+        return self.parser(respuesta.json())
+
+
+PROVEEDORES = [
+    ProveedorTasa('dolarapi', 'https://ve.dolarapi.com/v1/dolares/oficial', lambda d: d.get('promedio')),
+    ProveedorTasa(
+        'pydolarve', 'https://pydolarve.org/api/v1/dollar?page=bcv',
+        lambda d: d.get('monitors', {}).get('usd', {}).get('price'),
+    ),
+]
+
+
+# --- Cortacircuitos por proveedor (en la caché, compartido por todos los workers) ---
+
+def _clave_circuito(nombre):
+    return f'tasa_bcv:circuito:{nombre}'
+
+
+def circuito_abierto(nombre):
+    estado = cache.get(_clave_circuito(nombre))
+    return bool(estado) and estado['abierto_hasta'] > time.time()
+
+
+def _registrar_resultado(nombre, exito):
+    clave = _clave_circuito(nombre)
+    if exito:
+        cache.delete(clave)
+        return
+    estado = cache.get(clave) or {'fallos': 0, 'abierto_hasta': 0}
+    estado['fallos'] += 1
+    # Pasado el enfriamiento se permite un intento; si falla, el circuito se vuelve a abrir
+    if estado['fallos'] >= UMBRAL_FALLOS:
+        estado['abierto_hasta'] = time.time() + ENFRIAMIENTO
+        logger.warning("Proveedor de tasa %s fuera de servicio por %s s (%s fallos seguidos)", nombre, ENFRIAMIENTO, estado['fallos'])
+    cache.set(clave, estado, timeout=ENFRIAMIENTO * 10)
+
+
+# --- Consulta a los proveedores ---
+
+def _consultar(proveedor, timeout):
+    tasa = Decimal(str(proveedor.obtener(timeout)))
+    if not tasa > 0:
+        raise ValueError(f"tasa inválida: {tasa}")
+    return tasa.quantize(DECIMALES)
+
+
+def consultar_proveedores(proveedores=None, timeout=None):
+    """
+    Consulta en paralelo los proveedores con el circuito cerrado y devuelve
+    (tasa, nombre del proveedor) de la primera respuesta válida, sin esperar a
+    los demás. Lanza TasaNoDisponible si ninguno responde a tiempo.
+    """
+    proveedores = PROVEEDORES if proveedores is None else proveedores
+    timeout = timeout or settings.TASA_BCV_TIMEOUT
+    habilitados = [p for p in proveedores if not circuito_abierto(p.nombre)]
+    if not habilitados:
+        raise TasaNoDisponible("Todos los proveedores tienen el circuito abierto.")
+
+    errores = []
+    pool = ThreadPoolExecutor(max_workers=len(habilitados))
+    futuros = {pool.submit(_consultar, proveedor, timeout): proveedor for proveedor in habilitados}
+    try:
+        for futuro in as_completed(futuros, timeout=timeout + 1):
+            proveedor = futuros[futuro]
+            try:
+                tasa = futuro.result()
+            except Exception as e:
+                _registrar_resultado(proveedor.nombre, False)
+                errores.append(f"{proveedor.nombre}: {e}")
+                continue
+            _registrar_resultado(proveedor.nombre, True)
+            return tasa, proveedor.nombre
+    except TiempoAgotado:
+        for futuro, proveedor in futuros.items():
+            if not futuro.done():
+                _registrar_resultado(proveedor.nombre, False)
+                errores.append(f"{proveedor.nombre}: sin respuesta en {timeout} s")
+    finally:
+        # No se espera a los más lentos: terminan solos con su propio timeout
+        pool.shutdown(wait=False, cancel_futures=True)
+    raise TasaNoDisponible('; '.join(errores))
+
+
+# --- Historial y caché ---
+
+def _dato_cache(tasa, fecha, fuente, obtenida):
+    return {'tasa': str(tasa), 'fecha': fecha.isoformat(), 'fuente': fuente, 'obtenida': obtenida}
+
+
+def guardar_tasa(tasa, fecha=None, fuente='', moneda='USD'):
+    """Registra la tasa del día en el historial; si es la de hoy, también en la caché."""
+    hoy = timezone.localdate()
+    fecha = fecha or hoy
+    registro, creada = TasaCambio.objects.get_or_create(moneda=moneda, fecha=fecha, defaults={'tasa': tasa, 'fuente': fuente})
+    # Sin cambios no se guarda: cada guardado recalcula el resumen mensual de esas fechas
+    if not creada and registro.tasa != tasa:
+        registro.tasa, registro.fuente = tasa, fuente
+        registro.save()
+    if moneda == 'USD' and fecha == hoy:
+        cache.set(CLAVE_CACHE, _dato_cache(tasa, fecha, fuente, time.time()), DURACION_CACHE)
+
+
+def refrescar_tasa(proveedores=None):
+    """Consulta los proveedores y guarda la tasa. Devuelve (tasa, fuente)."""
+    tasa, fuente = consultar_proveedores(proveedores)
+    guardar_tasa(tasa, fuente=fuente)
+    logger.info("Tasa BCV obtenida de %s: %s", fuente, tasa)
+    return tasa, fuente
+
+
+def _refrescar_con_candado(proveedores):
+    """Refresca si el candado ya es nuestro; lo suelta al terminar."""
+    try:
+        refrescar_tasa(proveedores)
+    except TasaNoDisponible as e:
+        logger.error("No se pudo obtener la tasa BCV: %s", e)
+    finally:
+        cache.delete(CLAVE_CANDADO)
+
+
+def _revalidar_en_segundo_plano(proveedores):
+    def revalidar():
+        try:
+            _refrescar_con_candado(proveedores)
+        finally:
+            connection.close()
+
+    threading.Thread(target=revalidar, name='revalidar-tasa-bcv', daemon=True).start()
+
+
+def _tomar_candado():
+    # El vencimiento libera el candado si el proceso muere a mitad del refresco
+    return cache.add(CLAVE_CANDADO, True, timeout=settings.TASA_BCV_TIMEOUT * 3)
+
+
+def tasa_actual(proveedores=None):
+    """
+    Tasa para mostrar ya: {'tasa', 'fecha', 'fuente', 'desactualizada'} o None.
+    Con la caché vacía se sirve la última del historial. Nunca consulta a los
+    proveedores dentro de la petición: en un arranque en frío (sin caché ni
+    historial) devuelve None y la tasa aparece cuando termina la revalidación.
+    """
+    dato = cache.get(CLAVE_CACHE)
+    if dato is None:
+        ultima = TasaCambio.objects.filter(moneda='USD').order_by('-fecha').first()
+        if ultima is not None:
+            dato = _dato_cache(ultima.tasa, ultima.fecha, ultima.fuente, ultima.fecha_actualizacion.timestamp())
+            cache.set(CLAVE_CACHE, dato, DURACION_CACHE)
+
+    vieja = dato is None or time.time() - dato['obtenida'] > settings.TASA_BCV_FRESCURA
+    if vieja and _tomar_candado():
+        _revalidar_en_segundo_plano(proveedores)
+    if dato is None:
+        return None
+    return dict(dato, desactualizada=vieja)
+
+
+def tasa_en(fecha, moneda='USD'):
+    """Tasa vigente en 'fecha' según el historial (la última publicada hasta ese día), o None."""
+    return (
+        TasaCambio.objects.filter(moneda=moneda, fecha__lte=fecha)
+        .order_by('-fecha').values_list('tasa', flat=True).first()
+    )
+
+
+# --- Conversión en SQL (reportes) ---
+
+def tasa_en_fecha(campo_fecha, moneda='USD'):
+    """
+    Subconsulta correlacionada con la tasa vigente en la fecha 'campo_fecha' de
+    cada fila (la última publicada hasta ese día; NULL si no hay ninguna).
+    Usa el índice único (moneda, fecha) de TasaCambio.
+    """
+    return Subquery(
+        TasaCambio.objects.filter(moneda=moneda, fecha__lte=OuterRef(campo_fecha))
+        .order_by('-fecha').values('tasa')[:1],
+        output_field=models.DecimalField(max_digits=18, decimal_places=6),
+    )
+
+
+def en_bolivares(campo_monto, campo_tasa='tasa'):
+    """Monto por tasa (anotada con tasa_en_fecha), para usar dentro de Sum()."""
+    return ExpressionWrapper(F(campo_monto) * F(campo_tasa), output_field=models.DecimalField(max_digits=24, decimal_places=2))
+
@@ -1,3 +1,315 @@
-from django.test import TestCase
+import csv
+import io
+import time
+from datetime import date
+from decimal import Decimal
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.db import IntegrityError, connection, transaction
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from clientes.models import Cliente
+from polizas.models import Asegurado, Aseguradora, Poliza, Siniestro
+from . import resumen, tasas
+from .exportacion import (
+    CABECERAS_POLIZAS, contar_filas_reporte, escribir_xlsx_reporte, generar_csv_polizas, hojas_reporte,
+    polizas_para_exportar,
+)
+from .models import ResumenMensual, TasaCambio
+
+
+class ProveedorFalso:
+    """Sustituto sin red: devuelve 'tasa' o lanza 'error' y cuenta las consultas."""
+
+    def __init__(self, nombre, tasa=None, error=None):
+        self.nombre = nombre
+        self.tasa = tasa
+        self.error = error
+        self.consultas = 0
+
+    def obtener(self, timeout):
+        self.consultas += 1
+        if self.error:
+            raise self.error
+        return self.tasa
+
+
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    TASA_BCV_FRESCURA=3600, TASA_BCV_TIMEOUT=1,
+)
+class TasaBcvTests(TestCase):
+
+    def setUp(self):
+        cache.clear()
+        revalidar = mock.patch('reportes.tasas._revalidar_en_segundo_plano')
+        self.revalidar = revalidar.start()
+        self.addCleanup(revalidar.stop)
+
+    def guardar_en_cache(self, hace_segundos):
+        cache.set(tasas.CLAVE_CACHE, tasas._dato_cache(
+            Decimal('36.5'), timezone.localdate(), 'dolarapi', time.time() - hace_segundos,
+        ))
+
+    # --- Servir sin esperar a los proveedores ---
+
+    def test_tasa_fresca_no_revalida(self):
+        self.guardar_en_cache(hace_segundos=60)
+        dato = tasas.tasa_actual()
+        self.assertEqual(dato['tasa'], '36.5')
+        self.assertFalse(dato['desactualizada'])
+        self.revalidar.assert_not_called()
+
+    def test_tasa_vieja_se_sirve_y_se_revalida_una_sola_vez(self):
+        self.guardar_en_cache(hace_segundos=7200)
+        proveedor = ProveedorFalso('lento', tasa='40')
+        for _ in range(3):
+            dato = tasas.tasa_actual([proveedor])
+            self.assertEqual(dato['tasa'], '36.5')
+            self.assertTrue(dato['desactualizada'])
+        self.revalidar.assert_called_once_with([proveedor])
+        self.assertEqual(proveedor.consultas, 0)
+
+    def test_con_la_cache_vacia_se_sirve_el_historial(self):
+        TasaCambio.objects.create(fecha=timezone.localdate(), tasa=Decimal('35.1'), fuente='manual')
+        proveedor = ProveedorFalso('lento', tasa='40')
+        dato = tasas.tasa_actual([proveedor])
+        self.assertEqual(Decimal(dato['tasa']), Decimal('35.1'))
+        self.assertEqual(proveedor.consultas, 0)
+        self.revalidar.assert_not_called()
+
+    def test_arranque_en_frio_no_consulta_dentro_de_la_peticion(self):
+        proveedor = ProveedorFalso('lento', tasa='40')
+        self.assertIsNone(tasas.tasa_actual([proveedor]))
+        self.assertEqual(proveedor.consultas, 0)
+        self.revalidar.assert_called_once_with([proveedor])
+
+    def test_la_revalidacion_guarda_la_tasa_y_suelta_el_candado(self):
+        self.assertTrue(tasas._tomar_candado())
+        tasas._refrescar_con_candado([ProveedorFalso('dolarapi', tasa='41.25')])
+        self.assertEqual(tasas.tasa_actual()['tasa'], '41.250000')
+        self.assertTrue(TasaCambio.objects.filter(fecha=timezone.localdate(), tasa=Decimal('41.25')).exists())
+        self.assertTrue(tasas._tomar_candado())
+
+    # --- Proveedores: respaldo y cortacircuitos ---
+
+    def test_si_un_proveedor_falla_responde_el_otro(self):
+        caido = ProveedorFalso('caido', error=ConnectionError("sin red"))
+        respaldo = ProveedorFalso('respaldo', tasa='36.75')
+        self.assertEqual(tasas.consultar_proveedores([caido, respaldo]), (Decimal('36.750000'), 'respaldo'))
+
+    def test_una_tasa_invalida_cuenta_como_fallo(self):
+        with self.assertRaises(tasas.TasaNoDisponible):
+            tasas.consultar_proveedores([ProveedorFalso('roto', tasa='0')])
+
+    def test_el_circuito_se_abre_tras_los_fallos_seguidos(self):
+        caido = ProveedorFalso('caido', error=ConnectionError("sin red"))
+        respaldo = ProveedorFalso('respaldo', tasa='36.75')
+        for _ in range(tasas.UMBRAL_FALLOS):
+            tasas.consultar_proveedores([caido, respaldo])
+        self.assertTrue(tasas.circuito_abierto('caido'))
+        self.assertFalse(tasas.circuito_abierto('respaldo'))
+
+        tasas.consultar_proveedores([caido, respaldo])
+        self.assertEqual(caido.consultas, tasas.UMBRAL_FALLOS)
+
+        with self.assertRaises(tasas.TasaNoDisponible):
+            tasas.consultar_proveedores([caido])
+
+    def test_un_exito_cierra_el_circuito(self):
+        inestable = ProveedorFalso('inestable', error=ConnectionError("sin red"))
+        for _ in range(tasas.UMBRAL_FALLOS - 1):
+            with self.assertRaises(tasas.TasaNoDisponible):
+                tasas.consultar_proveedores([inestable])
+        inestable.error, inestable.tasa = None, '37'
+        tasas.consultar_proveedores([inestable])
+        inestable.error = ConnectionError("sin red")
+        with self.assertRaises(tasas.TasaNoDisponible):
+            tasas.consultar_proveedores([inestable])
+        self.assertFalse(tasas.circuito_abierto('inestable'))
+
+
+class ResumenMensualTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('corredor', 'corredor@example.com', 'clave')
+        cls.cliente = Cliente.objects.create(usuario=cls.usuario, nombre_completo="Ana Pérez", numero_documento='V-1')
+
+    def crear_poliza(self, numero, emision, aseguradora=None):
+        # Sin aseguradora por defecto: es el caso que la clave única con NULL no protegía
+        with self.captureOnCommitCallbacks(execute=True):
+            return Poliza.objects.create(
+                usuario=self.usuario, cliente=self.cliente, aseguradora=aseguradora,
+                numero_poliza=numero, ramo_tipo_seguro='Salud',
+                fecha_emision=emision, fecha_inicio_vigencia=emision, fecha_fin_vigencia=emision.replace(year=emision.year + 1),
+                prima_total_anual=Decimal('1200'), frecuencia_pago='ANUAL', estado_poliza='VIGENTE',
+            )
+
+    def cantidades(self):
+        return dict(ResumenMensual.objects.values_list('mes', 'cantidad'))
+
+    def test_recalcular_dos_veces_no_duplica_las_filas_sin_aseguradora(self):
+        self.crear_poliza('P-1', date(2026, 1, 10))
+        self.crear_poliza('P-2', date(2026, 1, 20))
+        resumen.recalcular_meses(self.usuario.pk, [date(2026, 1, 1)])
+        resumen.recalcular_meses(self.usuario.pk, [date(2026, 1, 1)])
+        self.assertEqual(self.cantidades(), {date(2026, 1, 1): 2})
+
+        fila = ResumenMensual.objects.get()
+        fila.pk = None
+        with self.assertRaises(IntegrityError), transaction.atomic():
+            fila.save()
+
+    def test_solo_se_rehacen_los_meses_marcados(self):
+        self.crear_poliza('P-1', date(2026, 1, 10))
+        self.crear_poliza('P-2', date(2026, 3, 10))
+        intacta = ResumenMensual.objects.create(usuario=self.usuario, mes=date(2026, 2, 1), ramo='Salud', estado='VIGENTE', cantidad=7)
+        resumen.recalcular_meses(self.usuario.pk, [date(2026, 1, 5), date(2026, 3, 5)])
+        self.assertEqual(ResumenMensual.objects.get(pk=intacta.pk).cantidad, 7)
+
+    def test_cambiar_la_emision_mueve_la_poliza_de_mes_sin_releerla(self):
+        self.crear_poliza('P-1', date(2026, 1, 10))
+        poliza = Poliza.objects.get(numero_poliza='P-1')
+        poliza.fecha_emision = date(2026, 4, 2)
+        with self.captureOnCommitCallbacks(execute=True):
+            with CaptureQueriesContext(connection) as consultas:
+                poliza.save()
+        releidas = [q['sql'] for q in consultas.captured_queries if q['sql'].startswith('SELECT "polizas_poliza"."usuario_id"')]
+        self.assertEqual(releidas, [])
+        self.assertEqual(self.cantidades(), {date(2026, 4, 1): 1})
+
+    def test_borrar_el_cliente_recalcula_una_vez(self):
+        for numero, mes in enumerate([1, 2, 2, 5]):
+            self.crear_poliza(f'P-{numero}', date(2026, mes, 10))
+        with mock.patch('reportes.resumen.recalcular_meses', wraps=resumen.recalcular_meses) as recalcular:
+            with self.captureOnCommitCallbacks(execute=True):
+                self.cliente.delete()
+        recalcular.assert_called_once()
+        self.assertEqual(ResumenMensual.objects.count(), 0)
+
+    def test_borrar_una_aseguradora_pasa_sus_polizas_a_sin_aseguradora(self):
+        aseguradora = Aseguradora.objects.create(usuario=self.usuario, nombre="Mapfre")
+        self.crear_poliza('P-1', date(2026, 1, 10), aseguradora)
+        self.crear_poliza('P-2', date(2026, 1, 20))
+        self.assertEqual(ResumenMensual.objects.count(), 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            aseguradora.delete()
+        fila = ResumenMensual.objects.get()
+        self.assertEqual((fila.aseguradora_id, fila.cantidad), (None, 2))
+
+
+    def test_los_montos_se_convierten_a_la_tasa_de_la_fecha_de_emision(self):
+        for fecha, tasa in [(date(2026, 1, 5), '40'), (date(2026, 1, 15), '50'), (date(2026, 2, 1), '60')]:
+            TasaCambio.objects.create(moneda='USD', fecha=fecha, tasa=Decimal(tasa))
+        TasaCambio.objects.create(moneda='EUR', fecha=date(2026, 1, 1), tasa=Decimal('99'))
+        # Antes de la primera tasa, el mismo día de una, entre dos y después de la última del mes
+        for numero, emision in enumerate([date(2026, 1, 3), date(2026, 1, 5), date(2026, 1, 10), date(2026, 1, 20), date(2026, 2, 14)]):
+            self.crear_poliza(f'P-{numero}', emision)
+
+        convertidas = Poliza.objects.annotate(
+            tasa=tasas.tasa_en_fecha('fecha_emision'), prima_ves=tasas.en_bolivares('prima_total_anual'),
+        ).order_by('numero_poliza').values_list('tasa', 'prima_ves')
+        self.assertEqual(list(convertidas), [
+            (None, None), (Decimal('40'), Decimal('48000')), (Decimal('40'), Decimal('48000')),
+            (Decimal('50'), Decimal('60000')), (Decimal('60'), Decimal('72000')),
+        ])
+
+        filas = {fila.mes: fila for fila in ResumenMensual.objects.all()}
+        enero, febrero = filas[date(2026, 1, 1)], filas[date(2026, 2, 1)]
+        self.assertEqual((enero.cantidad, enero.prima_total), (4, Decimal('4800')))
+        # La póliza sin tasa no suma en bolívares y queda contada aparte
+        self.assertEqual((enero.prima_total_ves, enero.polizas_sin_tasa), (Decimal('156000'), 1))
+        self.assertEqual((febrero.prima_total_ves, febrero.polizas_sin_tasa), (Decimal('72000'), 0))
+
+class ExportacionTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('corredor', 'corredor@example.com', 'clave')
+        cls.otro = User.objects.create_user('otro', 'otro@example.com', 'clave')
+        ana = Cliente.objects.create(usuario=cls.usuario, nombre_completo="Ana Pérez", numero_documento='111')
+        beto = Cliente.objects.create(usuario=cls.usuario, nombre_completo="Beto Ruiz", numero_documento='222')
+        aseguradora = Aseguradora.objects.create(usuario=cls.usuario, nombre="Mapfre")
+        cls.polizas = {}
+        for numero, cliente, asegura, fin, frecuencia, cobrada in [
+            ('P-B1', beto, aseguradora, date(2027, 1, 1), 'TRIMESTRAL', False),
+            ('P-A2', ana, aseguradora, date(2027, 6, 1), 'ANUAL', True),
+            ('P-A1', ana, None, date(2027, 3, 1), 'ANUAL', False),
+        ]:
+            cls.polizas[numero] = Poliza.objects.create(
+                usuario=cls.usuario, cliente=cliente, aseguradora=asegura, numero_poliza=numero,
+                ramo_tipo_seguro='Salud', fecha_emision=date(2026, 1, 5), fecha_inicio_vigencia=date(2026, 1, 5),
+                fecha_fin_vigencia=fin, prima_total_anual=Decimal('1200'), comision_monto=Decimal('120'),
+                comision_cobrada=cobrada, frecuencia_pago=frecuencia, estado_poliza='VIGENTE',
+            )
+            cls.polizas[numero].generar_plan_de_pagos()
+        Siniestro.objects.create(
+            usuario=cls.usuario, poliza=cls.polizas['P-A2'], fecha_ocurrencia=date(2026, 4, 2), descripcion="Choque",
+        )
+        for nombre in ("Luis Ruiz", "Eva Ruiz"):
+            Asegurado.objects.create(poliza=cls.polizas['P-B1'], nombre_completo=nombre)
+        ajena = Cliente.objects.create(usuario=cls.otro, nombre_completo="Ajeno", numero_documento='333')
+        Poliza.objects.create(
+            usuario=cls.otro, cliente=ajena, numero_poliza='X-1', fecha_inicio_vigencia=date(2026, 1, 5),
+            fecha_fin_vigencia=date(2027, 1, 5), prima_total_anual=Decimal('100'),
+        )
+
+    def test_csv_con_bom_cabeceras_y_punto_y_coma(self):
+        bloques = list(generar_csv_polizas(polizas_para_exportar(self.usuario), filas_por_bloque=2))
+        # Cabeceras, un bloque de dos filas y el resto
+        self.assertEqual(len(bloques), 3)
+        self.assertEqual(bloques[0], ('\ufeff' + ';'.join(CABECERAS_POLIZAS) + '\r\n').encode('utf-8'))
+
+    def test_csv_ordenado_por_cliente_y_fin_de_vigencia(self):
+        contenido = b''.join(generar_csv_polizas(polizas_para_exportar(self.usuario))).decode('utf-8-sig')
+        cabeceras, *filas = csv.reader(io.StringIO(contenido), delimiter=';')
+        self.assertEqual(cabeceras, CABECERAS_POLIZAS)
+        self.assertEqual([fila[1] for fila in filas], ['P-A1', 'P-A2', 'P-B1'])
+        self.assertEqual(dict(zip(cabeceras, filas[0])), {
+            'ID Poliza': str(self.polizas['P-A1'].pk), 'Nro. Poliza': 'P-A1', 'Cliente': "Ana Pérez",
+            'Documento Cliente': 'Cédula Venezolana (V)-111', 'Email Cliente': '', 'Telefono Cliente': '',
+            'Aseguradora': 'N/A', 'Ramo': 'Salud', 'Bien Asegurado (Placa)': '',
+            'Fecha Emision': '05/01/2026', 'Fecha Inicio Vigencia': '05/01/2026', 'Fecha Fin Vigencia': '01/03/2027',
+            'Prima Total Anual': '1200.00', 'Monto Comision': '120.00', 'Comision Cobrada': 'No',
+            'Estado de la Poliza': 'Vigente', 'Frecuencia de Pago': 'Anual',
+        })
+        self.assertEqual(filas[1][14], 'Si')
+
+    def leer_xlsx(self, usuario):
+        salida = io.BytesIO()
+        escritas = escribir_xlsx_reporte(salida, polizas_para_exportar(usuario))
+        libro = openpyxl.load_workbook(salida, read_only=True)
+        hojas = {hoja.title: list(hoja.iter_rows(values_only=True)) for hoja in libro.worksheets}
+        libro.close()
+        return escritas, hojas
+
+    def test_xlsx_con_una_hoja_por_modelo(self):
+        escritas, hojas = self.leer_xlsx(self.usuario)
+        # Trimestral: 4 cuotas; anual: 1
+        esperadas = {'Polizas': 3, 'Cuotas': 6, 'Siniestros': 1, 'Asegurados': 2}
+        self.assertEqual(list(hojas), ['Polizas', 'Cuotas', 'Siniestros', 'Asegurados'])
+        self.assertEqual(escritas, esperadas)
+        self.assertEqual({titulo: len(filas) - 1 for titulo, filas in hojas.items()}, esperadas)
+        self.assertEqual(contar_filas_reporte(polizas_para_exportar(self.usuario)), 12)
+        self.assertEqual([titulo for titulo, _, _, _ in hojas_reporte(polizas_para_exportar(self.usuario))], list(hojas))
+
+        self.assertEqual(hojas['Polizas'][0], tuple(CABECERAS_POLIZAS))
+        self.assertEqual([fila[1] for fila in hojas['Polizas'][1:]], ['P-A1', 'P-A2', 'P-B1'])
+        # En Excel las fechas van como fechas, no como texto
+        self.assertEqual(hojas['Polizas'][1][11].date(), date(2027, 3, 1))
+        self.assertEqual(hojas['Siniestros'][1][2:4], ('P-A2', "Ana Pérez"))
+        self.assertEqual([fila[3] for fila in hojas['Asegurados'][1:]], ["Luis Ruiz", "Eva Ruiz"])
+
+    def test_xlsx_de_una_cartera_vacia_solo_lleva_cabeceras(self):
+        Poliza.objects.filter(usuario=self.otro).delete()
+        escritas, hojas = self.leer_xlsx(self.otro)
+        self.assertEqual(escritas, {'Polizas': 0, 'Cuotas': 0, 'Siniestros': 0, 'Asegurados': 0})
+        self.assertEqual({titulo: len(filas) for titulo, filas in hojas.items()}, dict.fromkeys(escritas, 1))
@@ -6,4 +6,6 @@ app_name = 'reportes'
 urlpatterns = [
     path('', views.reportes_dashboard, name='dashboard_reportes'),
     path('exportar/polizas/', views.exportar_polizas_csv, name='exportar_polizas_csv'),
+    path('exportar/excel/', views.exportar_reporte_xlsx, name='exportar_reporte_xlsx'),
+    path('exportar/polizas/segundo-plano/', views.exportar_polizas_segundo_plano, name='exportar_polizas_segundo_plano'),
 ]
\ No newline at end of file
@@ -1,15 +1,26 @@
-import csv
-from django.db import models
-from django.http import HttpResponse
+from collections import defaultdict
+from decimal import Decimal
+
+from django.http import StreamingHttpResponse
 from django.shortcuts import render
 from django.contrib.auth.decorators import login_required
-from django.db.models import Sum, Count,Q
-from django.db.models.functions import TruncMonth
+from django.views.decorators.http import require_POST
+from django.utils.dateparse import parse_date
 from datetime import datetime
-from polizas.models import Poliza
 from django.utils import timezone
-from polizas.models import Poliza, Aseguradora
 from django.shortcuts import render
+from django.contrib import messages
+from django.shortcuts import redirect
+from tareas.cola import encolar_tarea, tareas_recientes
+from .exportacion import polizas_para_exportar, generar_csv_polizas
+from .resumen import CAMPOS_SUMABLES, filas_del_periodo, cartera_por_ramo_y_aseguradora
+
+
+def _fecha(valor):
+    try:
+        return parse_date(valor or '')
+    except ValueError:
+        return None
 
 
 @login_required
@@ -18,51 +29,39 @@ def reportes_dashboard(request):
     
     fecha_inicio_str = request.GET.get('fecha_inicio')
     fecha_fin_str = request.GET.get('fecha_fin')
-    
-    # Queryset base para TODAS las pólizas del usuario
-    polizas_base = Poliza.objects.filter(usuario=user)
-    
-    # Queryset para los datos que SÍ dependen del período (KPIs y gráfico de barras)
-    polizas_query_periodo = polizas_base
-    if fecha_inicio_str:
-        polizas_query_periodo = polizas_query_periodo.filter(fecha_emision__gte=fecha_inicio_str)
-    if fecha_fin_str:
-        # Añadimos +1 día al filtro 'lte' si usamos fechas, para incluir el día completo
-        # Pero como el input es 'date', no es necesario.
-        polizas_query_periodo = polizas_query_periodo.filter(fecha_emision__lte=fecha_fin_str)
+
+    # Todo sale del resumen mensual precalculado (ver reportes/resumen.py): el costo
+    # depende de la cantidad de meses del periodo, no de la cantidad de pólizas.
+    filas_periodo = filas_del_periodo(user, _fecha(fecha_inicio_str), _fecha(fecha_fin_str))
+
+    totales = dict.fromkeys(CAMPOS_SUMABLES, 0)
+    prima_por_mes = defaultdict(Decimal)
+    for fila in filas_periodo:
+        for campo in CAMPOS_SUMABLES:
+            totales[campo] += fila[campo]
+        prima_por_mes[fila['mes']] += fila['prima_total']
 
     # 1. Producción por Mes (para gráfico de barras)
-    produccion_por_mes = list(polizas_query_periodo.filter(
-        prima_total_anual__gt=0
-    ).annotate(
-        mes=TruncMonth('fecha_emision')
-    ).values('mes').annotate(
-        total_prima=Sum('prima_total_anual')
-    ).order_by('mes'))
-
-    # 2. Resumen de Comisiones (para KPI)
-    comisiones = polizas_query_periodo.aggregate(
-        cobradas=Sum('comision_monto', filter=Q(comision_cobrada=True), default=0),
-        pendientes=Sum('comision_monto', filter=Q(comision_cobrada=False), default=0),
-    )
-    
-    # 3. Cartera por Ramo (para gráfico de dona)
-    cartera_por_ramo = list(polizas_base.values('ramo_tipo_seguro').annotate(
-        cantidad=Count('id')
-    ).order_by('-cantidad'))
-    
-    # 4. Cartera por Aseguradora (NUEVO GRÁFICO)
-    cartera_por_aseguradora = list(polizas_base.annotate(
-        nombre_aseguradora=models.F('aseguradora__nombre')
-    ).values('nombre_aseguradora').annotate(
-        cantidad=Count('id')
-    ).order_by('-cantidad'))
-
-    # 5. KPIs
-    agregados_kpi = polizas_query_periodo.aggregate(
-        total_primas=Sum('prima_total_anual', default=0),
-        total_polizas=Count('id')
-    )
+    produccion_por_mes = [
+        {'mes': mes, 'total_prima': total} for mes, total in sorted(prima_por_mes.items()) if total > 0
+    ]
+
+    # 2 y 3. Cartera por Ramo y por Aseguradora (todo el historial, sin filtro de fechas)
+    cartera_por_ramo, cartera_por_aseguradora = cartera_por_ramo_y_aseguradora(user)
+
+    # 4. KPIs y comisiones, en dólares y en bolívares (a la tasa de la fecha de emisión)
+    comisiones = {
+        'cobradas': totales['comisiones_cobradas'],
+        'pendientes': totales['comisiones_pendientes'],
+        'cobradas_ves': totales['comisiones_cobradas_ves'],
+        'pendientes_ves': totales['comisiones_pendientes_ves'],
+    }
+    agregados_kpi = {
+        'total_primas': totales['prima_total'],
+        'total_polizas': totales['cantidad'],
+        'total_primas_ves': totales['prima_total_ves'],
+        'polizas_sin_tasa': totales['polizas_sin_tasa'],
+    }
 
     context = {
         # --- Datos para los Gráficos ---
@@ -74,10 +73,12 @@ def reportes_dashboard(request):
         'comisiones': comisiones,
         'total_primas': agregados_kpi.get('total_primas'),
         'total_polizas_periodo': agregados_kpi.get('total_polizas'),
+        'total_primas_ves': agregados_kpi.get('total_primas_ves'),
+        'polizas_sin_tasa': agregados_kpi.get('polizas_sin_tasa'),
         'fecha_inicio': fecha_inicio_str,
         'fecha_fin': fecha_fin_str,
         'titulo_pagina': 'Reportes de Agencia',
-
+        'tareas_recientes': tareas_recientes(user),
     }
     return render(request, 'reportes/reportes_dashboard.html', context)
 
@@ -85,69 +86,42 @@ def reportes_dashboard(request):
 # --- VISTA DE EXPORTACIÓN ---
 @login_required
 def exportar_polizas_csv(request):
-    # --- 1. Definir el nombre del archivo y la respuesta HTTP ---
+    # --- 1. Obtener los filtros de fecha de la URL (si existen) ---
+    fecha_inicio_str = request.GET.get('fecha_inicio')
+    fecha_fin_str = request.GET.get('fecha_fin')
+    polizas_query = polizas_para_exportar(request.user, fecha_inicio_str, fecha_fin_str)
+
+    # --- 2. Respuesta en streaming: el archivo se envía por bloques mientras se lee la BD ---
+    # (ver reportes/exportacion.py; incluye el BOM para compatibilidad con Excel)
     filename = f'reporte_polizas_{datetime.now().strftime("%Y-%m-%d")}.csv'
-    response = HttpResponse(content_type='text/csv')
+    response = StreamingHttpResponse(generar_csv_polizas(polizas_query), content_type='text/csv')
     response['Content-Disposition'] = f'attachment; filename="{filename}"'
-    
-    # --- 2. Añadir BOM para compatibilidad con Excel ---
-    # BOM (Byte Order Mark) le dice a Excel que el archivo es UTF-8
-    response.write('\ufeff'.encode('utf8'))
+    return response
 
-    # --- 3. Obtener los filtros de fecha de la URL (si existen) ---
-    fecha_inicio_str = request.GET.get('fecha_inicio')
-    fecha_fin_str = request.GET.get('fecha_fin')
 
-    # --- 4. Construir el queryset filtrado ---
-    polizas_query = Poliza.objects.filter(usuario=request.user).select_related('cliente', 'aseguradora').order_by('cliente__nombre_completo', 'fecha_fin_vigencia')
-
-    if fecha_inicio_str:
-        polizas_query = polizas_query.filter(fecha_emision__gte=fecha_inicio_str)
-    if fecha_fin_str:
-        polizas_query = polizas_query.filter(fecha_emision__lte=fecha_fin_str)
-
-    # --- 5. Definir las cabeceras del CSV (más claras y en español) ---
-    writer = csv.writer(response, delimiter=';')
-    writer.writerow([
-        'ID Poliza',
-        'Nro. Poliza',
-        'Cliente',
-        'Documento Cliente',
-        'Email Cliente',
-        'Telefono Cliente',
-        'Aseguradora',
-        'Ramo',
-        'Bien Asegurado (Placa)',
-        'Fecha Emision',
-        'Fecha Inicio Vigencia',
-        'Fecha Fin Vigencia',
-        'Prima Total Anual',
-        'Monto Comision',
-        'Comision Cobrada',
-        'Estado de la Poliza',
-        'Frecuencia de Pago',
-    ])
-
-    # --- 6. Escribir los datos de cada póliza en el CSV ---
-    for poliza in polizas_query:
-        writer.writerow([
-            poliza.id,
-            poliza.numero_poliza,
-            poliza.cliente.nombre_completo,
-            f"{poliza.cliente.get_tipo_documento_display()}-{poliza.cliente.numero_documento}",
-            poliza.cliente.email,
-            poliza.cliente.telefono_principal,
-            poliza.aseguradora.nombre if poliza.aseguradora else 'N/A',
-            poliza.ramo_tipo_seguro,
-            poliza.descripcion_bien_asegurado,
-            poliza.fecha_emision.strftime('%d/%m/%Y'),
-            poliza.fecha_inicio_vigencia.strftime('%d/%m/%Y'),
-            poliza.fecha_fin_vigencia.strftime('%d/%m/%Y'),
-            poliza.prima_total_anual,
-            poliza.comision_monto,
-            'Si' if poliza.comision_cobrada else 'No',
-            poliza.get_estado_poliza_display(),
-            poliza.get_frecuencia_pago_display(),
-        ])
-        
-    return response
\ No newline at end of file
+# --- EXPORTACIÓN EN SEGUNDO PLANO (para carteras grandes) ---
+# Solo por POST: crean una tarea, así que un enlace precargado o un rastreador no debe dispararlas
+
+def _encolar_exportacion(request, formato):
+    parametros = {
+        'fecha_inicio': request.POST.get('fecha_inicio') or None,
+        'fecha_fin': request.POST.get('fecha_fin') or None,
+        'formato': formato,
+    }
+    encolar_tarea(request.user, 'EXPORTAR_POLIZAS', parametros=parametros)
+    messages.info(request, "La exportación se está generando en segundo plano. El enlace de descarga aparecerá en esta página.")
+    return redirect('reportes:dashboard_reportes')
+
+
+@login_required
+@require_POST
+def exportar_reporte_xlsx(request):
+    # El libro (pólizas, cuotas, siniestros y asegurados) lo arma el worker
+    # (tareas/manejadores.py): con una cartera grande tarda más que una petición
+    return _encolar_exportacion(request, 'xlsx')
+
+
+@login_required
+@require_POST
+def exportar_polizas_segundo_plano(request):
+    return _encolar_exportacion(request, 'xlsx' if request.POST.get('formato') == 'xlsx' else 'csv')
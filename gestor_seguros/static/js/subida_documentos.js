@@ -0,0 +1,132 @@
+(function() {
+    // Subida de documentos por partes y reanudable (ver documentos/almacen.py).
+    // El archivo se envía en trozos; si la conexión se corta, se reintenta y, si se
+    // recarga la página y se elige el mismo archivo, se sigue desde el último byte recibido.
+    // Sin fetch/File.slice el formulario se envía de la forma normal.
+    const MAX_REINTENTOS = 5;
+    const MAX_HASH_BYTES = 20 * 1024 * 1024; // Por encima no se calcula el hash en el navegador
+
+    function clave(archivo) {
+        return 'subida:' + [archivo.name, archivo.size, archivo.lastModified].join(':');
+    }
+
+    function csrf(form) {
+        return form.querySelector('input[name="csrfmiddlewaretoken"]').value;
+    }
+
+    function esperar(ms) {
+        return new Promise(resolve => setTimeout(resolve, ms));
+    }
+
+    async function sha256(archivo) {
+        if (!window.crypto || !crypto.subtle || archivo.size > MAX_HASH_BYTES) {
+            return '';
+        }
+        const resumen = await crypto.subtle.digest('SHA-256', await archivo.arrayBuffer());
+        return Array.from(new Uint8Array(resumen)).map(b => b.toString(16).padStart(2, '0')).join('');
+    }
+
+    async function pedir(url, form, cuerpo) {
+        const response = await fetch(url, {
+            method: cuerpo ? 'POST' : 'GET',
+            headers: { 'X-CSRFToken': csrf(form), 'Accept': 'application/json' },
+            body: cuerpo,
+        });
+        const data = await response.json().catch(() => ({}));
+        return { status: response.status, data: data };
+    }
+
+    // Sesión guardada para este archivo (si sigue abierta en el servidor) o una nueva
+    async function abrirSesion(form, archivo) {
+        const guardada = localStorage.getItem(clave(archivo));
+        if (guardada) {
+            const r = await pedir(guardada, form).catch(() => null);
+            if (r && r.status === 200) {
+                return r.data;
+            }
+            localStorage.removeItem(clave(archivo));
+        }
+        const datos = new FormData();
+        datos.append('titulo', form.querySelector('[name="titulo"]').value);
+        datos.append('nombre', archivo.name);
+        datos.append('tamano', archivo.size);
+        datos.append('sha256', await sha256(archivo));
+        const r = await pedir(form.dataset.subidaUrl, form, datos);
+        if (r.status !== 200 && r.status !== 201) {
+            throw new Error(r.data.error || 'No se pudo iniciar la subida.');
+        }
+        if (!r.data.completa) {
+            localStorage.setItem(clave(archivo), r.data.url_subida);
+        }
+        return r.data;
+    }
+
+    async function subir(form, archivo, progreso) {
+        let estado = await abrirSesion(form, archivo);
+        const tamanoTrozo = estado.tamano_trozo;
+        const url = estado.url_subida;
+        let recibido = estado.recibido || 0;
+        let fallos = 0;
+
+        while (!estado.completa) {
+            progreso(recibido / archivo.size);
+            const datos = new FormData();
+            datos.append('desde', recibido);
+            datos.append('trozo', archivo.slice(recibido, recibido + tamanoTrozo), archivo.name);
+            let r;
+            try {
+                r = await pedir(url, form, datos);
+            } catch (e) {
+                r = null; // Error de red: se reintenta
+            }
+            if (r && (r.status === 200 || r.status === 409)) {
+                // 409: el servidor tiene otro punto de partida (p. ej. un trozo llegó pero no la respuesta)
+                estado = r.data;
+                recibido = r.data.recibido !== undefined ? r.data.recibido : recibido;
+                fallos = 0;
+            } else if (r && r.status < 500) {
+                localStorage.removeItem(clave(archivo));
+                throw new Error(r.data.error || 'El servidor rechazó el archivo.');
+            } else if (++fallos > MAX_REINTENTOS) {
+                throw new Error('Se perdió la conexión. Vuelva a elegir el archivo para continuar la subida.');
+            } else {
+                await esperar(1000 * Math.pow(2, fallos - 1));
+            }
+        }
+        localStorage.removeItem(clave(archivo));
+        return estado;
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        const form = document.getElementById('upload-document-form');
+        if (!form || !form.dataset.subidaUrl || !window.fetch || !window.FormData || !window.localStorage || !Blob.prototype.slice) {
+            return;
+        }
+        form.addEventListener('submit', function(e) {
+            const archivo = form.querySelector('[name="archivo"]').files[0];
+            if (!archivo || e.defaultPrevented) {
+                return;
+            }
+            e.preventDefault();
+            const boton = form.querySelector('button[type="submit"]');
+            const barra = form.querySelector('.subida-progreso');
+            const mensaje = form.querySelector('.subida-mensaje');
+            mensaje.textContent = '';
+            barra.parentElement.classList.remove('d-none');
+
+            subir(form, archivo, function(fraccion) {
+                barra.style.width = Math.round(fraccion * 100) + '%';
+            }).then(function(data) {
+                barra.style.width = '100%';
+                window.location.href = data.url || window.location.href;
+            }).catch(function(error) {
+                mensaje.textContent = error.message;
+                boton.disabled = false;
+                const spinner = boton.querySelector('.spinner-border');
+                const icon = boton.querySelector('.icon');
+                if (spinner) spinner.style.display = 'none';
+                if (icon) icon.style.display = '';
+            });
+        });
+    });
+})();
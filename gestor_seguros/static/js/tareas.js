@@ -0,0 +1,44 @@
+(function() {
+    // Consulta periódicamente el progreso de las tareas en segundo plano que aún no terminan.
+    const INTERVALO_MS = 2000;
+
+    function actualizar(item, data) {
+        item.querySelector('.tarea-estado').textContent = data.estado_display;
+        item.querySelector('.tarea-barra').style.width = data.porcentaje + '%';
+
+        const detalle = item.querySelector('.tarea-detalle');
+        if (data.estado === 'FALLIDA') {
+            detalle.textContent = data.mensaje_error || 'La tarea falló.';
+        } else if (data.terminada && data.creadas !== null && data.creadas !== undefined) {
+            detalle.textContent = `Creadas: ${data.creadas}. Actualizadas: ${data.actualizadas}. Errores: ${data.errores.length}.`;
+        } else if (data.total) {
+            detalle.textContent = `${data.procesadas} / ${data.total} filas`;
+        }
+
+        if (data.url_descarga) {
+            const enlace = item.querySelector('.tarea-descarga');
+            enlace.href = data.url_descarga;
+            enlace.classList.remove('d-none');
+        }
+    }
+
+    function consultar(item) {
+        fetch(item.dataset.tareaUrl, { headers: { 'Accept': 'application/json' } })
+            .then(response => response.json())
+            .then(data => {
+                actualizar(item, data);
+                if (!data.terminada) {
+                    setTimeout(() => consultar(item), INTERVALO_MS);
+                }
+            })
+            .catch(e => console.error('Error consultando el progreso de la tarea:', e));
+    }
+
+    document.addEventListener('DOMContentLoaded', function() {
+        document.querySelectorAll('[data-tarea-url]').forEach(function(item) {
+            if (item.dataset.tareaTerminada !== '1') {
+                consultar(item);
+            }
+        });
+    });
+})();
@@ -0,0 +1,9 @@
+from django.contrib import admin
+from .models import Tarea
+
+
+@admin.register(Tarea)
+class TareaAdmin(admin.ModelAdmin):
+    list_display = ('id', 'tipo', 'usuario', 'estado', 'procesadas', 'total', 'fecha_creacion', 'fecha_fin')
+    list_filter = ('tipo', 'estado')
+    readonly_fields = ('fecha_creacion', 'fecha_inicio', 'fecha_fin')
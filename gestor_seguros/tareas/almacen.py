@@ -0,0 +1,137 @@
+# tareas/almacen.py
+"""
+Almacenamiento de los archivos de las tareas en la base de datos.
+
+La web y el worker ('manage.py procesar_tareas') pueden correr en dynos o
+servidores distintos, sin disco compartido: el archivo que sube el usuario
+(importación) y el que genera el worker (exportación) se guardan en la base de
+datos, así que cualquiera de los dos procesos los lee. 'manage.py
+limpiar_tareas' los borra junto con sus tareas. Con TAREAS_ALMACENAMIENTO se
+puede usar otro Storage compartido (p. ej. uno de objetos).
+
+El contenido se guarda en trozos de TAMANO_TROZO bytes (TrozoArchivoTarea) y
+se lee con LectorEnTrozos, que trae de la base solo los trozos que se van
+leyendo: ni al guardar ni al leer se tiene el archivo completo en memoria, y
+la lectura admite seek() (openpyxl lo necesita para abrir un XLSX).
+"""
+import io
+from collections import OrderedDict
+
+from django.core.files import File
+from django.core.files.storage import Storage
+from django.db import transaction
+from django.utils.deconstruct import deconstructible
+
+TAMANO_TROZO = 1024 * 1024
+# Trozos que el lector conserva (el XLSX salta entre el índice del zip y sus partes)
+TROZOS_EN_MEMORIA = 4
+
+
+def _modelos():
+    # Import diferido: tareas.models crea este almacenamiento al definir sus campos
+    from .models import ArchivoTarea, TrozoArchivoTarea
+    return ArchivoTarea, TrozoArchivoTarea
+
+
+class LectorEnTrozos(io.RawIOBase):
+    """Lectura (con posición) de un ArchivoTarea, un trozo por consulta."""
+
+    def __init__(self, archivo):
+        super().__init__()
+        self.archivo_id = archivo.pk
+        self.tamano = archivo.tamano
+        self.tamano_trozo = archivo.tamano_trozo
+        self.posicion = 0
+        self._trozos = OrderedDict()
+
+    def readable(self):
+        return True
+
+    def seekable(self):
+        return True
+
+    def tell(self):
+        return self.posicion
+
+    def seek(self, desplazamiento, desde=io.SEEK_SET):
+        base = {io.SEEK_SET: 0, io.SEEK_CUR: self.posicion, io.SEEK_END: self.tamano}[desde]
+        self.posicion = max(0, base + desplazamiento)
+        return self.posicion
+
+    def _trozo(self, numero):
+        if numero in self._trozos:
+            self._trozos.move_to_end(numero)
+        else:
+            _, TrozoArchivoTarea = _modelos()
+            self._trozos[numero] = bytes(
+                TrozoArchivoTarea.objects.filter(archivo_id=self.archivo_id, numero=numero)
+                .values_list('datos', flat=True).get()
+            )
+            if len(self._trozos) > TROZOS_EN_MEMORIA:
+                self._trozos.popitem(last=False)
+        return self._trozos[numero]
+
+    def readinto(self, destino):
+        if self.posicion >= self.tamano:
+            return 0
+        numero, inicio = divmod(self.posicion, self.tamano_trozo)
+        parte = self._trozo(numero)[inicio:inicio + len(destino)]
+        destino[:len(parte)] = parte
+        self.posicion += len(parte)
+        return len(parte)
+
+
+@deconstructible
+class AlmacenamientoEnBaseDeDatos(Storage):
+
+    def _archivo(self, name):
+        ArchivoTarea, _ = _modelos()
+        try:
+            return ArchivoTarea.objects.get(nombre=name)
+        except ArchivoTarea.DoesNotExist:
+            raise FileNotFoundError(f"No existe el archivo de tarea {name}.")
+
+    def _open(self, name, mode='rb'):
+        return File(io.BufferedReader(LectorEnTrozos(self._archivo(name)), buffer_size=64 * 1024), name=name)
+
+    def _save(self, name, content):
+        ArchivoTarea, TrozoArchivoTarea = _modelos()
+        try:
+            # Los archivos subidos ya traen su tamaño: se guarda al crear y no hace falta actualizarlo
+            declarado = content.size
+        except AttributeError:
+            declarado = None
+        with transaction.atomic():
+            archivo = ArchivoTarea.objects.create(nombre=name, tamano=declarado or 0, tamano_trozo=TAMANO_TROZO)
+            numero = tamano = 0
+            pendiente = bytearray()
+
+            def guardar_trozo(datos):
+                nonlocal numero
+                TrozoArchivoTarea.objects.create(archivo=archivo, numero=numero, datos=bytes(datos))
+                numero += 1
+
+            # Los bloques de content.chunks() pueden tener cualquier tamaño: se reparten en
+            # trozos exactos de TAMANO_TROZO para poder ubicar cualquier byte al leer
+            for bloque in content.chunks(TAMANO_TROZO):
+                pendiente += bloque
+                tamano += len(bloque)
+                while len(pendiente) >= TAMANO_TROZO:
+                    guardar_trozo(pendiente[:TAMANO_TROZO])
+                    del pendiente[:TAMANO_TROZO]
+            if pendiente:
+                guardar_trozo(pendiente)
+            if tamano != declarado:
+                ArchivoTarea.objects.filter(pk=archivo.pk).update(tamano=tamano)
+        return name
+
+    def exists(self, name):
+        ArchivoTarea, _ = _modelos()
+        return ArchivoTarea.objects.filter(nombre=name).exists()
+
+    def delete(self, name):
+        ArchivoTarea, _ = _modelos()
+        ArchivoTarea.objects.filter(nombre=name).delete()
+
+    def size(self, name):
+        return self._archivo(name).tamano
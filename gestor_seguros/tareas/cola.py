@@ -0,0 +1,126 @@
+# tareas/cola.py
+import logging
+from datetime import timedelta
+
+from django.conf import settings
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .models import Tarea
+from .manejadores import AL_INTERRUMPIR, MANEJADORES
+
+logger = logging.getLogger(__name__)
+
+
+def encolar_tarea(usuario, tipo, archivo=None, parametros=None):
+    """
+    Registra una tarea para el worker. Con TAREAS_EN_SEGUNDO_PLANO = False
+    (desarrollo local sin worker) se ejecuta en el momento.
+    """
+    tarea = Tarea(usuario=usuario, tipo=tipo, parametros=parametros or {})
+    if archivo is not None:
+        tarea.archivo.save(archivo.name, archivo, save=False)
+    tarea.save()
+
+    if not getattr(settings, 'TAREAS_EN_SEGUNDO_PLANO', True) and _reclamar(tarea.pk):
+        tarea.refresh_from_db()
+        ejecutar_tarea(tarea)
+    return tarea
+
+
+def _reclamar(pk):
+    # UPDATE condicional: si dos workers compiten por la misma tarea solo uno la obtiene
+    ahora = timezone.now()
+    return Tarea.objects.filter(pk=pk, estado='PENDIENTE').update(
+        estado='EN_PROCESO', fecha_inicio=ahora, latido=ahora, intentos=F('intentos') + 1
+    ) == 1
+
+
+def reencolar_abandonadas():
+    """
+    Tareas EN_PROCESO cuyo worker dejó de dar señales (sin latido durante
+    TAREAS_SIN_LATIDO segundos): vuelven a PENDIENTE desde cero, o quedan
+    FALLIDA si ya agotaron TAREAS_MAX_INTENTOS. Las de AL_INTERRUMPIR (las
+    importaciones) no se repiten: quedan FALLIDA al primer corte, indicando
+    hasta dónde llegaron. Devuelve (reencoladas, fallidas).
+    """
+    ahora = timezone.now()
+    limite = ahora - timedelta(seconds=settings.TAREAS_SIN_LATIDO)
+    abandonadas = Tarea.objects.filter(estado='EN_PROCESO').filter(
+        Q(latido__lt=limite) | Q(latido__isnull=True, fecha_inicio__lt=limite)
+    )
+
+    fallidas = 0
+    interrumpidas = abandonadas.filter(tipo__in=AL_INTERRUMPIR).select_related('usuario')
+    for tarea in interrumpidas:
+        # UPDATE condicional: si otro worker ya la marcó (o volvió a dar latido) no se toca
+        marcada = abandonadas.filter(pk=tarea.pk).update(
+            estado='FALLIDA', fecha_fin=ahora,
+            mensaje_error=(
+                f"El proceso se detuvo tras procesar {tarea.procesadas} filas. Las pólizas de esas "
+                "filas ya quedaron guardadas: revísalas antes de volver a importar el archivo."
+            ),
+        )
+        if marcada:
+            AL_INTERRUMPIR[tarea.tipo](tarea)
+            fallidas += 1
+
+    fallidas += abandonadas.filter(intentos__gte=settings.TAREAS_MAX_INTENTOS).update(
+        estado='FALLIDA', fecha_fin=ahora,
+        mensaje_error="El proceso se detuvo varias veces mientras procesaba la tarea.",
+    )
+    reencoladas = abandonadas.update(estado='PENDIENTE', procesadas=0, latido=None)
+    if reencoladas or fallidas:
+        logger.warning("Tareas abandonadas: %s reencoladas, %s marcadas como fallidas", reencoladas, fallidas)
+    return reencoladas, fallidas
+
+
+def tomar_siguiente_tarea():
+    """Reclama la tarea pendiente más antigua, o devuelve None si no hay ninguna."""
+    reencolar_abandonadas()
+    candidatas = Tarea.objects.filter(estado='PENDIENTE').order_by('fecha_creacion').values_list('pk', flat=True)[:10]
+    for pk in candidatas:
+        if _reclamar(pk):
+            return Tarea.objects.select_related('usuario').get(pk=pk)
+    return None
+
+
+def ejecutar_tarea(tarea):
+    """Ejecuta una tarea ya reclamada y guarda su estado final."""
+    def al_avanzar(procesadas):
+        # Cada avance renueva el latido: mientras llegue, la tarea no se da por abandonada
+        Tarea.objects.filter(pk=tarea.pk).update(procesadas=procesadas, latido=timezone.now())
+        tarea.procesadas = procesadas
+
+    manejador = MANEJADORES[tarea.tipo]
+    try:
+        manejador(tarea, al_avanzar)
+        tarea.estado = 'COMPLETADA'
+    except Exception as e:
+        logger.exception("Falló la tarea %s", tarea.pk)
+        tarea.estado = 'FALLIDA'
+        tarea.mensaje_error = str(e)
+    tarea.fecha_fin = timezone.now()
+    tarea.save()
+    return tarea
+
+
+def tareas_recientes(usuario, horas=24, limite=5):
+    desde = timezone.now() - timedelta(hours=horas)
+    return Tarea.objects.filter(usuario=usuario, fecha_creacion__gte=desde).order_by('-fecha_creacion')[:limite]
+
+
+def limpiar_tareas(antes_de):
+    """
+    Borra las tareas terminadas creadas antes de 'antes_de' junto con su archivo
+    de entrada y su resultado. Devuelve cuántas.
+    """
+    viejas = Tarea.objects.filter(estado__in=['COMPLETADA', 'FALLIDA'], fecha_creacion__lt=antes_de)
+    cantidad = 0
+    for tarea in viejas.iterator():
+        for archivo in (tarea.archivo, tarea.resultado):
+            if archivo:
+                archivo.delete(save=False)
+        tarea.delete()
+        cantidad += 1
+    return cantidad
@@ -0,0 +1,21 @@
+# tareas/management/commands/limpiar_tareas.py
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from tareas.cola import limpiar_tareas
+
+
+class Command(BaseCommand):
+    help = (
+        "Borra las tareas terminadas con más de --dias días, con sus archivos de entrada "
+        "y resultados. Pensado para correr a diario."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dias', type=int, default=7, help="Antigüedad mínima de las tareas a borrar.")
+
+    def handle(self, *args, **options):
+        borradas = limpiar_tareas(timezone.now() - timedelta(days=options['dias']))
+        self.stdout.write(self.style.SUCCESS(f"Tareas borradas: {borradas}."))
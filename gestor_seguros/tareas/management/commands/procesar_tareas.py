@@ -0,0 +1,26 @@
+# tareas/management/commands/procesar_tareas.py
+import time
+
+from django.core.management.base import BaseCommand
+
+from tareas.cola import tomar_siguiente_tarea, ejecutar_tarea
+
+
+class Command(BaseCommand):
+    help = "Worker local: procesa las importaciones y exportaciones encoladas."
+
+    def add_arguments(self, parser):
+        parser.add_argument('--una-vez', action='store_true', help="Procesa las tareas pendientes y termina.")
+        parser.add_argument('--intervalo', type=float, default=2.0, help="Segundos de espera cuando no hay tareas.")
+
+    def handle(self, *args, **options):
+        self.stdout.write("Worker de tareas iniciado.")
+        while True:
+            tarea = tomar_siguiente_tarea()
+            if tarea is not None:
+                ejecutar_tarea(tarea)
+                self.stdout.write(f"{tarea} ({tarea.procesadas} filas).")
+                continue
+            if options['una_vez']:
+                break
+            time.sleep(options['intervalo'])
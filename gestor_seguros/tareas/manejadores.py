@@ -0,0 +1,90 @@
+# tareas/manejadores.py
+import io
+import tempfile
+from datetime import datetime
+
+from django.core.files import File
+
+from polizas.dashboard import invalidar_snapshot_dashboard
+from polizas.importacion import FilasArchivo, importar_filas
+from reportes.exportacion import (
+    polizas_para_exportar, escribir_csv_polizas, escribir_xlsx_reporte, contar_filas_reporte,
+)
+from reportes.resumen import reconstruir_resumen
+
+
+def importar_polizas(tarea, al_avanzar):
+    nombre_archivo = tarea.parametros.get('nombre_archivo') or tarea.archivo.name
+    with tarea.archivo.open('rb') as archivo:
+        try:
+            filas = FilasArchivo(archivo, nombre_archivo)
+        except Exception as e:
+            raise ValueError(f"Error al leer el archivo: {e}") from e
+
+        # Las filas se leen del archivo a medida que se importan
+        tarea.total = filas.total_estimado
+        tarea.save(update_fields=['total'])
+        tarea.reporte = importar_filas(tarea.usuario, filas, al_avanzar=al_avanzar)
+
+
+def importacion_interrumpida(tarea):
+    """
+    Una importación cortada no se repite desde cero: cada lote se confirma por
+    separado, así que lo ya importado quedó guardado, y las filas sin número de
+    póliza recibirían otro número generado (se duplicarían). Aquí se rehacen el
+    resumen mensual y el snapshot del dashboard que la importación agrupaba
+    hasta terminar.
+    """
+    reconstruir_resumen([tarea.usuario_id])
+    invalidar_snapshot_dashboard(tarea.usuario_id)
+
+
+def exportar_polizas(tarea, al_avanzar):
+    polizas = polizas_para_exportar(
+        tarea.usuario,
+        tarea.parametros.get('fecha_inicio'),
+        tarea.parametros.get('fecha_fin'),
+    )
+    if tarea.parametros.get('formato') == 'xlsx':
+        _exportar_xlsx(tarea, polizas, al_avanzar)
+        return
+
+    tarea.total = polizas.count()
+    tarea.save(update_fields=['total'])
+
+    # El CSV se escribe en un archivo temporal para no mantenerlo completo en memoria
+    with tempfile.TemporaryFile() as temporal:
+        salida = io.TextIOWrapper(temporal, encoding='utf-8-sig', newline='')
+        escritas = escribir_csv_polizas(salida, polizas, al_avanzar=al_avanzar)
+        salida.flush()
+        temporal.seek(0)
+        filename = f'reporte_polizas_{datetime.now().strftime("%Y-%m-%d")}.csv'
+        tarea.resultado.save(filename, File(temporal), save=False)
+        salida.detach()
+    tarea.reporte = {'filas': escritas}
+
+
+def _exportar_xlsx(tarea, polizas, al_avanzar):
+    # El progreso cuenta las filas de todas las hojas
+    tarea.total = contar_filas_reporte(polizas)
+    tarea.save(update_fields=['total'])
+
+    with tempfile.TemporaryFile() as temporal:
+        escritas_por_hoja = escribir_xlsx_reporte(temporal, polizas, al_avanzar=al_avanzar)
+        temporal.seek(0)
+        filename = f'reporte_polizas_{datetime.now().strftime("%Y-%m-%d")}.xlsx'
+        tarea.resultado.save(filename, File(temporal), save=False)
+    tarea.reporte = {'filas': sum(escritas_por_hoja.values()), 'hojas': escritas_por_hoja}
+
+
+
+MANEJADORES = {
+    'IMPORTAR_POLIZAS': importar_polizas,
+    'EXPORTAR_POLIZAS': exportar_polizas,
+}
+
+# Tipos que no se pueden reencolar si el worker se detiene a mitad: la tarea
+# queda FALLIDA y se llama a su función para dejar coherente lo ya guardado.
+AL_INTERRUMPIR = {
+    'IMPORTAR_POLIZAS': importacion_interrumpida,
+}
@@ -0,0 +1,43 @@
+# Generated by Django 4.2.7 on 2026-10-18 14:09
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import tareas.models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('tipo', models.CharField(choices=[('IMPORTAR_POLIZAS', 'Importación de Pólizas'), ('EXPORTAR_POLIZAS', 'Exportación de Pólizas')], max_length=30, verbose_name='Tipo de Tarea')),
+                ('estado', models.CharField(choices=[('PENDIENTE', 'Pendiente'), ('EN_PROCESO', 'En Proceso'), ('COMPLETADA', 'Completada'), ('FALLIDA', 'Fallida')], default='PENDIENTE', max_length=15, verbose_name='Estado')),
+                ('parametros', models.JSONField(blank=True, default=dict, verbose_name='Parámetros')),
+                ('archivo', models.FileField(blank=True, null=True, upload_to=tareas.models.ruta_archivo_tarea, verbose_name='Archivo de Entrada')),
+                ('resultado', models.FileField(blank=True, null=True, upload_to=tareas.models.ruta_archivo_tarea, verbose_name='Archivo Generado')),
+                ('total', models.PositiveIntegerField(blank=True, null=True, verbose_name='Total de Filas')),
+                ('procesadas', models.PositiveIntegerField(default=0, verbose_name='Filas Procesadas')),
+                ('reporte', models.JSONField(blank=True, default=dict, verbose_name='Reporte')),
+                ('mensaje_error', models.TextField(blank=True, null=True, verbose_name='Mensaje de Error')),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+                ('fecha_inicio', models.DateTimeField(blank=True, null=True)),
+                ('fecha_fin', models.DateTimeField(blank=True, null=True)),
+                ('usuario', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='tareas', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'verbose_name': 'Tarea en Segundo Plano',
+                'verbose_name_plural': 'Tareas en Segundo Plano',
+                'ordering': ['-fecha_creacion'],
+                'indexes': [models.Index(fields=['estado', 'fecha_creacion'], name='tareas_tare_estado_861e62_idx')],
+            },
+        ),
+    ]
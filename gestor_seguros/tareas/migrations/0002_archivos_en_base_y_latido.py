@@ -0,0 +1,48 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:22
+
+from django.db import migrations, models
+import tareas.models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tareas', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivoTarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('nombre', models.CharField(max_length=255, unique=True)),
+                ('contenido', models.BinaryField()),
+                ('tamano', models.PositiveBigIntegerField(default=0)),
+                ('fecha_creacion', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'Archivo de Tarea',
+                'verbose_name_plural': 'Archivos de Tareas',
+            },
+        ),
+        migrations.AddField(
+            model_name='tarea',
+            name='intentos',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='tarea',
+            name='latido',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='tarea',
+            name='archivo',
+            field=models.FileField(blank=True, null=True, storage=tareas.models.almacenamiento_tareas, upload_to=tareas.models.ruta_archivo_tarea, verbose_name='Archivo de Entrada'),
+        ),
+        migrations.AlterField(
+            model_name='tarea',
+            name='resultado',
+            field=models.FileField(blank=True, null=True, storage=tareas.models.almacenamiento_tareas, upload_to=tareas.models.ruta_archivo_tarea, verbose_name='Archivo Generado'),
+        ),
+    ]
@@ -0,0 +1,54 @@
+from django.db import migrations, models
+import django.db.models.deletion
+
+TAMANO_TROZO = 1024 * 1024
+
+
+def partir_contenidos(apps, schema_editor):
+    """Reparte el contenido de los archivos ya guardados en trozos de TAMANO_TROZO."""
+    ArchivoTarea = apps.get_model('tareas', 'ArchivoTarea')
+    TrozoArchivoTarea = apps.get_model('tareas', 'TrozoArchivoTarea')
+    for archivo in ArchivoTarea.objects.iterator(chunk_size=20):
+        contenido = bytes(archivo.contenido)
+        TrozoArchivoTarea.objects.bulk_create(
+            TrozoArchivoTarea(archivo=archivo, numero=numero, datos=contenido[inicio:inicio + TAMANO_TROZO])
+            for numero, inicio in enumerate(range(0, len(contenido), TAMANO_TROZO))
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tareas', '0002_archivos_en_base_y_latido'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='archivotarea',
+            name='tamano_trozo',
+            field=models.PositiveIntegerField(default=TAMANO_TROZO),
+            preserve_default=False,
+        ),
+        migrations.CreateModel(
+            name='TrozoArchivoTarea',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('numero', models.PositiveIntegerField()),
+                ('datos', models.BinaryField()),
+                ('archivo', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trozos', to='tareas.archivotarea')),
+            ],
+            options={
+                'verbose_name': 'Trozo de Archivo de Tarea',
+                'verbose_name_plural': 'Trozos de Archivos de Tareas',
+            },
+        ),
+        migrations.AddConstraint(
+            model_name='trozoarchivotarea',
+            constraint=models.UniqueConstraint(fields=('archivo', 'numero'), name='trozo_archivo_tarea_unico'),
+        ),
+        migrations.RunPython(partir_contenidos, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='archivotarea',
+            name='contenido',
+        ),
+    ]
@@ -0,0 +1,113 @@
+# tareas/models.py
+from django.db import models
+from django.conf import settings
+from django.utils.module_loading import import_string
+
+
+def ruta_archivo_tarea(instance, filename):
+    # El archivo se guardará como tareas/<user_id>/<filename> en el almacenamiento de tareas
+    return f'tareas/{instance.usuario_id}/{filename}'
+
+
+def almacenamiento_tareas():
+    # El worker puede correr en otra máquina que la web: ver tareas/almacen.py
+    return import_string(settings.TAREAS_ALMACENAMIENTO)()
+
+
+class ArchivoTarea(models.Model):
+    """
+    Archivo de tarea guardado en la base de datos (ver tareas/almacen.py). El
+    contenido va en TrozoArchivoTarea, en trozos de 'tamano_trozo' bytes (el
+    último puede ser menor), para no tenerlo nunca completo en memoria.
+    """
+    nombre = models.CharField(max_length=255, unique=True)
+    tamano = models.PositiveBigIntegerField(default=0)
+    tamano_trozo = models.PositiveIntegerField()
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.nombre
+
+    class Meta:
+        verbose_name = "Archivo de Tarea"
+        verbose_name_plural = "Archivos de Tareas"
+
+
+class TrozoArchivoTarea(models.Model):
+    archivo = models.ForeignKey(ArchivoTarea, on_delete=models.CASCADE, related_name='trozos')
+    numero = models.PositiveIntegerField()
+    datos = models.BinaryField()
+
+    def __str__(self):
+        return f"{self.archivo_id} #{self.numero}"
+
+    class Meta:
+        verbose_name = "Trozo de Archivo de Tarea"
+        verbose_name_plural = "Trozos de Archivos de Tareas"
+        constraints = [
+            # También es el índice con el que se lee cada trozo
+            models.UniqueConstraint(fields=['archivo', 'numero'], name='trozo_archivo_tarea_unico'),
+        ]
+
+
+class Tarea(models.Model):
+    """
+    Trabajo en segundo plano (importaciones y exportaciones) que procesa el
+    comando 'manage.py procesar_tareas' fuera del ciclo de la petición.
+    """
+    TIPO_CHOICES = [
+        ('IMPORTAR_POLIZAS', 'Importación de Pólizas'),
+        ('EXPORTAR_POLIZAS', 'Exportación de Pólizas'),
+    ]
+
+    ESTADO_CHOICES = [
+        ('PENDIENTE', 'Pendiente'),
+        ('EN_PROCESO', 'En Proceso'),
+        ('COMPLETADA', 'Completada'),
+        ('FALLIDA', 'Fallida'),
+    ]
+
+    usuario = models.ForeignKey(settings.AUTH_USER_MODEL, on_delete=models.CASCADE, related_name='tareas')
+    tipo = models.CharField(max_length=30, choices=TIPO_CHOICES, verbose_name="Tipo de Tarea")
+    estado = models.CharField(max_length=15, choices=ESTADO_CHOICES, default='PENDIENTE', verbose_name="Estado")
+
+    parametros = models.JSONField(default=dict, blank=True, verbose_name="Parámetros")
+    archivo = models.FileField(upload_to=ruta_archivo_tarea, storage=almacenamiento_tareas, blank=True, null=True, verbose_name="Archivo de Entrada")
+    resultado = models.FileField(upload_to=ruta_archivo_tarea, storage=almacenamiento_tareas, blank=True, null=True, verbose_name="Archivo Generado")
+
+    # Progreso y reporte (creadas, actualizadas y errores por fila en las importaciones)
+    total = models.PositiveIntegerField(null=True, blank=True, verbose_name="Total de Filas")
+    procesadas = models.PositiveIntegerField(default=0, verbose_name="Filas Procesadas")
+    reporte = models.JSONField(default=dict, blank=True, verbose_name="Reporte")
+    mensaje_error = models.TextField(blank=True, null=True, verbose_name="Mensaje de Error")
+
+    fecha_creacion = models.DateTimeField(auto_now_add=True)
+    fecha_inicio = models.DateTimeField(null=True, blank=True)
+    fecha_fin = models.DateTimeField(null=True, blank=True)
+    # El worker lo renueva al avanzar; si se detiene (caída, reinicio del dyno) la tarea
+    # queda sin latido y se vuelve a encolar, hasta TAREAS_MAX_INTENTOS veces
+    latido = models.DateTimeField(null=True, blank=True)
+    intentos = models.PositiveSmallIntegerField(default=0)
+
+    @property
+    def terminada(self):
+        return self.estado in ('COMPLETADA', 'FALLIDA')
+
+    @property
+    def porcentaje(self):
+        if self.estado == 'COMPLETADA':
+            return 100
+        if not self.total:
+            return 0
+        return min(100, int(self.procesadas * 100 / self.total))
+
+    def __str__(self):
+        return f"{self.get_tipo_display()} #{self.pk} ({self.get_estado_display()})"
+
+    class Meta:
+        verbose_name = "Tarea en Segundo Plano"
+        verbose_name_plural = "Tareas en Segundo Plano"
+        ordering = ['-fecha_creacion']
+        indexes = [
+            models.Index(fields=['estado', 'fecha_creacion']),
+        ]
@@ -0,0 +1,110 @@
+import io
+from datetime import date, timedelta
+from decimal import Decimal
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.core.files.base import ContentFile
+from django.test import TestCase, override_settings
+from django.utils import timezone
+
+from clientes.models import Cliente
+from polizas.models import Aseguradora, Poliza
+from reportes.models import ResumenMensual
+
+from .cola import encolar_tarea, limpiar_tareas, reencolar_abandonadas, tomar_siguiente_tarea
+from .models import ArchivoTarea, Tarea, TrozoArchivoTarea
+
+
+@override_settings(TAREAS_EN_SEGUNDO_PLANO=True, TAREAS_SIN_LATIDO=600, TAREAS_MAX_INTENTOS=2)
+class ColaDeTareasTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.usuario = User.objects.create_user('corredor', 'corredor@example.com', 'clave')
+
+    def encolar_con_archivo(self):
+        return encolar_tarea(self.usuario, 'IMPORTAR_POLIZAS', archivo=ContentFile(b'numero;cliente\n', name='polizas.csv'))
+
+    def test_el_archivo_de_entrada_se_guarda_en_la_base_de_datos(self):
+        tarea = self.encolar_con_archivo()
+        self.assertTrue(ArchivoTarea.objects.filter(nombre=tarea.archivo.name).exists())
+        with Tarea.objects.get(pk=tarea.pk).archivo.open('rb') as archivo:
+            self.assertEqual(archivo.read(), b'numero;cliente\n')
+
+    def test_el_archivo_se_guarda_en_trozos_y_se_lee_con_seek(self):
+        contenido = bytes(range(256)) * 4  # 1024 bytes: 10 trozos de 100 y uno de 24
+        with mock.patch('tareas.almacen.TAMANO_TROZO', 100):
+            tarea = encolar_tarea(self.usuario, 'IMPORTAR_POLIZAS', archivo=ContentFile(contenido, name='polizas.xlsx'))
+
+        archivo = ArchivoTarea.objects.get(nombre=tarea.archivo.name)
+        self.assertEqual((archivo.tamano, archivo.tamano_trozo), (1024, 100))
+        self.assertEqual(
+            [len(datos) for datos in TrozoArchivoTarea.objects.filter(archivo=archivo).order_by('numero').values_list('datos', flat=True)],
+            [100] * 10 + [24],
+        )
+        with Tarea.objects.get(pk=tarea.pk).archivo.open('rb') as leido:
+            self.assertEqual(leido.read(), contenido)
+            leido.seek(-30, io.SEEK_END)
+            self.assertEqual(leido.read(10), contenido[-30:-20])
+            leido.seek(95)
+            self.assertEqual(leido.read(10), contenido[95:105])
+            self.assertEqual(leido.tell(), 105)
+
+        tarea.archivo.delete(save=False)
+        self.assertFalse(TrozoArchivoTarea.objects.exists())
+
+    def test_el_tamano_guardado_es_el_leido_aunque_el_declarado_no_coincida(self):
+        contenido = ContentFile(b'numero;cliente\n', name='polizas.csv')
+        contenido.size = 1000
+        tarea = encolar_tarea(self.usuario, 'IMPORTAR_POLIZAS', archivo=contenido)
+        self.assertEqual(ArchivoTarea.objects.get(nombre=tarea.archivo.name).tamano, 15)
+
+    def test_tarea_sin_latido_se_reencola_hasta_agotar_los_intentos(self):
+        tarea = encolar_tarea(self.usuario, 'EXPORTAR_POLIZAS')
+        self.assertEqual(tomar_siguiente_tarea().pk, tarea.pk)
+        hace_una_hora = timezone.now() - timedelta(hours=1)
+
+        Tarea.objects.filter(pk=tarea.pk).update(latido=hace_una_hora)
+        self.assertEqual(reencolar_abandonadas(), (1, 0))
+        self.assertEqual(tomar_siguiente_tarea().intentos, 2)
+
+        Tarea.objects.filter(pk=tarea.pk).update(latido=hace_una_hora)
+        self.assertEqual(reencolar_abandonadas(), (0, 1))
+        self.assertEqual(Tarea.objects.get(pk=tarea.pk).estado, 'FALLIDA')
+
+    def test_importacion_sin_latido_falla_sin_repetirse_y_rehace_el_resumen(self):
+        # Las filas sin número de póliza reciben uno generado: repetir la importación las duplicaría
+        tarea = self.encolar_con_archivo()
+        self.assertEqual(tomar_siguiente_tarea().pk, tarea.pk)
+        cliente = Cliente.objects.create(usuario=self.usuario, nombre_completo='Ana', numero_documento='V-1')
+        aseguradora = Aseguradora.objects.create(usuario=self.usuario, nombre='Mapfre')
+        with self.captureOnCommitCallbacks(execute=True):
+            Poliza.objects.create(
+                usuario=self.usuario, cliente=cliente, aseguradora=aseguradora, numero_poliza='P-1',
+                fecha_emision=date(2026, 3, 5), fecha_inicio_vigencia=date(2026, 3, 5), fecha_fin_vigencia=date(2027, 3, 5),
+                prima_total_anual=Decimal('1200'), frecuencia_pago='ANUAL',
+            )
+        # Una importación cortada deja sin recalcular los meses que agrupaba
+        ResumenMensual.objects.all().delete()
+        Tarea.objects.filter(pk=tarea.pk).update(procesadas=500, latido=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(reencolar_abandonadas(), (0, 1))
+        tarea.refresh_from_db()
+        self.assertEqual((tarea.estado, tarea.procesadas, tarea.intentos), ('FALLIDA', 500, 1))
+        self.assertIn('500 filas', tarea.mensaje_error)
+        self.assertEqual(list(ResumenMensual.objects.values_list('mes', 'cantidad')), [(date(2026, 3, 1), 1)])
+
+    def test_tarea_con_latido_reciente_no_se_reencola(self):
+        encolar_tarea(self.usuario, 'EXPORTAR_POLIZAS')
+        tomar_siguiente_tarea()
+        self.assertEqual(reencolar_abandonadas(), (0, 0))
+
+    def test_limpiar_tareas_borra_las_terminadas_y_sus_archivos(self):
+        terminada = self.encolar_con_archivo()
+        Tarea.objects.filter(pk=terminada.pk).update(estado='COMPLETADA')
+        pendiente = self.encolar_con_archivo()
+
+        self.assertEqual(limpiar_tareas(timezone.now() + timedelta(seconds=1)), 1)
+        self.assertEqual(list(Tarea.objects.values_list('pk', flat=True)), [pendiente.pk])
+        self.assertEqual(list(ArchivoTarea.objects.values_list('nombre', flat=True)), [pendiente.archivo.name])
@@ -0,0 +1,9 @@
+from django.urls import path
+from . import views
+
+app_name = 'tareas'
+
+urlpatterns = [
+    path('<int:pk>/progreso/', views.progreso_tarea, name='progreso_tarea'),
+    path('<int:pk>/descargar/', views.descargar_resultado, name='descargar_resultado'),
+]
@@ -0,0 +1,39 @@
+# tareas/views.py
+from django.contrib.auth.decorators import login_required
+from django.http import JsonResponse, FileResponse, Http404
+from django.shortcuts import get_object_or_404
+from django.urls import reverse
+
+from .models import Tarea
+
+
+@login_required
+def progreso_tarea(request, pk):
+    """Estado de una tarea en JSON, consultado periódicamente desde la lista de pólizas."""
+    tarea = get_object_or_404(Tarea, pk=pk, usuario=request.user)
+    reporte = tarea.reporte or {}
+    data = {
+        'id': tarea.pk,
+        'tipo': tarea.get_tipo_display(),
+        'estado': tarea.estado,
+        'estado_display': tarea.get_estado_display(),
+        'terminada': tarea.terminada,
+        'procesadas': tarea.procesadas,
+        'total': tarea.total,
+        'porcentaje': tarea.porcentaje,
+        'creadas': reporte.get('creadas'),
+        'actualizadas': reporte.get('actualizadas'),
+        'errores': reporte.get('errores', []),
+        'mensaje_error': tarea.mensaje_error,
+        'url_descarga': reverse('tareas:descargar_resultado', kwargs={'pk': tarea.pk}) if tarea.resultado else None,
+    }
+    return JsonResponse(data)
+
+
+@login_required
+def descargar_resultado(request, pk):
+    tarea = get_object_or_404(Tarea, pk=pk, usuario=request.user)
+    if not tarea.resultado:
+        raise Http404("La tarea no generó ningún archivo.")
+    nombre = tarea.resultado.name.rsplit('/', 1)[-1]
+    return FileResponse(tarea.resultado.open('rb'), as_attachment=True, filename=nombre)